@@ -1,15 +1,19 @@
-from biocypher import BioCypher
 from collections import Counter, defaultdict
 from abc import ABC, abstractmethod
 import pathlib
 import os
 
+from biocypher_metta.adapters.batches import edge_batch_records, node_batch_records
+
 
 class BaseWriter(ABC):
     def __init__(self, schema_config, biocypher_config, output_dir):
         self.schema_config = schema_config
         self.biocypher_config = biocypher_config
         self.output_path = pathlib.Path(output_dir)
+        # Import lazily: biocypher pulls in pandas and networkx, which adapters importing
+        # biocypher_metta.adapters have no use for
+        from biocypher import BioCypher
         self.bcy = BioCypher(schema_config_path=schema_config,
                              biocypher_config_path=biocypher_config)
         if not os.path.exists(output_dir):
@@ -28,6 +32,14 @@ class BaseWriter(ABC):
     def write_edges(self, edges, path_prefix=None, create_dir=True):
         pass
 
+    def write_node_batches(self, batches, path_prefix=None):
+        """Writes node batches (see biocypher_metta/adapters/batches.py), one record at a time."""
+        return self.write_nodes(node_batch_records(batches), path_prefix=path_prefix)
+
+    def write_edge_batches(self, batches, path_prefix=None):
+        """Writes edge batches (see biocypher_metta/adapters/batches.py), one record at a time."""
+        return self.write_edges(edge_batch_records(batches), path_prefix=path_prefix)
+
     def extract_node_info(self, node):
         id, label, properties = node
         self.node_freq[label] += 1
@@ -1,6 +1,14 @@
 # Author Abdulrahman S. Omar <xabush@singularitynet.io>
 
+from biocypher_metta.adapters.batches import to_edge_batches, to_node_batches
+from biocypher_metta.adapters.row_errors import row_errors
+
+
 class Adapter:
+    # RecordSampler of a sampled build, set by create_knowledge_graph.py before the
+    # nodes and edges are read
+    sampler = None
+
     def __init__(self, write_properties, add_provenance):
         self.write_properties = write_properties
         self.add_provenance = add_provenance
@@ -8,4 +16,66 @@ class Adapter:
         pass
 
     def get_edges(self):
-        pass
\ No newline at end of file
+        pass
+
+    # Batch protocol (see biocypher_metta/adapters/batches.py). Adapters that build their
+    # records column by column override these; the default groups get_nodes()/get_edges().
+    def get_node_batches(self, batch_size=10000):
+        return to_node_batches(self.get_nodes() or (), batch_size)
+
+    def get_edge_batches(self, batch_size=10000):
+        return to_edge_batches(self.get_edges() or (), batch_size)
+
+    @classmethod
+    def yields_batches(cls):
+        """True if the adapter builds batches itself rather than through get_nodes()/get_edges()."""
+        return (cls.get_node_batches is not Adapter.get_node_batches
+                or cls.get_edge_batches is not Adapter.get_edge_batches)
+
+    @classmethod
+    def caches_output(cls, args):
+        """
+        False if the adapter built with `args` reads inputs that are not local files named by
+        its arguments (a remote ontology, the chado database): only the adapter resolves their
+        release, so its output is not cached (see biocypher_metta/adapters/output_cache.py).
+        """
+        return True
+
+    def sampled(self, *identifiers):
+        """True if a record about these entities belongs in the build (always, unless sampled)."""
+        return self.sampler is None or self.sampler.keep(*identifiers)
+
+    def row_error(self, error, row=None):
+        """Count a row skipped on `error` (see biocypher_metta/adapters/row_errors.py)."""
+        row_errors.record(error, row, adapter=type(self).__name__)
+
+    def read_csv_chunks(self, filepath, columns, chunksize, **kwargs):
+        """
+        pd.read_csv(filepath, names=columns, chunksize=chunksize, **kwargs) that skips the rows
+        with more fields than `columns` and counts them with row_error() instead of failing.
+        """
+        import warnings
+        import pandas as pd
+
+        # The parser skips most ragged rows with a ParserWarning, but truncates the ones that
+        # start a chunk: a spare column catches those.
+        extra = '__extra_fields__'
+        chunks = pd.read_csv(filepath, names=[*columns, extra], on_bad_lines='warn', chunksize=chunksize, **kwargs)
+        while True:
+            with warnings.catch_warnings(record=True) as skipped:
+                warnings.simplefilter('always', pd.errors.ParserWarning)
+                chunk = next(chunks, None)
+            for warning in skipped:
+                for line in str(warning.message).splitlines():
+                    self.row_error(ValueError(f'more than {len(columns)} fields'), line)
+            if chunk is None:
+                return
+            extra_fields = chunk.pop(extra)
+            ragged = extra_fields.notna().to_numpy()
+            if ragged.any():
+                ragged[ragged] = (extra_fields[ragged] != '').to_numpy()
+            if ragged.any():
+                for row in chunk[ragged].itertuples(index=False):
+                    self.row_error(ValueError(f'more than {len(columns)} fields'), list(row))
+                chunk = chunk[~ragged]
+            yield chunk
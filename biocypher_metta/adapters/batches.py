@@ -0,0 +1,78 @@
+"""
+Columnar batches of nodes and edges.
+
+get_nodes()/get_edges() yield one (id, label, properties) or (source, target, label,
+properties) tuple at a time, and writers handle them one at a time too. The batch protocol
+(Adapter.get_node_batches()/get_edge_batches()) yields the same records as dicts of lists
+instead:
+
+    node batch: {'id': [...], 'label': [...], 'properties': {name: [...]}}
+    edge batch: {'source': [...], 'target': [...], 'label': [...], 'properties': {name: [...]}}
+
+All lists of a batch have one entry per record. A None in a property column means that the
+record has no such property, so a record never holds a property set to None. The property
+columns are in the order the records list their properties in.
+
+Writers that know batches (MeTTaWriter.write_node_batches()) count, normalise and format a
+whole column at a time; the others get the records one at a time again through
+BaseWriter.write_node_batches().
+"""
+
+from itertools import islice
+
+
+def _property_columns(properties, size):
+    columns = {}
+    for i, props in enumerate(properties):
+        for key, value in props.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [None] * size
+            column[i] = value
+    return columns
+
+
+def _record_properties(columns, size):
+    properties = [{} for _ in range(size)]
+    for key, column in columns.items():
+        for props, value in zip(properties, column):
+            if value is not None:
+                props[key] = value
+    return properties
+
+
+def to_node_batches(nodes, batch_size=10000):
+    """Groups (id, label, properties) tuples into node batches."""
+    nodes = iter(nodes)
+    while True:
+        records = list(islice(nodes, batch_size))
+        if not records:
+            return
+        ids, labels, properties = zip(*records)
+        yield {'id': list(ids), 'label': list(labels), 'properties': _property_columns(properties, len(records))}
+
+
+def to_edge_batches(edges, batch_size=10000):
+    """Groups (source, target, label, properties) tuples into edge batches."""
+    edges = iter(edges)
+    while True:
+        records = list(islice(edges, batch_size))
+        if not records:
+            return
+        sources, targets, labels, properties = zip(*records)
+        yield {'source': list(sources), 'target': list(targets), 'label': list(labels),
+               'properties': _property_columns(properties, len(records))}
+
+
+def node_batch_records(batches):
+    """Yields the (id, label, properties) tuples of node batches."""
+    for batch in batches:
+        properties = _record_properties(batch['properties'], len(batch['id']))
+        yield from zip(batch['id'], batch['label'], properties)
+
+
+def edge_batch_records(batches):
+    """Yields the (source, target, label, properties) tuples of edge batches."""
+    for batch in batches:
+        properties = _record_properties(batch['properties'], len(batch['source']))
+        yield from zip(batch['source'], batch['target'], batch['label'], properties)
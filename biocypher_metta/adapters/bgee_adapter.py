@@ -1,5 +1,7 @@
 import gzip
+import os
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.external_sort import ExternalSorter
 from biocypher_metta.adapters.helpers import to_float
 from collections import defaultdict
 
@@ -32,18 +34,35 @@ class BgeeAdapter(Adapter):
         9606: 'ENSEMBL',
     }
 
-    def __init__(self, filepath, write_properties, add_provenance, taxon_id, label):
+    # Compressed input size above which the external sort is used when external_sort is None
+    EXTERNAL_SORT_MIN_FILE_SIZE = 256 * 2**20
+
+    def __init__(self, filepath, write_properties, add_provenance, taxon_id, label,
+                 external_sort=None, memory_budget_mb=512, tmp_dir=None):
+        """
+        :param external_sort: keep the max-score call per (gene, anatomical entity) with an on-disk
+            sort instead of a dict of every pair; None picks it from the size of the input file when
+            the edges are read
+        :param memory_budget_mb: memory kept by the external sort before spilling sorted runs
+        :param tmp_dir: directory for the sorted runs (default: system temp dir)
+        """
         self.filepath = filepath
         self.label = label
         self.taxon_id = taxon_id
+        self.external_sort = external_sort
+        self.memory_budget_mb = memory_budget_mb
+        self.tmp_dir = tmp_dir
 
         self.source = 'bgee' 
         self.source_url = f"https://www.bgee.org/download/gene-expression-calls?id={self.taxon_id}"
         super(BgeeAdapter, self).__init__(write_properties, add_provenance)
     
     
-    def get_edges(self):
-        edge_dict = defaultdict(lambda: {"score": float("-inf"), "props": {}})
+    def get_expression_calls(self):
+        """
+        Yields (source_id, target_id, score, props) for every anatomical entity of every
+        present call, in file order.
+        """
         try:
             with gzip.open(self.filepath, 'rt') as f:
                 next(f)  # skip header
@@ -81,19 +100,53 @@ class BgeeAdapter(Adapter):
                                     "source_url": self.source_url,                                
                                 })                        
 
-                            # Update edge if new score is higher
-                            edge_key = (source_id, target_id)
-                            if score > edge_dict[edge_key]["score"]:
-                                edge_dict[edge_key] = {"score": score, "props": props}
-
-            # Yield deduplicated edges
-            for (source_id, target_id), edge_data in edge_dict.items():
-                yield source_id, ('anatomy', target_id), self.label, edge_data["props"]
-                yield source_id, ('developmental_stage', edge_data['props'].get('developmental_stage')), self.label, edge_data["props"]
+                            yield source_id, target_id, score, props
 
         except OSError as e:
             raise RuntimeError(f"Error opening the file: {https://www.bgee.org/download/gene-expression-calls?id=9606}")
 
+    def get_edges(self):
+        external_sort = self.external_sort
+        if external_sort is None:
+            external_sort = os.path.getsize(self.filepath) > BgeeAdapter.EXTERNAL_SORT_MIN_FILE_SIZE
+        if external_sort:
+            edges = self.get_max_score_edges_sorted()
+        else:
+            edges = self.get_max_score_edges()
+
+        for source_id, target_id, props in edges:
+            yield source_id, ('anatomy', target_id), self.label, props
+            yield source_id, ('developmental_stage', props.get('developmental_stage')), self.label, props
+
+    def get_max_score_edges(self):
+        edge_dict = defaultdict(lambda: {"score": float("-inf"), "props": {}})
+        for source_id, target_id, score, props in self.get_expression_calls():
+            # Update edge if new score is higher
+            edge_key = (source_id, target_id)
+            if score > edge_dict[edge_key]["score"]:
+                edge_dict[edge_key] = {"score": score, "props": props}
+
+        # Yield deduplicated edges
+        for (source_id, target_id), edge_data in edge_dict.items():
+            yield source_id, target_id, edge_data["props"]
+
+    def get_max_score_edges_sorted(self):
+        """
+        Same edges as get_max_score_edges(), in (gene, anatomical entity) order. Calls are
+        sorted on (gene, anatomical entity, -score, position in the file), so the first record
+        of every pair is its highest score, first seen on ties, and only that one is kept when
+        the sorted runs are merged.
+        """
+        max_score = ExternalSorter(self.memory_budget_mb, unique_key=lambda record: record[:2], tmp_dir=self.tmp_dir)
+        with max_score:
+            for seq, (source_id, target_id, score, props) in enumerate(self.get_expression_calls()):
+                # NaN and -inf scores never replace the empty default of the in-memory path
+                rank = -score if score > float("-inf") else float("inf")
+                max_score.add((source_id, target_id, rank, seq, props))
+
+            for source_id, target_id, rank, _, props in max_score:
+                yield source_id, target_id, props if rank != float("inf") else {}
+
     def split_by_intersection(self, s: str) -> list[str]:
         """
         Split a string by the Unicode intersection separator '∩' and return a list of IDs.
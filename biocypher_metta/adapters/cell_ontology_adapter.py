@@ -1,6 +1,6 @@
 import rdflib
 from rdflib.namespace import RDF, RDFS, OWL
-from pathlib import Path
+import os
 from biocypher_metta.adapters.ontologies_adapter import OntologyAdapter
 
 class CellOntologyAdapter(OntologyAdapter):
@@ -181,29 +181,12 @@ class CellOntologyAdapter(OntologyAdapter):
 
         UBERON provides dbxrefs to BTO; we invert those xrefs.
         """
-        uberon_graph = rdflib.Graph()
-
-        cache_dir = Path(self.cache_dir) if self.cache_dir else None
-        local_uberon = cache_dir / 'uberon.owl' if cache_dir else None
-
-        parsed = False
-        if local_uberon and local_uberon.exists():
-            for fmt in ('xml', 'turtle', 'n3', 'nt'):
-                try:
-                    uberon_graph.parse(str(local_uberon), format=fmt)
-                    parsed = True
-                    break
-                except Exception:
-                    continue
-
-        if not parsed:
-            try:
-                from biocypher_metta.adapters.uberon_adapter import UberonAdapter
+        from biocypher_metta.adapters.uberon_adapter import UberonAdapter
 
-                uberon_graph.parse(UberonAdapter.ONTOLOGIES['uberon'])
-                parsed = True
-            except Exception:
-                return {}
+        local_uberon = os.path.join(self.cache_dir, 'uberon.owl') if self.cache_dir else None
+        uberon_graph = self.get_shared_graph(UberonAdapter.ONTOLOGIES['uberon'], local_uberon)
+        if uberon_graph is None:
+            return {}
 
         uberon_to_bto = {}
         for uberon_node, xref in uberon_graph.subject_objects(predicate=OntologyAdapter.DB_XREF, unique=True):
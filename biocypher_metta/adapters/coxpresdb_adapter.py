@@ -1,6 +1,8 @@
 
 from biocypher_metta.adapters import Adapter
 import pickle
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from biocypher_metta.processors import EntrezEnsemblProcessor
 import os
 
@@ -33,12 +35,52 @@ import os
 # Rat data:
 
 
+# Sorted entrez ids with an ensembl mapping, set in every worker process by _init_worker()
+_mapped_entrez_ids = None
+
+
+def _init_worker(mapped_entrez_ids):
+    global _mapped_entrez_ids
+    _mapped_entrez_ids = mapped_entrez_ids
+
+
+def select_partners(gene_file_path, mapped_entrez_ids, top_k=None, min_score=None):
+    '''
+    Reads a gene file and returns (indexes into mapped_entrez_ids, scores) of the partners
+    with an ensembl mapping, score >= min_score and among the top_k scores, in file order.
+    '''
+    # every row is '<entrez id>\t<score>'
+    values = np.loadtxt(gene_file_path, dtype=np.float64, ndmin=2).reshape(-1, 2)
+    co_entrez_ids = values[:, 0].astype(np.int64)
+    scores = values[:, 1]
+
+    positions = np.searchsorted(mapped_entrez_ids, co_entrez_ids)
+    positions[positions == len(mapped_entrez_ids)] = 0
+    keep = mapped_entrez_ids[positions] == co_entrez_ids if len(mapped_entrez_ids) else np.zeros(len(scores), dtype=bool)
+    if min_score is not None:
+        keep &= scores >= min_score
+    selected = np.flatnonzero(keep)
+    if top_k is not None and len(selected) > top_k:
+        best = np.argpartition(-scores[selected], top_k - 1)[:top_k]
+        selected = np.sort(selected[best])
+    return positions[selected], scores[selected]
+
+
+def _select_partners_worker(task):
+    gene_file_path, top_k, min_score = task
+    return select_partners(gene_file_path, _mapped_entrez_ids, top_k, min_score)
+
 
 class CoxpresdbAdapter(Adapter):
 
     def __init__(self, filepath, entrez_to_ensemble_path=None, label='coexpressed_with',
                  write_properties=None, add_provenance=None, taxon_id=9606,
-                 entrez_ensembl_processor=None):
+                 entrez_ensembl_processor=None, top_k=None, min_score=None, workers=1):
+        '''
+        top_k:     only keep the top_k highest scoring partners of every gene
+        min_score: only keep partners with a score >= min_score
+        workers:   processes reading the gene files (1 reads them in this process)
+        '''
 
         self.file_path = filepath
         self.dataset = 'coxpresdb'
@@ -47,6 +89,9 @@ class CoxpresdbAdapter(Adapter):
         self.source_url = 'https://coxpresdb.jp/'
         self.version = 'v8'
         self.taxon_id = taxon_id
+        self.top_k = top_k
+        self.min_score = min_score
+        self.workers = workers
         assert os.path.isdir(self.file_path), "coxpresdb file path is not a directory"
 
         # Use provided processor or create new one; fallback to pickle for non-human
@@ -70,7 +115,8 @@ class CoxpresdbAdapter(Adapter):
         # every gene has ensembl id in gencode file, every gene has hgnc id if available.
         # every gene has entrez gene id in gene_info file, every gene has ensembl id or hgcn id if available
 
-        gene_ids = [f for f in os.listdir(self.file_path) if os.path.isfile(os.path.join(self.file_path, f)) and f.isdigit()]
+        # numeric gene order, so the output does not depend on the directory listing
+        gene_ids = sorted((f for f in os.listdir(self.file_path) if os.path.isfile(os.path.join(self.file_path, f)) and f.isdigit()), key=int)
 
         # Use processor mapping or load from pickle
         if self.processor is not None:
@@ -78,23 +124,34 @@ class CoxpresdbAdapter(Adapter):
         else:
             with open(self.entrez_to_ensemble_dict_path, 'rb') as f:
                 entrez_ensembl_dict = pickle.load(f)
-        for gene_id in gene_ids:
-            gene_file_path = os.path.join(self.file_path, gene_id)
-            entrez_id = gene_id
-            ensembl_id = entrez_ensembl_dict.get(entrez_id)
-            if ensembl_id:
-                with open(gene_file_path, 'r') as input:
-                    for line in input:
-                        (co_entrez_id, score) = line.strip().split()
-                        co_ensembl_id = entrez_ensembl_dict.get(co_entrez_id)
-                        if co_ensembl_id:
-                            _id = entrez_id + '_' + co_entrez_id + '_' + self.label
-                            source = f"ENSEMBL:{ensembl_id}"
-                            target = f"ENSEMBL:{co_ensembl_id}"
-                            _props = {'taxon_id': f'{self.taxon_id}'}
-                            if self.write_properties:
-                                _props['score'] = float(score)
-                                if self.add_provenance:
-                                    _props['source'] = self.source
-                                    _props['source_url'] = self.source_url
-                            yield source, target, self.label, _props
+        mapped_entrez = sorted((int(entrez_id), entrez_id) for entrez_id, ensembl_id in entrez_ensembl_dict.items()
+                               if entrez_id.isdigit() and ensembl_id)
+        mapped_entrez_ids = np.array([entrez_id for entrez_id, _ in mapped_entrez], dtype=np.int64)
+        mapped_targets = [f"ENSEMBL:{entrez_ensembl_dict[entrez_id]}" for _, entrez_id in mapped_entrez]
+
+        genes = [(gene_id, entrez_ensembl_dict[gene_id]) for gene_id in gene_ids if entrez_ensembl_dict.get(gene_id)]
+        tasks = [(os.path.join(self.file_path, gene_id), self.top_k, self.min_score) for gene_id, _ in genes]
+        if self.workers > 1 and len(tasks) > 1:
+            executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(mapped_entrez_ids,))
+            # map() returns results in task order, whichever worker finishes first
+            results = executor.map(_select_partners_worker, tasks, chunksize=max(1, len(tasks) // (self.workers * 8)))
+        else:
+            executor = None
+            results = (select_partners(path, mapped_entrez_ids, top_k, min_score) for path, top_k, min_score in tasks)
+
+        taxon_id = f'{self.taxon_id}'
+        try:
+            for (_, ensembl_id), (partners, scores) in zip(genes, results):
+                source = f"ENSEMBL:{ensembl_id}"
+                for partner, score in zip(partners.tolist(), scores.tolist()):
+                    target = mapped_targets[partner]
+                    _props = {'taxon_id': taxon_id}
+                    if self.write_properties:
+                        _props['score'] = score
+                        if self.add_provenance:
+                            _props['source'] = self.source
+                            _props['source_url'] = self.source_url
+                    yield source, target, self.label, _props
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
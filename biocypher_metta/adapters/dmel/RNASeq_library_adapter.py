@@ -86,6 +86,11 @@ class RnaseqLibraryAdapter(Adapter):
 
         super(RnaseqLibraryAdapter, self).__init__(write_properties, add_provenance)
 
+    @classmethod
+    def caches_output(cls, args):
+        # FCA2 libraries are looked up in the chado database
+        return False
+
 
     def get_nodes(self):
         for dmel_data_filepath in self.filepaths:
@@ -15,7 +15,7 @@ FBal0009407	kst[01318]	FBgn0004167	kst
 FBal0091321	Ecol\lacZ[kst-01318]	FBgn0014447	Ecol\lacZ
 FBal0091320	Ecol\lacZ[mam-04615]	FBgn0014447	Ecol\lacZ
 '''
-from biocypher_metta.adapters.dmel.flybase_tsv_reader import FlybasePrecomputedTable
+from biocypher_metta.adapters.dmel.flybase_tsv_reader import FlybaseTsvStream, extract_date_string
 #from flybase_tsv_reader import FlybasePrecomputedTable
 from biocypher_metta.adapters import Adapter
 
@@ -31,29 +31,27 @@ class AlleleAdapter(Adapter):
  
 
     def get_nodes(self):
-        fbal_table = FlybasePrecomputedTable(self.dmel_filepath)
-        self.version = fbal_table.extract_date_string(self.dmel_filepath)
+        self.version = extract_date_string(self.dmel_filepath)
         #header:
         #AlleleID	AlleleSymbol	GeneID	GeneSymbol
-        rows = fbal_table.get_rows()
-        for row in rows:
+        rows = FlybaseTsvStream(self.dmel_filepath, columns=['AlleleID', 'AlleleSymbol'])
+        for allele, allele_symbol in rows:
             props = {}
-            allele_id = f'FlyBase:{row[0]}'
-            props['allele_symbol'] = row[1]
+            allele_id = f'FlyBase:{allele}'
+            props['allele_symbol'] = allele_symbol
             props['taxon_id'] = 7227
 
             yield allele_id, self.label, props      # here label is 'allele'
 
     def get_edges(self):
-        fbal_table = FlybasePrecomputedTable(self.dmel_filepath)
-        self.version = fbal_table.extract_date_string(self.dmel_filepath)
+        self.version = extract_date_string(self.dmel_filepath)
         #header:
         #AlleleID	AlleleSymbol	GeneID	GeneSymbol
-        rows = fbal_table.get_rows()
-        for row in rows:
+        rows = FlybaseTsvStream(self.dmel_filepath, columns=['AlleleID', 'GeneID'])
+        for allele, gene in rows:
             props = {}
-            source = f'FlyBase:{row[0].lower()}' # allele
-            target = f'FlyBase:{row[2].lower()}' # gene
+            source = f'FlyBase:{allele.lower()}' # allele
+            target = f'FlyBase:{gene.lower()}' # gene
             props['taxon_id'] = 7227
 
             yield source, target, self.label, props     # here label is 'variant_of'
@@ -219,7 +219,7 @@ class PhysicalInteractionAdapter(Adapter):
             # print(parts[ len(parts) // 2 ].replace(':', '_'))    
             return parts[ len(parts) // 2 ].replace(':', '_')
         except Exception as e:
-            print(f"mi_string:::::--> {mi_string}.  {e}")
+            self.row_error(e, mi_string)
             return ''
 
     # not  used
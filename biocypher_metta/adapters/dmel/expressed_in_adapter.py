@@ -19,7 +19,7 @@ FBrf0245988	Cattenoz et al., 2020, EMBO J. 39(12): e104486	FBlc0003731	scRNAseq_
 FBrf0245988	Cattenoz et al., 2020, EMBO J. 39(12): e104486	FBlc0003731	scRNAseq_2020_Cattenoz_NI_seq_clustering		larval stage	embryonic/larval hemolymph	FBlc0003732	scRNAseq_2020_Cattenoz_NI_seq_clustering_plasmatocytes	FBbt:00001685	embryonic/larval plasmatocyte	FBgn0024989	CG3777	354.646665	0.0003379520108144643
 
 '''
-from biocypher_metta.adapters.dmel.flybase_tsv_reader import FlybasePrecomputedTable
+from biocypher_metta.adapters.dmel.flybase_tsv_reader import FlybaseTsvStream, extract_date_string
 from biocypher_metta.adapters import Adapter
 from biocypher_metta.processors import GOSubontologyProcessor
 from biocypher._logger import logger
@@ -54,19 +54,18 @@ class ExpressedInAdapter(Adapter):
 
 
     def get_edges(self):
-        expression_table = FlybasePrecomputedTable(self.filepath)
-        self.version = expression_table.extract_date_string(self.filepath)
+        self.version = extract_date_string(self.filepath)
         # To avoid duplicates
         expresseds: dict[str, list[str]] = {}
 
         # header:
         # Pub_ID	Pub_miniref	Clustering_Analysis_ID	Clustering_Analysis_Name	Source_Tissue_Sex	Source_Tissue_Stage
         # Source_Tissue_Anatomy	Cluster_ID	Cluster_Name	Cluster_Cell_Type_ID	Cluster_Cell_Type_Name	Gene_ID	Gene_Symbol	Mean_Expression	Spread
-        rows = expression_table.get_rows()
-        for row in rows:
+        rows = FlybaseTsvStream(self.filepath, columns=['Gene_ID', 'Cluster_Cell_Type_ID'])
+        for gene_id, cell_type_id in rows:
             props = {}
-            source = f'FlyBase:{row[11].upper()}'                    # gene FBgn#                      
-            target = row[9] #.replace(':', '_').upper()   # Cluster_Cell_Type_ID  (FBbt# or GO#)   
+            source = f'FlyBase:{gene_id.upper()}'                    # gene FBgn#                      
+            target = cell_type_id #.replace(':', '_').upper()   # Cluster_Cell_Type_ID  (FBbt# or GO#)   
             target_type = ExpressedInAdapter.ontologies.get(target.split(':')[0].lower())
             # if isinstance(target_type, list):  #just for testing, remove later
             #     target_type = target_type[0]
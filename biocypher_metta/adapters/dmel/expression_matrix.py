@@ -0,0 +1,118 @@
+'''
+Genes x conditions expression matrices for the dmel expression adapters.
+
+Expression tables hold one value per (gene, library/sample) pair. Going through them row by
+row keeps every row as a list of strings and builds the edge properties value by value. An
+ExpressionMatrix keeps each value in two arrays instead, with gene and condition ids stored
+once: its number, so filters are applied to whole arrays, and its text as written in the
+table (as ASCII bytes), which is what edges carry, as on the row path ('5', '0.50' and
+'1e-3' are not rewritten as '5.0', '0.5' and '0.001'). Edges are generated in batches.
+
+Wide tables (one column per condition, e.g. AFCA) are stored dense; long tables (one row
+per gene and condition, e.g. the FlyBase high-throughput report) are stored sparse, as
+coordinate arrays in file order. Empty values are stored as NaN (and '') and, as on the
+row path, yielded as '' unless a minimum value is given.
+'''
+
+from array import array
+
+import numpy as np
+
+from biocypher_metta.adapters.dmel.flybase_tsv_reader import FlybaseTsvStream
+
+
+class ExpressionMatrix:
+    def __init__(self, genes, conditions, values, texts, gene_index=None, condition_index=None,
+                 condition_attributes=None):
+        self.genes = genes
+        self.conditions = conditions
+        self.values = values
+        # the values as written in the source table, shaped like values
+        self.texts = texts
+        # Sparse matrices keep the coordinates of their values, dense ones have values.shape == (genes, conditions)
+        self.gene_index = gene_index
+        self.condition_index = condition_index
+        self.condition_attributes = condition_attributes or {}
+
+    @property
+    def is_sparse(self):
+        return self.gene_index is not None
+
+    @property
+    def nbytes(self):
+        total = self.values.nbytes + self.texts.nbytes
+        if self.is_sparse:
+            total += self.gene_index.nbytes + self.condition_index.nbytes
+        return total
+
+    @classmethod
+    def from_long_table(cls, tsv_file_name, gene_column, condition_column, value_column, attribute_column=None):
+        '''
+        Reads a table with one row per (gene, condition) pair. `attribute_column` (e.g. the
+        expression unit) is recorded once per condition.
+        '''
+        columns = [gene_column, condition_column, value_column]
+        if attribute_column:
+            columns.append(attribute_column)
+
+        genes, conditions = {}, {}
+        gene_index, condition_index, values = array('i'), array('i'), array('d')
+        texts = []
+        condition_attributes = {}
+        for row in FlybaseTsvStream(tsv_file_name, columns=columns):
+            gene_id = genes.setdefault(row[0], len(genes))
+            condition_id = conditions.setdefault(row[1], len(conditions))
+            gene_index.append(gene_id)
+            condition_index.append(condition_id)
+            values.append(float(row[2]) if row[2] != '' else np.nan)
+            texts.append(row[2])
+            if attribute_column:
+                condition_attributes[condition_id] = row[3]
+
+        return cls(list(genes), list(conditions), np.frombuffer(values, dtype=np.float64),
+                   np.array(texts, dtype=np.bytes_), gene_index=np.frombuffer(gene_index, dtype=np.int32),
+                   condition_index=np.frombuffer(condition_index, dtype=np.int32),
+                   condition_attributes=condition_attributes)
+
+    @classmethod
+    def from_wide_table(cls, tsv_file_name, chunk_size=500):
+        '''Reads a table whose first column is the gene and every other column a condition.'''
+        stream = FlybaseTsvStream(tsv_file_name)
+        genes = []
+        blocks, text_blocks = [], []
+        for chunk in stream.iter_chunks(chunk_size):
+            genes.extend(row[0] for row in chunk)
+            block = np.array([row[1:] for row in chunk], dtype=object)
+            text_blocks.append(block.astype(np.bytes_))
+            block[block == ''] = 'nan'
+            blocks.append(block.astype(np.float64))
+        conditions = stream.get_header()[1:]
+        values = np.vstack(blocks) if blocks else np.empty((0, len(conditions)))
+        texts = np.vstack(text_blocks) if text_blocks else np.empty((0, len(conditions)), dtype=np.bytes_)
+        return cls(genes, conditions, values, texts)
+
+    def _selected(self, values, min_value):
+        if min_value is None:
+            return np.ones(values.shape, dtype=bool)
+        # False for the empty values (NaN)
+        return values >= min_value
+
+    def iter_batches(self, min_value=None, batch_size=100000):
+        '''
+        Yields (gene indexes, condition indexes, values as written in the table) of all the
+        values, or of the values >= min_value, in batches of about `batch_size` matrix cells.
+        '''
+        if self.is_sparse:
+            for start in range(0, len(self.values), batch_size):
+                mask = self._selected(self.values[start:start + batch_size], min_value)
+                yield (self.gene_index[start:start + batch_size][mask].tolist(),
+                       self.condition_index[start:start + batch_size][mask].tolist(),
+                       self.texts[start:start + batch_size][mask].astype(str).tolist())
+            return
+
+        genes_per_batch = max(1, batch_size // max(1, len(self.conditions)))
+        for start in range(0, len(self.genes), genes_per_batch):
+            gene_index, condition_index = np.nonzero(self._selected(self.values[start:start + genes_per_batch],
+                                                                    min_value))
+            texts = self.texts[start:start + genes_per_batch][gene_index, condition_index]
+            yield (gene_index + start).tolist(), condition_index.tolist(), texts.astype(str).tolist()
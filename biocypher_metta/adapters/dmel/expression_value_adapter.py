@@ -58,51 +58,105 @@ Dmel_R6.58	FBgn0000003	7SLRNA:CR32864	FBlc0000085	modENCODE_mRNA-Seq_development
 '''
 
 from numpy.core.defchararray import upper
-import psycopg2
 import csv
-from biocypher_metta.adapters.dmel.flybase_tsv_reader import FlybasePrecomputedTable
+from biocypher_metta.adapters.dmel.expression_matrix import ExpressionMatrix
+from biocypher_metta.adapters.dmel.flybase_chado import FlybaseChado
+from biocypher_metta.adapters.dmel.flybase_tsv_reader import FlybasePrecomputedTable, FlybaseTsvStream, extract_date_string
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.batches import edge_batch_records, to_edge_batches
 from biocypher._logger import logger
 import gc
+import numpy as np
+
+# The tables get_file_edges() tells apart, in the order it tests them, and whether they can be read as an
+# ExpressionMatrix
+TABLES = [("scRNA-Seq_gene_expression_fb", False), ("high-throughput_gene_expression_fb", True),
+          ("gene_rpkm_report_fb", False), ("fca2", False), ("afca", True)]
+
+
+def _read_as_matrix(dmel_data_filepath):
+    return next((matrix for table, matrix in TABLES if table in dmel_data_filepath), False)
+
+
+def _object_array(values):
+    # a 1-d object array, even of tuples
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
 
 class ExpressionValueAdapter(Adapter):
-    def __init__(self, write_properties, add_provenance, data_filepaths, aux_filepaths):
+    def __init__(self, write_properties, add_provenance, data_filepaths, aux_filepaths, chado_cache_path=None,
+                 expression_matrix=False, min_expression_value=None, batch_size=100000):
         self.data_filepaths = data_filepaths
         '''
         self.aux_filepaths[0] is used to build the gene symbol to FBgn dictionary in the build_gene_symbol_to_fbgn_dict()
         for the AFCA data.
         '''
         self.aux_filepaths = aux_filepaths
+        '''
+        chado lookups are cached in chado_cache_path (SQLite) under the FlyBase release of self.aux_filepaths[0]
+        '''
+        release = extract_date_string(aux_filepaths[0]) if aux_filepaths else None
+        self.chado = FlybaseChado(release=release, cache_path=chado_cache_path)
+        '''
+        With expression_matrix, the tables holding one value per (gene, library) (high-throughput and AFCA) are
+        read into an ExpressionMatrix, values below min_expression_value (and empty values, if it is given) are
+        dropped and edges are built batch_size values at a time, as columnar edge batches (get_edge_batches()).
+        Values are yielded as written in the tables.
+        '''
+        self.expression_matrix = expression_matrix
+        self.min_expression_value = min_expression_value
+        self.batch_size = batch_size
         self.label = 'expression_value'
         self.source = 'FLYBASE'
         self.source_url = 'https://flybase.org/'
 
         super(ExpressionValueAdapter, self).__init__(write_properties, add_provenance)
 
+    @classmethod
+    def caches_output(cls, args):
+        # gene symbols and libraries are looked up in the chado database
+        return False
+
 
     def get_edges(self):
+        yield from self.get_file_edges(self.data_filepaths)
+
+
+    def get_edge_batches(self, batch_size=10000):
+        # the tables read into an ExpressionMatrix give batches, the others are grouped into batches
         for dmel_data_filepath in self.data_filepaths:
-            expression_table = FlybasePrecomputedTable(dmel_data_filepath)
-            self.version = expression_table.extract_date_string(dmel_data_filepath)
+            if self.expression_matrix and _read_as_matrix(dmel_data_filepath):
+                yield from self.get_matrix_edge_batches(dmel_data_filepath)
+            else:
+                yield from to_edge_batches(self.get_file_edges([dmel_data_filepath]), batch_size)
+
+
+    def get_file_edges(self, dmel_data_filepaths):
+        for dmel_data_filepath in dmel_data_filepaths:
+            self.version = extract_date_string(dmel_data_filepath)
+            # The FlyBase tables are the large ones: they are streamed and only the used columns are kept
             if "scRNA-Seq_gene_expression_fb" in dmel_data_filepath:                
                 self.source = 'FLYBASE'
                 self.source_url = 'https://flybase.org/'
                 # header:
                 # Pub_ID	Pub_miniref	Clustering_Analysis_ID	Clustering_Analysis_Name	Source_Tissue_Sex	Source_Tissue_Stage
                 # Source_Tissue_Anatomy	Cluster_ID	Cluster_Name	Cluster_Cell_Type_ID	Cluster_Cell_Type_Name	Gene_ID	Gene_Symbol	Mean_Expression	Spread
-                rows = expression_table.get_rows()
-                for row in rows:
+                rows = FlybaseTsvStream(dmel_data_filepath, columns=['Gene_ID', 'Cluster_ID', 'Mean_Expression', 'Spread'])
+                for gene_id, cluster_id, mean_expression, spread in rows:
                     props = {}
                     #source_ids = row[1].split('|')
-                    _source = ('gene', f'FlyBase{row[11].upper()}')    # gene FBgn#
-                    _target = row[7].upper()     # library FBlc = Cluster ID#
+                    _source = ('gene', f'FlyBase{gene_id.upper()}')    # gene FBgn#
+                    _target = cluster_id.upper()     # library FBlc = Cluster ID#
 
                     props['value_and_description'] = [
-                        ( row[13],        # Mean_Expression
+                        ( mean_expression,        # Mean_Expression
                           "Mean_Expression"#: is the average level of expression of the gene across all "
                                            #       "cells of the cluster in which the gene is detected at all"
                         ),
-                        ( row[14],    # Spread
+                        ( spread,    # Spread
                           "Spread"#: is the proportion of cells in the cluster in which the gene is detected"
                         )
                     ]
@@ -111,8 +165,6 @@ class ExpressionValueAdapter(Adapter):
                         props['source'] = self.source
                         props['source_url'] = self.source_url
                     yield _source, f'FlyBase:{_target}', self.label, props
-                
-                del rows
 
                 
             elif "high-throughput_gene_expression_fb" in dmel_data_filepath:
@@ -121,15 +173,19 @@ class ExpressionValueAdapter(Adapter):
                 # header:
                 # High_Throughput_Expression_Section	Dataset_ID	Dataset_Name	Sample_ID	Sample_Name	Gene_ID
                 # Gene_Symbol	Expression_Unit	Expression_Value
-                rows = expression_table.get_rows()
-                for row in rows:
+                if self.expression_matrix:
+                    yield from edge_batch_records(self.get_matrix_edge_batches(dmel_data_filepath))
+                    continue
+                rows = FlybaseTsvStream(dmel_data_filepath,
+                                        columns=['Gene_ID', 'Sample_ID', 'Expression_Unit', 'Expression_Value'])
+                for gene_id, sample_id, expression_unit, expression_value in rows:
                     props = {}
-                    _source = ('gene', f'FlyBase:{row[5].upper()}') # FBgn#
-                    _target = row[3].upper()    # Sample_ID  FBlc#
+                    _source = ('gene', f'FlyBase:{gene_id.upper()}') # FBgn#
+                    _target = sample_id.upper()    # Sample_ID  FBlc#
 
                     props['value_and_description'] = [
-                        (row[8],        # Expression_Value
-                         str(row[7]).replace('"', '').replace("'", '')         # Expression_Unit
+                        (expression_value,        # Expression_Value
+                         str(expression_unit).replace('"', '').replace("'", '')         # Expression_Unit
                          ),
                     ]
                     props['taxon_id'] = 7227
@@ -144,26 +200,28 @@ class ExpressionValueAdapter(Adapter):
                 # header:
                 # Release_ID	FBgn#	GeneSymbol	Parent_library_FBlc#	Parent_library_name	RNASource_FBlc#
                 # RNASource_name	RPKM_value	Bin_value	Unique_exon_base_count	Total_exon_base_count	Count_used
-                rows = expression_table.get_rows()
+                rows = FlybaseTsvStream(dmel_data_filepath,
+                                        columns=['FBgn#', 'RNASource_FBlc#', 'RPKM_value', 'Bin_value',
+                                                 'Unique_exon_base_count', 'Total_exon_base_count', 'Count_used'])
                 for row in rows:
                     props = {}
-                    _source = ('gene', f'FlyBase:{row[1].upper()}') # FBgn#
-                    _target = row[5].upper()  # RNASource_FBlc#
+                    _source = ('gene', f'FlyBase:{row[0].upper()}') # FBgn#
+                    _target = row[1].upper()  # RNASource_FBlc#
 
                     props['value_and_description'] = [
-                        (row[7], # RPKM_value
+                        (row[2], # RPKM_value
                          "RPKM",
-                         row[11]        #	Count_used in the RPKM (Total or Unique)
+                         row[6]        #	Count_used in the RPKM (Total or Unique)
                          ),
-                        (row[8],  # Bin_value
+                        (row[3],  # Bin_value
                          "Bin_value"#: The expression bin classification of this gene in this RNA-Seq experiment, "
                          #"based on RPKM value. Bins range from 1 (no/extremely low expression) to 8 (extremely high expression)"
                          ),
-                        (row[9],  # Unique_exon_base_count
+                        (row[4],  # Unique_exon_base_count
                          "Unique_exon_base_count"#: The number of exonic bases unique to the gene (not overlapping exons of other genes). Field "
                          #"will be blank for genes derived from dicistronic/polycistronic transcripts"
                          ),
-                        (row[10],  # Total_exon_base_count
+                        (row[5],  # Total_exon_base_count
                          "Total_exon_base_count"#: The number of bases in all exons of this gene"
                          ),
                     ]
@@ -185,7 +243,7 @@ class ExpressionValueAdapter(Adapter):
                 else:
                     tissue_library_dict, _ = self.build_fca2_fb_tissues_libraries_ids_dicts(fca2_tissues_file_path)                
 
-                self.version = expression_table.extract_date_string(dmel_data_filepath)                
+                expression_table = FlybasePrecomputedTable(dmel_data_filepath)
                 rows = expression_table.get_rows()
                 
                 # fca2_fbgn_gene header:
@@ -195,8 +253,8 @@ class ExpressionValueAdapter(Adapter):
                         try:
                             # Tissue stage and sex']}_{row['_gene file tissue']}"
                             library_data = tissue_library_dict[ f'{row[1]}_{row[2]}' ]
-                        except KeyError:
-                            print(f"No library data for key: {f'{row[1]}_{row[2]}'}. Gene: {row[0]}")
+                        except KeyError as e:
+                            self.row_error(e, row)
                             if f'{row[1]}_{row[2]}' == "Larval_Garland cells":
                                 library_data = ("Garland Organ", "FBlc0006089", "RNA-Seq_Profile_FlyAtlas2_L3_Garland_Organ") 
                         # target
@@ -230,8 +288,8 @@ class ExpressionValueAdapter(Adapter):
                         try:
                             # Tissue stage and sex']}_{row['_gene file tissue']}"
                             library_data = tissue_library_dict[ f'microRNA_{row[1]}_{row[2]}' ]
-                        except KeyError:
-                            print(f"No library data for key: {f'{row[1]}_{row[2]}'}. MicroRNA gene: {row[0]}")
+                        except KeyError as e:
+                            self.row_error(e, row)
                             if f'{row[1]}_{row[2]}' == "Adult Male_Whole body":
                                 library_data = ("Whole", "FBlc0005729", "microRNA-Seq_TPM_FlyAtlas2_Adult_Male")
                             elif f'{row[1]}_{row[2]}' == "Adult Female_Whole body":
@@ -267,8 +325,8 @@ class ExpressionValueAdapter(Adapter):
                         try:
                             # Tissue stage and sex']}_{row['_gene file tissue']}"
                             library_data = tissue_library_dict[ f'{row[1]}_{row[2]}' ]
-                        except KeyError:
-                            print(f"No library data for key: {f'{row[1]}_{row[2]}'}. transcriptGene: {row[0]}")
+                        except KeyError as e:
+                            self.row_error(e, row)
                             if f'{row[1]}_{row[2]}' == "Larval_Garland cells":
                                 library_data = ("Garland Organ", "FBlc0006089", "RNA-Seq_Profile_FlyAtlas2_L3_Garland_Organ")                            
                         
@@ -331,18 +389,26 @@ class ExpressionValueAdapter(Adapter):
             elif 'afca' in dmel_data_filepath:
                 self.source = 'AgingFlyCellAtlas'
                 self.source_url = 'https://hongjielilab.org/afca/'
+                if self.expression_matrix:
+                    yield from edge_batch_records(self.get_matrix_edge_batches(dmel_data_filepath))
+                    continue
                 gene_symbol_to_fbgn = self.build_gene_symbol_to_fbgn_dict()
+                expression_table = FlybasePrecomputedTable(dmel_data_filepath)
                 libraries = expression_table.get_header()
                 rows = expression_table.get_rows()
+                # symbols missing from the FlyBase table are looked up in chado all at once
+                fbgn_from_flybase = self.chado.resolve_gene_symbols(
+                    [row[0] for row in rows if row[0] not in gene_symbol_to_fbgn])
                 for row in rows:
                     fbgn = gene_symbol_to_fbgn.get(row[0])
                     if fbgn is None:            # genes that have not been localized to the reference genome assembly for a given Drosophila species.
-                        fbgn = self.get_fbgn_from_flybase(row[0])
+                        fbgn = fbgn_from_flybase.get(row[0])
                         if fbgn is None:
-                            print(f'Gene {row[0]} is not in Flybase or is not a fresh Flybase record: EXCLUDED FROM ATOM SPACE...')
+                            self.row_error(LookupError(f'gene {row[0]} is not in FlyBase or is not a fresh FlyBase record'), row)
                             continue                        
                     _source = ('gene', f'FlyBase:{fbgn.upper()}')                    
                     for exp_value, library_id in zip(row[1:], libraries[1:]):
+                        props = {}
                         props['value_and_description'] = [
                             (
                                 exp_value,         # Expression_Value
@@ -358,6 +424,71 @@ class ExpressionValueAdapter(Adapter):
                         
 
 
+    def read_expression_matrix(self, dmel_data_filepath):
+        '''
+        Reads a high-throughput or AFCA table into an ExpressionMatrix. Returns it with the edge
+        sources, targets and value descriptions, indexed like matrix.genes/matrix.conditions
+        (None for the genes that are not in FlyBase).
+        '''
+        self.version = extract_date_string(dmel_data_filepath)
+        if "high-throughput_gene_expression_fb" in dmel_data_filepath:
+            self.source = 'FLYBASE'
+            self.source_url = 'https://flybase.org/'
+            matrix = ExpressionMatrix.from_long_table(dmel_data_filepath, 'Gene_ID', 'Sample_ID',
+                                                      'Expression_Value', attribute_column='Expression_Unit')
+            sources = [('gene', f'FlyBase:{gene_id.upper()}') for gene_id in matrix.genes]
+            targets = [f'FlyBase:{sample_id.upper()}' for sample_id in matrix.conditions]
+            units = [str(matrix.condition_attributes.get(i, '')).replace('"', '').replace("'", '')
+                     for i in range(len(matrix.conditions))]
+            return matrix, sources, targets, units
+
+        self.source = 'AgingFlyCellAtlas'
+        self.source_url = 'https://hongjielilab.org/afca/'
+        gene_symbol_to_fbgn = self.build_gene_symbol_to_fbgn_dict()
+        matrix = ExpressionMatrix.from_wide_table(dmel_data_filepath)
+        fbgn_from_flybase = self.chado.resolve_gene_symbols(
+            [symbol for symbol in matrix.genes if symbol not in gene_symbol_to_fbgn])
+        sources = []
+        for symbol in matrix.genes:
+            fbgn = gene_symbol_to_fbgn.get(symbol) or fbgn_from_flybase.get(symbol)
+            if fbgn is None:
+                self.row_error(LookupError(f'gene {symbol} is not in FlyBase or is not a fresh FlyBase record'))
+                sources.append(None)
+            else:
+                sources.append(('gene', f'FlyBase:{fbgn.upper()}'))
+        targets = [f'AFCA:{library_id}' for library_id in matrix.conditions]
+        return matrix, sources, targets, ['?'] * len(targets)
+
+
+    def get_matrix_edge_batches(self, dmel_data_filepath):
+        '''
+        Yields the edges of the selected values of a table read with read_expression_matrix()
+        as edge batches, built a column at a time from the matrix batches.
+        '''
+        matrix, sources, targets, descriptions = self.read_expression_matrix(dmel_data_filepath)
+        sources, targets, descriptions = _object_array(sources), _object_array(targets), _object_array(descriptions)
+        in_flybase = np.array([source is not None for source in sources], dtype=bool)
+        for gene_index, condition_index, values in matrix.iter_batches(self.min_expression_value, self.batch_size):
+            gene_index, condition_index = np.asarray(gene_index, dtype=np.intp), np.asarray(condition_index, dtype=np.intp)
+            selected = in_flybase[gene_index]
+            if not selected.all():
+                values = [value for value, keep in zip(values, selected) if keep]
+                gene_index, condition_index = gene_index[selected], condition_index[selected]
+            size = len(values)
+            if not size:
+                continue
+            properties = {
+                'value_and_description': [[value_and_description] for value_and_description
+                                          in zip(values, descriptions[condition_index].tolist())],
+                'taxon_id': [7227] * size,
+            }
+            if self.add_provenance:
+                properties['source'] = [self.source] * size
+                properties['source_url'] = [self.source_url] * size
+            yield {'source': sources[gene_index].tolist(), 'target': targets[condition_index].tolist(),
+                   'label': [self.label] * size, 'properties': properties}
+
+
     def build_gene_symbol_to_fbgn_dict(self):
         '''
             From Flybase downloads overview web page one can learn that fbgn_fbtr_fbpp_expanded_fb_ files exclude:                
@@ -376,67 +507,16 @@ class ExpressionValueAdapter(Adapter):
     
 
     def get_fbgn_from_flybase(self, gene_symbol: str):
-        # Establish a connection to the FlyBase database
-        conn = psycopg2.connect(
-            host="chado.flybase.org",
-            database="flybase",
-            user="flybase"
-        )    
-        cur = conn.cursor()
-        cur.execute(f"SELECT uniquename, name, is_obsolete FROM feature WHERE feature.name LIKE '{gene_symbol}';")
-        results = cur.fetchall() 
-        for gene_data in results:
-            if gene_data[-1] == False:    # is uniquename obsolete???
-                return gene_data[0]
-        '''
-            if nothing is returned try an alternative query: Flybase appends :1, :2,... to symbols and FBgns
-        '''
-        cur.execute(f"SELECT uniquename, name, is_obsolete FROM feature WHERE feature.name LIKE '{gene_symbol}:1';")
-        results = cur.fetchall() 
-        #print(f'results for {gene_symbol}:\n{results}')
-        for gene_data in results:
-            if gene_data[-1] == False:    # uniquename is not obsolete
-                return gene_data[0].split(':')[0]
-            
-        '''
-            if nothing is returned try to get gene_symbol as a synonym...
-        '''
-        cur.execute(f"SELECT synonym.synonym_id FROM synonym WHERE synonym.name LIKE '{gene_symbol}';")
-        results = cur.fetchall() 
-        results = list(set(results))
-        for res in results:
-            cur.execute(f"SELECT feature_id FROM feature_synonym WHERE synonym_id={res[0]};")
-            results = cur.fetchall() 
-            results = list(set(results))
-            for result in results:
-                cur.execute(f"SELECT uniquename, is_obsolete FROM feature WHERE feature_id={result[0]};")
-                feature_results = cur.fetchall() 
-                for feature in feature_results:
-                    if feature[-1] == False:
-                        return feature[0]
-        cur.close()
-        conn.close()
-        
-        return None
+        return self.chado.resolve_gene_symbols([gene_symbol]).get(gene_symbol)
 
 
     def build_fca2_fb_tissues_libraries_ids_dicts(self, file_path):
         gene_tissue_library_dict = {}
         transcript_tissue_library_dict = {} 
             
-        # Establish a connection to the FlyBase database
-        conn = psycopg2.connect(
-            host="chado.flybase.org",
-            database="flybase",
-            user="flybase"
-        )    
-        cur = conn.cursor()
-        cur.execute("SELECT uniquename, name FROM library WHERE library.name LIKE 'RNA-Seq_Profile_FlyAtlas2_%';") #RNA-Seq_Profile_FlyAtlas2_
-        results = cur.fetchall() 
-        mir_cur = conn.cursor()
-        mir_cur.execute("SELECT uniquename, name FROM library WHERE library.name LIKE 'microRNA-Seq_TPM_FlyAtlas2_%';")
-        #mir_cur.execute("SELECT uniquename, name FROM library WHERE library.name LIKE 'microRNA-Seq%';")
-        mir_results = mir_cur.fetchall()
+        results = self.chado.get_libraries('RNA-Seq_Profile_FlyAtlas2_%')
+        mir_results = self.chado.get_libraries('microRNA-Seq_TPM_FlyAtlas2_%')
+        #mir_results = self.chado.get_libraries('microRNA-Seq%')
         # print(mir_results)
         # print(len(mir_results))
         
@@ -504,8 +584,5 @@ class ExpressionValueAdapter(Adapter):
         gene_tissue_library_dict["microRNA_Adult Female_Whole body"] = ("Whole", "FBlc0005730", "microRNA-Seq_TPM_FlyAtlas2_Adult_Female")  
         transcript_tissue_library_dict["microRNA_Adult Male_Whole body"] = ("Whole", "FBlc0005729", "microRNA-Seq_TPM_FlyAtlas2_Adult_Male")
         transcript_tissue_library_dict["microRNA_Adult Female_Whole body"] = ("Whole", "FBlc0005730", "microRNA-Seq_TPM_FlyAtlas2_Adult_Female")  
-        cur.close()
-        mir_cur.close()
-        conn.close()
 
         return gene_tissue_library_dict, transcript_tissue_library_dict
@@ -0,0 +1,249 @@
+'''
+Access layer for the public FlyBase chado database (chado.flybase.org).
+
+The dmel and Reactome adapters used to send SQL statements per gene symbol or polypeptide,
+so a build made thousands of round-trips and repeated all of them on the next run.
+FlybaseChado sends one parameterized `= ANY(%s)` query per chunk of identifiers, reads
+the results through a server-side cursor, and keeps every answer (including "not found")
+in a local SQLite file keyed by FlyBase release, so later builds of the same release do
+not touch the network.
+
+Any DB-API connection can be used instead of the chado server. A sqlite3 connection to a
+database created with create_sqlite_chado() (the few chado tables queried here) lets the
+whole path run offline in tests and benchmarks.
+'''
+
+import json
+import sqlite3
+
+import psycopg2
+
+
+CHADO_CONNECTION = {
+    'host': 'chado.flybase.org',
+    'database': 'flybase',
+    'user': 'flybase',
+}
+
+# SQLite before 3.32 allows at most 999 parameters per statement
+SQLITE_MAX_VALUES = 500
+
+CHADO_FIXTURE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS feature (
+    feature_id INTEGER PRIMARY KEY,
+    uniquename TEXT NOT NULL,
+    name TEXT,
+    is_obsolete BOOLEAN NOT NULL DEFAULT 0,
+    is_analysis BOOLEAN NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS feature_name_idx ON feature (name);
+CREATE TABLE IF NOT EXISTS synonym (
+    synonym_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS synonym_name_idx ON synonym (name);
+CREATE TABLE IF NOT EXISTS feature_synonym (
+    feature_id INTEGER NOT NULL,
+    synonym_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS feature_synonym_idx ON feature_synonym (synonym_id);
+CREATE TABLE IF NOT EXISTS db (
+    db_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dbxref (
+    dbxref_id INTEGER PRIMARY KEY,
+    db_id INTEGER NOT NULL,
+    accession TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS feature_dbxref (
+    feature_id INTEGER NOT NULL,
+    dbxref_id INTEGER NOT NULL,
+    is_current BOOLEAN NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS feature_dbxref_idx ON feature_dbxref (feature_id);
+CREATE TABLE IF NOT EXISTS library (
+    library_id INTEGER PRIMARY KEY,
+    uniquename TEXT NOT NULL,
+    name TEXT
+);
+'''
+
+
+def create_sqlite_chado(path=':memory:'):
+    '''Returns a sqlite3 connection holding empty copies of the chado tables used by FlybaseChado.'''
+    conn = sqlite3.connect(path)
+    conn.executescript(CHADO_FIXTURE_SCHEMA)
+    return conn
+
+
+class FlybaseChado:
+    def __init__(self, release=None, cache_path=None, connection=None, chunk_size=1000, itersize=10000):
+        '''
+        release:    FlyBase release (e.g. '2024_02') the answers are cached under; without it
+                    answers are only kept for the lifetime of this object.
+        cache_path: SQLite file for the cache.
+        connection: DB-API connection to use instead of connecting to chado.flybase.org.
+        '''
+        self.release = release
+        self.chunk_size = chunk_size
+        self.itersize = itersize
+        self.round_trips = 0
+        self._connection = connection
+        self._owns_connection = connection is None
+        self._cache = {}
+        self._cache_db = None
+        if cache_path and release:
+            self._cache_db = sqlite3.connect(cache_path)
+            self._cache_db.execute(
+                'CREATE TABLE IF NOT EXISTS chado_lookup '
+                '(release TEXT, kind TEXT, key TEXT, value TEXT, PRIMARY KEY (release, kind, key))')
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = psycopg2.connect(**CHADO_CONNECTION)
+        return self._connection
+
+    def _is_sqlite(self):
+        return isinstance(self._connect(), sqlite3.Connection)
+
+    def _chunks(self, keys):
+        '''Splits `keys` into chunks of chunk_size, at most SQLITE_MAX_VALUES on SQLite.'''
+        if not keys:
+            return
+        size = min(self.chunk_size, SQLITE_MAX_VALUES) if self._is_sqlite() else self.chunk_size
+        for i in range(0, len(keys), size):
+            yield keys[i:i + size]
+
+    def _any(self, values):
+        '''SQL fragment and parameters matching a column against all `values`.'''
+        if self._is_sqlite():
+            if len(values) > SQLITE_MAX_VALUES:
+                raise ValueError(f'At most {SQLITE_MAX_VALUES} values can be matched at once on SQLite')
+            return f"IN ({', '.join('?' * len(values))})", list(values)
+        return '= ANY(%s)', [list(values)]
+
+    def _query(self, sql, params):
+        conn = self._connect()
+        self.round_trips += 1
+        if self._is_sqlite():
+            yield from conn.execute(sql.replace('%s', '?'), params)
+            return
+        # Named cursors are server-side: rows are fetched `itersize` at a time
+        with conn.cursor(name=f'flybase_chado_{self.round_trips}') as cur:
+            cur.itersize = self.itersize
+            cur.execute(sql, params)
+            yield from cur
+
+    def _cached(self, kind, keys):
+        found = {}
+        missing = []
+        for key in keys:
+            if (kind, key) in self._cache:
+                found[key] = self._cache[(kind, key)]
+            else:
+                missing.append(key)
+        if self._cache_db is not None and missing:
+            for i in range(0, len(missing), SQLITE_MAX_VALUES):
+                chunk = missing[i:i + SQLITE_MAX_VALUES]
+                rows = self._cache_db.execute(
+                    f"SELECT key, value FROM chado_lookup WHERE release = ? AND kind = ? "
+                    f"AND key IN ({', '.join('?' * len(chunk))})", [self.release, kind, *chunk])
+                for key, value in rows:
+                    found[key] = self._cache[(kind, key)] = json.loads(value)
+            missing = [key for key in missing if key not in found]
+        return found, missing
+
+    def _store(self, kind, answers):
+        for key, value in answers.items():
+            self._cache[(kind, key)] = value
+        if self._cache_db is not None and answers:
+            with self._cache_db:
+                self._cache_db.executemany(
+                    'INSERT OR REPLACE INTO chado_lookup (release, kind, key, value) VALUES (?, ?, ?, ?)',
+                    [(self.release, kind, key, json.dumps(value)) for key, value in answers.items()])
+
+    def resolve_gene_symbols(self, symbols):
+        '''
+        Returns {symbol: FBgn or None} for the given gene symbols. A symbol resolves to the
+        first non obsolete feature with that name, then to a feature named '<symbol>:1'
+        (FlyBase appends :1, :2, ... to some symbols), then to a feature having the symbol
+        as a synonym.
+        '''
+        resolved, missing = self._cached('gene_symbol', list(dict.fromkeys(symbols)))
+        for chunk in self._chunks(missing):
+            answers = dict.fromkeys(chunk)
+
+            match, params = self._any(chunk)
+            for name, uniquename, is_obsolete in self._query(
+                    f'SELECT name, uniquename, is_obsolete FROM feature WHERE name {match}', params):
+                if not is_obsolete and answers.get(name) is None:
+                    answers[name] = uniquename
+
+            unresolved = [symbol for symbol in chunk if answers[symbol] is None]
+            if unresolved:
+                match, params = self._any([f'{symbol}:1' for symbol in unresolved])
+                for name, uniquename, is_obsolete in self._query(
+                        f'SELECT name, uniquename, is_obsolete FROM feature WHERE name {match}', params):
+                    symbol = name[:-len(':1')]
+                    if not is_obsolete and answers.get(symbol) is None:
+                        answers[symbol] = uniquename.split(':')[0]
+
+            unresolved = [symbol for symbol in chunk if answers[symbol] is None]
+            if unresolved:
+                match, params = self._any(unresolved)
+                for name, uniquename, is_obsolete in self._query(
+                        'SELECT synonym.name, feature.uniquename, feature.is_obsolete FROM synonym '
+                        'JOIN feature_synonym ON feature_synonym.synonym_id = synonym.synonym_id '
+                        'JOIN feature ON feature.feature_id = feature_synonym.feature_id '
+                        f'WHERE synonym.name {match}', params):
+                    if not is_obsolete and answers.get(name) is None:
+                        answers[name] = uniquename
+
+            self._store('gene_symbol', answers)
+            resolved.update(answers)
+        return resolved
+
+    def resolve_polypeptide_uniprot_ids(self, polypeptide_ids):
+        '''
+        Returns {FBpp: UniProt accession or None} for the given polypeptides: the first, in
+        accession order, of the current UniProt/Swiss-Prot and UniProt/TrEMBL cross-references
+        of the non obsolete, non analysis feature with that uniquename.
+        '''
+        resolved, missing = self._cached('polypeptide_uniprot', list(dict.fromkeys(polypeptide_ids)))
+        for chunk in self._chunks(missing):
+            answers = dict.fromkeys(chunk)
+
+            match, params = self._any(chunk)
+            for uniquename, accession in self._query(
+                    'SELECT feature.uniquename, dbxref.accession FROM feature '
+                    'JOIN feature_dbxref ON feature_dbxref.feature_id = feature.feature_id '
+                    'JOIN dbxref ON dbxref.dbxref_id = feature_dbxref.dbxref_id '
+                    'JOIN db ON db.db_id = dbxref.db_id '
+                    'WHERE NOT feature.is_obsolete AND NOT feature.is_analysis AND feature_dbxref.is_current '
+                    "AND db.name IN ('UniProt/Swiss-Prot', 'UniProt/TrEMBL') "
+                    f'AND feature.uniquename {match} ORDER BY dbxref.accession', params):
+                if answers.get(uniquename) is None:
+                    answers[uniquename] = accession
+
+            self._store('polypeptide_uniprot', answers)
+            resolved.update(answers)
+        return resolved
+
+    def get_libraries(self, name_pattern):
+        '''Returns [(uniquename, name)] of the libraries whose name matches the SQL LIKE `name_pattern`.'''
+        found, missing = self._cached('library_name', [name_pattern])
+        if missing:
+            rows = [list(row) for row in self._query(
+                'SELECT uniquename, name FROM library WHERE library.name LIKE %s', [name_pattern])]
+            self._store('library_name', {name_pattern: rows})
+            found[name_pattern] = rows
+        return [tuple(row) for row in found[name_pattern]]
+
+    def close(self):
+        if self._connection is not None and self._owns_connection:
+            self._connection.close()
+        self._connection = None
+        if self._cache_db is not None:
+            self._cache_db.close()
+            self._cache_db = None
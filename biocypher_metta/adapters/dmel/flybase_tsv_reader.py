@@ -4,11 +4,131 @@ import gzip
 import pandas
 import re
 
+def extract_date_string(file_name):
+    pattern = r"fb_(\d{4}_\d{2})"
+    match = re.search(pattern, file_name)
+    if match:
+        return match.group(1)
+    else:
+        return None
+
+
+def open_flybase_tsv(input_file_name: str):
+    if input_file_name.endswith(".gz"):
+        return gzip.open(input_file_name, 'rt')
+    elif input_file_name.endswith(".tsv"):
+        return open(input_file_name, 'r')
+    print(f'Invalid input file type. Only gzipped (.gz) or .tsv are allowed: {input_file_name}')
+    return None
+
+
+class FlybaseTsvStream:
+    """
+    Streams the rows of a FlyBase precomputed table without loading the file.
+
+    The header is the last comment line before the first data row (FlyBase puts the
+    column names in a '#' or '##' line right above the data). Rows repeating the header
+    and the '#-----' / '## Finished' trailer lines are skipped.
+
+    columns:    names of the columns to keep, in the order they are wanted; every row is
+                projected to these columns only (all columns if None).
+    converters: optional {column name: callable} applied to the non-empty values of that
+                column (e.g. {'RPKM_value': int}).
+    """
+    def __init__(self, tsv_file_name, columns=None, converters=None):
+        self.tsv_file_name = tsv_file_name
+        self.columns = list(columns) if columns is not None else None
+        self.converters = converters or {}
+        self._header = None
+
+    def get_header(self):
+        if self._header is None:
+            # The header is known once the first data row has been reached
+            rows = self._iter_raw_rows()
+            next(rows, None)
+            rows.close()
+            if self._header is None:
+                self._header = []
+        return self._header
+
+    def get_columns(self):
+        return self.columns if self.columns is not None else self.get_header()
+
+    def extract_date_string(self, file_name=None):
+        return extract_date_string(file_name or self.tsv_file_name)
+
+    def _iter_raw_rows(self):
+        input = open_flybase_tsv(self.tsv_file_name)
+        if input is None:
+            return
+        header = None
+        previous: str = None
+        with input:
+            for row in input:
+                # strip() added to handle "blank" row in TSVs
+                if not row or not row.strip():
+                    continue
+
+                if not row.startswith("#"):
+                    # a table without a comment line above its data has no header
+                    if header is None and previous is not None and previous.startswith("#"):
+                        header = previous.lstrip("#\t ")
+                        header = [column_name.strip() for column_name in header.split('\t')]
+                        self._header = header
+                    row_list = [value.strip() for value in row.split('\t')]
+                    if header and row_list[0] == header[0]:
+                        continue
+                    yield row_list
+                if not row.startswith("#-----") and not row.startswith("## Finished "):
+                    previous = row
+
+    def _projection(self, header):
+        columns = self.columns if self.columns is not None else header
+        indexes = []
+        for column in columns:
+            if column not in header:
+                raise ValueError(f"Column '{column}' not found in {self.tsv_file_name}. Available columns: {header}")
+            indexes.append(header.index(column))
+        converters = [(position, self.converters[column]) for position, column in enumerate(columns)
+                      if column in self.converters]
+        return indexes, converters
+
+    def __iter__(self):
+        indexes = converters = None
+        for row in self._iter_raw_rows():
+            if indexes is None:
+                if self.columns is None and not self.converters:
+                    indexes = False
+                else:
+                    indexes, converters = self._projection(self._header or [])
+            if indexes:
+                row = [row[i] if i < len(row) else '' for i in indexes]
+            for position, convert in converters or ():
+                if row[position] != '':
+                    row[position] = convert(row[position])
+            yield row
+
+    def iter_chunks(self, chunk_size=100_000):
+        """Yields lists of at most `chunk_size` rows."""
+        chunk = []
+        for row in self:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
 class FlybasePrecomputedTable:
-    def __init__(self, tsv_file_name):
+    """
+    In-memory FlyBase precomputed table, for small files. Large tables should be read
+    with FlybaseTsvStream, projecting only the columns that are used.
+    """
+    def __init__(self, tsv_file_name, columns=None, converters=None):
         self.__header = []
         self.__rows = []
-        self._proces_input_tsv(tsv_file_name)
+        self._proces_input_tsv(tsv_file_name, columns, converters)
 
     def get_header(self):
         return self.__header
@@ -26,12 +146,7 @@ class FlybasePrecomputedTable:
         return self
 
     def extract_date_string(self, file_name):
-        pattern = r"fb_(\d{4}_\d{2})"
-        match = re.search(pattern, file_name)
-        if match:
-            return match.group(1)
-        else:
-            return None
+        return extract_date_string(file_name)
 
     def _set_header(self, header):
         self.__header = header
@@ -43,40 +158,10 @@ class FlybasePrecomputedTable:
         self.__rows.append(row)
 
 
-    def _proces_input_tsv(self, input_file_name: str):
-        header = None
-        previous: str = None
-        if input_file_name.endswith(".gz"):
-            input = gzip.open(input_file_name, 'rt')
-        elif input_file_name.endswith(".tsv"):
-            input = open(input_file_name, 'r')
-        else:
-            print(f'Invalid input file type. Only gzipped (.gz) or .tsv are allowed: {input_file_name}')
-            return
-
-        lines = input.readlines()
-        #print(f'Lines to read: {len(lines)}')
-        for i in range(0, len(lines)):
-        #for row in input:
-            row = lines[i]
-            # print(row)
-            # strip() added to handle "blank" row in TSVs
-            if not row or not row.strip():
-                continue
-
-            if not row.startswith("#"):
-                if header is None and previous is not None:
-                    header = previous.lstrip("#\t ")
-                    header = [column_name.strip() for column_name in header.split('\t') ]
-                    self._set_header(header)
-                row_list = [value.strip() for value in row.split('\t')]
-                self._add_row(row_list)
-            if not row.startswith("#-----") and not row.startswith("## Finished "):
-                previous = row
-
-            # if i > len(lines) - 1:
-            #     break
-            #exit(9)
+    def _proces_input_tsv(self, input_file_name: str, columns=None, converters=None):
+        stream = FlybaseTsvStream(input_file_name, columns=columns, converters=converters)
+        self.__rows = list(stream)
+        self._set_header(stream.get_columns())
 
 
     def _process_tsv(self, file_name):
@@ -67,6 +67,6 @@ class ParalogyAssociationAdapter(Adapter):
                 props['DIOPT_score'] = int(row[10])
                 props['taxon_id'] = 7227
             except Exception as e:
-                print(f'\nDeffective ROW:\n{row}\nException: {e}')
+                self.row_error(e, row)
                 continue
             yield f'FlyBase:{source}', f'FlyBase:{target}', self.label, props
@@ -0,0 +1,117 @@
+"""
+Disk-backed sorting for adapters that aggregate more records than fit in memory.
+
+Records (tuples) are buffered until the buffer reaches the memory budget, then sorted
+and written to a temporary run file. Iterating the sorter k-way merges the runs and the
+remaining buffer, so peak memory is one buffer plus one record per run.
+
+With `unique_key`, only the first record (in sort order) of every group sharing that key
+is kept, both when a run is written and when runs are merged. Sorting on (key, ...) then
+gives first-occurrence or max/min aggregation per key: e.g. sort on (key, -score) to keep
+the highest score.
+"""
+
+import heapq
+import os
+import pickle
+import sys
+import tempfile
+
+
+def _deep_size(obj):
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        size += sum(_deep_size(item) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in obj.items())
+    return size
+
+
+class ExternalSorter:
+    SIZE_SAMPLE = 1000
+    BLOCK_SIZE = 1000
+
+    def __init__(self, memory_budget_mb=256, key=None, unique_key=None, tmp_dir=None):
+        self.memory_budget = int(memory_budget_mb * 2**20)
+        self.key = key
+        self.unique_key = unique_key
+        self.tmp_dir = tmp_dir
+        self.buffer = []
+        self.runs = []
+        self.records = 0
+        self._sampled_bytes = 0
+        self._record_size = None
+
+    def add(self, record):
+        self.buffer.append(record)
+        self.records += 1
+        # Estimate the in-memory size of a record from the first ones added
+        if self._record_size is None:
+            self._sampled_bytes += _deep_size(record) + 8
+            if len(self.buffer) >= self.SIZE_SAMPLE:
+                self._record_size = self._sampled_bytes / len(self.buffer)
+        elif len(self.buffer) * self._record_size >= self.memory_budget:
+            self._spill()
+
+    def _sorted_buffer(self):
+        self.buffer.sort(key=self.key)
+        return self._unique(self.buffer)
+
+    def _unique(self, records):
+        if self.unique_key is None:
+            yield from records
+            return
+        previous = object()
+        for record in records:
+            record_key = self.unique_key(record)
+            if record_key != previous:
+                previous = record_key
+                yield record
+
+    def _spill(self):
+        fd, path = tempfile.mkstemp(prefix='biocypher_sort_', suffix='.run', dir=self.tmp_dir)
+        with os.fdopen(fd, 'wb') as f:
+            # Runs are written as pickled blocks of records: a single Pickler/Unpickler per run
+            # would keep every record it has seen in its memo
+            block = []
+            for record in self._sorted_buffer():
+                block.append(record)
+                if len(block) == self.BLOCK_SIZE:
+                    pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    block = []
+            if block:
+                pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.runs.append(path)
+        self.buffer = []
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    block = pickle.load(f)
+                except EOFError:
+                    return
+                yield from block
+
+    def __iter__(self):
+        try:
+            streams = [self._read_run(path) for path in self.runs]
+            streams.append(iter(sorted(self.buffer, key=self.key)))
+            self.buffer = []
+            yield from self._unique(heapq.merge(*streams, key=self.key))
+        finally:
+            self.close()
+
+    def close(self):
+        for path in self.runs:
+            if os.path.exists(path):
+                os.remove(path)
+        self.runs = []
+        self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -3,6 +3,7 @@ import gzip
 from Bio.UniProt.GOA import gafiterator
 
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.hashed_key_set import HashedKeySet
 from biocypher_metta.processors import HGNCProcessor, GOSubontologyProcessor
 
 # GAF files are defined here: https://geneontology.github.io/docs/go-annotation-file-gaf-format-2.2/
@@ -56,7 +57,11 @@ class GAFAdapter(Adapter):
     }
 
     def __init__(self, filepath, write_properties, add_provenance, label, taxon_id, gaf_type='human',
-                 hgnc_processor=None, go_subontology_processor=None):
+                 hgnc_processor=None, go_subontology_processor=None, dedup_hash_bits=64, exact_dedup=False):
+        """
+        :param dedup_hash_bits: width (64 or 128) of the hashes kept to skip duplicate annotations
+        :param exact_dedup: also keep the edges themselves and report hash collisions
+        """
         if gaf_type not in GAFAdapter.SOURCES.keys():
             raise ValueError('Invalid type. Allowed values: ' +
                              ', '.join(GAFAdapter.SOURCES.keys()))
@@ -95,7 +100,7 @@ class GAFAdapter(Adapter):
         elif 'biological_process' in label:
             self.subontology = 'biological_process'
 
-        self.seen_edges = set()
+        self.seen_edges = HashedKeySet(hash_bits=dedup_hash_bits, exact=exact_dedup)
 
         super(GAFAdapter, self).__init__(write_properties, add_provenance)
 
@@ -175,9 +180,8 @@ class GAFAdapter(Adapter):
                 
                 # Check for redundancy  (Not necessary if we use DAS)
                 edge = (source, target, label)
-                if edge in self.seen_edges:
-                    continue  
-                self.seen_edges.add(edge)          
+                if not self.seen_edges.insert(edge):
+                    continue
                 props = {}
                 if self.write_properties:
                     # if self.taxon_id != int(annotation['Taxon_ID'][0].split(':')[-1]):
@@ -194,4 +198,6 @@ class GAFAdapter(Adapter):
                 if label != self.label:                    
                     yield source, target, label, props
                 else:
-                    yield source, target, self.label, props
\ No newline at end of file
+                    yield source, target, self.label, props
+        if self.seen_edges.exact:
+            print(f"GAFAdapter: {self.seen_edges.collisions} hash collisions among {len(self.seen_edges)} edges")
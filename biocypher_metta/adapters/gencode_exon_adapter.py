@@ -1,5 +1,5 @@
-import gzip
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.gtf_reader import read_gtf
 from biocypher_metta.adapters.helpers import check_genomic_location
 
 
@@ -40,8 +40,7 @@ class GencodeExonAdapter(Adapter):
         9606: 'ENSEMBL'
     }
 
-    ALLOWED_KEYS = ['gene_id', 'transcript_id', 'transcript_type', 'transcript_biotype', 'transcript_name', 'exon_number', 'exon_id']
-    INDEX = {'chr': 0, 'type': 2, 'coord_start': 3, 'coord_end': 4, 'info': 8}
+    ALLOWED_KEYS = ['gene_id', 'transcript_id', 'exon_number', 'exon_id']
 
      # Only transcripts that code for proteins
     CODING_TYPES = {
@@ -84,13 +83,6 @@ class GencodeExonAdapter(Adapter):
 
         super(GencodeExonAdapter, self).__init__(write_properties, add_provenance)
 
-    def parse_info_metadata(self, info):
-        parsed_info = {}
-        for key, value in zip(info, info[1:]):
-            if key in GencodeExonAdapter.ALLOWED_KEYS:
-                parsed_info[key] = value.replace('"', '').replace(';', '')
-        return parsed_info
-    
     def should_keep_transcript(self, transcript_type, tags):
         """Determine if a transcript should be kept based on type and tags."""
         # Keep all non-coding transcripts
@@ -102,94 +94,75 @@ class GencodeExonAdapter(Adapter):
 
 
     def get_nodes(self):
-        with gzip.open(self.filepath, 'rt') as input:
-            for line in input:
-                if line.startswith('#'):
-                    continue
-                    
-                split_line = line.strip().split()
-                if split_line[GencodeExonAdapter.INDEX['type']] == 'exon':
-                    info = self.parse_info_metadata(
-                        split_line[GencodeExonAdapter.INDEX['info']:])
-                    
-                    # Skip if we don't want to keep this transcript
-                    # if not self.should_keep_transcript(info.get('transcript_type', ''), info.get('tags', [])):
-                    #     continue
-
-                    gene_id = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{info['gene_id'].split('.')[0].upper()}"
-                    if info['gene_id'].endswith('PAR_Y'):
-                        gene_id = gene_id + '_PAR_Y'
-                        
-                    transcript_id = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{info['transcript_id'].split('.')[0].upper()}"
-                    if info['transcript_id'].endswith('_PAR_Y'):
-                        transcript_id = transcript_id + '_PAR_Y'
-                        
-                    # exon_id = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{info['exon_id'].split('.')[0].upper()}"
-                    exon_id = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{info['exon_id'].split('.')[0].upper()}"
-                    # If the exon_id ends with _PAR_Y, we append it to the exon_id
-                    if info['exon_id'].endswith('_PAR_Y'):
-                        exon_id = exon_id + '_PAR_Y'
-                    
-                    chr = split_line[GencodeExonAdapter.INDEX['chr']]
-                    start = int(split_line[GencodeExonAdapter.INDEX['coord_start']])
-                    end = int(split_line[GencodeExonAdapter.INDEX['coord_end']])
-                    
-                    props = {}
-                    try:
-                        if check_genomic_location(self.chr, self.start, self.end, chr, start, end):
-                            if self.write_properties:
-                                props = {
-                                    'gene_id': gene_id,
-                                    'transcript_id': transcript_id,
-                                    'chr': chr,
-                                    'start': start,
-                                    'end': end,
-                                    'exon_number': int(info.get('exon_number', -1)),
-                                    'exon_id': f"{info['exon_id'].split('.')[0].upper()}", #f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{info['exon_id'].split('.')[0].upper()}",
-                                }
-                                
-                                if self.add_provenance:
-                                    props['source'] = self.source
-                                    props['source_url'] = self.source_url                                    
-                            yield exon_id, self.label, props
-
-                    except Exception as e:
-                        print(f'Failed to process for label to load: {self.label}, type to load: exon, data: {line}')
-                        print(f'Error: {str(e)}')
+        for chunk in read_gtf(self.filepath, ['exon'], GencodeExonAdapter.ALLOWED_KEYS):
+            for chr, start, end, gene_key, transcript_key, exon_number, exon_key in zip(
+                    chunk['chr'], chunk['start'], chunk['end'],
+                    *(chunk[key] for key in GencodeExonAdapter.ALLOWED_KEYS)):
+                # Skip if we don't want to keep this transcript
+                # if not self.should_keep_transcript(transcript_type, tags):
+                #     continue
 
-    def get_edges(self):
-        with gzip.open(self.filepath, 'rt') as input:
-            for line in input:
-                if line.startswith('#'):
+                exon_id = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{exon_key.split('.')[0].upper()}"
+                # If the exon_id ends with _PAR_Y, we append it to the exon_id
+                if exon_key.endswith('_PAR_Y'):
+                    exon_id = exon_id + '_PAR_Y'
+                if not self.sampled(exon_id):
                     continue
 
-                data_line = line.strip().split()
-                if data_line[GencodeExonAdapter.INDEX['type']] != 'exon':
-                    continue
+                gene_id = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{gene_key.split('.')[0].upper()}"
+                if gene_key.endswith('PAR_Y'):
+                    gene_id = gene_id + '_PAR_Y'
 
-                info = self.parse_info_metadata(data_line[GencodeExonAdapter.INDEX['info']:])
-                
-                # Skip if we don't want to keep this transcript
-                if not self.should_keep_transcript(info.get('transcript_type', ''), info.get('tags', [])):
-                    continue
+                transcript_id = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{transcript_key.split('.')[0].upper()}"
+                if transcript_key.endswith('_PAR_Y'):
+                    transcript_id = transcript_id + '_PAR_Y'
+
+                props = {}
+                try:
+                    if check_genomic_location(self.chr, self.start, self.end, chr, start, end):
+                        if self.write_properties:
+                            props = {
+                                'gene_id': gene_id,
+                                'transcript_id': transcript_id,
+                                'chr': chr,
+                                'start': start,
+                                'end': end,
+                                'exon_number': int(exon_number if exon_number is not None else -1),
+                                'exon_id': f"{exon_key.split('.')[0].upper()}", #f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{exon_key.split('.')[0].upper()}",
+                            }
+
+                            if self.add_provenance:
+                                props['source'] = self.source
+                                props['source_url'] = self.source_url
+                        yield exon_id, self.label, props
 
-                target_id = info[self.target_type].split('.')[0]
-                if info[self.target_type].endswith('_PAR_Y'):
+                except Exception as e:
+                    self.row_error(e, exon_key)
+
+    def get_edges(self):
+        keys = list(dict.fromkeys(['gene_id', 'transcript_type', 'exon_id', self.target_type]))
+        for chunk in read_gtf(self.filepath, ['exon'], keys):
+            for gene_id, transcript_type, exon_key, target_key in zip(
+                    chunk['gene_id'], chunk['transcript_type'], chunk['exon_id'], chunk[self.target_type]):
+                target_id = target_key.split('.')[0]
+                if target_key.endswith('_PAR_Y'):
                     target_id = target_id + '_PAR_Y'
-                    
-                exon_id = info['exon_id'].split('.')[0]
-                if info['exon_id'].endswith('_PAR_Y'):
+
+                exon_id = exon_key.split('.')[0]
+                if exon_key.endswith('_PAR_Y'):
                     exon_id = exon_id + '_PAR_Y'
+                if not self.sampled(exon_id, target_id):
+                    continue
+
+                # Skip if we don't want to keep this transcript (exon tags are not read)
+                if not self.should_keep_transcript(transcript_type or '', []):
+                    continue
 
                 _props = {}
                 if self.write_properties and self.add_provenance:
                     _props['source'] = self.source
                     _props['source_url'] = self.source_url
 
-                try:
-                    _source = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{exon_id}"
-                    _target = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{target_id}"                    
-                    yield _source, _target, self.label, _props
-                except Exception as e:
-                    print(f'Failed to process for label to load: {self.label}, type to load: exon, data: {line}')
-                    print(f'Error: {str(e)}')
\ No newline at end of file
+                _source = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{exon_id}"
+                _target = f"{GencodeExonAdapter.CURIE_PREFIX[self.taxon_id]}:{target_id}"
+                yield _source, _target, self.label, _props
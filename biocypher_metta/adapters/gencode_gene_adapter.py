@@ -1,5 +1,6 @@
 import gzip
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.gtf_reader import read_gtf
 from biocypher_metta.adapters.helpers import check_genomic_location
 from biocypher_metta.processors import HGNCProcessor, EntrezEnsemblProcessor
 
@@ -41,9 +42,7 @@ class GencodeGeneAdapter(Adapter):
         9606: 'ENSEMBL'
     }
 
-    ALLOWED_KEYS = ['gene_id', 'gene_type', 'gene_biotype', 'gene_name',
-                    'transcript_id', 'transcript_type', 'transcript_name', 'hgnc_id']
-    INDEX = {'chr': 0, 'type': 2, 'coord_start': 3, 'coord_end': 4, 'info': 8}
+    ALLOWED_KEYS = ['gene_id', 'gene_type', 'gene_biotype', 'gene_name', 'hgnc_id']
 
     def __init__(self, write_properties, add_provenance, taxon_id, filepath, label,
                  gene_alias_file_path=None, chr=None, start=None, end=None):
@@ -80,13 +79,6 @@ class GencodeGeneAdapter(Adapter):
         super(GencodeGeneAdapter, self).__init__(write_properties, add_provenance)
  
 
-    def parse_info_metadata(self, info):
-        parsed_info = {}
-        for key, value in zip(info, info[1:]):
-            if key in GencodeGeneAdapter.ALLOWED_KEYS:
-                parsed_info[key] = value.replace('"', '').replace(';', '')
-        return parsed_info
-
     # the gene alias dict will use both ensembl id and hgnc id as key
     def get_gene_alias(self):
         alias_dict = {}
@@ -136,70 +128,60 @@ class GencodeGeneAdapter(Adapter):
         alias_dict = self.gene_aliases
         not_processed = 0
         processed_records = 0
-        with gzip.open(self.filepath, 'rt') as input:
-            for line in input:
-                if line.startswith('#'):
+        id_prefix = GencodeGeneAdapter.CURIE_PREFIX[self.taxon_id]
+        for chunk in read_gtf(self.filepath, ['gene'], GencodeGeneAdapter.ALLOWED_KEYS):
+            for chr, start, end, gene_id, gene_type, gene_biotype, gene_name, hgnc_id in zip(
+                    chunk['chr'], chunk['start'], chunk['end'],
+                    *(chunk[key] for key in GencodeGeneAdapter.ALLOWED_KEYS)):
+                raw_id = gene_id.split('.')[0]
+
+                # Determine CURIE prefix
+                id = f"{id_prefix}:{raw_id}"
+                if gene_id.endswith('_PAR_Y'):
+                    id = f"{id_prefix}:{raw_id}_PAR_Y"
+                if not self.sampled(id):
                     continue
-                split_line = line.strip().split()
-                if split_line[GencodeGeneAdapter.INDEX['type']] == 'gene':
-                    info = self.parse_info_metadata(
-                        split_line[GencodeGeneAdapter.INDEX['info']:])
-                    gene_id = info['gene_id']
-                    raw_id = gene_id.split('.')[0]
-                    
-                    # Determine CURIE prefix
-                    id_prefix = GencodeGeneAdapter.CURIE_PREFIX[self.taxon_id]
-                    id = f"{id_prefix}:{raw_id}"
-                    if gene_id.endswith('_PAR_Y'):
-                        id = f"{id_prefix}:{raw_id}_PAR_Y"
-
-                    alias = alias_dict.get(raw_id)
-                    if not alias:
-                        hgnc_id = info.get('hgnc_id')
-                        if hgnc_id:
-                            alias = alias_dict.get(hgnc_id.replace('HGNC:', ''))
-                    
-                    chr = split_line[GencodeGeneAdapter.INDEX['chr']]
-                    start = int(split_line[GencodeGeneAdapter.INDEX['coord_start']])
-                    end = int(split_line[GencodeGeneAdapter.INDEX['coord_end']])
-                    
-                    gene_name = info.get('gene_name')
-                    if not gene_name:
-                        # print(f"No gene name found for gene {gene_id}. Invalid record: {info}. Skipping it.")
-                        not_processed += 1
-                        continue
-
-                    if self.taxon_id == 9606:       # human
-                        result = self.hgnc_processor.process_identifier(gene_name)
-                    elif self.taxon_id == 7227:     # fly  I'll change this soon  --> TODO: fly and other organisms don't have HGNC IDs
-                        result = {
-                            'status': 'current',
-                            'original': gene_name,
-                            'current': gene_name
-                        }                    
-                    props = {}
-                    try:
-                        if check_genomic_location(self.chr, self.start, self.end, chr, start, end):
-                            if self.write_properties:
-                                gene_type_val = info.get('gene_type')
-                                props = {
-                                    'gene_type': gene_type_val if gene_type_val is not None else info['gene_biotype'],
-                                    'chr': chr if chr else 'unknown',
-                                    'start': start if start else 'unknown',
-                                    'end': end if end else 'unknown',
-                                    'gene_name': 'unknown' if result['status'] == 'unknown' or result['status'] == 'ensembl_only' else result['current'],
-                                    'synonym': alias
-                                }
-                                if result['status'] == 'updated':
-                                    props['old_gene_name'] = result['original']
-                                if self.add_provenance:
-                                    props['source'] = self.source
-                                    props['source_url'] = self.source_url
-                            processed_records += 1
-                            yield id, self.label, props
-                        else:
-                            not_processed += 1
-                    except Exception as e:
-                        print(f'Failed to process line: {line}\nError: {str(e)}')
+
+                alias = alias_dict.get(raw_id)
+                if not alias:
+                    if hgnc_id:
+                        alias = alias_dict.get(hgnc_id.replace('HGNC:', ''))
+
+                if not gene_name:
+                    # print(f"No gene name found for gene {gene_id}. Skipping it.")
+                    not_processed += 1
+                    continue
+
+                if self.taxon_id == 9606:       # human
+                    result = self.hgnc_processor.process_identifier(gene_name)
+                elif self.taxon_id == 7227:     # fly  I'll change this soon  --> TODO: fly and other organisms don't have HGNC IDs
+                    result = {
+                        'status': 'current',
+                        'original': gene_name,
+                        'current': gene_name
+                    }
+                props = {}
+                try:
+                    if check_genomic_location(self.chr, self.start, self.end, chr, start, end):
+                        if self.write_properties:
+                            props = {
+                                'gene_type': gene_type if gene_type is not None else gene_biotype,  # gene_biotype in dmel data
+                                'chr': chr if chr else 'unknown',
+                                'start': start if start else 'unknown',
+                                'end': end if end else 'unknown',
+                                'gene_name': 'unknown' if result['status'] == 'unknown' or result['status'] == 'ensembl_only' else result['current'],
+                                'synonym': alias
+                            }
+                            if result['status'] == 'updated':
+                                props['old_gene_name'] = result['original']
+                            if self.add_provenance:
+                                props['source'] = self.source
+                                props['source_url'] = self.source_url
+                        processed_records += 1
+                        yield id, self.label, props
+                    else:
                         not_processed += 1
-        print(f"Not processed records: {not_processed} out of {processed_records} genes included in the BioAS.")
\ No newline at end of file
+                except Exception as e:
+                    self.row_error(e, gene_id)
+                    not_processed += 1
+        print(f"Not processed records: {not_processed} out of {processed_records} genes included in the BioAS.")
@@ -1,5 +1,5 @@
 from biocypher_metta.adapters import Adapter
-import gzip
+from biocypher_metta.adapters.gtf_reader import read_gtf
 from biocypher_metta.adapters.helpers import check_genomic_location
 from biocypher_metta.processors import HGNCProcessor
 
@@ -45,10 +45,8 @@ class GencodeTranscriptAdapter(Adapter):
     ALLOWED_LABELS = ['transcript',
                       'transcribes_to']
 
-    ALLOWED_KEYS = ['gene_id', 'gene_type', 'gene_biotype', 'gene_name',  # 'gene_biotype'  key for dmel data
-                    'transcript_id', 'transcript_type', 'transcript_biotype', 'transcript_name'] # 'transcript_biotype'  key for dmel data
-
-    INDEX = {'chr': 0, 'type': 2, 'coord_start': 3, 'coord_end': 4, 'info': 8}
+    ALLOWED_KEYS = ['gene_id', 'gene_name', 'transcript_id', 'transcript_type',
+                    'transcript_biotype', 'transcript_name'] # 'transcript_biotype'  key for dmel data
 
     # Only transcripts that code for proteins
     CODING_TYPES = {
@@ -100,31 +98,6 @@ class GencodeTranscriptAdapter(Adapter):
 
         super(GencodeTranscriptAdapter, self).__init__(write_properties, add_provenance)
 
-    def parse_info_metadata(self, info):
-        parsed_info = {}
-        tags = []
-        
-        info_str = ' '.join(info)
-        items = info_str.split(';')
-        
-        for item in items:
-            item = item.strip()
-            if not item:
-                continue
-                
-            if 'tag' in item:
-                tag_match = item.split('"')
-                if len(tag_match) > 1:
-                    tags.append(tag_match[1])
-            else:
-                for key in GencodeTranscriptAdapter.ALLOWED_KEYS:
-                    if key in item:
-                        value = item.split('"')[1] if '"' in item else item
-                        parsed_info[key] = value.strip()
-        
-        parsed_info['tags'] = tags
-        return parsed_info
-
     def should_keep_transcript(self, transcript_type, tags):
         """Determine if a transcript should be kept based on type and tags."""
         # Keep all non-coding transcripts
@@ -135,52 +108,37 @@ class GencodeTranscriptAdapter(Adapter):
         return any(tag in self.REVIEWED_TAGS or tag.startswith('appris_principal') for tag in tags)
 
     def get_nodes(self):
-        with gzip.open(self.filepath, 'rt') as input:
-            not_processed = 0
-            for line in input:
-                if line.startswith('#'):
-                    continue
-
-                data_line = line.strip().split()
-                if data_line[GencodeTranscriptAdapter.INDEX['type']] != 'transcript':
+        not_processed = 0
+        for chunk in read_gtf(self.filepath, ['transcript'], GencodeTranscriptAdapter.ALLOWED_KEYS, ['tag']):
+            for chr, start, end, gene_id, gene_name, transcript_id, transcript_type, transcript_biotype, transcript_name, tags in zip(
+                    chunk['chr'], chunk['start'], chunk['end'],
+                    *(chunk[key] for key in GencodeTranscriptAdapter.ALLOWED_KEYS), chunk['tag']):
+                #CURIE ID Formatting
+                transcript_key = f"{GencodeTranscriptAdapter.CURIE_PREFIX[self.taxon_id]}:{transcript_id.split('.')[0]}"
+                if transcript_id.endswith('_PAR_Y'):
+                    transcript_key = transcript_key + '_PAR_Y'
+                if not self.sampled(transcript_key):
                     continue
 
-                data = data_line[:GencodeTranscriptAdapter.INDEX['info']]
-                info = self.parse_info_metadata(data_line[GencodeTranscriptAdapter.INDEX['info']:])
-                
                 # Skip if we don't want to keep this transcript
-                if not self.should_keep_transcript(info.get('transcript_type', ''), info.get('tags', [])):
+                if not self.should_keep_transcript(transcript_type or '', tags):
                     continue
 
-                gene_name = info.get('gene_name')
                 if not gene_name:
-                    # print(f"No gene name found for transcript {info['transcript_id']}. Record: {info}.\nGene name will be 'unkown'")
+                    # print(f"No gene name found for transcript {transcript_id}.\nGene name will be 'unkown'")
                     result = {'status': 'unknown', 'original': 'unknown', 'current': 'unknown'}
                 else:
                     result = self.hgnc_processor.process_identifier(gene_name)
-                
-                #CURIE ID Formatting
-                transcript_key = f"{GencodeTranscriptAdapter.CURIE_PREFIX[self.taxon_id]}:{info['transcript_id'].split('.')[0]}"
-                if info['transcript_id'].endswith('_PAR_Y'):
-                    transcript_key = transcript_key + '_PAR_Y'
-                gene_key = f"{info['gene_id'].split('.')[0]}"
-                if info['gene_id'].endswith('_PAR_Y'):
-                    gene_key = gene_key + '_PAR_Y'
-                
-                chr = data[GencodeTranscriptAdapter.INDEX['chr']]
-                start = int(data[GencodeTranscriptAdapter.INDEX['coord_start']])
-                end = int(data[GencodeTranscriptAdapter.INDEX['coord_end']])
-            
+
                 props = {}
                 try:
                     if check_genomic_location(self.chr, self.start, self.end, chr, start, end):
                         if self.type == 'transcript':
                             if self.write_properties:
-                                transcript_type_val = info.get('transcript_type')
                                 props = {
-                                    'transcript_id': info['transcript_id'].upper(),
-                                    'transcript_name': info['transcript_name'],
-                                    'transcript_type': transcript_type_val if transcript_type_val is not None else info['transcript_biotype'],                                
+                                    'transcript_id': transcript_id.upper(),
+                                    'transcript_name': transcript_name,
+                                    'transcript_type': transcript_type if transcript_type is not None else transcript_biotype,
                                     'gene_name': 'unknown' if result['status'] == 'unknown' or result['status'] == 'ensembl_only' else result['current'],
                                 }
                                 if result['status'] == 'updated':
@@ -192,51 +150,42 @@ class GencodeTranscriptAdapter(Adapter):
 
                             yield transcript_key, self.label, props
                 except Exception as e:
-                    print(f'Failed to process for label to load: {self.label}, type to load: {self.type}, data: {line}')
-                    print(f'Error: {str(e)}')
+                    self.row_error(e, transcript_id)
                     not_processed += 1
         print(f"Not processed records: {not_processed}")
 
     def get_edges(self):
-        with gzip.open(self.filepath, 'rt') as input:
-            not_processed = 0
-            for line in input:
-                if line.startswith('#'):
-                    continue
-
-                data_line = line.strip().split()
-                if data_line[GencodeTranscriptAdapter.INDEX['type']] != 'transcript':
+        not_processed = 0
+        for chunk in read_gtf(self.filepath, ['transcript'], ['gene_id', 'transcript_id', 'transcript_type'], ['tag']):
+            for gene_id, transcript_id, transcript_type, tags in zip(
+                    chunk['gene_id'], chunk['transcript_id'], chunk['transcript_type'], chunk['tag']):
+                gene_key = gene_id.split('.')[0]
+                if gene_id.endswith('_PAR_Y'):
+                    gene_key = gene_key + '_PAR_Y'
+                transcript_key = transcript_id.split('.')[0]
+                if transcript_id.endswith('_PAR_Y'):
+                    transcript_key = transcript_key + '_PAR_Y'
+                if not self.sampled(gene_key, transcript_key):
                     continue
 
-                info = self.parse_info_metadata(data_line[GencodeTranscriptAdapter.INDEX['info']:])
-                
                 # Skip if we don't want to keep this transcript
-                if not self.should_keep_transcript(info.get('transcript_type', ''), info.get('tags', [])):
+                if not self.should_keep_transcript(transcript_type or '', tags):
                     not_processed += 1
                     continue
 
-                transcript_key = info['transcript_id'].split('.')[0]
-                if info['transcript_id'].endswith('_PAR_Y'):
-                    transcript_key = transcript_key + '_PAR_Y'
-                gene_key = info['gene_id'].split('.')[0]
-                if info['gene_id'].endswith('_PAR_Y'):
-                    gene_key = gene_key + '_PAR_Y'
-               
                 _props = {}
                 if self.write_properties and self.add_provenance:
                     _props['source'] = self.source
                     _props['source_url'] = self.source_url
-               
+
                 try:
                     if self.type == 'transcribes to':
-                        _id = gene_key + '_' + transcript_key
-                        _source = f"{GencodeTranscriptAdapter.CURIE_PREFIX[self.taxon_id]}:{gene_key}"                        
-                        _target = f"{GencodeTranscriptAdapter.CURIE_PREFIX[self.taxon_id]}:{transcript_key}"                        
+                        _source = f"{GencodeTranscriptAdapter.CURIE_PREFIX[self.taxon_id]}:{gene_key}"
+                        _target = f"{GencodeTranscriptAdapter.CURIE_PREFIX[self.taxon_id]}:{transcript_key}"
 
                         yield _source, _target, self.label, _props
 
                 except Exception as e:
-                    print(f'Failed to process for label to load: {self.label}, type to load: {self.type}, data: {line}')
-                    print(f'Error: {str(e)}')
+                    self.row_error(e, transcript_id)
                     not_processed += 1
         print(f"Not processed records: {not_processed}")
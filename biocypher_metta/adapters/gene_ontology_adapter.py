@@ -1,5 +1,6 @@
 import rdflib
 from biocypher_metta.adapters.ontologies_adapter import OntologyAdapter
+from biocypher_metta.adapters.ontology_store import ontology_store
 from biocypher_metta.processors import GOSubontologyProcessor
 
 class GeneOntologyAdapter(OntologyAdapter):
@@ -21,10 +22,14 @@ class GeneOntologyAdapter(OntologyAdapter):
 
     def __init__(self, write_properties, add_provenance, ontology, type, label=None,
                  dry_run=False, add_description=False, cache_dir=None,
-                 go_subontology_processor=None):
+                 go_subontology_processor=None, transitive_closure=False,
+                 closure_max_ancestors=None, emit_diff=False):
         super(GeneOntologyAdapter, self).__init__(write_properties, add_provenance,
                                                  ontology, type, label, False,
-                                                 add_description, cache_dir)
+                                                 add_description, cache_dir,
+                                                 transitive_closure=transitive_closure,
+                                                 closure_max_ancestors=closure_max_ancestors,
+                                                 emit_diff=emit_diff)
         self.dry_run = dry_run
 
         # Use provided GO subontology processor or create new one
@@ -49,7 +54,7 @@ class GeneOntologyAdapter(OntologyAdapter):
             ] else None
         else:  # type == 'edge'
             for subonto, edge_label in self.EDGE_LABELS.items():
-                if label == edge_label:
+                if label in (edge_label, f'{edge_label}_closure'):
                     self.current_subontology = subonto
                     break
             else:
@@ -72,10 +77,15 @@ class GeneOntologyAdapter(OntologyAdapter):
     def _ensure_mapping_loaded(self):
         """Ensure the subontology mapping is loaded."""
         if self.subontology_mapping is None:
-            # Set graph on processor and load/update
-            self.go_subontology_processor.set_graph(self.graph)
-            self.go_subontology_processor.load_or_update()
-            self.subontology_mapping = self.go_subontology_processor.mapping
+            def build_mapping():
+                # Set graph on processor and load/update
+                self.go_subontology_processor.set_graph(self.graph)
+                self.go_subontology_processor.load_or_update()
+                return self.go_subontology_processor.mapping
+
+            # All GO adapters of this process share the mapping derived from the stored graph
+            self.subontology_mapping = ontology_store.get_derived(
+                self.ONTOLOGIES[self.ontology], 'go_subontology', build_mapping)
 
     def get_subontology(self, go_id):
         """Get subontology for a given GO ID"""
@@ -92,7 +102,7 @@ class GeneOntologyAdapter(OntologyAdapter):
             self.subontology_counter = 0
             processed_nodes = set()
 
-            for node in self.graph.all_nodes():
+            for node in self.iter_graph_nodes():
                 if not isinstance(node, rdflib.term.URIRef):
                     continue
 
@@ -138,7 +148,15 @@ class GeneOntologyAdapter(OntologyAdapter):
                 self.subontology_counter += 1
                 yield node_key, self.label, props
 
+    def include_closure_term(self, node_key):
+        return self.get_subontology(node_key) == self.current_subontology
+
     def get_edges(self):
+        if self.transitive_closure:
+            if self.current_subontology:
+                yield from self.get_closure_edges()
+            return
+
         self.update_graph()
         self.cache_edge_properties()
         self._ensure_mapping_loaded()
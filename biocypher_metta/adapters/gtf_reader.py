@@ -0,0 +1,93 @@
+"""
+Columnar reader of GTF files (GENCODE, Ensembl).
+
+The GENCODE adapters each want one feature type (gene, transcript or exon) and a handful of
+attributes out of files of millions of lines. read_gtf() reads the file with the Arrow CSV
+reader a block at a time, drops the records of other feature types, and only then extracts
+the requested attributes, one column at a time:
+
+    {'chr': [...], 'type': [...], 'start': [...], 'end': [...], 'strand': [...],
+     <attribute>: [...], <list attribute>: [[...], ...]}
+
+Coordinates are ints. An attribute a record does not have is None; a list attribute (tag,
+which GENCODE repeats) is the list of all its values, empty if it has none. Attribute values
+are unquoted: 'gene_id "ENSG00000290825.1"; level 2;' gives '2' for level.
+
+Comment lines (#, #!) are skipped wherever they are. Records that are not tab-separated (the
+end of samples/hsa/gencode_sample.gtf.gz) are split on whitespace instead, and come after the
+tab-separated records of their block.
+"""
+
+import re
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+
+GTF_COLUMNS = ['chr', 'source', 'type', 'start', 'end', 'score', 'strand', 'frame', 'attributes']
+COLUMN_TYPES = {'chr': pa.string(), 'type': pa.string(), 'start': pa.int64(), 'end': pa.int64(),
+                'strand': pa.string(), 'attributes': pa.string()}
+
+
+def _attribute_pattern(key):
+    # matched against '; ' + attributes: a literal prefix is many times faster than (?:^|; )
+    return rf'; {re.escape(key)} "?(?P<value>[^";]*)'
+
+
+def _whitespace_records(lines, schema):
+    """Record batch of the lines the CSV reader rejected, split on whitespace."""
+    records = [line.split(None, 8) for line in lines if not line.startswith('#')]
+    records = [fields for fields in records if len(fields) == len(GTF_COLUMNS)]
+    columns = {name: [fields[GTF_COLUMNS.index(name)].strip() for fields in records] for name in schema.names}
+    columns['start'] = list(map(int, columns['start']))
+    columns['end'] = list(map(int, columns['end']))
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def _to_list(array):
+    # through NumPy: to_pylist() is slow for string columns
+    return array.to_numpy(zero_copy_only=False).tolist()
+
+
+def read_gtf(filepath, feature_types, attributes=(), list_attributes=(), block_size=1 << 24):
+    """
+    Yields the records of the (optionally gzipped) GTF `filepath` whose type is one of
+    `feature_types`, as chunks of columns (see above).
+
+    attributes:      keys of the attributes to extract (first value).
+    list_attributes: keys of the repeated attributes to extract (all values).
+    """
+    rejected = []
+
+    def invalid_row(row):
+        rejected.append(row.text)
+        return 'skip'
+
+    reader = pcsv.open_csv(
+        filepath,
+        read_options=pcsv.ReadOptions(column_names=GTF_COLUMNS, block_size=block_size),
+        # comment lines have a single column, like records separated by spaces
+        parse_options=pcsv.ParseOptions(delimiter='\t', quote_char=False, escape_char=False,
+                                        invalid_row_handler=invalid_row),
+        convert_options=pcsv.ConvertOptions(column_types=COLUMN_TYPES, include_columns=list(COLUMN_TYPES),
+                                            strings_can_be_null=False),
+    )
+    feature_types = pa.array(list(feature_types), pa.string())
+    list_patterns = {key: re.compile(rf'(?:^|;)\s*{re.escape(key)} "?([^";]*)') for key in list_attributes}
+
+    for batch in reader:
+        if rejected:
+            batch = pa.concat_batches([batch, _whitespace_records(rejected, batch.schema)])
+            rejected.clear()
+        batch = batch.filter(pc.is_in(batch.column('type'), value_set=feature_types))
+        if batch.num_rows == 0:
+            continue
+        chunk = {column: _to_list(batch.column(column)) for column in ('chr', 'type', 'start', 'end', 'strand')}
+        info = pc.binary_join_element_wise('; ', batch.column('attributes'), '')
+        for key in attributes:
+            chunk[key] = _to_list(pc.struct_field(pc.extract_regex(info, _attribute_pattern(key)), 'value'))
+        if list_patterns:
+            info = _to_list(batch.column('attributes'))
+            for key, pattern in list_patterns.items():
+                chunk[key] = [pattern.findall(record) for record in info]
+        yield chunk
@@ -0,0 +1,143 @@
+"""
+Compact set of seen keys for adapters that deduplicate millions of edges.
+
+A Python set of edge tuples stores every tuple and string it holds (a few hundred bytes
+per GO annotation). HashedKeySet stores a fixed-width hash of each key in a NumPy
+open-addressing table instead: 8 bytes per slot for 64-bit hashes, 16 bytes for 128-bit,
+at a load factor of at most MAX_LOAD.
+
+64-bit hashes are the built-in hash() of the key (keyed SipHash for strings, so they are
+only stable within a process, which is all deduplication needs); 128-bit hashes are
+BLAKE2b digests of the key's repr. With 64 bits, the chance of any collision among 10
+million keys is about 3e-6; a collision makes a new key look seen. exact=True also keeps
+the keys themselves to detect and count collisions, which costs as much memory as a set
+and is meant for checking a hash width on a given input.
+"""
+
+import hashlib
+
+import numpy as np
+
+_MASK_64 = 0xFFFF_FFFF_FFFF_FFFF
+
+
+class HashedKeySet:
+    MAX_LOAD = 0.6
+
+    def __init__(self, hash_bits=64, capacity=2**16, exact=False):
+        if hash_bits not in (64, 128):
+            raise ValueError(f'hash_bits must be 64 or 128, got {hash_bits}')
+        self.hash_bits = hash_bits
+        self.exact = exact
+        self.size = 0
+        self.collisions = 0
+        self._keys = {} if exact else None
+        self._colliding_keys = set()
+        self._allocate(max(16, 1 << (int(capacity) - 1).bit_length()))
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._max_size = int(capacity * self.MAX_LOAD)
+        # A zero low word marks an empty slot, digests never have one
+        self._low = np.zeros(capacity, dtype=np.uint64)
+        self._low_view = memoryview(self._low)
+        if self.hash_bits == 128:
+            self._high = np.zeros(capacity, dtype=np.uint64)
+            self._high_view = memoryview(self._high)
+        else:
+            self._high = self._high_view = None
+
+    def _digest(self, key):
+        if self.hash_bits == 64:
+            return (hash(key) & _MASK_64) or 1, 0
+        digest = int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=16).digest(), 'little')
+        return (digest & _MASK_64) or 1, digest >> 64
+
+    def _find(self, low, high):
+        """Returns (slot, found): the slot holding the digest, or the empty slot it goes in."""
+        low_view, high_view, mask = self._low_view, self._high_view, self._mask
+        slot = low & mask
+        while True:
+            value = low_view[slot]
+            if value == 0:
+                return slot, False
+            if value == low and (high_view is None or high_view[slot] == high):
+                return slot, True
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        occupied = np.flatnonzero(self._low)
+        low = self._low[occupied]
+        high = self._high[occupied] if self._high is not None else np.zeros_like(low)
+        self._allocate(self.capacity * 2)
+
+        # Linear probing placement of all digests at once: sorted by home slot, every digest
+        # goes to its home slot or right after the previous one, whichever is further
+        home = (low & np.uint64(self._mask)).astype(np.int64)
+        order = np.argsort(home, kind='stable')
+        low, high, home = low[order], high[order], home[order]
+        index = np.arange(len(home))
+        slots = index + np.maximum.accumulate(home - index)
+        fits = slots < self.capacity
+        self._low[slots[fits]] = low[fits]
+        if self._high is not None:
+            self._high[slots[fits]] = high[fits]
+        # the few that run past the end wrap around to the first free slots
+        for digest_low, digest_high in zip(low[~fits].tolist(), high[~fits].tolist()):
+            self._place(digest_low, digest_high)
+
+    def _place(self, low, high):
+        slot, _ = self._find(low, high)
+        self._low_view[slot] = low
+        if self._high_view is not None:
+            self._high_view[slot] = high
+
+    def insert(self, key):
+        """Adds `key` and returns True if it was not in the set yet."""
+        # Inlined _digest() and _find(): this runs once per edge
+        if self.hash_bits == 64:
+            low, high = (hash(key) & _MASK_64) or 1, 0
+        else:
+            low, high = self._digest(key)
+        low_view, high_view, mask = self._low_view, self._high_view, self._mask
+        slot = low & mask
+        while True:
+            value = low_view[slot]
+            if value == 0:
+                break
+            if value == low and (high_view is None or high_view[slot] == high):
+                return self._verify(key, (low, high)) if self.exact else False
+            slot = (slot + 1) & mask
+
+        low_view[slot] = low
+        if high_view is not None:
+            high_view[slot] = high
+        if self.exact:
+            self._keys[(low, high)] = key
+        self.size += 1
+        if self.size > self._max_size:
+            self._grow()
+        return True
+
+    def _verify(self, key, digest):
+        if self._keys[digest] == key or key in self._colliding_keys:
+            return False
+        self.collisions += 1
+        self._colliding_keys.add(key)
+        self.size += 1
+        return True
+
+    def __contains__(self, key):
+        digest = self._digest(key)
+        _, found = self._find(*digest)
+        if found and self.exact:
+            return self._keys[digest] == key or key in self._colliding_keys
+        return found
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self._low.nbytes + (self._high.nbytes if self._high is not None else 0)
@@ -1,26 +1,31 @@
+from functools import wraps
 from inspect import getfullargspec
 import hashlib
 from math import log10, floor, isinf
-from liftover import get_lifter
-
-import hgvs.dataproviders.uta
+import numpy as np
 
 ALLOWED_ASSEMBLIES = ['GRCh38']
 _lifters = {}
+_chain_intervals = {}
 
 
 def assembly_check(id_builder):
-    def wrapper(*args, **kwargs):
-        argspec = getfullargspec(id_builder)
+    # Position of the assembly argument, resolved once instead of on every call
+    argspec = getfullargspec(id_builder)
+    assembly_index = argspec.args.index('assembly') if 'assembly' in argspec.args else None
 
-        if 'assembly' in argspec.args:
-            assembly_index = argspec.args.index('assembly')
-            if assembly_index >= len(args):
-                pass
-            elif args[assembly_index] not in ALLOWED_ASSEMBLIES:
+    @wraps(id_builder)
+    def wrapper(*args, **kwargs):
+        if assembly_index is not None:
+            if assembly_index < len(args):
+                if args[assembly_index] not in ALLOWED_ASSEMBLIES:
+                    raise ValueError('Assembly not supported')
+            elif 'assembly' in kwargs and kwargs['assembly'] not in ALLOWED_ASSEMBLIES:
                 raise ValueError('Assembly not supported')
-        return id_builder(*args, *kwargs)
+        return id_builder(*args, **kwargs)
 
+    # For callers that already guarantee a supported assembly, e.g. build_variant_id.trusted(chr, pos, ref, alt)
+    wrapper.trusted = id_builder
     return wrapper
 
 
@@ -37,30 +42,61 @@ def build_regulatory_region_id(chr, pos_start, pos_end, assembly='GRCh38'):
     return '{}_{}_{}_{}'.format(chr, pos_start, pos_end, assembly)
 
 
+def _id_part(values):
+    # str() of every value as an Arrow string array (or scalar, which is broadcast)
+    # Import lazily, as in the functions below: pyarrow takes over a third of the import time of
+    # this module, which every adapter imports
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not isinstance(values, (pa.Array, pa.ChunkedArray, pa.Scalar)):
+        values = pa.scalar(values) if np.isscalar(values) or values is None else pa.array(values)
+    if pa.types.is_floating(values.type) or pa.types.is_boolean(values.type):
+        # Arrow formats them differently from str(): 100.0 -> '100', True -> 'true'
+        raise TypeError(f'ID parts must be integers or strings, got {values.type}')
+    return pc.fill_null(pc.cast(values, pa.string()), 'None')
+
+
+def _check_assemblies(assembly):
+    import pyarrow.compute as pc
+
+    assemblies = pc.unique(_id_part(assembly)).to_pylist() if not isinstance(assembly, str) else [assembly]
+    if any(assembly not in ALLOWED_ASSEMBLIES for assembly in assemblies):
+        raise ValueError('Assembly not supported')
+
+
+def build_variant_ids(chr, pos_first_ref_base, ref_seq, alt_seq, assembly='GRCh38'):
+    """
+    build_variant_id() over whole columns: takes lists, NumPy arrays, pandas Series or Arrow
+    arrays (scalars are broadcast) and returns an Arrow string array of the same IDs.
+    """
+    import pyarrow.compute as pc
+
+    _check_assemblies(assembly)
+    return pc.binary_join_element_wise(pc.utf8_lower(_id_part(chr)), _id_part(pos_first_ref_base),
+                                       _id_part(ref_seq), _id_part(alt_seq), _id_part(assembly), '_')
+
+
+def build_regulatory_region_ids(chr, pos_start, pos_end, assembly='GRCh38'):
+    """build_regulatory_region_id() over whole columns, see build_variant_ids()."""
+    import pyarrow.compute as pc
+
+    _check_assemblies(assembly)
+    return pc.binary_join_element_wise(_id_part(chr), _id_part(pos_start), _id_part(pos_end),
+                                       _id_part(assembly), '_')
+
+
 @assembly_check
-def build_variant_id_from_hgvs(hgvs_id, validate=True, assembly='GRCh38'):
+def build_variant_id_from_hgvs(hgvs_id, validate=True, assembly='GRCh38', cache_path=None):
     # translate hgvs naming to vcf format e.g. NC_000003.12:g.183917980C>T -> 3_183917980_C_T
+    # cache_path: SQLite file of validated ids (default: hgvs_validation.DEFAULT_CACHE_PATH)
     if validate:  # use tools from hgvs, which corrects ref allele if it's wrong
         # Import lazily to avoid eager network calls from hgvs.easy at module import time.
         # Some test/dev environments run fully offline and should still be able to import adapters.
-        from hgvs.extras.babelfish import Babelfish
-        from hgvs.parser import Parser
-
-        # got connection timed out error occasionally, could add a retry function
-        hdp = hgvs.dataproviders.uta.connect()
-        babelfish38 = Babelfish(hdp, assembly_name=assembly)
-        parser = Parser()
-        try:
-            chr, pos_start, ref, alt, type = babelfish38.hgvs_to_vcf(
-                parser.parse(hgvs_id))
-        except Exception as e:
-            print(e)
-            return None
+        from biocypher_metta.adapters.hgvs_validation import get_validator
 
-        if type == 'sub' or type == 'delins':
-            return build_variant_id(chr, pos_start + 1, ref[1:], alt[1:])
-        else:
-            return build_variant_id(chr, pos_start, ref, alt)
+        # one pooled UTA connection and cached answers are shared by all calls
+        return get_validator(assembly, cache_path).variant_id(hgvs_id)
 
     # if no need to validate/query ref allele (e.g. single position substitutions) -> use regex match is quicker
     else:
@@ -89,6 +125,16 @@ def build_variant_id_from_hgvs(hgvs_id, validate=True, assembly='GRCh38'):
             return None
 
 
+@assembly_check
+def build_variant_ids_from_hgvs(hgvs_ids, validate=True, assembly='GRCh38', cache_path=None):
+    # returns {hgvs id: variant id or None}, validating every distinct id once
+    if validate:
+        from biocypher_metta.adapters.hgvs_validation import get_validator
+        return get_validator(assembly, cache_path).variant_ids(hgvs_ids)
+    return {hgvs_id: build_variant_id_from_hgvs(hgvs_id, validate=False, assembly=assembly)
+            for hgvs_id in dict.fromkeys(hgvs_ids)}
+
+
 # Arangodb converts a number to string if it can't be represented in signed 64-bit
 # Using the approximation of a limit +/- 308 decimal points for 64 bits
 
@@ -166,6 +212,8 @@ def convert_genome_reference(chr, pos, from_build='hg19', to_build='hg38'):
 
     # Initialize the lifter for the specified build conversion if not already cached
     if lifter_key not in _lifters:
+        # Import lazily: most adapters never lift coordinates over
+        from liftover import get_lifter
         _lifters[lifter_key] = get_lifter(from_build, to_build)
 
     # Convert the chromosome identifier to a format compatible with the liftover library
@@ -177,3 +225,198 @@ def convert_genome_reference(chr, pos, from_build='hg19', to_build='hg38'):
         return int(converted)
     except:
         return None
+
+
+def convert_genome_references(chr, pos, from_build='hg19', to_build='hg38', memo_path=None):
+    """
+    Convert arrays of genomic coordinates from one reference build to another, with the same
+    results as calling convert_genome_reference on every coordinate.
+
+    Args:
+        chr (array-like of str): The chromosome identifiers (e.g., 'chr1', 'chrX'), or one for all positions.
+        pos (array-like of int): The genomic positions.
+        from_build (str): The reference build version to convert from (must be 'hg19' or 'hg38').
+        to_build (str): The reference build version to convert to (must be 'hg19' or 'hg38', and different from `from_build`).
+        memo_path (str): Optional .npz file remembering converted coordinates across runs. The chain file
+            is only loaded if some coordinates are not in it.
+
+    Returns:
+        (np.ndarray, np.ndarray): The converted positions (int64) and a boolean mask of the failed conversions,
+        whose converted position is 0.
+    """
+    if from_build not in ['hg19', 'hg38'] or to_build not in ['hg19', 'hg38'] or from_build == to_build:
+        raise ValueError("Invalid reference build versions. 'from_build' and 'to_build' must be different and one of 'hg19' or 'hg38'.")
+    # Import lazily: liftover_chain pulls in pandas and liftover
+    from biocypher_metta.adapters.liftover_chain import ChainIntervals, LiftoverMemo, chain_file_path
+    import pyarrow as pa
+
+    pos = np.asarray(pos, dtype=np.int64)
+    if isinstance(chr, str):
+        chr = [chr] * len(pos)
+    # Same chromosome names as convert_genome_reference, converted once per distinct name
+    chr = pa.array(chr, type=pa.string()).dictionary_encode()
+    chr_no = np.array([name.replace('chr', '').replace('ch', '') for name in chr.dictionary.to_pylist()],
+                      dtype=object)[chr.indices.to_numpy()]
+
+    lifted = np.zeros(len(pos), dtype=np.int64)
+    failed = np.ones(len(pos), dtype=bool)
+    todo = np.ones(len(pos), dtype=bool)
+    memo = None
+    if memo_path:
+        memo = LiftoverMemo(memo_path, from_build, to_build)
+        known, lifted, failed = memo.lookup(chr_no.tolist(), pos)
+        todo = ~known
+
+    if todo.any():
+        lifter_key = f"{from_build}_{to_build}"
+        if lifter_key not in _lifters:
+            from liftover import get_lifter
+            # get_lifter() downloads the chain file if needed
+            _lifters[lifter_key] = get_lifter(from_build, to_build)
+        if lifter_key not in _chain_intervals:
+            _chain_intervals[lifter_key] = ChainIntervals.from_file(chain_file_path(from_build, to_build),
+                                                                    _lifters[lifter_key])
+        lifted[todo], failed[todo] = _chain_intervals[lifter_key].lift(chr_no[todo], pos[todo])
+        if memo is not None:
+            memo.store(chr_no[todo].tolist(), pos[todo], lifted[todo], failed[todo])
+
+    return lifted, failed
+
+
+# Interval joins. Intervals are closed ([start, end], as in GFF/VCF coordinates): two intervals
+# overlap if they share at least one position. Each interval set is given as three columns
+# (chromosome names, starts, ends) of lists, NumPy arrays or Arrow arrays, and joins return
+# NumPy arrays of indices into them.
+
+def _chromosome_groups(query_chr, ref_chr):
+    # yields (query indices, reference indices) of every chromosome both sets have
+    import pyarrow as pa
+
+    chr = pa.concat_arrays([pa.array(query_chr, type=pa.string()), pa.array(ref_chr, type=pa.string())])
+    codes = chr.dictionary_encode().indices.to_numpy(zero_copy_only=False)
+    query_codes, ref_codes = codes[:len(query_chr)], codes[len(query_chr):]
+    query_order = np.argsort(query_codes, kind='stable')
+    ref_order = np.argsort(ref_codes, kind='stable')
+    bounds = np.arange(codes.max() + 2) if len(codes) else np.arange(1)
+    query_bounds = np.searchsorted(query_codes[query_order], bounds)
+    ref_bounds = np.searchsorted(ref_codes[ref_order], bounds)
+    for code in range(len(bounds) - 1):
+        query_index = query_order[query_bounds[code]:query_bounds[code + 1]]
+        ref_index = ref_order[ref_bounds[code]:ref_bounds[code + 1]]
+        if len(query_index) and len(ref_index):
+            yield query_index, ref_index
+
+
+def _overlaps(query_start, query_end, ref_start, ref_end):
+    # (query, reference) index pairs of one chromosome, in no particular order
+    lengths = np.maximum(ref_end - ref_start, 0)
+    # A reference overlaps [qs, qe] if it starts in [qs - its length, qe]. References are searched
+    # by start, one length class at a time, so that the window, [qs - longest length in the class,
+    # qe], takes few references that end before qs.
+    length_classes = np.floor(np.log2(lengths + 1)).astype(np.int64)
+    query_parts, ref_parts = [], []
+    for length_class in np.unique(length_classes):
+        refs = np.flatnonzero(length_classes == length_class)
+        refs = refs[np.argsort(ref_start[refs], kind='stable')]
+        starts = ref_start[refs]
+        lo = np.searchsorted(starts, query_start - (ref_end[refs] - starts).max(), side='left')
+        hi = np.searchsorted(starts, query_end, side='right')
+        counts = hi - lo
+        total = counts.sum()
+        if total == 0:
+            continue
+        queries = np.repeat(np.arange(len(query_start)), counts)
+        candidates = refs[np.repeat(lo, counts) + np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)]
+        overlapping = ref_end[candidates] >= query_start[queries]
+        query_parts.append(queries[overlapping])
+        ref_parts.append(candidates[overlapping])
+    if not query_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(query_parts), np.concatenate(ref_parts)
+
+
+def overlap_join(query_chr, query_start, query_end, ref_chr, ref_start, ref_end):
+    """
+    All pairs of overlapping query and reference intervals on the same chromosome.
+
+    Returns:
+        (np.ndarray, np.ndarray): The query and reference indices of the pairs, ordered by query
+        index, then reference index (the order of a loop over the queries and, for each, over the
+        references).
+    """
+    query_start, query_end = np.asarray(query_start, dtype=np.int64), np.asarray(query_end, dtype=np.int64)
+    ref_start, ref_end = np.asarray(ref_start, dtype=np.int64), np.asarray(ref_end, dtype=np.int64)
+    query_parts, ref_parts = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for query_index, ref_index in _chromosome_groups(query_chr, ref_chr):
+        queries, refs = _overlaps(query_start[query_index], query_end[query_index],
+                                  ref_start[ref_index], ref_end[ref_index])
+        query_parts.append(query_index[queries])
+        ref_parts.append(ref_index[refs])
+    queries, refs = np.concatenate(query_parts), np.concatenate(ref_parts)
+    order = np.lexsort((refs, queries))
+    return queries[order], refs[order]
+
+
+def _distances(query_start, query_end, ref_start, ref_end):
+    # start of the later interval minus end of the earlier (1 for adjacent intervals), 0 if they overlap
+    return np.maximum(np.maximum(ref_start - query_end, query_start - ref_end), 0)
+
+
+def window_join(query_chr, query_start, query_end, ref_chr, ref_start, ref_end, distance):
+    """
+    All pairs of query and reference intervals on the same chromosome at most `distance` bases
+    apart (overlapping intervals are 0 bases apart), ordered as in overlap_join().
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray): The query and reference indices of the pairs, and
+        the distance between them.
+    """
+    query_start, query_end = np.asarray(query_start, dtype=np.int64), np.asarray(query_end, dtype=np.int64)
+    ref_start, ref_end = np.asarray(ref_start, dtype=np.int64), np.asarray(ref_end, dtype=np.int64)
+    queries, refs = overlap_join(query_chr, query_start - distance, query_end + distance, ref_chr, ref_start, ref_end)
+    return queries, refs, _distances(query_start[queries], query_end[queries], ref_start[refs], ref_end[refs])
+
+
+def nearest_join(query_chr, query_start, query_end, ref_chr, ref_start, ref_end):
+    """
+    The nearest reference interval of every query interval, on the same chromosome. Ties, as
+    several overlapping references, go to the lowest reference index. Queries on a chromosome
+    without references are left out.
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray): The query indices (increasing), the index of their
+        nearest reference, and the distance between them.
+    """
+    query_start, query_end = np.asarray(query_start, dtype=np.int64), np.asarray(query_end, dtype=np.int64)
+    ref_start, ref_end = np.asarray(ref_start, dtype=np.int64), np.asarray(ref_end, dtype=np.int64)
+    query_parts, ref_parts = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for query_index, ref_index in _chromosome_groups(query_chr, ref_chr):
+        starts, ends = query_start[query_index], query_end[query_index]
+        # closest reference ending before the query: the last by end (lowest index among equal ends)
+        by_end = ref_index[np.lexsort((-ref_index, ref_end[ref_index]))]
+        before = np.searchsorted(ref_end[by_end], starts, side='left') - 1
+        # closest reference starting after the query: the first by start (lowest index first)
+        by_start = ref_index[np.lexsort((ref_index, ref_start[ref_index]))]
+        after = np.searchsorted(ref_start[by_start], ends, side='right')
+
+        none = np.iinfo(np.int64).max
+        before_ref = by_end[np.maximum(before, 0)]
+        after_ref = by_start[np.minimum(after, len(by_start) - 1)]
+        before_distance = np.where(before >= 0, starts - ref_end[before_ref], none)
+        after_distance = np.where(after < len(by_start), ref_start[after_ref] - ends, none)
+        take_after = (after_distance < before_distance) | ((after_distance == before_distance) & (after_ref < before_ref))
+        nearest = np.where(take_after, after_ref, before_ref)
+
+        # queries overlapping references: the lowest overlapping reference index
+        queries, refs = _overlaps(starts, ends, ref_start[ref_index], ref_end[ref_index])
+        if len(queries):
+            lowest = np.full(len(query_index), none, dtype=np.int64)
+            np.minimum.at(lowest, queries, ref_index[refs])
+            overlapping = lowest != none
+            nearest[overlapping] = lowest[overlapping]
+        query_parts.append(query_index)
+        ref_parts.append(nearest)
+    queries, refs = np.concatenate(query_parts), np.concatenate(ref_parts)
+    order = np.argsort(queries, kind='stable')
+    queries, refs = queries[order], refs[order]
+    return queries, refs, _distances(query_start[queries], query_end[queries], ref_start[refs], ref_end[refs])
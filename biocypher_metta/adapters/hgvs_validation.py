@@ -0,0 +1,221 @@
+'''
+Shared HGVS validation for build_variant_id_from_hgvs.
+
+Validating an HGVS id maps it to VCF-style coordinates with hgvs' Babelfish, which reads
+reference sequence from UTA. Every call used to open its own UTA connection and build its
+own parser and Babelfish. Here one pooled UTA data provider, one parser and one Babelfish
+per assembly are created on first use and shared by all calls in the process.
+
+HgvsValidator also remembers its answers: an in-memory LRU of recent HGVS ids, and, with a
+`cache_path`, a SQLite file that keeps them across runs. The validators of get_validator(),
+which build_variant_id_from_hgvs uses, keep theirs in DEFAULT_CACHE_PATH. Invalid ids are remembered as None;
+lookups that failed because UTA was unreachable or lacked the sequence are not, so they are
+retried on the next run.
+
+Any object with the two sequence methods Babelfish uses can stand in for UTA. The sqlite3
+database created by create_sqlite_uta() holds reference sequence segments, which lets
+validation run offline in tests and benchmarks.
+'''
+
+import os
+import sqlite3
+from collections import OrderedDict
+
+import hgvs.dataproviders.uta
+from hgvs.exceptions import HGVSDataNotAvailableError, HGVSError
+
+from biocypher_metta.adapters.helpers import build_variant_id
+from biocypher_metta.adapters.row_errors import row_errors
+
+
+UTA_FIXTURE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS seq_segment (
+    ac TEXT NOT NULL,
+    start_i INTEGER NOT NULL,
+    seq TEXT NOT NULL,
+    PRIMARY KEY (ac, start_i)
+);
+'''
+
+DEFAULT_CACHE_PATH = 'aux_files/hgvs_cache/hgvs_variant_ids.sqlite'
+
+_data_provider = None
+_parser = None
+_babelfish = {}
+_validators = {}
+
+
+def create_sqlite_uta(path=':memory:'):
+    '''
+    Returns a sqlite3 connection for SqliteSequenceProvider. Each row of seq_segment holds
+    the reference sequence of accession `ac` starting at the 0-based `start_i`.
+    '''
+    conn = sqlite3.connect(path)
+    conn.executescript(UTA_FIXTURE_SCHEMA)
+    return conn
+
+
+class SqliteSequenceProvider:
+    '''The part of the UTA data provider Babelfish uses, served from create_sqlite_uta() tables.'''
+    def __init__(self, connection):
+        self.connection = connection
+        # hgvs fetches sequence both from the data provider and from its seqfetcher
+        self.seqfetcher = self
+        self.round_trips = 0
+
+    def get_seq(self, ac, start_i=None, end_i=None):
+        start_i = start_i or 0
+        self.round_trips += 1
+        row = self.connection.execute(
+            'SELECT start_i, seq FROM seq_segment WHERE ac = ? AND start_i <= ? '
+            'ORDER BY start_i DESC LIMIT 1', (ac, start_i)).fetchone()
+        if row is None:
+            raise HGVSDataNotAvailableError(f'No sequence available for {ac} at {start_i}')
+        segment_start, seq = row
+        return seq[start_i - segment_start:None if end_i is None else end_i - segment_start]
+
+    fetch_seq = get_seq
+
+
+def get_data_provider():
+    '''The pooled UTA data provider shared by all validators, connected on first use.'''
+    global _data_provider
+    if _data_provider is None:
+        _data_provider = hgvs.dataproviders.uta.connect(pooling=True)
+    return _data_provider
+
+
+def get_parser():
+    global _parser
+    if _parser is None:
+        from hgvs.parser import Parser
+        _parser = Parser()
+    return _parser
+
+
+def get_babelfish(assembly, data_provider=None):
+    '''The Babelfish for `assembly` over `data_provider` (default: the pooled UTA provider).'''
+    data_provider = data_provider or get_data_provider()
+    key = (id(data_provider), assembly)
+    if key not in _babelfish:
+        # Imported lazily, like the parser, to keep importing the adapters cheap
+        from hgvs.extras.babelfish import Babelfish
+        _babelfish[key] = (data_provider, Babelfish(data_provider, assembly_name=assembly))
+    return _babelfish[key][1]
+
+
+def get_validator(assembly='GRCh38', cache_path=None):
+    '''
+    The process-wide HgvsValidator for `assembly`, using the pooled UTA provider and keeping
+    its answers in `cache_path` (default: DEFAULT_CACHE_PATH; '' for none).
+    '''
+    if cache_path is None:
+        cache_path = DEFAULT_CACHE_PATH
+    key = (assembly, cache_path)
+    if key not in _validators:
+        _validators[key] = HgvsValidator(assembly, cache_path=cache_path)
+    return _validators[key]
+
+
+class HgvsValidator:
+    def __init__(self, assembly='GRCh38', data_provider=None, cache_path=None, cache_size=100000):
+        '''
+        data_provider: UTA data provider (or SqliteSequenceProvider) to use instead of the
+                       pooled UTA connection.
+        cache_path:    SQLite file keeping validated ids across runs.
+        cache_size:    number of HGVS ids kept in memory.
+        '''
+        self.assembly = assembly
+        self.cache_size = cache_size
+        self._data_provider = data_provider
+        self._cache = OrderedDict()
+        self._cache_db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._cache_db = sqlite3.connect(cache_path)
+            self._cache_db.execute(
+                'CREATE TABLE IF NOT EXISTS hgvs_variant_id '
+                '(assembly TEXT, hgvs_id TEXT, variant_id TEXT, PRIMARY KEY (assembly, hgvs_id))')
+
+    def _remember(self, hgvs_id, variant_id):
+        self._cache[hgvs_id] = variant_id
+        self._cache.move_to_end(hgvs_id)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _cached(self, hgvs_ids):
+        found = {}
+        missing = []
+        for hgvs_id in hgvs_ids:
+            if hgvs_id in self._cache:
+                self._cache.move_to_end(hgvs_id)
+                found[hgvs_id] = self._cache[hgvs_id]
+            else:
+                missing.append(hgvs_id)
+        if self._cache_db is not None and missing:
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                rows = self._cache_db.execute(
+                    f"SELECT hgvs_id, variant_id FROM hgvs_variant_id WHERE assembly = ? "
+                    f"AND hgvs_id IN ({', '.join('?' * len(chunk))})", [self.assembly, *chunk])
+                for hgvs_id, variant_id in rows:
+                    found[hgvs_id] = variant_id
+                    self._remember(hgvs_id, variant_id)
+            missing = [hgvs_id for hgvs_id in missing if hgvs_id not in found]
+        return found, missing
+
+    def _store(self, answers):
+        for hgvs_id, variant_id in answers.items():
+            self._remember(hgvs_id, variant_id)
+        if self._cache_db is not None and answers:
+            with self._cache_db:
+                self._cache_db.executemany(
+                    'INSERT OR REPLACE INTO hgvs_variant_id (assembly, hgvs_id, variant_id) VALUES (?, ?, ?)',
+                    [(self.assembly, hgvs_id, variant_id) for hgvs_id, variant_id in answers.items()])
+
+    def _row_error(self, error, hgvs_id):
+        row_errors.record(error, hgvs_id, adapter=type(self).__name__)
+
+    def _validate(self, hgvs_id):
+        '''Returns (variant id or None, whether the answer may be cached).'''
+        babelfish = get_babelfish(self.assembly, self._data_provider)
+        try:
+            vcf = babelfish.hgvs_to_vcf(get_parser().parse(hgvs_id))
+        except HGVSDataNotAvailableError as e:
+            self._row_error(e, hgvs_id)
+            return None, False
+        except HGVSError as e:
+            self._row_error(e, hgvs_id)
+            return None, True
+        except Exception as e:
+            # e.g. UTA connection errors, worth retrying on a later run
+            self._row_error(e, hgvs_id)
+            return None, False
+
+        if vcf is None:  # not a variation, e.g. NC_000006.12:g.49949407=
+            self._row_error(ValueError('no variation'), hgvs_id)
+            return None, True
+        chr, pos_start, ref, alt, type = vcf
+        if type == 'sub' or type == 'delins':
+            return build_variant_id(chr, pos_start + 1, ref[1:], alt[1:], self.assembly), True
+        return build_variant_id(chr, pos_start, ref, alt, self.assembly), True
+
+    def variant_id(self, hgvs_id):
+        return self.variant_ids([hgvs_id])[hgvs_id]
+
+    def variant_ids(self, hgvs_ids):
+        '''Returns {hgvs id: variant id or None}, validating each distinct id not cached yet once.'''
+        resolved, missing = self._cached(list(dict.fromkeys(hgvs_ids)))
+        answers = {}
+        for hgvs_id in missing:
+            variant_id, cacheable = self._validate(hgvs_id)
+            resolved[hgvs_id] = variant_id
+            if cacheable:
+                answers[hgvs_id] = variant_id
+        self._store(answers)
+        return resolved
+
+    def close(self):
+        if self._cache_db is not None:
+            self._cache_db.close()
+            self._cache_db = None
@@ -68,7 +68,7 @@ class ABCAdapter(Adapter):
                             processed += 1
                             yield _source, _target, self.label, props
                         except Exception as e:
-                            print(f"error while parsing row: {row}, error: {e} skipping...")
+                            self.row_error(e, row)
                             continue
                 except KeyError as e:
                     # logger.error(f"rsid {rsid} not found in dbsnp_rsid_map, skipping...")
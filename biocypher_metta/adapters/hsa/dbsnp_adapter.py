@@ -1,5 +1,7 @@
 import gzip
+from itertools import islice
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.batches import node_batch_records
 from biocypher_metta.adapters.helpers import check_genomic_location, to_float
 # Exaple dbSNP vcf input file:
 #CHROM	POS	ID	REF	ALT	QUAL	FILTER	INFO
@@ -35,34 +37,60 @@ class DBSNPAdapter(Adapter):
                 info_dict[key] = True
         return info_dict
     
+    @staticmethod
+    def parse_caf(info_string):
+        """The CAF entry of the INFO column as parse_info() reads it, without parsing the others."""
+        start = info_string.find('CAF=')
+        while start > 0 and info_string[start - 1] != ';':
+            start = info_string.find('CAF=', start + 1)
+        if start < 0:
+            return None
+        end = info_string.find(';', start)
+        value = info_string[start + 4:] if end < 0 else info_string[start + 4:end]
+        return value.split(',') if ',' in value else value
+
     def get_nodes(self):
-        with gzip.open(self.filepath, 'rt') as f:
-            for line in f:
-                if line.startswith('#'):
-                    continue
-                data = line.strip().split('\t')
-                #CURIE format for dbSNP ID
-                rsid = f"DBSNP:{data[DBSNPAdapter.INDEX['id']]}"
-                chr = data[DBSNPAdapter.INDEX['chr']]
-                pos = int(data[DBSNPAdapter.INDEX['pos']])
-                ref = data[DBSNPAdapter.INDEX['ref']]
-                alt = data[DBSNPAdapter.INDEX['alt']]
-                info_dict = self.parse_info(data[DBSNPAdapter.INDEX['info']])
-                caf = info_dict.get('CAF')
+        yield from node_batch_records(self.get_node_batches())
 
-                if check_genomic_location(self.chr, self.start, self.end, chr, pos, pos):
-                    props = {}
+    def get_node_batches(self, batch_size=10000):
+        columns = ('chr', 'start', 'end', 'ref', 'alt', 'caf_ref', 'caf_alt', 'source', 'source_url')
+        with gzip.open(self.filepath, 'rt') as f:
+            while True:
+                lines = list(islice(f, batch_size))
+                if not lines:
+                    return
+                ids = []
+                properties = {column: [] for column in columns}
+                for line in lines:
+                    if line.startswith('#'):
+                        continue
+                    data = line.strip().split('\t')
+                    if not self.sampled(data[DBSNPAdapter.INDEX['id']]):
+                        continue
+                    chr = data[DBSNPAdapter.INDEX['chr']]
+                    pos = int(data[DBSNPAdapter.INDEX['pos']])
+                    if not check_genomic_location(self.chr, self.start, self.end, chr, pos, pos):
+                        continue
+                    #CURIE format for dbSNP ID
+                    ids.append(f"DBSNP:{data[DBSNPAdapter.INDEX['id']]}")
                     if self.write_properties:
-                        props['chr'] = 'chr'+chr
-                        props['start'] = pos
-                        props['end'] = pos
-                        props['ref'] = ref
-                        props['alt'] = alt
-                        if caf != None:
-                            props['caf_ref'] = to_float(caf[0] if caf[0] != '.' else '0')
-                            props['caf_alt'] = to_float(caf[1] if caf[1] != '.' else '0')
-                        if self.add_provenance:
-                            props['source'] = self.source
-                            props['source_url'] = self.source_url
-                    
-                    yield rsid, self.label, props
\ No newline at end of file
+                        caf = self.parse_caf(data[DBSNPAdapter.INDEX['info']])
+                        properties['chr'].append('chr'+chr)
+                        properties['start'].append(pos)
+                        properties['end'].append(pos)
+                        properties['ref'].append(data[DBSNPAdapter.INDEX['ref']])
+                        properties['alt'].append(data[DBSNPAdapter.INDEX['alt']])
+                        properties['caf_ref'].append(
+                            None if caf is None else to_float(caf[0] if caf[0] != '.' else '0'))
+                        properties['caf_alt'].append(
+                            None if caf is None else to_float(caf[1] if caf[1] != '.' else '0'))
+                if not ids:
+                    continue
+                if not self.write_properties:
+                    properties = {}
+                elif self.add_provenance:
+                    properties['source'] = [self.source] * len(ids)
+                    properties['source_url'] = [self.source_url] * len(ids)
+                else:
+                    del properties['source'], properties['source_url']
+                yield {'id': ids, 'label': [self.label] * len(ids), 'properties': properties}
@@ -4,7 +4,7 @@ import gzip
 import pickle
 from biocypher_metta.adapters import Adapter
 from biocypher_metta.processors import HGNCProcessor
-from biocypher_metta.adapters.helpers import build_regulatory_region_id, check_genomic_location, convert_genome_reference
+from biocypher_metta.adapters.helpers import build_regulatory_region_ids, check_genomic_location, convert_genome_references
 # Example dbSuper tsv input files:
 # chrom	 start	 stop	 se_id	 gene_symbol	 cell_name	 rank
 # chr1	120485363	120615071	SE_00001	NOTCH2	Adipose Nuclei	1
@@ -41,66 +41,68 @@ class DBSuperAdapter(Adapter):
 
         super(DBSuperAdapter, self).__init__(write_properties, add_provenance)
 
-
-    def get_nodes(self):
+    def get_lifted_rows(self):
+        '''
+        Yields (line, start, end, region_id) for every row, with the hg19 coordinates converted to hg38
+        (None where the conversion fails). All coordinates are converted, and the super enhancer
+        region IDs built, in one batch.
+        '''
         with gzip.open(self.filePath, 'rt') as f:
             reader = csv.reader(f, delimiter=self.delimiter)
             next(reader)
-            for line in reader:
-                se_id = line[DBSuperAdapter.INDEX['se_id']]
-                chr = line[DBSuperAdapter.INDEX['chr']]
-                start_hg19 = int(line[DBSuperAdapter.INDEX['coord_start']]) + 1 # +1 since it is 0-based genomic coordinate
-                end_hg19 = int(line[DBSuperAdapter.INDEX['coord_end']])
-                start = convert_genome_reference(chr, start_hg19)
-                end = convert_genome_reference(chr, end_hg19)
-                
-                if start == None or end == None:
-                    continue
-                #CURIE ID For super enhancer region
-                #"SO" provides standardized terms for genomic features, including regulatory regions  
-                se_region_id = f"SO:{build_regulatory_region_id(chr, start, end)}"
-                if check_genomic_location(self.chr, self.start, self.end, chr, start, end):
-                    props = {}
-                    if self.write_properties:
-                        props['se_id'] = se_id
-                        props['chr'] = chr
-                        props['start'] = start
-                        props['end'] = end
-                        if self.add_provenance:
-                            props['source'] = self.source
-                            props['source_url'] = self.source_url
+            lines = list(reader)
+        chrs = [line[DBSuperAdapter.INDEX['chr']] for line in lines]
+        starts_hg19 = [int(line[DBSuperAdapter.INDEX['coord_start']]) + 1 for line in lines] # +1 since it is 0-based genomic coordinate
+        ends_hg19 = [int(line[DBSuperAdapter.INDEX['coord_end']]) for line in lines]
+        lifted, failed = convert_genome_references(chrs + chrs, starts_hg19 + ends_hg19)
+        lifted = [None if fail else pos for pos, fail in zip(lifted.tolist(), failed.tolist())]
+        starts, ends = lifted[:len(lines)], lifted[len(lines):]
+        #CURIE ID For super enhancer region
+        #"SO" provides standardized terms for genomic features, including regulatory regions
+        region_ids = build_regulatory_region_ids(chrs, starts, ends).to_pylist()
+        yield from zip(lines, starts, ends, (f"SO:{region_id}" for region_id in region_ids))
+
+    def get_nodes(self):
+        for line, start, end, se_region_id in self.get_lifted_rows():
+            se_id = line[DBSuperAdapter.INDEX['se_id']]
+            chr = line[DBSuperAdapter.INDEX['chr']]
+            
+            if start == None or end == None:
+                continue
+            if check_genomic_location(self.chr, self.start, self.end, chr, start, end):
+                props = {}
+                if self.write_properties:
+                    props['se_id'] = se_id
+                    props['chr'] = chr
+                    props['start'] = start
+                    props['end'] = end
+                    if self.add_provenance:
+                        props['source'] = self.source
+                        props['source_url'] = self.source_url
 
-                    yield se_region_id, self.label, props
+                yield se_region_id, self.label, props
 
     
     def get_edges(self):
-        with gzip.open(self.filePath, 'rt') as f:
-            reader = csv.reader(f, delimiter=self.delimiter)
-            next(reader)
-            for line in reader:
-                gene_id = line[DBSuperAdapter.INDEX['gene_id']]
-                #CURIE ID For gene - Get Ensembl ID from HGNC symbol
-                ensembl_id = self.hgnc_processor.get_ensembl_id(gene_id)
-                if ensembl_id is None:
-                    continue
-                ensembl_gene_id = f"ENSEMBL:{ensembl_id}"
-                chr = line[DBSuperAdapter.INDEX['chr']]
-                start_hg19 = int(line[DBSuperAdapter.INDEX['coord_start']]) + 1 # +1 since it is 0-based genomic coordinate
-                end_hg19 = int(line[DBSuperAdapter.INDEX['coord_end']])
-                start = convert_genome_reference(chr, start_hg19)
-                end = convert_genome_reference(chr, end_hg19)
-                cell_name = line[DBSuperAdapter.INDEX['cell_name']]
-                biological_id = self.dbsuper_tissues_map[cell_name]
-                
-                if None in [ensembl_gene_id, start, end]:
-                    continue
-                se_region_id = f"SO:{build_regulatory_region_id(chr, start, end)}"
-                if check_genomic_location(self.chr, self.start, self.end, chr, start, end):
-                    props = {}
-                    if self.write_properties:
-                        props['biological_context'] = biological_id
-                        if self.add_provenance:
-                            props['source'] = self.source
-                            props['source_url'] = self.source_url
+        for line, start, end, se_region_id in self.get_lifted_rows():
+            gene_id = line[DBSuperAdapter.INDEX['gene_id']]
+            #CURIE ID For gene - Get Ensembl ID from HGNC symbol
+            ensembl_id = self.hgnc_processor.get_ensembl_id(gene_id)
+            if ensembl_id is None:
+                continue
+            ensembl_gene_id = f"ENSEMBL:{ensembl_id}"
+            chr = line[DBSuperAdapter.INDEX['chr']]
+            cell_name = line[DBSuperAdapter.INDEX['cell_name']]
+            biological_id = self.dbsuper_tissues_map[cell_name]
+            
+            if None in [ensembl_gene_id, start, end]:
+                continue
+            if check_genomic_location(self.chr, self.start, self.end, chr, start, end):
+                props = {}
+                if self.write_properties:
+                    props['biological_context'] = biological_id
+                    if self.add_provenance:
+                        props['source'] = self.source
+                        props['source_url'] = self.source_url
 
-                    yield se_region_id, ensembl_gene_id, self.label, props
\ No newline at end of file
+                yield se_region_id, ensembl_gene_id, self.label, props
\ No newline at end of file
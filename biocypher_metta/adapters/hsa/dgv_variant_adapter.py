@@ -1,6 +1,8 @@
 import gzip
+from itertools import islice
+import numpy as np
 from biocypher_metta.adapters import Adapter
-from biocypher_metta.adapters.helpers import build_regulatory_region_id, check_genomic_location
+from biocypher_metta.adapters.helpers import build_regulatory_region_id, check_genomic_location, overlap_join
 # Example dgv input file:
 # variantaccession	chr	start	end	varianttype	variantsubtype	reference	pubmedid	method	platform	mergedvariants	supportingvariants	mergedorsample	frequency	samplesize	observedgains	observedlosses	cohortdescription	genes	samples
 # dgv1n82	1	10001	22118	CNV	duplication	Sudmant_et_al_2013	23825009	Oligo aCGH,Sequencing			nsv945697,nsv945698	M		97	10	0		""	HGDP00456,HGDP00521,HGDP00542,HGDP00665,HGDP00778,HGDP00927,HGDP00998,HGDP01029,HGDP01284,HGDP01307
@@ -9,6 +11,8 @@ from biocypher_metta.adapters.helpers import build_regulatory_region_id, check_g
 
 class DGVVariantAdapter(Adapter):
     INDEX = {'variant_accession': 0, 'chr': 1, 'coord_start': 2, 'coord_end': 3, 'type': 5, 'pubmedid': 7, 'genes': 17}
+    # features read from a feature file and joined with the structural variants at once
+    FEATURE_BATCH_SIZE = 1000000
 
     def __init__(self, filepath, write_properties, add_provenance, 
                  label, delimiter='\t',
@@ -62,44 +66,54 @@ class DGVVariantAdapter(Adapter):
     def get_edges(self):
         if not self.feature_files:
             raise FileNotFoundError("Feature files for overlap calculation not provided in configuration.")
-            
-        svs = {}
+
+        sv_ids, sv_chr, sv_start, sv_end = [], [], [], []
         for sv_id, chr, start, end, label in self._parse_dgv(self.filepath):
             if not check_genomic_location(self.chr, self.start, self.end, chr, start, end):
                 continue
-            if chr not in svs: svs[chr] = []
-            svs[chr].append({'id': sv_id, 'start': start, 'end': end, 'label': label})
-            
+            sv_ids.append(sv_id)
+            sv_chr.append(chr)
+            sv_start.append(start)
+            sv_end.append(end)
+        sv_start, sv_end = np.array(sv_start, dtype=np.int64), np.array(sv_end, dtype=np.int64)
+
         for feat_config in self.feature_files:
             path = feat_config['path']
             label = feat_config['label']
             file_type = feat_config['type']
             delimiter = feat_config.get('delimiter', '\t')
-            
+
             if file_type == 'gtf':
                 iterator = self._parse_gtf(path)
             elif file_type == 'bed':
                 iterator = self._parse_bed(path, delimiter, label)
             else:
                 continue
-                
-            for feat_id, chr, start, end in iterator:
-                if chr in svs:
-                    for sv in svs[chr]:
-                        if self._check_overlap(start, end, sv['start'], sv['end']):
-                            props = {
-                                'overlap_start': max(start, sv['start']),
-                                'overlap_end': min(end, sv['end'])
-                            }
-                            if self.add_provenance:
-                                props['source'] = 'Overlap calculation'
-                            
-                            # Dynamic granular labels
-                            feat_to_sv_label = f"{label}_overlaps_structural_variant"
-                            sv_to_feat_label = f"structural_variant_overlaps_{label}"
-                            
-                            yield feat_id, sv['id'], feat_to_sv_label, props
-                            yield sv['id'], feat_id, sv_to_feat_label, props
+
+            # Dynamic granular labels
+            feat_to_sv_label = f"{label}_overlaps_structural_variant"
+            sv_to_feat_label = f"structural_variant_overlaps_{label}"
+
+            # features are joined with the structural variants a batch at a time
+            while True:
+                features = list(islice(iterator, self.FEATURE_BATCH_SIZE))
+                if not features:
+                    break
+                feat_ids, feat_chr, feat_start, feat_end = zip(*features)
+                feat_index, sv_index = overlap_join(feat_chr, feat_start, feat_end, sv_chr, sv_start, sv_end)
+                overlap_start = np.maximum(np.array(feat_start, dtype=np.int64)[feat_index], sv_start[sv_index])
+                overlap_end = np.minimum(np.array(feat_end, dtype=np.int64)[feat_index], sv_end[sv_index])
+                for i, j, start, end in zip(feat_index.tolist(), sv_index.tolist(),
+                                            overlap_start.tolist(), overlap_end.tolist()):
+                    props = {
+                        'overlap_start': start,
+                        'overlap_end': end
+                    }
+                    if self.add_provenance:
+                        props['source'] = 'Overlap calculation'
+
+                    yield feat_ids[i], sv_ids[j], feat_to_sv_label, props
+                    yield sv_ids[j], feat_ids[i], sv_to_feat_label, props
 
     def _parse_dgv(self, path):
         with gzip.open(path, 'rt') as f:
@@ -115,9 +129,6 @@ class DGVVariantAdapter(Adapter):
                 
                 yield region_id, chr, start, end, self.label
 
-    def _check_overlap(self, s1, e1, s2, e2):
-        return max(s1, s2) <= min(e1, e2)
-
     def _parse_gtf(self, path):
         with gzip.open(path, 'rt') as f:
             for line_num, line in enumerate(f, 1):
@@ -163,8 +174,8 @@ class DGVVariantAdapter(Adapter):
                             feat_id += '_PAR_Y'
                         yield feat_id, chr, start, end
                 except Exception as e:
-                    # Skip malformed lines but log the error
-                    print(f"Warning: Skipping malformed GTF line {line_num} in {path}: {str(e)[:100]}")
+                    # Skip malformed lines but count the error
+                    self.row_error(e, f"{path}:{line_num}")
                     continue
 
     def _parse_bed(self, path, delimiter, label):
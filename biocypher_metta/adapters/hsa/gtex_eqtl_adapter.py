@@ -2,9 +2,11 @@ import csv
 import os
 import pickle
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.batches import edge_batch_records
 from biocypher_metta.adapters.helpers import to_float, check_genomic_location
 from biocypher._logger import logger
 import gzip
+from itertools import islice
 
 # description for column headers can be found here: 
 # https://storage.googleapis.com/adult-gtex/bulk-qtl/v8/single-tissue-cis-qtl/README_eQTL_v8.txt
@@ -51,32 +53,45 @@ class GTExEQTLAdapter(Adapter):
         super(GTExEQTLAdapter, self).__init__(write_properties, add_provenance)
 
     def get_edges(self):
+        yield from edge_batch_records(self.get_edge_batches())
+
+    def get_edge_batches(self, batch_size=10000):
+        columns = ('maf', 'slope', 'p_value', 'biological_context', 'source', 'source_url')
         with gzip.open(self.filepath, 'rt') as qtl:
             next(qtl) # skip header
             qtl_csv = csv.reader(qtl)
-            for row in qtl_csv:
-                try:
-                    chr, pos = row[COL_DICT["chr"]], row[COL_DICT["pos"]]
-                    pos = int(pos)
-                    variant_id = row[COL_DICT["rsid"]]
-                    gene_id = row[COL_DICT["gene_id"]]
-                    if check_genomic_location(self.chr, self.start, self.end, chr, pos, pos):
-                        _source = f"DBSNP:{variant_id}"
-                        _target = f"ENSEMBL:{gene_id}"
-                        _props = {}
+            while True:
+                rows = list(islice(qtl_csv, batch_size))
+                if not rows:
+                    return
+                sources, targets = [], []
+                properties = {column: [] for column in columns[:4]}
+                for row in rows:
+                    try:
+                        variant_id = row[COL_DICT["rsid"]]
+                        gene_id = row[COL_DICT["gene_id"]]
+                        if not self.sampled(variant_id, gene_id):
+                            continue
+                        chr, pos = row[COL_DICT["chr"]], row[COL_DICT["pos"]]
+                        pos = int(pos)
+                        if not check_genomic_location(self.chr, self.start, self.end, chr, pos, pos):
+                            continue
                         if self.write_properties:
                             tissue_name = row[COL_DICT["tissue"]].split(".")[0]
-                            _props = {
-                                'maf': to_float(row[COL_DICT["maf"]]),
-                                'slope': to_float(row[COL_DICT["slope"]]),
-                                'p_value': to_float(row[COL_DICT["p_value"]]),
-                                'biological_context': self.gtex_tissue_ontology_map[tissue_name]
-                            }
-                            if self.add_provenance:
-                                _props['source'] = self.source
-                                _props['source_url'] = self.source_url
-
-                        yield _source, _target, self.label, _props
-                except Exception as e:
-                    print(row)
-                    print(e)
+                            values = (to_float(row[COL_DICT["maf"]]), to_float(row[COL_DICT["slope"]]),
+                                      to_float(row[COL_DICT["p_value"]]), self.gtex_tissue_ontology_map[tissue_name])
+                            for column, value in zip(columns, values):
+                                properties[column].append(value)
+                        sources.append(f"DBSNP:{variant_id}")
+                        targets.append(f"ENSEMBL:{gene_id}")
+                    except Exception as e:
+                        self.row_error(e, row)
+                if not sources:
+                    continue
+                if not self.write_properties:
+                    properties = {}
+                elif self.add_provenance:
+                    properties['source'] = [self.source] * len(sources)
+                    properties['source_url'] = [self.source_url] * len(sources)
+                yield {'source': sources, 'target': targets, 'label': [self.label] * len(sources),
+                       'properties': properties}
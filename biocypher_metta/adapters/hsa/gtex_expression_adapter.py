@@ -61,5 +61,4 @@ class GTExExpressionAdapter(Adapter):
 
                         yield _source, _target, self.label, _props
                 except Exception as e:
-                    print(row)
-                    print(e)
+                    self.row_error(e, row)
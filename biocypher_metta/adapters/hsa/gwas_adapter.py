@@ -85,5 +85,4 @@ class GWASAdapter(Adapter):
 
                         yield _source, _target, self.label, _props
                 except Exception as e:
-                    print(row)
-                    print(e)
+                    self.row_error(e, row)
@@ -71,7 +71,7 @@ class RefSeqClosestGeneAdapter(Adapter):
                             yield source_id, target_id, self.label, props
 
                         except Exception as e:
-                            logger.error(f"error while parsing row: {row}, error: {e} skipping...")
+                            self.row_error(e, row)
                             continue
                 except KeyError as e:
                     # logger.error(f"rsid {rsid} not found in dbsnp_rsid_map, skipping...")
@@ -91,5 +91,5 @@ class RoadMapDHSAdapter(Adapter):
                         yield _source, _target, self.label, _props
                         yield _source, tissue_target, self.label, _props                        
                 except Exception as e:
-                    print(f"error while parsing row: {row}, error: {e.args} skipping... {biological_context}")
+                    self.row_error(e, row)
                     continue
\ No newline at end of file
@@ -3,8 +3,8 @@ import csv
 import gzip
 import os.path
 import pickle
-from collections import defaultdict
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.external_sort import ExternalSorter
 from biocypher_metta.adapters.helpers import check_genomic_location
 
 # Example roadmap csv input files
@@ -27,13 +27,16 @@ class RoadMapChromatinStateAdapter(Adapter):
 
     def __init__(self, filepath, cell_to_ontology_id_map,  tissue_to_ontology_id_map, label,
                  dbsnp_rsid_map, write_properties, add_provenance,
-                 chr=None, start=None, end=None):
+                 chr=None, start=None, end=None, memory_budget_mb=None, tmp_dir=None):
         """
         :param filepath: path to the directory containing epigenomic data
         :param dbsnp_rsid_map: a dictionary mapping dbSNP rsid to genomic position
         :param chr: chromosome name
         :param start: start position
         :param end: end position
+        :param memory_budget_mb: if set, edges are deduplicated with an external sort that keeps
+            about this many MiB in memory instead of holding every edge seen in a dict
+        :param tmp_dir: directory for the sorted runs of the external sort (default: system temp dir)
         """
         self.filepath = filepath
         assert os.path.isdir(self.filepath), "The path to the directory containing epigenomic data is not directory"
@@ -43,6 +46,8 @@ class RoadMapChromatinStateAdapter(Adapter):
         self.chr = chr
         self.start = start
         self.end = end
+        self.memory_budget_mb = memory_budget_mb
+        self.tmp_dir = tmp_dir
 
         self.source = "Roadmap Epigenomics Project"
         self.source_url = "https://forgedb.cancer.gov/api/forge2.erc2-chromatin15state-all/v1.0/forge2.erc2-chromatin15state-all.{0-9}.forgedb.csv.gz" # {0-9} indicates this dataset is split into 10 parts
@@ -50,8 +55,11 @@ class RoadMapChromatinStateAdapter(Adapter):
 
         super(RoadMapChromatinStateAdapter, self).__init__(write_properties, add_provenance)
 
-    def get_edges(self):        
-        edge_dict = defaultdict(lambda: {"props": {}})
+    def get_candidate_edges(self):
+        """
+        Yields (source, target, props) for the cell and the tissue of every row in the input
+        files, in file order. The same pair comes up once per dataset it appears in.
+        """
         for file_name in os.listdir(self.filepath):
             with gzip.open(os.path.join(self.filepath, file_name), "rt") as fp:
                 next(fp)
@@ -92,23 +100,47 @@ class RoadMapChromatinStateAdapter(Adapter):
                                 if self.add_provenance:
                                     _props['source'] = self.source
                                     _props['source_url'] = self.source_url
-                            edge_key = (_source, _target)
-                            edge_key2 = (_source, tissue_target)
-                            if edge_key in edge_dict:
-                                if edge_key2 in edge_dict:
-                                    continue
-                                else:
-                                    edge_dict[edge_key2] = {"props": _props}
-                                    yield _source, tissue_target, self.label, _props
-                            else:
-                                edge_dict[edge_key] = {"props": _props}
-                                yield _source, _target, self.label, _props
-                                if edge_key2  in edge_dict:
-                                    continue
-                                else:
-                                    edge_dict[edge_key2] = {"props": _props}
-                                    yield _source, tissue_target, self.label, _props
+                            yield _source, _target, _props
+                            yield _source, tissue_target, _props
 
                     except Exception as e:
-                        print(f"error while parsing row: {row}, error: {e.args}. Skipping... {biological_context} / {tissue_id}")
-                        continue
\ No newline at end of file
+                        self.row_error(e, row)
+                        continue
+
+    def get_edges(self):
+        if self.memory_budget_mb:
+            yield from self.get_edges_external()
+            return
+        seen_edges = set()
+        for _source, _target, _props in self.get_candidate_edges():
+            edge_key = (_source, _target)
+            if edge_key in seen_edges:
+                continue
+            seen_edges.add(edge_key)
+            yield _source, _target, self.label, _props
+
+    def get_edges_external(self):
+        """
+        Same edges, in the same order, as the in-memory path. Candidate edges are sorted on
+        (source, target, position in the input) in runs of at most memory_budget_mb and
+        merged keeping the first occurrence of every pair; the survivors are then sorted back
+        into input order by a second external sort.
+        """
+        first_seen = ExternalSorter(self.memory_budget_mb, unique_key=lambda record: record[:2], tmp_dir=self.tmp_dir)
+        with first_seen:
+            for seq, (_source, _target, _props) in enumerate(self.get_candidate_edges()):
+                first_seen.add((_source, _target, seq, _props.get("state")))
+
+            in_input_order = ExternalSorter(self.memory_budget_mb, tmp_dir=self.tmp_dir)
+            with in_input_order:
+                for _source, _target, seq, state in first_seen:
+                    in_input_order.add((seq, _source, _target, state))
+
+                for _, _source, _target, state in in_input_order:
+                    _props = {}
+                    if self.write_properties:
+                        _props["state"] = state
+                        if self.add_provenance:
+                            _props['source'] = self.source
+                            _props['source_url'] = self.source_url
+                    yield _source, _target, self.label, _props
@@ -1,7 +1,7 @@
-import csv
-import gzip
 import json
 import os
+import numpy as np
+import pandas as pd
 from biocypher_metta.adapters import Adapter
 from biocypher_metta.adapters.helpers import build_variant_id, to_float, check_genomic_location
 from biocypher._logger import logger
@@ -14,12 +14,32 @@ from biocypher._logger import logger
 # 5031031,5063457,5031031:C:T,5063457:G:C,0.443,0.832,+
 
 
+def parse_column(values, dtype):
+    """
+    Converts an array of strings the way int()/float() would. Returns the values (0 where a
+    string cannot be converted) and a mask of the converted ones.
+    """
+    try:
+        return values.astype(dtype), np.ones(len(values), dtype=bool)
+    except (ValueError, TypeError, OverflowError):
+        convert = int if dtype == np.int64 else float
+        parsed = np.zeros(len(values), dtype=dtype)
+        valid = np.zeros(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            try:
+                parsed[i] = convert(value)
+                valid[i] = True
+            except (ValueError, TypeError, OverflowError):
+                pass
+        return parsed, valid
+
 
 class TopLDAdapter(Adapter):
+    COLUMNS = ['SNP1', 'SNP2', 'Uniq_ID_1', 'Uniq_ID_2', 'R2', 'Dprime', '+/-corr']
     INDEX = {'SNP1': 0, 'SNP2': 1, 'R2': 4, 'Dprime': 5, '+/-corr': 6}
     def __init__(self, filepath, dbsnp_pos_map, chr,
                  ancestry, label, write_properties, add_provenance,
-                 start=None, end=None, cutoff=0.5):
+                 start=None, end=None, cutoff=0.5, chunk_size=500_000):
         self.file_path = filepath
         self.dbsnp_pos_map = dbsnp_pos_map
         self.chr = chr
@@ -27,44 +47,107 @@ class TopLDAdapter(Adapter):
         self.start = start
         self.end = end
         self.cutoff = cutoff
+        self.chunk_size = chunk_size
         self.label = label
         self.source = "TopLD"
         self.source_url = "http://topld.genetics.unc.edu/"
         super(TopLDAdapter, self).__init__(write_properties, add_provenance)
 
     def get_edges(self):
-        with gzip.open(self.file_path, 'rt') as f:
-            reader = csv.reader(f)
-            next(reader)
-            for row in reader:
-                try:
-                    var1_pos = int(row[TopLDAdapter.INDEX['SNP1']])
-                    var2_pos = int(row[TopLDAdapter.INDEX['SNP2']])
-                    if not check_genomic_location(self.chr, self.start, self.end, self.chr, var1_pos, var1_pos) or \
-                            not check_genomic_location(self.chr, self.start, self.end, self.chr, var2_pos, var2_pos):
-                        continue
-                    rsid_1 = self.dbsnp_pos_map.get(f"{self.chr}_{var1_pos}", None)
-                    rsid_2 = self.dbsnp_pos_map.get(f"{self.chr}_{var2_pos}", None)
-                    if rsid_1 is None or rsid_2 is None:
-                        # logger.warning(f"Couldn't find rsid for position {var1_pos} or {var2_pos}")
-                        continue
-
-                    r2_score = to_float(f"{row[TopLDAdapter.INDEX['+/-corr']]}{row[TopLDAdapter.INDEX['R2']]}")
-                    if abs(r2_score) < self.cutoff:
-                        continue
-                    props = {}
-                    if self.write_properties:
-                        props = {
-                            'r2': to_float(r2_score),
-                            'd_prime': to_float(row[TopLDAdapter.INDEX['Dprime']]),
-                            'ancestry': self.ancestry
-                        }
-                        if self.add_provenance:
-                            props['source'] = self.source
-                            props['source_url'] = self.source_url
-
-                    yield rsid_1, rsid_2, self.label, props
-
-                except Exception as e:
-                    logger.error(f"Error while processing line {row}, error: {e}, skipping...")
+        # Rows are read in chunks of columns; positions, scores and the region filter are
+        # handled as arrays and only the rows that pass become edges. Rows with values the
+        # arrays cannot hold exactly (malformed, non finite or out of to_float's range) go
+        # through edge_from_row(), which handles them as before.
+        try:
+            chunks = self.read_csv_chunks(self.file_path, TopLDAdapter.COLUMNS, self.chunk_size,
+                                          dtype=str, keep_default_na=False, header=None, skiprows=1)
+        except pd.errors.EmptyDataError:
+            return
+        for chunk in chunks:
+            rows = chunk.to_numpy()
+            var1_pos, valid = parse_column(rows[:, TopLDAdapter.INDEX['SNP1']], np.int64)
+            var2_pos, valid2 = parse_column(rows[:, TopLDAdapter.INDEX['SNP2']], np.int64)
+            r2, valid_r2 = parse_column(rows[:, TopLDAdapter.INDEX['R2']], np.float64)
+            d_prime, valid_d_prime = parse_column(rows[:, TopLDAdapter.INDEX['Dprime']], np.float64)
+            sign = rows[:, TopLDAdapter.INDEX['+/-corr']]
+            r2_score = np.where(sign == '-', -r2, r2)
+
+            valid &= valid2 & valid_r2 & valid_d_prime & np.isin(sign, ('+', '-'))
+            # the sign is prepended to R2, which must not have one of its own
+            valid &= chunk['R2'].str[:1].isin(list('0123456789.')).to_numpy()
+            valid &= self.in_float_range(r2) & self.in_float_range(d_prime)
+            keep = valid & self.in_region(var1_pos) & self.in_region(var2_pos) & (np.abs(r2_score) >= self.cutoff)
+
+            for i in np.flatnonzero(keep | ~valid).tolist():
+                if not valid[i]:
+                    edge = self.edge_from_row(rows[i].tolist())
+                    if edge is not None:
+                        yield edge
                     continue
+                rsid_1 = self.dbsnp_pos_map.get(f"{self.chr}_{var1_pos[i]}", None)
+                rsid_2 = self.dbsnp_pos_map.get(f"{self.chr}_{var2_pos[i]}", None)
+                if rsid_1 is None or rsid_2 is None:
+                    continue
+                props = {}
+                if self.write_properties:
+                    props = {
+                        'r2': float(r2_score[i]),
+                        'd_prime': float(d_prime[i]),
+                        'ancestry': self.ancestry
+                    }
+                    if self.add_provenance:
+                        props['source'] = self.source
+                        props['source_url'] = self.source_url
+
+                yield rsid_1, rsid_2, self.label, props
+
+    @staticmethod
+    def in_float_range(values):
+        # values to_float() returns unchanged
+        magnitude = np.abs(values)
+        return np.isfinite(values) & ((magnitude == 0) | ((magnitude >= 1e-307) & (magnitude < 1e307)))
+
+    def in_region(self, positions):
+        # check_genomic_location() on arrays of positions of self.chr
+        mask = np.ones(len(positions), dtype=bool)
+        if self.chr is None:
+            return mask
+        if self.start:
+            mask &= positions >= self.start
+        if self.end:
+            mask &= positions <= self.end
+        return mask
+
+    def edge_from_row(self, row):
+        """Returns the edge of a csv row, or None if the row is filtered out or cannot be parsed."""
+        try:
+            var1_pos = int(row[TopLDAdapter.INDEX['SNP1']])
+            var2_pos = int(row[TopLDAdapter.INDEX['SNP2']])
+            if not check_genomic_location(self.chr, self.start, self.end, self.chr, var1_pos, var1_pos) or \
+                    not check_genomic_location(self.chr, self.start, self.end, self.chr, var2_pos, var2_pos):
+                return None
+            rsid_1 = self.dbsnp_pos_map.get(f"{self.chr}_{var1_pos}", None)
+            rsid_2 = self.dbsnp_pos_map.get(f"{self.chr}_{var2_pos}", None)
+            if rsid_1 is None or rsid_2 is None:
+                # logger.warning(f"Couldn't find rsid for position {var1_pos} or {var2_pos}")
+                return None
+
+            r2_score = to_float(f"{row[TopLDAdapter.INDEX['+/-corr']]}{row[TopLDAdapter.INDEX['R2']]}")
+            if abs(r2_score) < self.cutoff:
+                return None
+            props = {}
+            if self.write_properties:
+                props = {
+                    'r2': to_float(r2_score),
+                    'd_prime': to_float(row[TopLDAdapter.INDEX['Dprime']]),
+                    'ancestry': self.ancestry
+                }
+                if self.add_provenance:
+                    props['source'] = self.source
+                    props['source_url'] = self.source_url
+
+            return rsid_1, rsid_2, self.label, props
+
+        except Exception as e:
+            self.row_error(e, row)
+            return None
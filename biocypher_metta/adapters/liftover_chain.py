@@ -0,0 +1,186 @@
+'''
+Batch liftover of genomic coordinates through a UCSC chain file.
+
+convert_genome_reference() lifts one position at a time with the liftover package, which
+returns every aligned block containing the position, in interval tree order, and keeps the
+first one. ChainIntervals loads the aligned blocks of the chain file into NumPy arrays per
+chromosome and lifts whole arrays of positions at once: positions are sorted by chromosome
+and position and matched to blocks with binary searches. Most positions lie in a single
+block, so the answer does not depend on the order of the blocks; the few covered by
+overlapping chains are passed to the liftover package, so results are always the same.
+
+A LiftoverMemo keeps lifted positions, and failed lifts, in a file, so coordinates seen by
+an earlier build are answered without loading the chain file at all.
+'''
+
+import gzip
+import os
+
+import numpy as np
+import pandas as pd
+from liftover import ChainFile
+
+
+def chain_file_path(from_build, to_build, cache=None):
+    '''The chain file liftover.get_lifter(from_build, to_build) downloads and reads.'''
+    cache = cache or os.path.expanduser('~/.liftover')
+    target = from_build[0].lower() + from_build[1:]
+    query = to_build[0].upper() + to_build[1:]
+    return os.path.join(cache, f'{target}To{query}.over.chain.gz')
+
+
+class ChainIntervals:
+    def __init__(self, blocks, lifter):
+        '''
+        blocks: {target chromosome: (starts, ends, query starts, query sizes, reverse)} of the
+                aligned blocks.
+        lifter: liftover ChainFile of the same chain file, for positions in several blocks.
+        '''
+        self.lifter = lifter
+        self.targets = {}
+        for name, (starts, ends, query_starts, query_sizes, reverse) in blocks.items():
+            order = np.argsort(starts, kind='stable')
+            ends = ends[order]
+            self.targets[name] = (starts[order], ends, np.maximum.accumulate(ends), np.sort(ends),
+                                  query_starts[order], query_sizes[order], reverse[order])
+
+    @classmethod
+    def from_file(cls, path, lifter=None):
+        blocks = {}
+        with gzip.open(path, 'rt') as f:
+            for line in f:
+                fields = line.split()
+                if not fields or fields[0] != 'chain':
+                    continue
+                name, query_size, query_strand = fields[2], int(fields[8]), fields[9]
+                target_pos, query_pos = int(fields[5]), int(fields[10])
+                starts, sizes, query_starts = [], [], []
+                for line in f:
+                    block = line.split()
+                    if not block:
+                        break
+                    size = int(block[0])
+                    starts.append(target_pos)
+                    sizes.append(size)
+                    query_starts.append(query_pos)
+                    if len(block) == 3:
+                        target_pos += size + int(block[1])
+                        query_pos += size + int(block[2])
+                chain_blocks = blocks.setdefault(name, ([], [], [], [], []))
+                chain_blocks[0].extend(starts)
+                chain_blocks[1].extend(sizes)
+                chain_blocks[2].extend(query_starts)
+                chain_blocks[3].extend([query_size] * len(starts))
+                chain_blocks[4].extend([query_strand == '-'] * len(starts))
+
+        arrays = {}
+        for name, (starts, sizes, query_starts, query_sizes, reverse) in blocks.items():
+            starts = np.array(starts, dtype=np.int64)
+            arrays[name] = (starts, starts + np.array(sizes, dtype=np.int64),
+                            np.array(query_starts, dtype=np.int64),
+                            np.array(query_sizes, dtype=np.int64), np.array(reverse, dtype=bool))
+        return cls(arrays, lifter or ChainFile(path))
+
+    def _target(self, chrom):
+        # same lookup as liftover: the name as given, then with a 'chr' prefix
+        if chrom in self.targets:
+            return self.targets[chrom]
+        return self.targets.get('chr' + chrom)
+
+    def lift(self, chroms, positions):
+        '''
+        Lifts (chrom, pos) pairs. Returns (lifted positions, failed): `failed` is True where
+        no aligned block contains the position, and the lifted position there is 0.
+        '''
+        chroms = np.asarray(chroms, dtype=object)
+        positions = np.asarray(positions, dtype=np.int64)
+        lifted = np.zeros(len(positions), dtype=np.int64)
+        failed = np.ones(len(positions), dtype=bool)
+        if len(positions) == 0:
+            return lifted, failed
+
+        codes, names = pd.factorize(chroms)
+        order = np.lexsort((positions, codes))
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        for group in np.split(order, bounds):
+            target = self._target(names[codes[group[0]]])
+            if target is None:
+                continue
+            starts, ends, max_ends, sorted_ends, query_starts, query_sizes, reverse = target
+            pos = positions[group]
+            # blocks [0, candidates) start at or before pos; those that also end at or before
+            # it are not containing it
+            candidates = np.searchsorted(starts, pos, side='right')
+            containing = candidates - np.searchsorted(sorted_ends, pos, side='right')
+            # the block containing pos is the first whose running maximum end passes pos
+            block = np.searchsorted(max_ends, pos, side='right')
+            single = containing == 1
+            hit_block, hit_pos, hit = block[single], pos[single], group[single]
+            offset = query_starts[hit_block] + hit_pos - starts[hit_block]
+            lifted[hit] = np.where(reverse[hit_block], query_sizes[hit_block] - offset - 1, offset)
+            failed[hit] = False
+
+            for i, value in zip(group[containing > 1].tolist(), pos[containing > 1].tolist()):
+                lifted[i] = self.lifter.query(chroms[i], value)[0][1]
+                failed[i] = False
+        return lifted, failed
+
+
+class LiftoverMemo:
+    '''
+    Lifted positions of earlier calls, in a NumPy .npz file. Every (chrom, pos) pair is kept
+    as one int64 key (chromosome number and position) in a sorted array, so a lookup is a
+    binary search per position. Positions beyond +/- 2**(POSITION_BITS - 1) are never memoized.
+    '''
+    POSITION_BITS = 40
+
+    def __init__(self, path, from_build, to_build):
+        self.path = path
+        self.builds = f'{from_build}_{to_build}'
+        self.chroms = {}
+        self.keys = np.empty(0, dtype=np.int64)
+        self.lifted = np.empty(0, dtype=np.int64)
+        self.failed = np.empty(0, dtype=bool)
+        if os.path.exists(path):
+            with np.load(path) as memo:
+                if str(memo['builds']) != self.builds:
+                    raise ValueError(f"{path} memoizes {memo['builds']} coordinates, not {self.builds}")
+                self.chroms = {chrom: i for i, chrom in enumerate(memo['chroms'].tolist())}
+                self.keys, self.lifted, self.failed = memo['keys'], memo['lifted'], memo['failed']
+
+    def _keys(self, chroms, positions, add=False):
+        '''Returns the keys of the pairs and whether they can be memoized.'''
+        codes, names = pd.factorize(np.asarray(chroms, dtype=object))
+        if add:
+            for name in names:
+                self.chroms.setdefault(name, len(self.chroms))
+        chrom_numbers = np.array([self.chroms.get(name, -1) for name in names], dtype=np.int64)[codes]
+        offsets = np.asarray(positions, dtype=np.int64) + 2**(self.POSITION_BITS - 1)
+        valid = (chrom_numbers >= 0) & (offsets >= 0) & (offsets < 2**self.POSITION_BITS)
+        return (chrom_numbers << self.POSITION_BITS) | offsets, valid
+
+    def lookup(self, chroms, positions):
+        '''Returns (known, lifted, failed) arrays for the (chrom, pos) pairs.'''
+        keys, valid = self._keys(chroms, positions)
+        known = np.zeros(len(keys), dtype=bool)
+        lifted = np.zeros(len(keys), dtype=np.int64)
+        failed = np.ones(len(keys), dtype=bool)
+        if len(self.keys):
+            index = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            known = valid & (self.keys[index] == keys)
+            lifted[known] = self.lifted[index[known]]
+            failed[known] = self.failed[index[known]]
+        return known, lifted, failed
+
+    def store(self, chroms, positions, lifted, failed):
+        keys, valid = self._keys(chroms, positions, add=True)
+        keys = np.concatenate([self.keys, keys[valid]])
+        lifted = np.concatenate([self.lifted, np.asarray(lifted, dtype=np.int64)[valid]])
+        failed = np.concatenate([self.failed, np.asarray(failed, dtype=bool)[valid]])
+        self.keys, first = np.unique(keys, return_index=True)
+        self.lifted, self.failed = lifted[first], failed[first]
+        # written next to the memo first, so an interrupted run leaves the previous memo intact
+        tmp_path = f'{self.path}.tmp.npz'
+        np.savez(tmp_path, builds=self.builds, chroms=np.array(list(self.chroms), dtype=str),
+                 keys=self.keys, lifted=self.lifted, failed=self.failed)
+        os.replace(tmp_path, self.path)
@@ -5,11 +5,16 @@ import requests
 import os
 import re
 import tempfile
+import heapq
+from collections import defaultdict, deque
+from functools import lru_cache
 from datetime import datetime as dt, timedelta
 from rdflib import Graph, URIRef
 from owlready2 import *
 from abc import ABC, abstractmethod
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.ontology_store import ontology_store
+from biocypher_metta.adapters.ontology_diff import OntologyDiff
 from xml.etree import ElementTree as ET
 
 class OntologyAdapter(Adapter):
@@ -35,7 +40,21 @@ class OntologyAdapter(Adapter):
     PREDICATES = [SUBCLASS, DB_XREF]
     RESTRICTION_PREDICATES = [HAS_PART, PART_OF]
 
-    def __init__(self, write_properties, add_provenance, ontology, type, label, dry_run=False, add_description=False, cache_dir=None, cache_expiration_days=30):
+    NODE_PROPERTY_COLLECTIONS = {
+        LABEL: 'term_names',
+        NAMESPACE: 'namespaces',
+        DESCRIPTION: 'descriptions',
+        RELATED_SYNONYM: 'related_synonyms',
+        EXACT_SYNONYM: 'exact_synonyms',
+        TYPE: 'node_types',
+        ON_PROPERTY: 'on_property',
+        SOME_VALUES_FROM: 'some_values_from',
+        DEPRECATED: 'deprecated',
+        ALTERNATIVE_ID: 'alternative_ids',
+    }
+
+    def __init__(self, write_properties, add_provenance, ontology, type, label, dry_run=False, add_description=False, cache_dir=None, cache_expiration_days=30,
+                 transitive_closure=False, closure_max_ancestors=None, emit_diff=False):
         self.cache_dir = cache_dir
         self.cache_expiration_days = cache_expiration_days
         if self.cache_dir and not os.path.exists(self.cache_dir):
@@ -44,9 +63,19 @@ class OntologyAdapter(Adapter):
         self.label = label
         self.dry_run = dry_run
         self.graph = None
+        self.world = None
         self.cache = {}
+        self.graph_nodes = None
         self.ontology = ontology
         self.add_description = add_description
+        # Emit every (term, ancestor) pair of the subclass hierarchy instead of the direct edges
+        self.transitive_closure = transitive_closure
+        self.closure_max_ancestors = closure_max_ancestors
+        # Also write what changed since the previous release apart (see ontology_diff): process_adapters()
+        # runs the records of get_nodes()/get_edges() through emit_changes()
+        self.emit_diff = emit_diff
+        if emit_diff and not cache_dir:
+            raise ValueError("emit_diff requires a cache_dir to keep the previous release's snapshot.")
 
         # Set source and source_url based on the ontology
         self.source, self.source_url = self.get_ontology_source()
@@ -54,7 +83,13 @@ class OntologyAdapter(Adapter):
         self.uri_prefixes = self.get_uri_prefixes()
 
         super(OntologyAdapter, self).__init__(write_properties, add_provenance)
-        
+
+    @classmethod
+    def caches_output(cls, args):
+        # the ontology is downloaded from ONTOLOGIES (or its cache_dir copy), whose release only
+        # the adapter checks, and emit_diff writes its delta and snapshot as the nodes are read
+        return False
+
     @abstractmethod
     def get_ontology_source(self):
         """
@@ -99,6 +134,58 @@ class OntologyAdapter(Adapter):
             raise ValueError(f"Ontology '{self.ontology}' is not defined in this adapter.")
 
         ontology_url = self.ONTOLOGIES[self.ontology]
+
+        # Reuse the graph if this ontology was already parsed in this process
+        # (by this adapter or by another config entry for the same ontology).
+        entry = ontology_store.get(ontology_url)
+        if entry is not None:
+            self.world = entry.world
+            self.graph = entry.graph
+            self.version = entry.version
+            self.clear_cache()
+            print(f"Reusing parsed ontology {self.ontology} ({ontology_store.parses_avoided} parses avoided so far)")
+            return
+
+        self._load_graph(ontology_url)
+        ontology_store.put(ontology_url, self.graph, world=self.world, version=getattr(self, 'version', None))
+
+    def get_shared_graph(self, ontology_url, local_path=None):
+        """
+        Returns the graph of another ontology used as a bridge (e.g. UBERON xrefs),
+        parsing it at most once per process. Returns None if it cannot be loaded.
+
+        The graph of an adapter of that ontology is reused. A graph parsed here is stored
+        under its own key: it has no version, and an adapter of the ontology loads the
+        ontology itself (recording its version) rather than reusing it.
+        """
+        if ontology_url in ontology_store:
+            return ontology_store.get(ontology_url).graph
+        bridge_key = f"bridge:{ontology_url}"
+        entry = ontology_store.get(bridge_key)
+        if entry is not None:
+            return entry.graph
+
+        graph = rdflib.Graph()
+        parsed = False
+        if local_path and os.path.exists(local_path):
+            for fmt in ('xml', 'turtle', 'n3', 'nt'):
+                try:
+                    graph.parse(local_path, format=fmt)
+                    parsed = True
+                    break
+                except Exception:
+                    continue
+
+        if not parsed:
+            try:
+                graph.parse(ontology_url)
+            except Exception:
+                return None
+
+        ontology_store.put(bridge_key, graph)
+        return graph
+
+    def _load_graph(self, ontology_url):
         use_cached = False
         cached_path = None
         meta = None
@@ -310,10 +397,10 @@ class OntologyAdapter(Adapter):
         print(f"Graph initialized with {len(self.graph)} triples for {self.ontology}")
 
     def __del__(self):
-        # Clean up the world instance when the adapter is destroyed
-        if self.world is not None:
-            self.world.close()
-            self.world = None
+        # The world is owned by the ontology store, which closes it on eviction;
+        # other adapters may still be reading from it.
+        self.world = None
+        self.graph = None
 
     def _calculate_file_hash(self, file_path):
         """Calculate MD5 hash of a file."""
@@ -468,7 +555,7 @@ class OntologyAdapter(Adapter):
         self.update_graph()
         self.cache_node_properties()
 
-        nodes = self.graph.all_nodes()
+        nodes = self.iter_graph_nodes()
         processed_nodes = set()  
 
         i = 0  # dry run counter
@@ -524,6 +611,10 @@ class OntologyAdapter(Adapter):
             yield node_key, self.label, props
 
     def get_edges(self):
+        if self.transitive_closure:
+            yield from self.get_closure_edges()
+            return
+
         self.update_graph()
         self.cache_edge_properties()
 
@@ -596,6 +687,128 @@ class OntologyAdapter(Adapter):
                     yield from_node_key, to_node_key, self.label, props
                     i += 1
 
+    def emit_changes(self, records):
+        """
+        Yields every record, then writes the records added, changed and removed since the
+        snapshot of the previous release and the new snapshot once all were emitted.
+        """
+        diff = OntologyDiff(self.cache_dir, self.ontology, self.label, self.type)
+        yield from diff.track(records)
+        if self.dry_run:
+            return
+        diff.commit(getattr(self, 'version', 'unknown'))
+
+    def include_closure_term(self, node_key):
+        """
+        Hook for subclasses to restrict the transitive closure to a subset of terms
+        (e.g. a single GO subontology). Both ends of a subclass edge must pass.
+        """
+        return True
+
+    def get_closure_edges(self):
+        """
+        Yields one edge per (term, ancestor) pair of the rdfs:subClassOf hierarchy, with
+        the length of the shortest path between them as `distance`, so ancestor lookups
+        are a single hop instead of a recursive query.
+
+        Terms are visited in topological order (parents before children) and a term's
+        ancestors are derived from those of its direct parents. A term's ancestor set is
+        dropped as soon as its last child has been visited, so memory follows the
+        traversal frontier rather than the size of the closure. If `closure_max_ancestors`
+        is set, terms with more ancestors than that keep only the nearest ones.
+        """
+        self.update_graph()
+        self.cache_predicates({OntologyAdapter.DEPRECATED: 'deprecated'})
+
+        # Intern term keys so the ancestor sets hold small ints instead of strings
+        index = {}
+        keys = []
+        parents = defaultdict(set)
+        children = defaultdict(list)
+
+        def intern(key):
+            node_id = index.get(key)
+            if node_id is None:
+                node_id = index[key] = len(keys)
+                keys.append(key)
+            return node_id
+
+        for from_node, to_node in self.graph.subject_objects(predicate=OntologyAdapter.SUBCLASS, unique=True):
+            if not isinstance(from_node, URIRef) or not isinstance(to_node, URIRef):
+                continue
+            if not self.should_include_edge(from_node, to_node, OntologyAdapter.SUBCLASS):
+                continue
+            if self.is_deprecated(from_node) or self.is_deprecated(to_node):
+                continue
+
+            from_node_key = OntologyAdapter.to_key(from_node)
+            to_node_key = OntologyAdapter.to_key(to_node)
+            if from_node_key == to_node_key:
+                continue
+            if not self.include_closure_term(from_node_key) or not self.include_closure_term(to_node_key):
+                continue
+
+            child, parent = intern(from_node_key), intern(to_node_key)
+            if parent not in parents[child]:
+                parents[child].add(parent)
+                children[parent].append(child)
+
+        pending_parents = [len(parents.get(node_id, ())) for node_id in range(len(keys))]
+        pending_children = [len(children.get(node_id, ())) for node_id in range(len(keys))]
+        queue = deque(node_id for node_id in range(len(keys)) if pending_parents[node_id] == 0)
+        ancestors = {}
+        visited = 0
+        capped = 0
+        i = 0  # dry run counter
+
+        while queue:
+            node_id = queue.popleft()
+            visited += 1
+
+            node_ancestors = {}
+            for parent in parents.get(node_id, ()):
+                if node_ancestors.get(parent, 2) > 1:
+                    node_ancestors[parent] = 1
+                for ancestor, distance in ancestors[parent].items():
+                    if distance + 1 < node_ancestors.get(ancestor, distance + 2):
+                        node_ancestors[ancestor] = distance + 1
+                pending_children[parent] -= 1
+                if pending_children[parent] == 0:
+                    del ancestors[parent]
+
+            if self.closure_max_ancestors and len(node_ancestors) > self.closure_max_ancestors:
+                node_ancestors = dict(heapq.nsmallest(self.closure_max_ancestors, node_ancestors.items(),
+                                                      key=lambda item: (item[1], keys[item[0]])))
+                capped += 1
+
+            if pending_children[node_id]:
+                ancestors[node_id] = node_ancestors
+
+            for child in children.get(node_id, ()):
+                pending_parents[child] -= 1
+                if pending_parents[child] == 0:
+                    queue.append(child)
+
+            from_node_key = keys[node_id]
+            for ancestor, distance in sorted(node_ancestors.items(), key=lambda item: (item[1], keys[item[0]])):
+                if i > 100 and self.dry_run:
+                    return
+                props = {}
+                if self.write_properties:
+                    props['rel_type'] = 'subclass'
+                    props['distance'] = distance
+                    if self.add_provenance:
+                        props['source'] = self.source
+                        props['source_url'] = self.source_url
+
+                yield from_node_key, keys[ancestor], self.label, props
+                i += 1
+
+        if visited < len(keys):
+            print(f"Skipped {len(keys) - visited} terms of {self.ontology} that are part of a subclass cycle")
+        if capped:
+            print(f"Capped the ancestors of {capped} {self.ontology} terms to the nearest {self.closure_max_ancestors}")
+
     def predicate_name(self, predicate):
         predicate = str(predicate)
         if predicate == str(OntologyAdapter.HAS_PART):
@@ -616,22 +829,8 @@ class OntologyAdapter(Adapter):
         """
         Modified to_key method that handles URIs more carefully
         """
-        key = str(node_uri).split('/')[-1]
-        key = key.replace('#', '.').replace('?', '_')
-        key = key.replace('&', '.').replace('=', '_')
-        key = key.replace('/', '_').replace('~', '.')
-        key = key.replace('_', ':')
-        key = key.replace(' ', '')
-
-        # Only convert to number_XX format if it's a valid ontology identifier
-        if key.replace('.', '').isnumeric() and len(key) > 0:
-            if any(c.isalpha() for c in str(node_uri)):
-                return key  # Return original key if URI contains letters
-            if len(key) > 10:  # Probably not a valid ontology ID
-                return None
-            key = f'number_{key}'
-
-        return key
+        # Every term is looked up several times per run (label, synonyms, deprecation, ...)
+        return _uri_to_key(str(node_uri))
     
     # Example of a restriction block:
     # <rdfs:subClassOf>
@@ -676,46 +875,103 @@ class OntologyAdapter(Adapter):
     
     def clear_cache(self):
         self.cache = {}
+        self.graph_nodes = None
 
     def cache_edge_properties(self):
-        for predicate in OntologyAdapter.PREDICATES:
-            self.cache_predicate(predicate=predicate)
+        self.cache_predicates({predicate: None for predicate in OntologyAdapter.PREDICATES})
 
     def cache_node_properties(self):
-        self.cache_predicate(predicate=OntologyAdapter.LABEL, collection='term_names')
-        self.cache_predicate(predicate=OntologyAdapter.NAMESPACE, collection='namespaces')
-        self.cache_predicate(predicate=OntologyAdapter.DESCRIPTION, collection='descriptions')
-        self.cache_predicate(predicate=OntologyAdapter.RELATED_SYNONYM, collection='related_synonyms')
-        self.cache_predicate(predicate=OntologyAdapter.EXACT_SYNONYM, collection='exact_synonyms')
-        self.cache_predicate(predicate=OntologyAdapter.TYPE, collection='node_types')
-        self.cache_predicate(predicate=OntologyAdapter.ON_PROPERTY, collection='on_property')
-        self.cache_predicate(predicate=OntologyAdapter.SOME_VALUES_FROM, collection='some_values_from')
-        self.cache_predicate(predicate=OntologyAdapter.DEPRECATED, collection='deprecated')
-        self.cache_predicate(predicate=OntologyAdapter.ALTERNATIVE_ID, collection='alternative_ids')
-
+        self.cache_predicates(OntologyAdapter.NODE_PROPERTY_COLLECTIONS, collect_nodes=True)
 
     def cache_predicate(self, predicate, collection=None):
-        triples = list(self.graph.subject_objects(predicate=predicate, unique=True))
-        for s, o in triples:
-            s_key = OntologyAdapter.to_key(s)
+        self.cache_predicates({predicate: collection})
+
+    def cache_predicates(self, collections, collect_nodes=False):
+        """
+        Index the objects of several predicates by subject key.
+
+        `collections` maps each predicate to the cache collection its values are appended to,
+        or to None to store the last value under the predicate itself. With collect_nodes the
+        whole graph is read in a single pass and the set of all subjects and objects is kept
+        as well, so get_nodes() does not need another scan through graph.all_nodes().
+        """
+        if collect_nodes:
+            graph_nodes = set()
+            triples = self.graph.triples((None, None, None))
+        else:
+            graph_nodes = None
+            triples = ((s, predicate, o)
+                       for predicate in collections
+                       for s, o in self.graph.subject_objects(predicate=predicate, unique=True))
+
+        cache = self.cache
+        to_key = OntologyAdapter.to_key
+        # {(subject key, collection): its values}, so repeated values are found without scanning the lists
+        seen = {}
+        for s, p, o in triples:
+            if graph_nodes is not None:
+                graph_nodes.add(s)
+                graph_nodes.add(o)
+
+            if p not in collections:
+                continue
+            collection = collections[p]
 
-            if s_key not in self.cache:
-                self.cache[s_key] = {}
+            s_key = to_key(s)
+            entry = cache.get(s_key)
+            if entry is None:
+                entry = cache[s_key] = {}
 
             if not collection:
                 if isinstance(o, rdflib.Literal) and o.language:
-                    if not re.match(r"^[a-zA-Z\-]+$", o.language):  
+                    if not re.match(r"^[a-zA-Z\-]+$", o.language):
                         print(f"Skipping invalid language tag for node {s_key}: {o.language}")
                         continue
-                self.cache[s_key][predicate] = o
+                entry[p] = o
                 continue
 
-            if collection not in self.cache[s_key]:
-                self.cache[s_key][collection] = []
-
-            self.cache[s_key][collection].append(o)
-
+            values = entry.get(collection)
+            if values is None:
+                entry[collection] = [o]
+                seen[s_key, collection] = {o}
+                continue
+            known = seen.get((s_key, collection))
+            if known is None:
+                # values cached by a previous call
+                known = seen[s_key, collection] = set(values)
+            if o not in known:
+                known.add(o)
+                values.append(o)
+
+        if graph_nodes is not None:
+            self.graph_nodes = graph_nodes
+
+    def iter_graph_nodes(self):
+        """All subjects and objects of the graph, reusing the set gathered while caching node properties."""
+        if self.graph_nodes is not None:
+            return iter(self.graph_nodes)
+        return iter(self.graph.all_nodes())
 
     def get_all_property_values_from_node(self, node, collection):
         node_key = OntologyAdapter.to_key(node)
-        return self.cache.get(node_key, {}).get(collection, [])
\ No newline at end of file
+        return self.cache.get(node_key, {}).get(collection, [])
+
+
+@lru_cache(maxsize=1 << 20)
+def _uri_to_key(node_uri):
+    key = str(node_uri).split('/')[-1]
+    key = key.replace('#', '.').replace('?', '_')
+    key = key.replace('&', '.').replace('=', '_')
+    key = key.replace('/', '_').replace('~', '.')
+    key = key.replace('_', ':')
+    key = key.replace(' ', '')
+
+    # Only convert to number_XX format if it's a valid ontology identifier
+    if key.replace('.', '').isnumeric() and len(key) > 0:
+        if any(c.isalpha() for c in str(node_uri)):
+            return key  # Return original key if URI contains letters
+        if len(key) > 10:  # Probably not a valid ontology ID
+            return None
+        key = f'number_{key}'
+
+    return key
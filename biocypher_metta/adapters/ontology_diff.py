@@ -0,0 +1,144 @@
+"""
+Release-to-release deltas for ontology adapters.
+
+A new GO or UBERON release changes a small fraction of the terms, but a full
+build re-emits all of them and the loaders have to drop and reload the whole
+ontology. With `emit_diff` enabled, an OntologyAdapter still writes the full
+release to its outdir, and compares every record it emits against a snapshot
+of what it emitted for the previous release. The records added and changed
+since, and the keys of the removed ones, are written apart, as an upsert and
+delete patch:
+
+    <cache_dir>/deltas/<ontology>_<label>_<old version>_to_<new version>/
+        added.jsonl, changed.jsonl   {"id", "label", "properties"} per node,
+                                     {"source", "target", "label", "properties"} per edge
+        removed.jsonl                {"id"} per node, {"source", "target", "rel_type"} per edge
+        summary.json                 versions and counts
+
+The snapshot only stores a digest per record, keyed by node id or by
+(source, target, rel_type) for edges, and is replaced once a run has emitted
+every record of a new release. Rerunning the release of the snapshot (or one
+emitting the same records, when the version is unknown) writes no delta and
+leaves the snapshot as it is.
+"""
+
+import hashlib
+import json
+import os
+
+
+class OntologyDiff:
+    KEY_SEPARATOR = '\t'
+
+    def __init__(self, cache_dir, ontology, label, type):
+        self.cache_dir = cache_dir
+        self.ontology = ontology
+        self.label = label
+        self.type = type
+        self.snapshot_path = os.path.join(cache_dir, f"{ontology}_{label}_{type}_snapshot.json")
+        self.previous_version, self.previous = self._load_snapshot()
+        self.current = {}
+        self.added = []
+        self.changed = []
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return None, None
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            return snapshot['version'], snapshot['records']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable snapshot {self.snapshot_path}: {e}")
+            return None, None
+
+    @classmethod
+    def record_key(cls, record):
+        """Identity of an emitted record: the node id, or source, target and rel_type of an edge."""
+        if len(record) == 3:
+            return str(record[0])
+        source, target, _, props = record
+        return cls.KEY_SEPARATOR.join([str(source), str(target), str(props.get('rel_type', ''))])
+
+    @staticmethod
+    def record_digest(record):
+        return hashlib.sha1(json.dumps(record[-1], sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def track(self, records):
+        """
+        Yield every record, remembering the ones that are new or changed since the
+        snapshot. Without a snapshot (first run) there is nothing to compare with.
+        """
+        for record in records:
+            key = self.record_key(record)
+            digest = self.record_digest(record)
+            self.current[key] = digest
+
+            if self.previous is not None:
+                previous_digest = self.previous.get(key)
+                if previous_digest is None:
+                    self.added.append(record)
+                elif previous_digest != digest:
+                    self.changed.append(record)
+            yield record
+
+    def removed(self):
+        if self.previous is None:
+            return []
+        return [key for key in self.previous if key not in self.current]
+
+    def _record_json(self, record):
+        if self.type == 'node':
+            node_id, label, props = record
+            return {'id': node_id, 'label': label, 'properties': props}
+        source, target, label, props = record
+        return {'source': source, 'target': target, 'label': label, 'properties': props}
+
+    def _key_json(self, key):
+        if self.type == 'node':
+            return {'id': key}
+        source, target, rel_type = key.split(self.KEY_SEPARATOR)
+        return {'source': source, 'target': target, 'rel_type': rel_type}
+
+    def commit(self, version):
+        """
+        Write the delta (when there is a snapshot) and replace the snapshot. A rerun of
+        the snapshot's release, or one that emitted the same records, changes nothing.
+        """
+        delta_path = None
+        if self.previous is not None:
+            removed = self.removed()
+            if (version == self.previous_version and version != 'unknown') or not (
+                    self.added or self.changed or removed):
+                print(f"{self.ontology} {self.label}: unchanged since version {self.previous_version}, "
+                      f"no delta written")
+                return None
+            delta_path = os.path.join(self.cache_dir, 'deltas',
+                                      f"{self.ontology}_{self.label}_{self.previous_version}_to_{version}")
+            os.makedirs(delta_path, exist_ok=True)
+            for name, items in (('added', map(self._record_json, self.added)),
+                                ('changed', map(self._record_json, self.changed)),
+                                ('removed', map(self._key_json, removed))):
+                with open(os.path.join(delta_path, f"{name}.jsonl"), 'w') as f:
+                    for item in items:
+                        f.write(json.dumps(item, default=str) + '\n')
+            summary = {
+                'ontology': self.ontology,
+                'label': self.label,
+                'type': self.type,
+                'from_version': self.previous_version,
+                'to_version': version,
+                'added': len(self.added),
+                'changed': len(self.changed),
+                'removed': len(removed),
+            }
+            with open(os.path.join(delta_path, 'summary.json'), 'w') as f:
+                json.dump(summary, f, indent=2)
+            print(f"{self.ontology} {self.label}: {len(self.added)} added, {len(self.changed)} changed, "
+                  f"{len(removed)} removed since version {self.previous_version} (delta written to {delta_path})")
+
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': version, 'records': self.current}, f)
+        os.replace(tmp_path, self.snapshot_path)
+        return delta_path
@@ -0,0 +1,101 @@
+"""
+Per-process store of parsed ontologies.
+
+Every ontology-backed entry in the adapters config (nodes, subclass_of edges,
+part_of edges, ...) is a separate OntologyAdapter instance, and each of them
+used to parse the same OWL file again. The store keeps the parsed graph keyed
+by ontology IRI so the first adapter pays for the parse and every later adapter
+(and any processor derived from the same graph, such as the GO subontology
+mapping) reuses it.
+
+Only the most recently used ontologies are kept; config entries for the same
+ontology are adjacent, so a small capacity avoids re-parsing without holding
+every ontology of the build in memory at once.
+"""
+
+from collections import OrderedDict
+from biocypher._logger import logger
+
+
+class OntologyStoreEntry:
+    def __init__(self, iri, graph, world=None, version=None):
+        self.iri = iri
+        self.graph = graph
+        self.world = world
+        self.version = version
+        self.derived = {}
+
+    def close(self):
+        if self.world is not None:
+            self.world.close()
+            self.world = None
+        self.graph = None
+        self.derived.clear()
+
+
+class OntologyStore:
+    def __init__(self, max_entries=3):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.parses = 0
+        self.parses_avoided = 0
+        self.evictions = 0
+
+    def get(self, iri):
+        """Return the entry for `iri`, or None if it has not been parsed yet."""
+        entry = self._entries.get(iri)
+        if entry is None:
+            return None
+        self._entries.move_to_end(iri)
+        self.parses_avoided += 1
+        return entry
+
+    def put(self, iri, graph, world=None, version=None):
+        """Register a freshly parsed ontology and evict the least recently used ones."""
+        previous = self._entries.pop(iri, None)
+        if previous is not None:
+            previous.close()
+
+        entry = OntologyStoreEntry(iri, graph, world=world, version=version)
+        self._entries[iri] = entry
+        self.parses += 1
+
+        while self.max_entries and len(self._entries) > self.max_entries:
+            evicted_iri, evicted = self._entries.popitem(last=False)
+            evicted.close()
+            self.evictions += 1
+            logger.info(f"Ontology store: evicted {evicted_iri}")
+
+        return entry
+
+    def get_derived(self, iri, key, builder):
+        """
+        Return an artifact computed from the ontology `iri` (e.g. a namespace mapping),
+        calling `builder()` only the first time it is requested while `iri` is stored.
+        """
+        entry = self._entries.get(iri)
+        if entry is None:
+            return builder()
+        if key not in entry.derived:
+            entry.derived[key] = builder()
+        return entry.derived[key]
+
+    def __contains__(self, iri):
+        return iri in self._entries
+
+    def clear(self):
+        for entry in self._entries.values():
+            entry.close()
+        self._entries.clear()
+
+    def reset_stats(self):
+        self.parses = 0
+        self.parses_avoided = 0
+        self.evictions = 0
+
+    def summary(self):
+        return (f"Ontology store: {self.parses} parses, {self.parses_avoided} parses avoided, "
+                f"{self.evictions} evictions")
+
+
+ontology_store = OntologyStore()
@@ -0,0 +1,222 @@
+"""
+Arrow IPC cache of the node and edge streams of adapters.
+
+Switching writers, or fixing a writer, used to mean running every adapter again from the
+raw files. With an AdapterOutputCache, process_adapters() records each stream into an
+Arrow IPC (Feather v2) file while the writer consumes it, and a later build with the same
+adapter replays the file instead of constructing and running the adapter.
+
+A stream is cached under a key hashing the adapter module and class, the source code the
+adapter runs (its module, the modules of its package and the modules adapters share:
+biocypher_metta/adapters/*.py and the processors), the constructor arguments, the sample of
+a sampled build and, for every argument naming an existing file or directory, the size and
+modification time of the files (not their contents, which would take as long to hash as
+some adapters take to run). Any change gives a new key; stale entries are never read, and
+can be deleted with the directory.
+
+Inputs the arguments do not name are resolved before the key is made. The ID mappings of
+the processors the adapter module imports (HGNCProcessor, EnsemblUniProtProcessor, ...) are
+checked for a new release as the adapter would check them: the key has the fingerprint of
+their version files, and an adapter whose mapping is due for an update is run, not cached,
+so that it updates it. Adapters reading inputs that only they resolve (remote ontologies,
+the chado database) are never cached (Adapter.caches_output()).
+
+The metadata of an entry keeps the adapter's row errors (see row_errors.py), which are
+counted again when the entry is replayed.
+
+Node ids, edge ends and properties can be any picklable Python value (edge sources are
+(type, id) tuples in some adapters), so each record is stored pickled, next to its label,
+and comes back exactly as the adapter yielded it.
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import pickle
+
+import pyarrow as pa
+
+from biocypher_metta.adapters.row_errors import row_errors
+from biocypher_metta.processors import BaseMappingProcessor
+
+# the label of each record, and the whole record pickled
+RECORD_SCHEMA = pa.schema([('label', pa.string()), ('record', pa.binary())])
+# adapter attributes gathered into graph_info.json, kept so a replay does not construct the adapter
+METADATA_ATTRIBUTES = ('source', 'version', 'source_url')
+ADAPTERS_DIR = os.path.dirname(os.path.abspath(__file__))
+# (directory, with its subdirectories) of the modules any adapter may run: helpers, readers, processors...
+SHARED_SOURCES = [(ADAPTERS_DIR, False),
+                  (os.path.join(os.path.dirname(ADAPTERS_DIR), 'processors'), True)]
+
+
+def _file_fingerprint(path):
+    if os.path.isdir(path):
+        return sorted(_file_fingerprint(os.path.join(root, name))
+                      for root, _, names in os.walk(path) for name in names)
+    stat = os.stat(path)
+    return [path, stat.st_size, stat.st_mtime_ns]
+
+
+def _source_digest(directory, recursive=False):
+    """sha256 of the names and contents of the Python modules in `directory`."""
+    if recursive:
+        paths = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+    else:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    digest = hashlib.sha256()
+    for path in sorted(path for path in paths if path.endswith('.py')):
+        digest.update(os.path.relpath(path, directory).encode() + b'\0')
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _mapping_processors(module):
+    """The mapping processor classes imported by an adapter module."""
+    return sorted((value for value in vars(module).values()
+                   if isinstance(value, type) and issubclass(value, BaseMappingProcessor)
+                   and value is not BaseMappingProcessor), key=lambda cls: cls.__name__)
+
+
+def _describe(value):
+    """JSON description of an adapter argument, with the fingerprint of the files it names."""
+    if isinstance(value, str):
+        return [value, _file_fingerprint(value)] if os.path.exists(value) else value
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_describe(item) for item in value]
+    if type(value) is dict:
+        return {str(key): _describe(item) for key, item in value.items()}
+    return f'<{type(value).__name__}>'
+
+
+def _record_batch(labels, pickled):
+    return pa.RecordBatch.from_arrays([pa.array(labels, pa.string()), pa.array(pickled, pa.binary())],
+                                      schema=RECORD_SCHEMA)
+
+
+class AdapterOutputCache:
+    def __init__(self, cache_dir, shared_inputs=None, batch_size=10000):
+        """
+        cache_dir:     directory of the cached streams.
+        shared_inputs: {argument name: file or directory} of the arguments the build hands to
+                       adapters instead of the config (the dbSNP maps); they are fingerprinted
+                       through the files they are loaded from, not their (huge) values.
+        """
+        self.cache_dir = cache_dir
+        self.shared_inputs = shared_inputs or {}
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        # {(directory, recursive): digest}, the sources do not change during a build
+        self._source_digests = {}
+        # {processor class: fingerprint of its version file, or None if the mapping is due for an update}
+        self._mapping_versions = {}
+
+    def _sources_digest(self, module):
+        sources = SHARED_SOURCES + [(os.path.dirname(os.path.abspath(module.__file__)), False)]
+        for source in sources:
+            if source not in self._source_digests:
+                self._source_digests[source] = _source_digest(*source)
+        return hashlib.sha256(''.join(self._source_digests[source] for source in sorted(set(sources)))
+                              .encode()).hexdigest()
+
+    def _mapping_version(self, processor_cls):
+        if processor_cls not in self._mapping_versions:
+            processor = processor_cls()
+            self._mapping_versions[processor_cls] = (
+                None if processor.check_update_needed() else _file_fingerprint(str(processor.version_file)))
+        return self._mapping_versions[processor_cls]
+
+    def key(self, adapter_config, args, sampler=None):
+        """
+        Cache key of the adapter described by `adapter_config` built with `args`, or None if
+        its output is not to be cached (or replayed) in this build.
+        """
+        module = importlib.import_module(adapter_config['module'])
+        if not getattr(module, adapter_config['cls']).caches_output(args):
+            return None
+        mappings = {processor_cls.__name__: self._mapping_version(processor_cls)
+                    for processor_cls in _mapping_processors(module)}
+        if None in mappings.values():
+            return None
+        with open(module.__file__, 'rb') as f:
+            module_digest = hashlib.sha256(f.read()).hexdigest()
+        description = {
+            'module': adapter_config['module'],
+            'cls': adapter_config['cls'],
+            'module_digest': module_digest,
+            'sources_digest': self._sources_digest(module),
+            'mappings': mappings,
+            'args': {name: _describe(self.shared_inputs[name]) if name in self.shared_inputs else _describe(value)
+                     for name, value in args.items()},
+            'sample': repr(sampler) if sampler is not None else None,
+        }
+        encoded = json.dumps(description, sort_keys=True)
+        return hashlib.sha256(encoded.encode()).hexdigest()[:24]
+
+    def _path(self, name, key, stream):
+        return os.path.join(self.cache_dir, f'{name}_{key}', f'{stream}.arrow')
+
+    def _metadata_path(self, name, key):
+        return os.path.join(self.cache_dir, f'{name}_{key}', 'metadata.json')
+
+    def load(self, name, key, streams):
+        """
+        Returns the adapter metadata and a replay of each stream in `streams` ('nodes',
+        'edges'), or None unless they are all cached.
+        """
+        metadata_path = self._metadata_path(name, key)
+        if not os.path.exists(metadata_path) or not all(
+                os.path.exists(self._path(name, key, stream)) for stream in streams):
+            self.misses += 1
+            return None
+        self.hits += 1
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        return metadata, {stream: self.replay(self._path(name, key, stream)) for stream in streams}
+
+    def replay(self, path):
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                # through NumPy: to_pylist() is slow for binary columns
+                pickled = reader.get_batch(i).column('record').to_numpy(zero_copy_only=False)
+                yield from map(pickle.loads, pickled.tolist())
+
+    def save_metadata(self, name, key, adapter):
+        """Saves the adapter attributes and the row errors of its run (as the adapter `name`)."""
+        metadata_path = self._metadata_path(name, key)
+        os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+        metadata = {attribute: getattr(adapter, attribute, None) for attribute in METADATA_ATTRIBUTES}
+        metadata['row_errors'] = row_errors.report(name)
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, default=str)
+
+    def record(self, name, key, stream, records):
+        """
+        Yields `records` (the 'nodes' or 'edges' stream of the adapter) while writing them to
+        the cache. The file is only put in place once the stream has been read to the end.
+        """
+        path = self._path(name, key, stream)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, RECORD_SCHEMA) as writer:
+                labels, pickled = [], []
+                for record in records:
+                    # pickled before the writer sees the record, in case it changes the properties
+                    labels.append(record[-2])
+                    pickled.append(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+                    yield record
+                    if len(pickled) == self.batch_size:
+                        writer.write_batch(_record_batch(labels, pickled))
+                        labels, pickled = [], []
+                if pickled:
+                    writer.write_batch(_record_batch(labels, pickled))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
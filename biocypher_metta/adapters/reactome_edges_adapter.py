@@ -1,7 +1,7 @@
 # 2025/09: started changes to handle multiple species data.
 
-import psycopg2
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.dmel.flybase_chado import FlybaseChado
 from biocypher_metta.processors import EnsemblUniProtProcessor
 
 # Data file for genes_pathways: https://reactome.org/download/current/Ensembl2Reactome_All_Levels.txt
@@ -73,13 +73,18 @@ class ReactomeEdgesAdapter(Adapter):
                       'reaction_to_pathway', 'protein_role_in_reaction'   ,
                       'parent_pathway_of', 'child_pathway_of']
 
-    def __init__(self, filepath, label, write_properties, add_provenance, taxon_id, ensembl_uniprot_map_path=None):
+    def __init__(self, filepath, label, write_properties, add_provenance, taxon_id, ensembl_uniprot_map_path=None,
+                 flybase_release=None, chado_cache_path=None):
         """
         Added taxon_id parameter to handle multiple species data.
 
         If taxon_id is None, all pathways defined in organism_taxon_map
         will be translated into Atom space. Otherwise, only data for
         the specified species will be processed.
+
+        For dmel, the UniProt ids of FlyBase polypeptides are looked up in chado
+        and cached in chado_cache_path (SQLite) under flybase_release, which has to be
+        bumped with the FlyBase release of the build (cached answers are never refreshed).
         """        
         if label not in ReactomeEdgesAdapter.ALLOWED_LABELS:
             raise ValueError('Invalid label. Allowed values: ' +
@@ -92,7 +97,7 @@ class ReactomeEdgesAdapter(Adapter):
         self.fbpp_to_uniprot = {}               # dict to map FBpp to UniProt ids and to avoid remote connections during runtime
         self.taxon_id = taxon_id
         if self.taxon_id == 7227:
-            self.connection = self.connect_to_flybase()
+            self.chado = FlybaseChado(release=flybase_release, cache_path=chado_cache_path)
         # Load the Ensembl to UniProt mapping
         self.ensembl_uniprot_map = {}
         if ensembl_uniprot_map_path and taxon_id != 9606:
@@ -109,6 +114,11 @@ class ReactomeEdgesAdapter(Adapter):
             self.ensembl_uniprot_map = processor.mapping
         super(ReactomeEdgesAdapter, self).__init__(write_properties, add_provenance)
 
+    @classmethod
+    def caches_output(cls, args):
+        # dmel polypeptides are looked up in the chado database
+        return args.get('taxon_id') != 7227
+
     def get_edges(self):
         # this is being used only as a list  :/
         organism_taxon_map = {
@@ -120,6 +130,9 @@ class ReactomeEdgesAdapter(Adapter):
             'R-MMU': 10090,   # Mus musculus (mmu)
             'R-RNO': 10116,   # Rattus norvegicus
         }
+        if self.taxon_id == 7227 and self.label in ['genes_pathways', 'gene_or_gene_product_reaction']:
+            # all polypeptides of the file are resolved at once, instead of querying chado per record
+            self.fbpp_to_uniprot = self.chado.resolve_polypeptide_uniprot_ids(self._unmapped_polypeptide_ids())
         with open(self.filepath) as input_file:
             base_props = {}
             if self.write_properties and self.add_provenance:
@@ -162,7 +175,7 @@ class ReactomeEdgesAdapter(Adapter):
                                 if uniprot_id is None:
                                     # print(f'{entity_id} not found in Ensembl-to-UniProt map.')
                                     
-                                    uniprot_id = self.get_uniprot_id_from_FB(self.connection, entity_id)
+                                    uniprot_id = self.fbpp_to_uniprot.get(entity_id)
                                     if uniprot_id is None:
                                         # print(f'No UniProt ID for protein {entity_id} of dmel.\nReactome {pathway_id} will not be linked.')
                                         not_mapped_no_processing += 1
@@ -255,69 +268,15 @@ class ReactomeEdgesAdapter(Adapter):
         else:
             return None
 
-    def connect_to_flybase(self):
-        """Establish a connection to the FlyBase PostgreSQL database."""
-        try:
-            conn = psycopg2.connect(
-                host="chado.flybase.org",
-                database="flybase",
-                user="flybase",
-                password="flybase" 
-            )
-            # print("Connection to FlyBase established successfully!")
-            return conn
-        except Exception as e:
-            print(f"Error connecting to FlyBase: {e}")
-            return None
-
-    def get_uniprot_id_from_FB(self, conn, polypeptide_id):
-        """
-        Retrieve the UniProt ID for a given polypeptide from FlyBase.
-        Caches results in fbpp_to_uniprot to avoid repeated queries.
-        """
-        # Check if we already have this UniProt ID cached
-        if polypeptide_id in self.fbpp_to_uniprot:
-            return self.fbpp_to_uniprot[polypeptide_id]
-
-        try:
-            cursor = conn.cursor()
-            # First, get the feature_id (pp_id) for this uniquename (polypeptide_id)
-            cursor.execute("""
-                SELECT feature_id AS pp_id
-                FROM feature
-                WHERE is_obsolete = FALSE
-                  AND is_analysis = FALSE
-                  AND uniquename = %s;
-            """, (polypeptide_id,))
-            result = cursor.fetchone()
-
-            if result is None:
-                print(f"No feature_id found for uniquename: {polypeptide_id}")
-                return None
-            pp_id = result[0]
-
-            # Next, fetch the UniProt accession(s) for that feature_id
-            cursor.execute("""
-                SELECT DISTINCT accession
-                FROM feature_dbxref fdbx
-                JOIN dbxref dbx ON dbx.dbxref_id = fdbx.dbxref_id
-                JOIN db ON db.db_id = dbx.db_id
-                WHERE fdbx.is_current = TRUE
-                  AND db.name IN ('UniProt/Swiss-Prot', 'UniProt/TrEMBL')
-                  AND fdbx.feature_id = %s;
-            """, (pp_id,))
-            uniprot_ids = cursor.fetchall()
-
-            if uniprot_ids:
-                # Cache and return the first UniProt ID found
-                self.fbpp_to_uniprot[polypeptide_id] = uniprot_ids[0][0]
-                return uniprot_ids[0][0]
-            else:
-                return None
-
-        except Exception as e:
-            print(f"Error executing query: {e}")
-            return None
-
-        finally:
-            cursor.close()
+    def _unmapped_polypeptide_ids(self):
+        """FlyBase polypeptides of the dmel records that are missing from the Ensembl-to-UniProt map."""
+        polypeptide_ids = []
+        with open(self.filepath) as input_file:
+            for line in input_file:
+                data = line.strip().split('\t')
+                entity_id, organism_pathway_prefix = data[0].strip(), data[1].strip()[:5]
+                if organism_pathway_prefix not in ('R-DME', 'R-NUL') or not entity_id.lower().startswith('fbpp'):
+                    continue
+                if self.ensembl_uniprot_map.get(entity_id) is None:
+                    polypeptide_ids.append(entity_id)
+        return polypeptide_ids
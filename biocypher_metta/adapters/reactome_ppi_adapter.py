@@ -102,5 +102,5 @@ class ReactomePPIAdapter(Adapter):
             yield _source, _target, self.label, _props
             
         except Exception as e:
-            print(f"reactome_ppi_adapter: error processing row: {e}")
+            self.row_error(e, row)
             return
\ No newline at end of file
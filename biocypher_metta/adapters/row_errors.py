@@ -0,0 +1,99 @@
+"""
+Per-process accounting of the rows adapters fail to parse.
+
+Adapters skip a row they cannot parse (a missing column, a value that is not a number, an
+unknown tissue) and used to print the row and the exception every time: on a dirty input,
+millions of formatted lines that cost more than the parsing. They now hand the exception
+to Adapter.row_error(), which counts it per adapter and exception class. Only the first
+few errors of each class are logged (and kept for the build report); after that one is
+logged every so often, with the count so far, and the rest only cost a counter increment.
+Rows are formatted only when they are logged.
+
+create_knowledge_graph.py names the adapter being run (its key in the adapters config), logs
+the summary after the last adapter and adds the report to graph_info.json.
+"""
+
+import logging
+import time
+from collections import Counter
+
+# The logger of biocypher (see biocypher._logger); importing biocypher for it would slow the
+# import of every adapter down
+logger = logging.getLogger('biocypher')
+
+MAX_ROW_LENGTH = 200
+
+
+class RowErrors:
+    def __init__(self, examples=5, log_interval=30.0):
+        """
+        examples:     errors of each adapter and exception class logged (and reported) in full.
+        log_interval: seconds between the errors logged after those, per adapter and class.
+        """
+        self.examples = examples
+        self.log_interval = log_interval
+        self.adapter = None
+        self.counts = Counter()
+        self._examples = {}
+        self._last_logged = {}
+
+    def record(self, error, row=None, adapter=None):
+        """
+        Count `error`, raised while parsing `row`, against the adapter being run (or
+        `adapter` outside of a build), and log it if it is one of the first or sampled.
+        """
+        key = (self.adapter or adapter, type(error).__name__)
+        count = self.counts[key] = self.counts[key] + 1
+        if count > self.examples and time.monotonic() - self._last_logged[key] < self.log_interval:
+            return
+        if count <= self.examples:
+            message = self._message(key, error, row)
+            self._examples.setdefault(key, []).append(message)
+            if count == self.examples:
+                message += (f" (further {key[1]} errors are counted, and one is logged every "
+                            f"{self.log_interval:g} s)")
+            logger.warning(message)
+        else:
+            logger.warning(f"{self._message(key, error, row)} ({count} {key[1]} errors so far)")
+        self._last_logged[key] = time.monotonic()
+
+    @staticmethod
+    def _message(key, error, row):
+        message = f"{key[0]}: skipping row, {key[1]}: {error}"
+        if row is not None:
+            row = repr(row)
+            if len(row) > MAX_ROW_LENGTH:
+                row = row[:MAX_ROW_LENGTH] + '...'
+            message += f" in {row}"
+        return message
+
+    def report(self, adapter=None):
+        """
+        Error counts and the first errors, per adapter and exception class, for graph_info.json
+        (of `adapter` only, if given).
+        """
+        return [{'adapter': name, 'error': error, 'count': count,
+                 'examples': self._examples.get((name, error), [])}
+                for (name, error), count in self.counts.most_common() if adapter is None or name == adapter]
+
+    def restore(self, report):
+        """Count the errors of a report() again, for an adapter whose output is replayed from a cache."""
+        for entry in report:
+            key = (entry['adapter'], entry['error'])
+            self.counts[key] += entry['count']
+            self._examples.setdefault(key, []).extend(entry['examples'][:self.examples])
+            logger.warning(f"{key[0]}: {entry['count']} rows skipped on {key[1]} when the cached output was made")
+
+    def summary(self):
+        lines = [f"{adapter}: {count} rows skipped on {error}"
+                 for (adapter, error), count in self.counts.most_common()]
+        return "\n".join([f"Row errors: {sum(self.counts.values())} rows skipped"] + lines)
+
+    def clear(self):
+        self.adapter = None
+        self.counts.clear()
+        self._examples.clear()
+        self._last_logged.clear()
+
+
+row_errors = RowErrors()
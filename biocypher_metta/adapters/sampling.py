@@ -0,0 +1,135 @@
+"""
+Deterministic record sampling for small builds of the full data.
+
+A sampled build (create_knowledge_graph.py --sample-rate) keeps an entity when a keyed
+BLAKE2b hash of its primary identifier (gene id, transcript id, rsID, ...) falls below the
+sample rate. The decision depends only on the identifier and the seed, so every adapter
+keeps the same genes and variants, and the same ones on every run, unlike the samples/
+files or a chromosome restriction.
+
+The entities sampled are the nodes of SAMPLED_NODE_TYPES, each keyed on its own id.
+process_adapters() runs every stream through a SampleFilter, which drops the nodes of these
+types that are not sampled and the edges with such an end (the type of an end is the one
+of a (type, id) end, or else the one the schema gives the edge label). An edge between
+two sampled entities (a variant and a gene) is thus kept only if both are, at rate r ** 2,
+and no edge points to a node the sampled build does not have, whichever adapter yields it.
+Nodes and edges of other types (ontologies, pathways, proteins) are all kept.
+
+Adapters reading large files of sampled entities also test the identifier (unversioned,
+as in the node ids) with Adapter.sampled() before parsing the rest of the record, so they
+skip the records the filter would drop without building them.
+"""
+
+import hashlib
+import re
+from collections import Counter
+
+# A CURIE prefix ('ENSEMBL:', 'DBSNP:'), which adapters add inconsistently
+_PREFIX = re.compile(r'^[A-Za-z_]+:')
+_HASH_RANGE = 2**64
+# Node types (schema input labels) whose entities are sampled
+SAMPLED_NODE_TYPES = frozenset(['gene', 'transcript', 'exon', 'snp'])
+
+
+def sample_key(identifier):
+    """The identifier an entity is sampled by: without a CURIE prefix, lowercase."""
+    identifier = str(identifier)
+    if ':' in identifier:
+        identifier = _PREFIX.sub('', identifier)
+    return identifier.lower()
+
+
+class RecordSampler:
+    def __init__(self, rate, seed=0):
+        """
+        rate: fraction of the entities to keep, in (0, 1].
+        seed: entities kept at the same rate differ from one seed to another.
+        """
+        if not 0 < rate <= 1:
+            raise ValueError(f'Sample rate must be in (0, 1], got {rate}')
+        self.rate = rate
+        self.seed = seed
+        self._threshold = int(rate * _HASH_RANGE)
+        self._hash_key = str(seed).encode()[:64]
+
+    def keeps(self, identifier):
+        digest = hashlib.blake2b(sample_key(identifier).encode(), digest_size=8, key=self._hash_key).digest()
+        return int.from_bytes(digest, 'big') < self._threshold
+
+    def keep(self, *identifiers):
+        """True if every one of the entities is in the sample."""
+        return self.rate == 1 or all(self.keeps(identifier) for identifier in identifiers)
+
+    def __repr__(self):
+        return f'RecordSampler(rate={self.rate}, seed={self.seed})'
+
+
+def _select(batch, keep, columns):
+    # the records of a node or edge batch at the positions where `keep` is True
+    selected = {column: [value for value, kept in zip(batch[column], keep) if kept] for column in columns}
+    selected['properties'] = {name: [value for value, kept in zip(values, keep) if kept]
+                              for name, values in batch['properties'].items()}
+    return selected
+
+
+class SampleFilter:
+    def __init__(self, sampler, schema_dict):
+        """
+        sampler:     the RecordSampler of the build.
+        schema_dict: {edge label: {'source': node type(s), 'target': node type(s), ...}}, as
+                     built by create_knowledge_graph.preprocess_schema().
+        """
+        self.sampler = sampler
+        self.schema_dict = schema_dict
+        self.dropped = Counter()
+        # {edge label: (source sampled, target sampled)} of the ends given as plain ids
+        self._edge_ends = {}
+
+    def _sampled_types(self, label):
+        ends = self._edge_ends.get(label)
+        if ends is None:
+            edge_type = self.schema_dict.get(str(label).lower(), {})
+            # an end that may be of several types is sampled if any of them is
+            ends = self._edge_ends[label] = tuple(
+                bool(SAMPLED_NODE_TYPES.intersection(types if isinstance(types, list) else [types]))
+                for types in (edge_type.get('source'), edge_type.get('target')))
+        return ends
+
+    def _keeps_end(self, end, sampled_type):
+        if isinstance(end, tuple):
+            sampled_type, end = end[0] in SAMPLED_NODE_TYPES, end[1]
+        return not sampled_type or self.sampler.keeps(end)
+
+    def keeps_node(self, node_id, label):
+        return label not in SAMPLED_NODE_TYPES or self.sampler.keeps(node_id)
+
+    def keeps_edge(self, source, target, label):
+        source_sampled, target_sampled = self._sampled_types(label)
+        return self._keeps_end(source, source_sampled) and self._keeps_end(target, target_sampled)
+
+    def nodes(self, nodes):
+        for node in nodes:
+            if self.keeps_node(node[0], node[1]):
+                yield node
+            else:
+                self.dropped['nodes'] += 1
+
+    def edges(self, edges):
+        for edge in edges:
+            if self.keeps_edge(edge[0], edge[1], edge[2]):
+                yield edge
+            else:
+                self.dropped['edges'] += 1
+
+    def node_batches(self, batches):
+        for batch in batches:
+            keep = [self.keeps_node(node_id, label) for node_id, label in zip(batch['id'], batch['label'])]
+            self.dropped['nodes'] += keep.count(False)
+            yield _select(batch, keep, ('id', 'label')) if not all(keep) else batch
+
+    def edge_batches(self, batches):
+        for batch in batches:
+            keep = [self.keeps_edge(source, target, label)
+                    for source, target, label in zip(batch['source'], batch['target'], batch['label'])]
+            self.dropped['edges'] += keep.count(False)
+            yield _select(batch, keep, ('source', 'target', 'label')) if not all(keep) else batch
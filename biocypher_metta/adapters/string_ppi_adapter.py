@@ -2,9 +2,8 @@
 from biocypher_metta.adapters import Adapter
 import pickle
 from biocypher_metta.processors import EnsemblUniProtProcessor
-import csv
-import gzip
-from biocypher_metta.adapters.helpers import to_float
+import numpy as np
+import pandas as pd
 
 # Imports STRING Protein-Protein interactions
 
@@ -20,12 +19,14 @@ from biocypher_metta.adapters.helpers import to_float
 class StringPPIAdapter(Adapter):
     def __init__(self, filepath, ensembl_to_uniprot_map=None, taxon_id=9606, label='interacts_with',
                  write_properties=None, add_provenance=None,
-                 ensembl_uniprot_processor=None):
+                 ensembl_uniprot_processor=None, min_score=None, chunk_size=500_000):
         """
         Constructs StringPPI adapter that returns edges between proteins
         :param filepath: Path to the TSV file downloaded from String
         :param ensembl_to_uniprot_map: DEPRECATED - use ensembl_uniprot_processor instead
         :param ensembl_uniprot_processor: EnsemblUniProtProcessor instance for ID mapping
+        :param min_score: only keep interactions with a normalized score (combined_score / 1000) >= min_score
+        :param chunk_size: rows read, filtered and mapped at a time
         """
         self.filepath = filepath
         self.taxon_id = taxon_id
@@ -44,32 +45,54 @@ class StringPPIAdapter(Adapter):
         if hasattr(self, 'processor') and self.processor is not None:
             self.ensembl2uniprot = self.processor.mapping
 
+        self.min_score = min_score
+        self.chunk_size = chunk_size
         self.label = label
         self.source = "STRING"
         self.source_url = "https://string-db.org/"
         self.version = "v12.0"
         super(StringPPIAdapter, self).__init__(write_properties, add_provenance)
 
+    def map_proteins(self, proteins, mapped_ensembl_ids):
+        """Positions of the STRING protein ids (taxon.ENSP) in mapped_ensembl_ids, -1 if unmapped."""
+        # A chunk repeats a few thousand proteins, so each distinct id is only split and looked up once
+        codes, distinct = pd.factorize(proteins)
+        positions = mapped_ensembl_ids.get_indexer([protein.split(".")[1] for protein in distinct])
+        return positions[codes]
+
     def get_edges(self):
-        with gzip.open(self.filepath, "rt") as fp:
-            table = csv.reader(fp, delimiter=" ", quotechar='"')
-            table.__next__() # skip header
-            for row in table:
-                protein1 = row[0].split(".")[1]
-                protein2 = row[1].split(".")[1]
-                if protein1 in self.ensembl2uniprot and protein2 in self.ensembl2uniprot:
-                    protein1_uniprot = self.ensembl2uniprot[protein1]
-                    protein2_uniprot = self.ensembl2uniprot[protein2]
-                    _source = f"{protein1_uniprot}"
-                    _target = f"{protein2_uniprot}"
-                    _props = {}
-                    if self.write_properties:
-                        _props = {
-                            "score": to_float(row[2]) / 1000, # divide by 1000 to normalize score
-                        }
-                        _props['taxon_id'] = f'{self.taxon_id}'
-                        if self.add_provenance:
-                            _props["source"] = self.source
-                            _props["source_url"] = self.source_url
+        # Ensembl ids are joined against the mapping a chunk at a time
+        mapped_ensembl_ids = pd.Index(list(self.ensembl2uniprot.keys()))
+        mapped_uniprot_ids = np.array([f"{uniprot_id}" for uniprot_id in self.ensembl2uniprot.values()], dtype=object)
+        taxon_id = f'{self.taxon_id}'
+
+        chunks = self.read_csv_chunks(self.filepath, ["protein1", "protein2", "combined_score"], self.chunk_size,
+                                      sep=" ", quotechar='"', header=None, skiprows=1,
+                                      dtype={"protein1": str, "protein2": str, "combined_score": np.float64},
+                                      float_precision="round_trip")
+        for chunk in chunks:
+            scores = chunk["combined_score"].to_numpy() / 1000 # divide by 1000 to normalize score
+            keep = np.ones(len(chunk), dtype=bool)
+            if self.min_score is not None:
+                keep &= scores >= self.min_score
+
+            protein1 = self.map_proteins(chunk["protein1"], mapped_ensembl_ids)
+            protein2 = self.map_proteins(chunk["protein2"], mapped_ensembl_ids)
+            keep &= (protein1 >= 0) & (protein2 >= 0)
+
+            rows = zip(mapped_uniprot_ids[protein1[keep]].tolist(), mapped_uniprot_ids[protein2[keep]].tolist(),
+                       scores[keep].tolist())
+            if not self.write_properties:
+                for _source, _target, _ in rows:
+                    yield _source, _target, self.label, {}
+                continue
+            for _source, _target, score in rows:
+                _props = {
+                    "score": score,
+                }
+                _props['taxon_id'] = taxon_id
+                if self.add_provenance:
+                    _props["source"] = self.source
+                    _props["source_url"] = self.source_url
 
-                    yield _source, _target, self.label, _props
\ No newline at end of file
+                yield _source, _target, self.label, _props
@@ -0,0 +1,154 @@
+'''
+Columnar cache of the UniProt SwissProt/TrEMBL flat files.
+
+The UniProt adapters each parsed the whole .dat.gz file with Bio.SwissProt, which is slow,
+and a build runs a dozen of them over the same file. build_swissprot_cache() parses a file
+once into a Parquet file holding the record fields the adapters use, and SwissProtCache
+reads back only the columns an adapter needs.
+
+The cache file is named after the SHA-256 digest of the flat file, so a new UniProt release
+(or any other change to the file) gets a new cache instead of stale records. Hashing a
+multi-GB file takes a while, so the digest is kept in DIGESTS_FILE in the cache directory
+with the size and modification time of the file, and only computed again when they change.
+'''
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from Bio import SwissProt
+
+# {absolute path of a flat file: [size, mtime_ns, SHA-256 digest]}
+DIGESTS_FILE = 'digests.json'
+
+SWISSPROT_SCHEMA = pa.schema([
+    ('entry_name', pa.string()),
+    ('accessions', pa.list_(pa.string())),
+    ('description', pa.string()),
+    ('sequence_length', pa.int64()),
+    ('cross_references', pa.list_(pa.list_(pa.string()))),
+    ('comments', pa.list_(pa.string())),
+    # qualifiers of the BINDING features, as written in the FT lines
+    ('binding_sites', pa.list_(pa.struct([
+        ('ligand_id', pa.string()),
+        ('ligand_part_id', pa.string()),
+        ('evidence', pa.string()),
+    ]))),
+])
+
+
+def file_digest(path, chunk_size=2**20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def known_file_digest(path, cache_dir):
+    '''file_digest() of `path`, read from the DIGESTS_FILE of `cache_dir` unless the file changed.'''
+    digests_path = os.path.join(cache_dir, DIGESTS_FILE)
+    try:
+        with open(digests_path) as f:
+            digests = json.load(f)
+    except (OSError, ValueError):
+        digests = {}
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    known = digests.get(key)
+    if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return known[2]
+
+    digest = file_digest(path)
+    digests[key] = [stat.st_size, stat.st_mtime_ns, digest]
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.json', dir=cache_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(digests, f)
+    os.replace(tmp_path, digests_path)
+    return digest
+
+
+def swissprot_cache_path(filepath, cache_dir):
+    name = os.path.basename(filepath).split('.')[0]
+    return os.path.join(cache_dir, f'{name}_{known_file_digest(filepath, cache_dir)[:16]}.parquet')
+
+
+def _record_row(record):
+    return {
+        'entry_name': record.entry_name,
+        'accessions': record.accessions,
+        'description': record.description,
+        'sequence_length': record.sequence_length,
+        'cross_references': [list(cross_reference) for cross_reference in record.cross_references],
+        'comments': record.comments,
+        'binding_sites': [{key: feature.qualifiers.get(key) for key in ('ligand_id', 'ligand_part_id', 'evidence')}
+                          for feature in record.features if feature.type == 'BINDING'],
+    }
+
+
+def build_swissprot_cache(filepath, cache_path, batch_size=10000):
+    '''Parses the gzipped SwissProt flat file `filepath` into the Parquet file `cache_path`.'''
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    # Written to a temporary file first, so adapters running in parallel never read a partial cache
+    fd, tmp_path = tempfile.mkstemp(suffix='.parquet', dir=os.path.dirname(cache_path) or '.')
+    os.close(fd)
+    try:
+        with gzip.open(filepath, 'rt') as input_file, pq.ParquetWriter(tmp_path, SWISSPROT_SCHEMA) as writer:
+            rows = []
+            for record in SwissProt.parse(input_file):
+                rows.append(_record_row(record))
+                if len(rows) == batch_size:
+                    writer.write_table(pa.Table.from_pylist(rows, schema=SWISSPROT_SCHEMA))
+                    rows = []
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=SWISSPROT_SCHEMA))
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return cache_path
+
+
+def _to_pylist(array):
+    # Like array.to_pylist(), which is slow for strings: they go through NumPy instead
+    if pa.types.is_list(array.type):
+        values = _to_pylist(array.values)
+        offsets = array.offsets.to_numpy().tolist()
+        return [values[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    if pa.types.is_string(array.type):
+        return array.to_numpy(zero_copy_only=False).tolist()
+    return array.to_pylist()
+
+
+class SwissProtCache:
+    '''
+    Records of the SwissProt file `filepath` read from its cache in `cache_dir`, which is
+    built first if there is none for the file yet.
+    '''
+    def __init__(self, filepath, cache_dir='aux_files/swissprot_cache'):
+        self.cache_path = swissprot_cache_path(filepath, cache_dir)
+        if not os.path.exists(self.cache_path):
+            build_swissprot_cache(filepath, self.cache_path)
+        self._file = pq.ParquetFile(self.cache_path)
+
+    def records(self, columns, batch_size=10000):
+        '''Yields every record, in file order, as a named tuple of `columns` (see SWISSPROT_SCHEMA).'''
+        record = namedtuple('SwissProtRecord', columns)
+        for batch in self._file.iter_batches(batch_size=batch_size, columns=columns):
+            for values in zip(*(_to_pylist(batch.column(column)) for column in columns)):
+                yield record._make(values)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -5,8 +5,10 @@ class UberonAdapter(OntologyAdapter):
         'uberon': 'http://purl.obolibrary.org/obo/uberon.owl'
     }
 
-    def __init__(self, write_properties, add_provenance, ontology, type, label='anatomy', dry_run=False, add_description=False, cache_dir=None):
-        super().__init__(write_properties, add_provenance, ontology, type, label, dry_run, add_description, cache_dir)
+    def __init__(self, write_properties, add_provenance, ontology, type, label='anatomy', dry_run=False, add_description=False, cache_dir=None,
+                 transitive_closure=False, closure_max_ancestors=None, emit_diff=False):
+        super().__init__(write_properties, add_provenance, ontology, type, label, dry_run, add_description, cache_dir,
+                         transitive_closure=transitive_closure, closure_max_ancestors=closure_max_ancestors, emit_diff=emit_diff)
 
     def get_ontology_source(self):
         return 'UBERON', 'http://purl.obolibrary.org/obo/uberon.owl'
@@ -1,6 +1,5 @@
-import gzip
-from Bio import SeqIO, SwissProt
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.swissprot_cache import SwissProtCache
 
 # Data file is uniprot_sprot_human.dat.gz and uniprot_trembl_human.dat.gz at https://ftp.uniprot.org/pub/databases/uniprot/current_release/knowledgebase/taxonomic_divisions/.
 # We can use SeqIO from Bio to read the file.
@@ -24,7 +23,7 @@ class UniprotAdapter(Adapter):
 
     # added "taxon_id" to the 'protein' schema
     def __init__(self, filepath, type, label,
-                 write_properties, add_provenance, taxon_id):
+                 write_properties, add_provenance, taxon_id, cache_dir='aux_files/swissprot_cache'):
         if type not in UniprotAdapter.ALLOWED_TYPES:
             raise ValueError('Invalid type. Allowed values: ' +
                              ', '.join(UniprotAdapter.ALLOWED_TYPES))
@@ -38,6 +37,7 @@ class UniprotAdapter(Adapter):
         self.source = "UniProt"
         self.source_url = "https://www.uniprot.org/"
         self.taxon_id = taxon_id
+        self.cache_dir = cache_dir
 
         super(UniprotAdapter, self).__init__(write_properties, add_provenance)
 
@@ -45,8 +45,8 @@ class UniprotAdapter(Adapter):
     def get_edges(self):
         translation_conditions_hold = translation_condition_map[self.taxon_id]
 
-        with gzip.open(self.filepath, 'rt') as input_file:
-            records = SwissProt.parse(input_file)
+        with SwissProtCache(self.filepath, self.cache_dir) as swissprot:
+            records = swissprot.records(['entry_name', 'accessions', 'cross_references'])
             for record in records:
                 if self.type == 'translates to':
                     # dbxrefs = record.dbxrefs
@@ -65,6 +65,5 @@ class UniprotAdapter(Adapter):
                                     _props['source_url'] = self.source_url
                                 yield _source, _target, self.label, _props
 
-                            except :
-                                print(f'UniprotAdapter::--> fail to process for edge translates to: {record.entry_name} / {item[0]} / {item[1]}')
-                                pass
+                            except Exception as e:
+                                self.row_error(e, (record.entry_name, *item))
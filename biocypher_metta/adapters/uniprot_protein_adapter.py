@@ -1,12 +1,11 @@
 from collections import defaultdict
-import gzip
 import pickle
 import re
 import json
 import os
 from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.swissprot_cache import SwissProtCache
 from biocypher_metta.processors import GOSubontologyProcessor
-from Bio import SwissProt
 
 # Data file is uniprot_sprot_human.dat.gz and uniprot_trembl_human.dat.gz at https://ftp.uniprot.org/pub/databases/uniprot/current_release/knowledgebase/taxonomic_divisions/.
 # We can use SeqIO from Bio to read the file.
@@ -16,8 +15,10 @@ from Bio import SwissProt
 class UniprotProteinAdapter(Adapter):
     ALLOWED_SOURCES = ['UniProtKB/Swiss-Prot', 'UniProtKB/TrEMBL']
 
-    def __init__(self, filepath, write_properties, add_provenance,taxon_id, label, dbxref=None, mapping_file=None):
+    def __init__(self, filepath, write_properties, add_provenance,taxon_id, label, dbxref=None, mapping_file=None,
+                 cache_dir='aux_files/swissprot_cache'):
         self.filepath = filepath
+        self.cache_dir = cache_dir
         self.dataset = 'UniProtKB_protein'
         self.label = label
         self.dbxref = dbxref
@@ -91,8 +92,8 @@ class UniprotProteinAdapter(Adapter):
         taxon_to_suffixes[7227] ='DROME',
         taxon_to_suffixes[9606] = 'HUMAN',
         
-        with gzip.open(self.filepath, 'rt') as input_file:
-            records = SwissProt.parse(input_file)
+        with SwissProtCache(self.filepath, self.cache_dir) as swissprot:
+            records = swissprot.records(['entry_name', 'accessions', 'comments'])
             for record in records:
                 if taxon_to_suffixes[self.taxon_id] == None or not record.entry_name.endswith(taxon_to_suffixes[self.taxon_id]):
                     continue
@@ -139,8 +140,8 @@ class UniprotProteinAdapter(Adapter):
         taxon_to_suffixes[7227] ='DROME',
         taxon_to_suffixes[9606] = 'HUMAN',
                 
-        with gzip.open(self.filepath, 'rt') as input_file:
-            for record in SwissProt.parse(input_file):
+        with SwissProtCache(self.filepath, self.cache_dir) as swissprot:
+            for record in swissprot.records(['entry_name', 'accessions', 'cross_references', 'comments', 'binding_sites']):
                 if taxon_to_suffixes[self.taxon_id] == None or not record.entry_name.endswith(taxon_to_suffixes[self.taxon_id]):
                     continue                
                 dbxrefs = self.get_dbxrefs(record.cross_references)
@@ -182,46 +183,20 @@ class UniprotProteinAdapter(Adapter):
                                     yield base_id, chebi_id, self.label, props
 
                     elif self.label in ["protein_has_xref_binding_site_ligand", "chemical_substance_part_of_chemical_substance"]:
-                        for feature in record.features:
-                            if feature.type == "BINDING":
-                                ligand_id = feature.qualifiers.get('ligand_id')
-                                if ligand_id:
-                                    if self.label == "protein_has_xref_binding_site_ligand":
-                                        if isinstance(ligand_id, str):
-                                            ligand_id = [ligand_id]
-                                        
-                                        for lid in ligand_id:
-                                            cid_match = re.search(r"CHEBI:(\d+)", lid, re.IGNORECASE)
-                                            if cid_match:
-                                                cid = f"CHEBI:{cid_match.group(1)}"
-                                                
-                                                evidence = feature.qualifiers.get('evidence', [])
-                                                if isinstance(evidence, str):
-                                                    evidence = [evidence]
-                                                evidence_codes = []
-                                                for ev in evidence:
-                                                    ecos = re.findall(r"ECO:(\d+)", ev)
-                                                    for eco in ecos:
-                                                        evidence_codes.append(f"ECO_{eco}")
-                                                
-                                                props = {}
-                                                if self.write_properties:
-                                                    if evidence_codes:
-                                                        props['evidence'] = evidence_codes
-                                                    if self.add_provenance:
-                                                        props['source'] = self.source
-                                                        props['source_url'] = self.source_url
-                                                yield base_id, cid, self.label, props
-
-                                    if self.label == "chemical_substance_part_of_chemical_substance":
-                                        part_id = feature.qualifiers.get('ligand_part_id')
-                                        if part_id:
-                                            if isinstance(ligand_id, str):
-                                                ligand_id = [ligand_id]
-                                            if isinstance(part_id, str):
-                                                part_id = [part_id]
+                        # BINDING features only
+                        for feature in record.binding_sites:
+                            ligand_id = feature.get('ligand_id')
+                            if ligand_id:
+                                if self.label == "protein_has_xref_binding_site_ligand":
+                                    if isinstance(ligand_id, str):
+                                        ligand_id = [ligand_id]
+                                    
+                                    for lid in ligand_id:
+                                        cid_match = re.search(r"CHEBI:(\d+)", lid, re.IGNORECASE)
+                                        if cid_match:
+                                            cid = f"CHEBI:{cid_match.group(1)}"
                                             
-                                            evidence = feature.qualifiers.get('evidence', [])
+                                            evidence = feature.get('evidence') or []
                                             if isinstance(evidence, str):
                                                 evidence = [evidence]
                                             evidence_codes = []
@@ -229,24 +204,50 @@ class UniprotProteinAdapter(Adapter):
                                                 ecos = re.findall(r"ECO:(\d+)", ev)
                                                 for eco in ecos:
                                                     evidence_codes.append(f"ECO_{eco}")
+                                            
+                                            props = {}
+                                            if self.write_properties:
+                                                if evidence_codes:
+                                                    props['evidence'] = evidence_codes
+                                                if self.add_provenance:
+                                                    props['source'] = self.source
+                                                    props['source_url'] = self.source_url
+                                            yield base_id, cid, self.label, props
+
+                                if self.label == "chemical_substance_part_of_chemical_substance":
+                                    part_id = feature.get('ligand_part_id')
+                                    if part_id:
+                                        if isinstance(ligand_id, str):
+                                            ligand_id = [ligand_id]
+                                        if isinstance(part_id, str):
+                                            part_id = [part_id]
+                                        
+                                        evidence = feature.get('evidence') or []
+                                        if isinstance(evidence, str):
+                                            evidence = [evidence]
+                                        evidence_codes = []
+                                        for ev in evidence:
+                                            ecos = re.findall(r"ECO:(\d+)", ev)
+                                            for eco in ecos:
+                                                evidence_codes.append(f"ECO_{eco}")
             
-                                            for lid in ligand_id:
-                                                l_match = re.search(r"CHEBI:(\d+)", lid, re.IGNORECASE)
-                                                if l_match:
-                                                    l_chebi = f"CHEBI:{l_match.group(1)}"
-                                                    for pid in part_id:
-                                                        p_match = re.search(r"CHEBI:(\d+)", pid, re.IGNORECASE)
-                                                        if p_match:
-                                                            p_chebi = f"CHEBI:{p_match.group(1)}"
-                                                            
-                                                            part_props = {}
-                                                            if self.write_properties:
-                                                                if evidence_codes:
-                                                                    part_props['evidence'] = evidence_codes
-                                                                if self.add_provenance:
-                                                                    part_props['source'] = self.source
-                                                                    part_props['source_url'] = self.source_url
-                                                            yield p_chebi, l_chebi, self.label, part_props
+                                        for lid in ligand_id:
+                                            l_match = re.search(r"CHEBI:(\d+)", lid, re.IGNORECASE)
+                                            if l_match:
+                                                l_chebi = f"CHEBI:{l_match.group(1)}"
+                                                for pid in part_id:
+                                                    p_match = re.search(r"CHEBI:(\d+)", pid, re.IGNORECASE)
+                                                    if p_match:
+                                                        p_chebi = f"CHEBI:{p_match.group(1)}"
+                                                        
+                                                        part_props = {}
+                                                        if self.write_properties:
+                                                            if evidence_codes:
+                                                                part_props['evidence'] = evidence_codes
+                                                            if self.add_provenance:
+                                                                part_props['source'] = self.source
+                                                                part_props['source_url'] = self.source_url
+                                                        yield p_chebi, l_chebi, self.label, part_props
                     continue
 
                 dbxrefs = self.get_dbxrefs(record.cross_references)
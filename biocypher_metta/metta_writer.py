@@ -251,6 +251,143 @@ class MeTTaWriter(BaseWriter):
 
         return self.edge_freq
 
+    def _output_dir(self, path_prefix, create_dir):
+        if path_prefix is None:
+            return self.output_path
+        output_dir = f"{self.output_path}/{path_prefix}"
+        if create_dir:
+            pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
+        return output_dir
+
+    def _property_lines(self, def_outs, properties):
+        """write_property() of every record of a batch, formatting one property column at a time."""
+        lines = [[def_out] for def_out in def_outs]
+        for k, column in properties.items():
+            if k in self.excluded_properties:
+                continue
+            # values repeat within a column (sources, chromosomes, alleles): each is formatted once
+            formatted = {}
+            for record_lines, def_out, v in zip(lines, def_outs, column):
+                if v is None or v == "":
+                    continue
+                if k == 'biological_context' or isinstance(v, (list, dict)):
+                    record_lines.extend(self.write_property(def_out, {k: v})[1:])
+                    continue
+                value_key = (type(v), v)
+                value = formatted.get(value_key)
+                if value is None:
+                    value = formatted[value_key] = self.check_property(v)
+                record_lines.append(f'({k} {def_out} {value})')
+        return lines
+
+    def _count_node_properties(self, labels, properties):
+        """extract_node_info() for a batch: a property counts for a label if one of its records has it."""
+        for label in set(labels):
+            label_props = self.node_props[label]
+            for key, column in properties.items():
+                if key in label_props:
+                    continue
+                if any(v is not None for v, l in zip(column, labels) if l == label):
+                    label_props.add(key)
+
+    def write_node_batches(self, batches, path_prefix=None, create_dir=True):
+        """Writes node batches (see biocypher_metta/adapters/batches.py), like write_nodes()."""
+        output_dir = self._output_dir(path_prefix, create_dir)
+        file_handles = {}
+        # raw label -> (file label, node type, label ontology ids are preprocessed for)
+        label_info = {}
+
+        try:
+            for batch in batches:
+                ids, labels, properties = batch['id'], batch['label'], batch['properties']
+                self.node_freq.update(labels)
+                self._count_node_properties(labels, properties)
+
+                def_outs = []
+                for _id, label in zip(ids, labels):
+                    info = label_info.get(label)
+                    if info is None:
+                        label_to_check = label.split(".")[1] if "." in label else label
+                        info = label_info[label] = (
+                            label_to_check.lower(), self.normalize_text(label_to_check),
+                            label_to_check if self._is_ontology_label(label_to_check) else None)
+                    def_outs.append(f"({info[1]} {self.preprocess_id(str(_id), label=info[2])})")
+
+                chunks = defaultdict(list)
+                for label, record_lines in zip(labels, self._property_lines(def_outs, properties)):
+                    chunks[label_info[label][0]].extend(record_lines)
+                for file_label, file_lines in chunks.items():
+                    if file_label not in file_handles:
+                        file_handles[file_label] = open(f"{output_dir}/nodes_{file_label}.metta", "w")
+                    file_handles[file_label].write("\n".join(file_lines) + "\n")
+
+        finally:
+            for fh in file_handles.values():
+                try:
+                    fh.write("\n")
+                    fh.close()
+                except Exception:
+                    pass
+
+        logger.info("Finished writing out nodes")
+        return self.node_freq, self.node_props
+
+    def write_edge_batches(self, batches, path_prefix=None, create_dir=True):
+        """Writes edge batches (see biocypher_metta/adapters/batches.py), like write_edges()."""
+        output_dir = self._output_dir(path_prefix, create_dir)
+        file_handles = {}
+        # raw label -> (file key, file suffix, label to use, source type, target type)
+        label_info = {}
+
+        try:
+            for batch in batches:
+                sources, targets, labels = batch['source'], batch['target'], batch['label']
+                self.edge_freq.update(labels)
+
+                def_outs = []
+                for source_id, target_id, label in zip(sources, targets, labels):
+                    info = label_info.get(label)
+                    if info is None:
+                        lower = label.lower()
+                        edge_info = self.edge_node_types.get(lower, {})
+                        output_label = edge_info.get("output_label")
+                        label_to_use = output_label if output_label is not None else lower
+                        source_type = edge_info.get("source", "unknown")
+                        target_type = edge_info.get("target", "unknown")
+                        if isinstance(source_type, list):
+                            source_type = source_type[0]
+                        if isinstance(target_type, list):
+                            target_type = target_type[0]
+                        info = label_info[label] = ((lower, source_type, target_type),
+                                                    f"{source_type}_{label_to_use}_{target_type}",
+                                                    label_to_use, source_type, target_type)
+                    if isinstance(source_id, tuple) or isinstance(target_id, tuple):
+                        def_outs.append(self.edge_definition(source_id, target_id, label))
+                    else:
+                        _, _, label_to_use, source_type, target_type = info
+                        def_outs.append(
+                            f"({label_to_use} ({source_type} {self.preprocess_id(str(source_id), label=source_type)}) "
+                            f"({target_type} {self.preprocess_id(str(target_id), label=target_type)}))")
+
+                chunks = defaultdict(list)
+                for label, record_lines in zip(labels, self._property_lines(def_outs, batch['properties'])):
+                    chunks[label].extend(record_lines)
+                for label, file_lines in chunks.items():
+                    file_key, file_suffix = label_info[label][:2]
+                    if file_key not in file_handles:
+                        file_handles[file_key] = open(f"{output_dir}/edges_{file_suffix}.metta", "w")
+                    file_handles[file_key].write("\n".join(file_lines) + "\n")
+
+        finally:
+            for fh in file_handles.values():
+                try:
+                    fh.write("\n")
+                    fh.close()
+                except Exception:
+                    pass
+
+        return self.edge_freq
+
     def write_node(self, node):
         id, label, properties = node
         # Determine if this is an ontology term label
@@ -295,6 +432,9 @@ class MeTTaWriter(BaseWriter):
 
     def write_edge(self, edge):
         source_id, target_id, label, properties = edge
+        return self.write_property(self.edge_definition(source_id, target_id, label), properties)
+
+    def edge_definition(self, source_id, target_id, label):
         source_id_processed = source_id
         target_id_processed = target_id
         label = label.lower()
@@ -363,7 +503,7 @@ class MeTTaWriter(BaseWriter):
         else:
             def_out = f"({label_to_use} ({source_type} {source_id_processed}) ({target_type} {target_id_processed}))"
 
-        return self.write_property(def_out, properties)
+        return def_out
 
     def write_property(self, def_out, property):
         out_str = [def_out]
@@ -2,17 +2,16 @@
 Knowledge graph generation through BioCypher script
 """
 
+import os
 from datetime import date
 from pathlib import Path
 
 from biocypher import BioCypher
-from biocypher_metta.metta_writer import *
-from biocypher_metta.prolog_writer import PrologWriter
-from biocypher_metta.neo4j_csv_writer import *
-from biocypher_metta.kgx_writer import *
-from biocypher_metta.parquet_writer import ParquetWriter
-from biocypher_metta.networkx_writer import NetworkXWriter
 from biocypher_metta.processors import DBSNPProcessor
+from biocypher_metta.adapters.ontology_store import ontology_store
+from biocypher_metta.adapters.sampling import RecordSampler, SampleFilter
+from biocypher_metta.adapters.output_cache import AdapterOutputCache
+from biocypher_metta.adapters.row_errors import row_errors
 from biocypher._logger import logger
 import typer
 import yaml
@@ -49,21 +48,26 @@ def load_species_config(config_path: str = "config/species_config.yaml") -> dict
         raise typer.Exit(1)
 
 
-# Function to choose the writer class based on user input
+# Function to choose the writer class based on user input. Writers are imported here, so that
+# a build only imports the one it writes with (and its dependencies, e.g. rdflib, pyarrow).
 def get_writer(writer_type: str, output_dir: Path, schema_config_path: Path):
     if writer_type.lower() == 'metta':
+        from biocypher_metta.metta_writer import MeTTaWriter
         return MeTTaWriter(schema_config=str(schema_config_path),
                            biocypher_config="config/biocypher_config.yaml",
                            output_dir=output_dir)
     elif writer_type.lower() == 'prolog':
+        from biocypher_metta.prolog_writer import PrologWriter
         return PrologWriter(schema_config=str(schema_config_path), 
                             biocypher_config="config/biocypher_config.yaml",
                             output_dir=output_dir)
     elif writer_type.lower() == 'neo4j':
+        from biocypher_metta.neo4j_csv_writer import Neo4jCSVWriter
         return Neo4jCSVWriter(schema_config=str(schema_config_path), 
                                biocypher_config="config/biocypher_config.yaml",
                                output_dir=output_dir)
     elif writer_type.lower() == 'parquet':
+        from biocypher_metta.parquet_writer import ParquetWriter
         return ParquetWriter(
             schema_config=str(schema_config_path), 
             biocypher_config="config/biocypher_config.yaml",
@@ -72,10 +76,12 @@ def get_writer(writer_type: str, output_dir: Path, schema_config_path: Path):
             overwrite=True
         )
     elif writer_type.lower() == 'kgx':
+        from biocypher_metta.kgx_writer import KGXWriter
         return KGXWriter(schema_config=str(schema_config_path),
                           biocypher_config="config/biocypher_config.yaml",
                           output_dir=output_dir)
     elif writer_type.lower() == 'networkx':
+        from biocypher_metta.networkx_writer import NetworkXWriter
         return NetworkXWriter(
             schema_config=str(schema_config_path),
             biocypher_config="config/biocypher_config.yaml",
@@ -211,6 +217,8 @@ def process_adapters(
     add_provenance,
     schema_dict,
     checkpoint_manager: Optional[CheckpointManager] = None,
+    sampler: Optional[RecordSampler] = None,
+    output_cache: Optional[AdapterOutputCache] = None,
 ):
     """
     Iterate over all adapters, write nodes/edges, and accumulate statistics.
@@ -222,6 +230,26 @@ def process_adapters(
     - If an adapter raises an exception the checkpoint is saved with the
       failing adapter name before re-raising, so the user can fix the data
       and resume without losing prior progress.
+
+    When a RecordSampler is provided, it is handed to every adapter, and the
+    adapters that support sampling keep only the records of sampled entities.
+    Every stream also goes through a SampleFilter, which drops the nodes of
+    sampled types that are not in the sample and the edges pointing to them.
+
+    When an AdapterOutputCache is provided, the node and edge streams of each
+    adapter are recorded while they are written, and an adapter whose streams
+    are already cached is replayed from them without being constructed, with
+    the row errors of the run that cached them. Adapters the cache gives no
+    key (AdapterOutputCache.key()) are run and not cached.
+
+    Adapters that build columnar batches (Adapter.yields_batches()) are
+    written through writer.write_node_batches()/write_edge_batches().
+
+    The records of ontology adapters configured with emit_diff go through
+    their emit_changes(), which writes the changes since the previous release.
+
+    The rows adapters skip are counted per adapter in row_errors, which is
+    cleared first and summarized at the end.
     """
     # ------------------------------------------------------------------
     # Restore accumulators from a previous partial run (if any)
@@ -244,6 +272,8 @@ def process_adapters(
     completed_adapters: list = list(
         checkpoint_manager.completed_adapters if checkpoint_manager else []
     )
+    row_errors.clear()
+    sample_filter = SampleFilter(sampler, schema_dict) if sampler is not None and sampler.rate < 1 else None
 
     for c in adapters_dict:
         # ── Skip already-completed adapters ─────────────────────────
@@ -253,6 +283,7 @@ def process_adapters(
 
         writer.clear_counts()
         logger.info(f"Running adapter: {c}")
+        row_errors.adapter = c
 
         adapter_config = adapters_dict[c]["adapter"]
         adapter_module = importlib.import_module(adapter_config["module"])
@@ -266,14 +297,31 @@ def process_adapters(
         ctr_args["write_properties"] = write_properties
         ctr_args["add_provenance"] = add_provenance
 
-        adapter = adapter_cls(**ctr_args)
         write_nodes = adapters_dict[c]["nodes"]
         write_edges = adapters_dict[c]["edges"]
         outdir = adapters_dict[c]["outdir"]
 
-        dataset_name = getattr(adapter, 'source', None)
-        version = getattr(adapter, 'version', None)
-        source_url = getattr(adapter, 'source_url', None)
+        cached = cache_key = None
+        if output_cache is not None:
+            cache_key = output_cache.key(adapter_config, ctr_args, sampler)
+        if cache_key is not None:
+            streams = [stream for stream, wanted in (("nodes", write_nodes), ("edges", write_edges)) if wanted]
+            cached = output_cache.load(c, cache_key, streams)
+
+        if cached is not None:
+            logger.info(f"Replaying adapter output from the cache: {c}")
+            metadata, replays = cached
+            row_errors.restore(metadata.get('row_errors', []))
+            dataset_name = metadata.get('source')
+            version = metadata.get('version')
+            source_url = metadata.get('source_url')
+        else:
+            adapter = adapter_cls(**ctr_args)
+            if sampler is not None:
+                adapter.sampler = sampler
+            dataset_name = getattr(adapter, 'source', None)
+            version = getattr(adapter, 'version', None)
+            source_url = getattr(adapter, 'source_url', None)
 
         if dataset_name is None:
             logger.warning(
@@ -291,10 +339,27 @@ def process_adapters(
                     "imported_on": str(date.today())
                 }
 
+        # adapters building columnar batches hand them to the writer as they are
+        batched = adapter_cls.yields_batches() and hasattr(writer, "write_node_batches")
+
         try:
             if write_nodes:
-                nodes = adapter.get_nodes()
-                freq, props = writer.write_nodes(nodes, path_prefix=outdir)
+                if cached is not None:
+                    freq, props = writer.write_nodes(replays["nodes"], path_prefix=outdir)
+                elif cache_key is None and batched:
+                    node_batches = adapter.get_node_batches()
+                    if sample_filter is not None:
+                        node_batches = sample_filter.node_batches(node_batches)
+                    freq, props = writer.write_node_batches(node_batches, path_prefix=outdir)
+                else:
+                    nodes = adapter.get_nodes()
+                    if getattr(adapter, "emit_diff", False):
+                        nodes = adapter.emit_changes(nodes)
+                    if sample_filter is not None:
+                        nodes = sample_filter.nodes(nodes)
+                    if cache_key is not None:
+                        nodes = output_cache.record(c, cache_key, "nodes", nodes)
+                    freq, props = writer.write_nodes(nodes, path_prefix=outdir)
                 for node_label in freq:
                     nodes_count[node_label] += freq[node_label]
                     if dataset_name is not None:
@@ -303,8 +368,22 @@ def process_adapters(
                     nodes_props[node_label] = nodes_props[node_label].union(props[node_label])
 
             if write_edges:
-                edges = adapter.get_edges()
-                freq = writer.write_edges(edges, path_prefix=outdir)
+                if cached is not None:
+                    freq = writer.write_edges(replays["edges"], path_prefix=outdir)
+                elif cache_key is None and batched:
+                    edge_batches = adapter.get_edge_batches()
+                    if sample_filter is not None:
+                        edge_batches = sample_filter.edge_batches(edge_batches)
+                    freq = writer.write_edge_batches(edge_batches, path_prefix=outdir)
+                else:
+                    edges = adapter.get_edges()
+                    if getattr(adapter, "emit_diff", False):
+                        edges = adapter.emit_changes(edges)
+                    if sample_filter is not None:
+                        edges = sample_filter.edges(edges)
+                    if cache_key is not None:
+                        edges = output_cache.record(c, cache_key, "edges", edges)
+                    freq = writer.write_edges(edges, path_prefix=outdir)
                 for edge_label_key in freq:
                     edges_count[edge_label_key] += freq[edge_label_key]
 
@@ -319,6 +398,9 @@ def process_adapters(
                     if dataset_name is not None:
                         datasets_dict[dataset_name]['edges'].add(output_label)
 
+            if cache_key is not None and cached is None:
+                output_cache.save_metadata(c, cache_key, adapter)
+
         except Exception as exc:
             logger.error(f"Adapter '{c}' failed: {exc}")
             # ── Save checkpoint with the failed adapter name ─────────
@@ -349,6 +431,17 @@ def process_adapters(
             )
             logger.info(f"Checkpoint updated after adapter: {c}")
 
+    row_errors.adapter = None
+    if row_errors.counts:
+        logger.warning(row_errors.summary())
+    if ontology_store.parses or ontology_store.parses_avoided:
+        logger.info(ontology_store.summary())
+    if sample_filter is not None:
+        logger.info(f"Sampled build: {sample_filter.dropped['nodes']} nodes and {sample_filter.dropped['edges']} "
+                    "edges of entities out of the sample dropped")
+    if output_cache is not None:
+        logger.info(f"Adapter output cache: {output_cache.hits} replayed, {output_cache.misses} run")
+
     return nodes_count, nodes_props, edges_count, datasets_dict
 # ────────────────────────────────────────────────────────────────────────────
 
@@ -366,6 +459,7 @@ def _write_graph_info(
         graph_info['datasets'].append(datasets_dict[ds])
 
     graph_info["dataset_count"] = len(graph_info['datasets'])
+    graph_info["row_errors"] = row_errors.report()
 
     file_path = Path(output_dir) / "graph_info.json"
     with open(file_path, "w") as f:
@@ -566,6 +660,19 @@ def main(
         help="Specific adapters to include (space-separated, default: all)",
         case_sensitive=False,
     ),
+    sample_rate: Optional[float] = typer.Option(
+        None,
+        help="Build from this fraction of the genes, variants, etc. of the full data, "
+             "selected by a hash of their ids so every adapter keeps the same ones (e.g. 0.01)"
+    ),
+    sample_seed: int = typer.Option(0, help="Seed of the --sample-rate selection"),
+    adapter_cache_dir: Optional[Path] = typer.Option(
+        None,
+        file_okay=False,
+        dir_okay=True,
+        help="Cache the node and edge streams of the adapters in this directory (Arrow IPC files) "
+             "and replay them on later builds with the same adapters and inputs"
+    ),
 
     # ── NEW: checkpoint options ─────────────────────────────────────────
     no_checkpoint: bool = typer.Option(
@@ -605,6 +712,19 @@ def main(
       --no-checkpoint   Disable checkpointing (original behaviour).
       --resume          Resume automatically without prompting.
       --restart         Delete any checkpoint and start over without prompting.
+
+    Sampled builds
+    --------------
+    --sample-rate 0.01 keeps 1% of the genes, variants, etc., chosen by a hash
+    of their ids and --sample-seed, so the same entities are kept by every
+    adapter and on every run (see biocypher_metta/adapters/sampling.py).
+
+    Adapter output cache
+    --------------------
+    --adapter-cache-dir DIR records what every adapter yields; a later build
+    (with another writer, say) replays it instead of parsing the inputs again,
+    as long as the adapter, its arguments and its input files are unchanged
+    (see biocypher_metta/adapters/output_cache.py).
     """
 
     # Determine which mode we're in
@@ -621,6 +741,15 @@ def main(
         logger.error("--output-dir is required")
         raise typer.Exit(1)
 
+    sampler = None
+    if sample_rate is not None:
+        try:
+            sampler = RecordSampler(sample_rate, sample_seed)
+        except ValueError as e:
+            logger.error(e)
+            raise typer.Exit(1)
+        logger.info(f"Sampled build: {sampler}")
+
     is_merged_schema = False
     temp_schema_to_cleanup = None
     try:
@@ -693,7 +822,7 @@ def main(
                     # ── Checkpoint setup per-species ─────────────────────
                     ckpt = _setup_checkpoint(
                         sp_output_dir,
-                        pipeline_id=f"{sp_output_dir}::{sp_adapters_config}",
+                        pipeline_id=_pipeline_id(sp_output_dir, sp_adapters_config, sampler),
                         no_checkpoint=no_checkpoint,
                         resume=resume,
                     )
@@ -702,6 +831,8 @@ def main(
                         sp_adapters_dict, sp_dbsnp_rsids_dict, sp_dbsnp_pos_dict, bc,
                         write_properties, add_provenance, schema_dict,
                         checkpoint_manager=ckpt,
+                        sampler=sampler,
+                        output_cache=_output_cache(adapter_cache_dir, sp_dbsnp_cache_dir),
                     )
 
 
@@ -810,7 +941,7 @@ def main(
         output_dir.mkdir(parents=True, exist_ok=True)
         ckpt = _setup_checkpoint(
             output_dir,
-            pipeline_id=f"{output_dir}::{adapters_config}",
+            pipeline_id=_pipeline_id(output_dir, adapters_config, sampler),
             no_checkpoint=no_checkpoint,
             resume=resume,
         )
@@ -820,6 +951,8 @@ def main(
             adapters_dict, dbsnp_rsids_dict, dbsnp_pos_dict, bc,
             write_properties, add_provenance, schema_dict,
             checkpoint_manager=ckpt,
+            sampler=sampler,
+            output_cache=_output_cache(adapter_cache_dir, dbsnp_cache_dir),
         )
 
         if writer_type == 'networkx':
@@ -846,6 +979,26 @@ def main(
         if is_merged_schema and temp_schema_to_cleanup is not None:
             delete_temp_schema(temp_schema_to_cleanup)
 
+def _output_cache(cache_dir, dbsnp_cache_dir) -> Optional[AdapterOutputCache]:
+    """AdapterOutputCache in cache_dir, or None if the adapter output is not cached."""
+    if cache_dir is None:
+        return None
+    # the dbSNP maps are handed to adapters by the build: they are known by the files they come from
+    dbsnp_mapping = str(Path(dbsnp_cache_dir) / 'dbsnp_mapping.pkl') if dbsnp_cache_dir else None
+    return AdapterOutputCache(
+        str(cache_dir),
+        shared_inputs={'dbsnp_rsid_map': dbsnp_mapping, 'dbsnp_pos_map': dbsnp_mapping},
+    )
+
+
+def _pipeline_id(output_dir, adapters_config, sampler) -> str:
+    """Checkpoint pipeline id: a sampled build does not resume a different one."""
+    pipeline_id = f"{output_dir}::{adapters_config}"
+    if sampler is not None:
+        pipeline_id += f"::sample={sampler.rate},seed={sampler.seed}"
+    return pipeline_id
+
+
 # ── Helper: create and configure a CheckpointManager ────────────────────────
 def _setup_checkpoint(
     output_dir: Path,
@@ -0,0 +1,72 @@
+"""
+Compare writing an adapter record by record with writing its columnar batches.
+
+Tiles the GTEx eQTL sample --repeat times, then times the MeTTa writer writing the edges of
+the GTEx adapter through get_edges()/write_edges() and through
+get_edge_batches()/write_edge_batches(), and checks that both write the same files.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_adapter_batches.py --repeat 2000
+"""
+
+import argparse
+import filecmp
+import gzip
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from biocypher_metta.adapters.hsa.gtex_eqtl_adapter import GTExEQTLAdapter
+from biocypher_metta.metta_writer import MeTTaWriter
+from create_knowledge_graph import delete_temp_schema, merge_schemas
+
+SAMPLE = 'samples/hsa/gtex.forgedb.sample.csv.gz'
+TISSUE_MAP = 'aux_files/hsa/gtex_tissues_to_ontology_map.pkl'
+
+
+def timed(label, fn, records):
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28} {elapsed:8.3f}s  {records / elapsed:12,.0f} edges/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=1000, help='Times the sample records are repeated')
+    args = parser.parse_args()
+
+    with gzip.open(SAMPLE, 'rt') as f:
+        header, *sample = f.readlines()
+
+    schema = merge_schemas('config/primer_schema_config.yaml', 'config/hsa/hsa_schema_config.yaml')
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            filepath = str(Path(tmp) / 'gtex.forgedb.csv.gz')
+            with gzip.open(filepath, 'wt', compresslevel=1) as f:
+                f.write(header)
+                for _ in range(args.repeat):
+                    f.writelines(sample)
+            records = len(sample) * args.repeat
+
+            adapter = GTExEQTLAdapter(filepath, TISSUE_MAP, True, True, 'gtex_variant_gene')
+            output_dirs = []
+            for label, write in (("records", lambda w: w.write_edges(adapter.get_edges(), path_prefix='out')),
+                                 ("batches", lambda w: w.write_edge_batches(adapter.get_edge_batches(),
+                                                                            path_prefix='out'))):
+                writer = MeTTaWriter(schema_config=str(schema), biocypher_config='config/biocypher_config.yaml',
+                                     output_dir=str(Path(tmp) / label))
+                timed(f"write {label}", lambda: write(writer), records)
+                output_dirs.append(str(Path(tmp) / label / 'out'))
+
+            files = sorted(os.listdir(output_dirs[0]))
+            _, mismatch, errors = filecmp.cmpfiles(*output_dirs, files, shallow=False)
+            assert not mismatch and not errors
+    finally:
+        delete_temp_schema(schema)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Per-call cost of the assembly_check decorator of biocypher_metta.adapters.helpers.
+
+Times build_variant_id() and build_regulatory_region_id() wrapped by the former
+decorator (getfullargspec() on every call), by the current one, and through the
+unvalidated `.trusted` builders.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_assembly_check.py --calls 200000
+"""
+
+import argparse
+import timeit
+from inspect import getfullargspec
+
+from biocypher_metta.adapters.helpers import ALLOWED_ASSEMBLIES, build_regulatory_region_id, build_variant_id
+
+
+def legacy_assembly_check(id_builder):
+    # the former decorator
+    def wrapper(*args, **kwargs):
+        argspec = getfullargspec(id_builder)
+
+        if 'assembly' in argspec.args:
+            assembly_index = argspec.args.index('assembly')
+            if assembly_index >= len(args):
+                pass
+            elif args[assembly_index] not in ALLOWED_ASSEMBLIES:
+                raise ValueError('Assembly not supported')
+        return id_builder(*args, *kwargs)
+
+    return wrapper
+
+
+def per_call(fn, args, calls):
+    return min(timeit.repeat(lambda: fn(*args), number=calls, repeat=3)) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200000, help='Calls per timing')
+    args = parser.parse_args()
+
+    for builder, call_args in ((build_variant_id, ('chr1', 12345, 'A', 'T')),
+                               (build_variant_id, ('chr1', 12345, 'A', 'T', 'GRCh38')),
+                               (build_regulatory_region_id, ('chr1', 12345, 13345))):
+        label = f"{builder.__name__}({len(call_args)} args)"
+        legacy = legacy_assembly_check(builder.trusted)
+        assert legacy(*call_args) == builder(*call_args) == builder.trusted(*call_args)
+        print(f"{label:<34} before {per_call(legacy, call_args, args.calls):7.0f} ns"
+              f"  after {per_call(builder, call_args, args.calls):7.0f} ns"
+              f"  trusted {per_call(builder.trusted, call_args, args.calls):7.0f} ns")
+
+
+if __name__ == '__main__':
+    main()
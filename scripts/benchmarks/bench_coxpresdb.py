@@ -0,0 +1,74 @@
+"""
+Benchmark CoxpresdbAdapter on a directory of synthetic gene files.
+
+Copies the hsa sample gene files under --genes mapped entrez ids and times the former
+line-by-line parser against the NumPy path with 1 and --workers processes, with and
+without a top-k selection.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_coxpresdb.py --genes 2000 --workers 8 --top-k 100
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from biocypher_metta.adapters.coxpresdb_adapter import CoxpresdbAdapter
+from biocypher_metta.processors import EntrezEnsemblProcessor
+
+SAMPLE_DIR = 'samples/hsa/coxpressdb'
+
+
+def legacy_edges(directory, entrez_ensembl_dict, label='coexpressed_with'):
+    # the former CoxpresdbAdapter.get_edges() loop
+    for gene_id in sorted(os.listdir(directory), key=int):
+        ensembl_id = entrez_ensembl_dict.get(gene_id)
+        if ensembl_id:
+            with open(os.path.join(directory, gene_id), 'r') as input:
+                for line in input:
+                    (co_entrez_id, score) = line.strip().split()
+                    co_ensembl_id = entrez_ensembl_dict.get(co_entrez_id)
+                    if co_ensembl_id:
+                        yield f"ENSEMBL:{ensembl_id}", f"ENSEMBL:{co_ensembl_id}", label, {'taxon_id': '9606', 'score': float(score)}
+
+
+def timed(label, edges):
+    t0 = time.perf_counter()
+    n = sum(1 for _ in edges)
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<32} {elapsed:8.3f}s  {n / elapsed:12,.0f} edges/s  ({n} edges)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--genes', type=int, default=500, help='Number of gene files')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes of the parallel run')
+    parser.add_argument('--top-k', type=int, default=100, help='top_k of the top-k run')
+    args = parser.parse_args()
+
+    processor = EntrezEnsemblProcessor()
+    processor.load_or_update()
+    entrez_ensembl_dict = processor.entrez_to_ensembl
+    samples = sorted(Path(SAMPLE_DIR).iterdir())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gene_ids = [entrez_id for entrez_id, ensembl_id in entrez_ensembl_dict.items() if entrez_id.isdigit() and ensembl_id]
+        for i, gene_id in enumerate(gene_ids[:args.genes]):
+            shutil.copyfile(samples[i % len(samples)], Path(tmp) / gene_id)
+
+        def adapter(**kwargs):
+            return CoxpresdbAdapter(tmp, write_properties=True, add_provenance=False,
+                                    entrez_ensembl_processor=processor, **kwargs)
+
+        timed("line by line", legacy_edges(tmp, entrez_ensembl_dict))
+        timed("numpy, 1 process", adapter(workers=1).get_edges())
+        timed(f"numpy, {args.workers} processes", adapter(workers=args.workers).get_edges())
+        timed(f"numpy, {args.workers} processes, top {args.top_k}",
+              adapter(workers=args.workers, top_k=args.top_k).get_edges())
+
+
+if __name__ == '__main__':
+    main()
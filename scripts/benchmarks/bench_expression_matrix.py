@@ -0,0 +1,89 @@
+"""
+Compare ExpressionValueAdapter's row path with its expression-matrix path.
+
+Runs both paths over the dmel sample high-throughput and AFCA tables, optionally
+tiled --repeat times with renamed genes to get closer to the full FlyBase tables, and
+reports wall time, peak traced memory and edges per second. Edges are read through
+get_edge_batches(), as process_adapters() reads them for writers that take batches
+(the matrix path builds its batches column by column, the row path groups its edges). AFCA symbols are resolved
+against an in-memory SQLite stand-in for chado, so no network access is needed.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_expression_matrix.py --repeat 200
+"""
+
+import argparse
+import gzip
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from biocypher_metta.adapters.dmel.expression_value_adapter import ExpressionValueAdapter
+from biocypher_metta.adapters.dmel.flybase_chado import FlybaseChado, create_sqlite_chado
+
+HIGH_THROUGHPUT = 'samples/dmel/flybase/high-throughput_gene_expression_fb_2024_02.tsv.gz'
+AFCA = 'samples/dmel/afca/afca_afca_annotation_group_by_mean.tsv.gz'
+FBGN_TABLE = 'aux_files/dmel/fbgn_fbtr_fbpp_expanded_fb_2024_02.tsv.gz'
+
+
+def tile(src, dst, repeat, gene_column):
+    """Writes `src` with its data rows repeated `repeat` times, renaming the gene of every copy."""
+    with gzip.open(src, 'rt') as f:
+        lines = f.readlines()
+    header = [line for line in lines if line.startswith('#')]
+    rows = [line.rstrip('\n').split('\t') for line in lines if not line.startswith('#') and line.strip()]
+    genes = set()
+    with gzip.open(dst, 'wt') as f:
+        f.writelines(header)
+        for copy in range(repeat):
+            for row in rows:
+                row = list(row)
+                row[gene_column] = f'{row[gene_column]}_{copy}' if copy else row[gene_column]
+                genes.add(row[gene_column])
+                f.write('\t'.join(row) + '\n')
+    return genes
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    edges = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {elapsed:8.3f}s  peak {peak / 2**20:8.1f} MiB  {edges / elapsed:12,.0f} edges/s  ({edges} edges)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=1, help='Times the sample rows are repeated')
+    parser.add_argument('--min-value', type=float, default=1.0,
+                        help='min_expression_value of an extra matrix run (the row path has no threshold)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        high_throughput = str(Path(tmp) / 'high-throughput_gene_expression_fb_2024_02.tsv.gz')
+        afca = str(Path(tmp) / 'afca_afca_annotation_group_by_mean.tsv.gz')
+        tile(HIGH_THROUGHPUT, high_throughput, args.repeat, gene_column=5)
+        afca_genes = tile(AFCA, afca, args.repeat, gene_column=0)
+
+        chado = create_sqlite_chado()
+        chado.executemany('INSERT INTO feature (uniquename, name, is_obsolete) VALUES (?, ?, 0)',
+                          [(f'FBgn{i:07d}', symbol) for i, symbol in enumerate(sorted(afca_genes))])
+
+        for file_path in (high_throughput, afca):
+            for expression_matrix, min_value in ((False, None), (True, None), (True, args.min_value)):
+                # the row path of the AFCA branch relies on props left over from a previous file
+                adapter = ExpressionValueAdapter(True, False, [HIGH_THROUGHPUT, file_path], [FBGN_TABLE],
+                                                 expression_matrix=expression_matrix,
+                                                 min_expression_value=min_value)
+                adapter.chado = FlybaseChado(connection=chado)
+                label = f"{Path(file_path).name.split('_')[0]} {'matrix' if expression_matrix else 'rows'}"
+                if min_value is not None:
+                    label += f' >= {min_value:g}'
+                measure(label, lambda: sum(len(batch['source']) for batch in adapter.get_edge_batches()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark gene symbol lookups against a SQLite stand-in for FlyBase chado.
+
+Compares the previous per-symbol queries of ExpressionValueAdapter.get_fbgn_from_flybase
+(up to three statements per symbol) with FlybaseChado's chunked `= ANY` queries, cold and
+with the per-release SQLite cache warm. --latency-ms adds a delay per round-trip to mimic
+the remote chado server.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_flybase_chado.py --symbols 5000 --latency-ms 20
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from biocypher_metta.adapters.dmel.flybase_chado import FlybaseChado, create_sqlite_chado
+
+
+class LatencyConnection:
+    """Wraps a sqlite3 connection, sleeping on every statement like a remote server would."""
+    def __init__(self, conn, latency):
+        self.conn = conn
+        self.latency = latency
+        self.round_trips = 0
+
+    def execute(self, sql, params=()):
+        self.round_trips += 1
+        time.sleep(self.latency)
+        return self.conn.execute(sql, params)
+
+
+def build_fixture(path, n_symbols):
+    conn = create_sqlite_chado(path)
+    features = []
+    synonyms = []
+    feature_synonyms = []
+    for i in range(n_symbols):
+        if i % 10 == 0:     # a tenth only resolves through a synonym
+            features.append((i, f'FBgn{i:07d}', f'CG{i}', 0))
+            synonyms.append((i, f'gene{i}'))
+            feature_synonyms.append((i, i))
+        else:
+            features.append((i, f'FBgn{i:07d}', f'gene{i}', 0))
+    conn.executemany('INSERT INTO feature (feature_id, uniquename, name, is_obsolete) VALUES (?, ?, ?, ?)', features)
+    conn.executemany('INSERT INTO synonym VALUES (?, ?)', synonyms)
+    conn.executemany('INSERT INTO feature_synonym VALUES (?, ?)', feature_synonyms)
+    conn.commit()
+    return conn
+
+
+def legacy_lookup(conn, gene_symbol):
+    # the former get_fbgn_from_flybase() queries
+    for gene_data in conn.execute(f"SELECT uniquename, name, is_obsolete FROM feature WHERE feature.name LIKE '{gene_symbol}';").fetchall():
+        if not gene_data[-1]:
+            return gene_data[0]
+    for gene_data in conn.execute(f"SELECT uniquename, name, is_obsolete FROM feature WHERE feature.name LIKE '{gene_symbol}:1';").fetchall():
+        if not gene_data[-1]:
+            return gene_data[0].split(':')[0]
+    for res in set(conn.execute(f"SELECT synonym.synonym_id FROM synonym WHERE synonym.name LIKE '{gene_symbol}';").fetchall()):
+        for result in set(conn.execute(f"SELECT feature_id FROM feature_synonym WHERE synonym_id={res[0]};").fetchall()):
+            for feature in conn.execute(f"SELECT uniquename, is_obsolete FROM feature WHERE feature_id={result[0]};").fetchall():
+                if not feature[-1]:
+                    return feature[0]
+    return None
+
+
+def with_latency(query, latency):
+    def delayed(sql, params):
+        time.sleep(latency)
+        return query(sql, params)
+    return delayed
+
+
+def timed(label, fn, round_trips):
+    t0 = time.perf_counter()
+    result = fn()
+    print(f"{label:<30} {time.perf_counter() - t0:8.3f}s  {round_trips():6d} round-trips")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=5000, help='Number of gene symbols to resolve')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Simulated delay per round-trip')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_fixture(str(Path(tmp) / 'chado.sqlite'), args.symbols)
+        symbols = [f'gene{i}' for i in range(args.symbols)]
+        latency = args.latency_ms / 1000
+
+        legacy_conn = LatencyConnection(conn, latency)
+        legacy = timed("per-symbol queries", lambda: {s: legacy_lookup(legacy_conn, s) for s in symbols},
+                       lambda: legacy_conn.round_trips)
+
+        cache_path = str(Path(tmp) / 'chado_cache.sqlite')
+        cold = FlybaseChado(release='bench', cache_path=cache_path, connection=conn)
+        cold._query = with_latency(cold._query, latency)
+        batched = timed("batched (cold cache)", lambda: cold.resolve_gene_symbols(symbols),
+                        lambda: cold.round_trips)
+
+        warm = FlybaseChado(release='bench', cache_path=cache_path, connection=conn)
+        timed("batched (warm release cache)", lambda: warm.resolve_gene_symbols(symbols),
+              lambda: warm.round_trips)
+
+        assert batched == legacy, "batched lookups differ from the per-symbol ones"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark reading a FlyBase precomputed table into memory versus streaming it.
+
+Compares FlybasePrecomputedTable (every row and column kept as strings) with
+FlybaseTsvStream projecting the four columns the RPKM branch of
+ExpressionValueAdapter uses, reporting time and peak traced memory.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_flybase_tsv.py --tsv gene_rpkm_report_fb_2024_02.tsv.gz
+    PYTHONPATH=. python scripts/benchmarks/bench_flybase_tsv.py --rows 500000   # synthetic RPKM report
+"""
+
+import argparse
+import gzip
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from biocypher_metta.adapters.dmel.flybase_tsv_reader import FlybasePrecomputedTable, FlybaseTsvStream
+
+RPKM_HEADER = ("## FlyBase RNA-Seq RPKM report\n"
+               "##Release_ID\tFBgn#\tGeneSymbol\tParent_library_FBlc#\tParent_library_name\tRNASource_FBlc#\t"
+               "RNASource_name\tRPKM_value\tBin_value\tUnique_exon_base_count\tTotal_exon_base_count\tCount_used\n")
+RPKM_ROW = ("Dmel_R6.59\tFBgn{gene:07d}\tCG{gene}\tFBlc0000060\tBCM_1_RNAseq\tFBlc{library:07d}\t"
+            "BCM_1_library_{library}\t{rpkm}\t{bin}\t11791\t11791\tUnique\n")
+COLUMNS = ['FBgn#', 'RNASource_FBlc#', 'RPKM_value', 'Bin_value']
+
+
+def write_synthetic_rpkm(path, n_rows):
+    with gzip.open(path, 'wt') as f:
+        f.write(RPKM_HEADER)
+        for i in range(n_rows):
+            f.write(RPKM_ROW.format(gene=i // 100, library=i % 100, rpkm=i % 997, bin=i % 8))
+        f.write("## Finished RPKM report.\n")
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<45} {elapsed:8.3f}s  peak {peak / 2**20:9.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tsv', help='Path to a gene_rpkm_report_fb_*.tsv.gz file')
+    parser.add_argument('--rows', type=int, default=500000, help='Number of rows in the synthetic report')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tsv_path = args.tsv
+        if tsv_path is None:
+            tsv_path = str(Path(tmp) / 'gene_rpkm_report_fb_2024_02.tsv.gz')
+            write_synthetic_rpkm(tsv_path, args.rows)
+
+        def in_memory():
+            table = FlybasePrecomputedTable(tsv_path)
+            return sum(1 for _ in table.get_rows())
+
+        def streamed():
+            return sum(1 for _ in FlybaseTsvStream(tsv_path, columns=COLUMNS))
+
+        def streamed_chunks():
+            return sum(len(chunk) for chunk in FlybaseTsvStream(tsv_path, columns=COLUMNS,
+                                                                converters={'RPKM_value': int}).iter_chunks())
+
+        rows = measure("FlybasePrecomputedTable (all columns)", in_memory)
+        measure("FlybaseTsvStream (4 columns)", streamed)
+        measure("FlybaseTsvStream.iter_chunks (4 columns, typed)", streamed_chunks)
+        print(f"rows: {rows}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare the line-by-line GTF parsing of the GENCODE adapters with the columnar GTF reader.
+
+Tiles the (tab-separated records of the) GENCODE sample --repeat times, then times the exon
+node adapter as it parsed the file before (every line split in Python, the attributes of
+every exon parsed into a dict), read_gtf() alone, and the adapter on read_gtf(), and checks
+that both adapters yield the same nodes.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_gtf_reader.py --repeat 1000
+"""
+
+import argparse
+import gzip
+import tempfile
+import time
+from pathlib import Path
+
+from biocypher_metta.adapters.gencode_exon_adapter import GencodeExonAdapter
+from biocypher_metta.adapters.gtf_reader import read_gtf
+
+SAMPLE = 'samples/hsa/gencode_sample.gtf.gz'
+ALLOWED_KEYS = ['gene_id', 'transcript_id', 'transcript_type', 'transcript_biotype', 'transcript_name', 'exon_number',
+                'exon_id']
+
+
+def legacy_nodes(filepath):
+    """GencodeExonAdapter.get_nodes() with write_properties and add_provenance, as it was."""
+    with gzip.open(filepath, 'rt') as input:
+        for line in input:
+            if line.startswith('#'):
+                continue
+            split_line = line.strip().split()
+            if split_line[2] != 'exon':
+                continue
+            info = {}
+            for key, value in zip(split_line[8:], split_line[9:]):
+                if key in ALLOWED_KEYS:
+                    info[key] = value.replace('"', '').replace(';', '')
+            gene_id = f"ENSEMBL:{info['gene_id'].split('.')[0].upper()}"
+            if info['gene_id'].endswith('PAR_Y'):
+                gene_id = gene_id + '_PAR_Y'
+            transcript_id = f"ENSEMBL:{info['transcript_id'].split('.')[0].upper()}"
+            if info['transcript_id'].endswith('_PAR_Y'):
+                transcript_id = transcript_id + '_PAR_Y'
+            exon_id = f"ENSEMBL:{info['exon_id'].split('.')[0].upper()}"
+            if info['exon_id'].endswith('_PAR_Y'):
+                exon_id = exon_id + '_PAR_Y'
+            props = {
+                'gene_id': gene_id,
+                'transcript_id': transcript_id,
+                'chr': split_line[0],
+                'start': int(split_line[3]),
+                'end': int(split_line[4]),
+                'exon_number': int(info.get('exon_number', -1)),
+                'exon_id': f"{info['exon_id'].split('.')[0].upper()}",
+                'source': 'GENCODE',
+                'source_url': 'https://www.gencodegenes.org/',
+            }
+            yield exon_id, 'exon', props
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28} {elapsed:8.3f}s  {len(result) / elapsed:12,.0f} exons/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=500, help='Times the sample records are repeated')
+    args = parser.parse_args()
+
+    with gzip.open(SAMPLE, 'rt') as f:
+        sample = [line for line in f if not line.startswith('#') and '\t' in line]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = str(Path(tmp) / 'gencode.v49.annotation.gtf.gz')
+        with gzip.open(filepath, 'wt') as f:
+            for _ in range(args.repeat):
+                f.writelines(sample)
+        adapter = GencodeExonAdapter(True, True, 'exon', 9606, 'exon', filepath=filepath)
+
+        legacy = timed("line by line", lambda: list(legacy_nodes(filepath)))
+        timed("read_gtf() only", lambda: [exon_id for chunk in read_gtf(filepath, ['exon'], GencodeExonAdapter.ALLOWED_KEYS)
+                                          for exon_id in chunk['exon_id']])
+        nodes = timed("adapter on read_gtf()", lambda: list(adapter.get_nodes()))
+        assert nodes == legacy
+
+
+if __name__ == '__main__':
+    main()
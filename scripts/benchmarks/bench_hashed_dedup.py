@@ -0,0 +1,74 @@
+"""
+Compare a Python set of edge tuples with HashedKeySet for GAFAdapter-style deduplication.
+
+Builds --edges (protein, GO term, label) keys the way GAFAdapter does, a fresh tuple per
+annotation with about --duplicates of them repeated, and reports the time to deduplicate
+them and the memory held by the seen-edges structure afterwards.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_hashed_dedup.py --edges 5000000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from biocypher_metta.adapters.hashed_key_set import HashedKeySet
+
+
+def annotations(n_edges, duplicates, seed=0):
+    rng = random.Random(seed)
+    n_distinct = int(n_edges * (1 - duplicates))
+    for _ in range(n_edges):
+        i = rng.randrange(n_distinct)
+        yield (("protein", f"UniProt:P{i // 20:06d}"), ("biological_process", f"GO:{i % 20 + 1000 * (i % 7):07d}"),
+               "biological_process_gene_product")
+
+
+def deduplicate(seen, n_edges, duplicates):
+    new = 0
+    if isinstance(seen, set):
+        for edge in annotations(n_edges, duplicates):
+            if edge in seen:
+                continue
+            seen.add(edge)
+            new += 1
+    else:
+        for edge in annotations(n_edges, duplicates):
+            if seen.insert(edge):
+                new += 1
+    return new
+
+
+def measure(label, make_seen, n_edges, duplicates):
+    # timed and traced separately: tracemalloc slows every allocation down
+    t0 = time.perf_counter()
+    new = deduplicate(make_seen(), n_edges, duplicates)
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    seen = make_seen()
+    deduplicate(seen, n_edges, duplicates)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<26} {elapsed:8.3f}s  {n_edges / elapsed:12,.0f} edges/s  held {held / 2**20:8.1f} MiB  ({new} distinct)")
+    return new
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--edges', type=int, default=1000000, help='Number of annotations')
+    parser.add_argument('--duplicates', type=float, default=0.3, help='Fraction of repeated annotations')
+    args = parser.parse_args()
+
+    counts = [
+        measure("set of tuples", set, args.edges, args.duplicates),
+        measure("HashedKeySet 64-bit", HashedKeySet, args.edges, args.duplicates),
+        measure("HashedKeySet 128-bit", lambda: HashedKeySet(hash_bits=128), args.edges, args.duplicates),
+    ]
+    assert len(set(counts)) == 1, "hashed deduplication kept a different number of edges"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare the per-chromosome nested loop of the structural variant adapters with the interval
+joins of biocypher_metta.adapters.helpers.
+
+Draws --features short features (genes, promoters, ncRNAs: up to 5 kb) and --variants
+structural variants (log-uniform lengths, 10 b to 3 Mb) on 24 chromosomes, then times
+finding the overlapping pairs with the loop the dbVar and DGV adapters ran (every feature
+against every variant of its chromosome) and with overlap_join(), checks that they find the
+same pairs, and times window_join() and nearest_join() on the same intervals.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_interval_join.py --features 200000 --variants 20000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from biocypher_metta.adapters.helpers import nearest_join, overlap_join, window_join
+
+CHROMOSOME_LENGTH = 100_000_000
+
+
+def naive_overlaps(feat_chr, feat_start, feat_end, sv_chr, sv_start, sv_end):
+    svs = {}
+    for j, (chr, start, end) in enumerate(zip(sv_chr, sv_start, sv_end)):
+        svs.setdefault(chr, []).append((j, start, end))
+    pairs = []
+    for i, (chr, start, end) in enumerate(zip(feat_chr, feat_start, feat_end)):
+        for j, sv_s, sv_e in svs.get(chr, ()):
+            if max(start, sv_s) <= min(end, sv_e):
+                pairs.append((i, j))
+    return pairs
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    print(f"{label:<28} {time.perf_counter() - t0:8.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--features', type=int, default=100000, help='Number of features (queries)')
+    parser.add_argument('--variants', type=int, default=10000, help='Number of structural variants (references)')
+    parser.add_argument('--distance', type=int, default=10000, help='Distance of the window join')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    chromosomes = np.array([f'chr{i}' for i in range(1, 23)] + ['chrX', 'chrY'], dtype=object)
+    feat_chr = chromosomes[rng.integers(0, len(chromosomes), args.features)].tolist()
+    feat_start = rng.integers(1, CHROMOSOME_LENGTH, args.features)
+    feat_end = feat_start + rng.integers(0, 5000, args.features)
+    sv_chr = chromosomes[rng.integers(0, len(chromosomes), args.variants)].tolist()
+    sv_start = rng.integers(1, CHROMOSOME_LENGTH, args.variants)
+    sv_end = sv_start + (10 ** rng.uniform(1, 6.5, args.variants)).astype(np.int64)
+
+    naive = timed("nested loop", lambda: naive_overlaps(feat_chr, feat_start.tolist(), feat_end.tolist(),
+                                                        sv_chr, sv_start.tolist(), sv_end.tolist()))
+    feat_index, sv_index = timed("overlap_join()", lambda: overlap_join(feat_chr, feat_start, feat_end,
+                                                                      sv_chr, sv_start, sv_end))
+    assert list(zip(feat_index.tolist(), sv_index.tolist())) == naive
+    print(f"{len(naive):,} overlapping pairs")
+    timed(f"window_join(), {args.distance} b", lambda: window_join(feat_chr, feat_start, feat_end,
+                                                                  sv_chr, sv_start, sv_end, args.distance))
+    timed("nearest_join()", lambda: nearest_join(feat_chr, feat_start, feat_end, sv_chr, sv_start, sv_end))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Compare convert_genome_reference with the batch convert_genome_references.
+
+Writes a synthetic hg19ToHg38 chain file (--blocks aligned blocks per chromosome, some chains
+overlapping and on the reverse strand), then lifts --coordinates random coordinates one at a
+time and in one batch, without and with the on-disk memo, and checks that all agree. No
+network access is needed: the lifters are built from the synthetic chain file.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_liftover.py --coordinates 1000000
+"""
+
+import argparse
+import gzip
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from liftover import ChainFile
+
+from biocypher_metta.adapters import helpers
+from biocypher_metta.adapters.helpers import convert_genome_reference, convert_genome_references
+from biocypher_metta.adapters.liftover_chain import ChainIntervals
+
+CHROMOSOMES = [f'chr{i}' for i in range(1, 23)] + ['chrX', 'chrY']
+CHROMOSOME_SIZE = 250_000_000
+
+
+def write_chain_file(path, blocks_per_chromosome, rng):
+    lines = []
+    chain_id = 0
+    for chrom in CHROMOSOMES:
+        target_pos = 0
+        blocks = 0
+        while target_pos < CHROMOSOME_SIZE and blocks < blocks_per_chromosome:
+            chain_id += 1
+            n_blocks = int(rng.integers(1, 200))
+            blocks += n_blocks
+            sizes = rng.integers(100, 20_000, n_blocks)
+            gaps = rng.integers(0, 2_000, (n_blocks, 2))
+            # one chain in twenty starts inside the previous one, as duplications do
+            start = target_pos - int(rng.integers(0, 50_000)) if chain_id % 20 == 0 else target_pos
+            start = max(start, 0)
+            target_end = start + int(sizes.sum() + gaps[:-1, 0].sum())
+            query_end = int(sizes.sum() + gaps[:-1, 1].sum())
+            strand = '-' if chain_id % 7 == 0 else '+'
+            lines.append(f'chain 1000 {chrom} {CHROMOSOME_SIZE} + {start} {target_end} '
+                         f'{chrom} {CHROMOSOME_SIZE} {strand} 0 {query_end} {chain_id}')
+            lines.extend(f'{size}\t{dt}\t{dq}' for size, (dt, dq) in zip(sizes[:-1].tolist(), gaps[:-1].tolist()))
+            lines.extend([str(sizes[-1]), ''])
+            target_pos = target_end + int(rng.integers(0, 10_000))
+    with gzip.open(path, 'wt') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def timed(label, fn, n=None):
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    rate = f"  {n / elapsed:12,.0f} coordinates/s" if n else ''
+    print(f"{label:<34} {elapsed:8.3f}s{rate}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--coordinates', type=int, default=1_000_000, help='Number of coordinates to lift')
+    parser.add_argument('--blocks', type=int, default=20_000, help='Approximate aligned blocks per chromosome')
+    parser.add_argument('--scalar-sample', type=int, default=200_000,
+                        help='Coordinates lifted one at a time (the rate is extrapolated to all of them)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        chain_path = str(Path(tmp) / 'hg19ToHg38.over.chain.gz')
+        write_chain_file(chain_path, args.blocks, rng)
+        lifter = timed("load chain (liftover)", lambda: ChainFile(chain_path))
+        helpers._lifters['hg19_hg38'] = lifter
+        helpers._chain_intervals['hg19_hg38'] = timed(
+            "load chain (ChainIntervals)", lambda: ChainIntervals.from_file(chain_path, lifter))
+
+        chroms = rng.choice(CHROMOSOMES, args.coordinates).tolist()
+        positions = rng.integers(0, CHROMOSOME_SIZE, args.coordinates)
+
+        sample = min(args.scalar_sample, args.coordinates)
+        scalar = timed(f"scalar ({sample} coordinates)",
+                       lambda: [convert_genome_reference(chr, pos) for chr, pos in
+                                zip(chroms[:sample], positions[:sample].tolist())], sample)
+        lifted, failed = timed("batch", lambda: convert_genome_references(chroms, positions), args.coordinates)
+        assert [None if fail else pos for pos, fail in zip(lifted[:sample].tolist(), failed[:sample].tolist())] == scalar
+
+        memo_path = str(Path(tmp) / 'liftover_memo.npz')
+        timed("batch, cold memo", lambda: convert_genome_references(chroms, positions, memo_path=memo_path),
+              args.coordinates)
+        # a warm memo answers every coordinate, the chain file is not loaded
+        helpers._lifters.clear()
+        helpers._chain_intervals.clear()
+        memo_lifted, memo_failed = timed(
+            "batch, warm memo", lambda: convert_genome_references(chroms, positions, memo_path=memo_path),
+            args.coordinates)
+        assert np.array_equal(memo_lifted, lifted) and np.array_equal(memo_failed, failed)
+        print(f"{failed.mean():.1%} of the coordinates could not be lifted")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark OntologyAdapter property caching and per-term lookups.
+
+Compares per-predicate caching (one graph query per predicate followed by a
+graph.all_nodes() scan) with the single-pass cache_node_properties(), then
+times a full get_nodes() run.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_ontology_cache.py --owl ontology_dataset_cache/efo.owl
+    PYTHONPATH=. python scripts/benchmarks/bench_ontology_cache.py --terms 20000   # synthetic GO-like ontology
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from biocypher_metta.adapters.ontologies_adapter import OntologyAdapter
+
+OWL_HEADER = """<?xml version="1.0"?>
+<rdf:RDF xmlns:owl="http://www.w3.org/2002/07/owl#"
+     xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+     xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+     xmlns:oboInOwl="http://www.geneontology.org/formats/oboInOwl#"
+     xmlns:obo="http://purl.obolibrary.org/obo/">
+    <owl:Ontology rdf:about="http://purl.obolibrary.org/obo/bench.owl"/>
+"""
+
+OWL_TERM = """    <owl:Class rdf:about="http://purl.obolibrary.org/obo/GO_{id:07d}">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/GO_{parent:07d}"/>
+        <rdfs:label>term {id}</rdfs:label>
+        <obo:IAO_0000115>Synthetic definition of term {id}.</obo:IAO_0000115>
+        <oboInOwl:hasExactSynonym>exact synonym {id}</oboInOwl:hasExactSynonym>
+        <oboInOwl:hasRelatedSynonym>related synonym {id}</oboInOwl:hasRelatedSynonym>
+        <oboInOwl:hasOBONamespace>biological_process</oboInOwl:hasOBONamespace>
+        <oboInOwl:hasDbXref>XREF:{id}</oboInOwl:hasDbXref>
+    </owl:Class>
+"""
+
+
+def write_synthetic_owl(path, n_terms):
+    with open(path, 'w') as f:
+        f.write(OWL_HEADER)
+        for i in range(1, n_terms + 1):
+            f.write(OWL_TERM.format(id=i, parent=max(1, i // 2)))
+        f.write("</rdf:RDF>\n")
+
+
+class BenchOntologyAdapter(OntologyAdapter):
+    ONTOLOGIES = {}
+
+    def get_ontology_source(self):
+        return 'Benchmark', ''
+
+    def get_uri_prefixes(self):
+        return {'primary': self.PRIMARY_PREFIX}
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    print(f"{label:<40} {time.perf_counter() - t0:8.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--owl', help='Path to an OWL file (e.g. a cached efo.owl or go.owl)')
+    parser.add_argument('--prefix', default='http://purl.obolibrary.org/obo/GO_',
+                        help="Primary URI prefix of the ontology (EFO: http://www.ebi.ac.uk/efo/EFO_)")
+    parser.add_argument('--terms', type=int, default=20000, help='Number of terms in the synthetic ontology')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        owl_path = args.owl
+        if owl_path is None:
+            owl_path = str(Path(tmp) / 'bench.owl')
+            write_synthetic_owl(owl_path, args.terms)
+
+        BenchOntologyAdapter.ONTOLOGIES = {'bench': owl_path}
+        BenchOntologyAdapter.PRIMARY_PREFIX = args.prefix
+        adapter = BenchOntologyAdapter(write_properties=True, add_provenance=False, ontology='bench',
+                                       type='node', label='term', add_description=True)
+
+        timed("parse", adapter.update_graph)
+        print(f"triples: {len(adapter.graph)}")
+
+        def per_predicate():
+            # previous behaviour: one query per predicate, then graph.all_nodes() in get_nodes()
+            adapter.clear_cache()
+            for predicate, collection in OntologyAdapter.NODE_PROPERTY_COLLECTIONS.items():
+                adapter.cache_predicate(predicate=predicate, collection=collection)
+            return len(adapter.graph.all_nodes())
+
+        def single_pass():
+            adapter.clear_cache()
+            adapter.cache_node_properties()
+
+        timed("cache: per predicate + all_nodes()", per_predicate)
+        timed("cache: single pass (incl. node set)", single_pass)
+        nodes = timed("get_nodes (cache + lookups)", lambda: sum(1 for _ in adapter.get_nodes()))
+        print(f"nodes: {nodes}")
+
+
+if __name__ == '__main__':
+    main()
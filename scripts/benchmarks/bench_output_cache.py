@@ -0,0 +1,61 @@
+"""
+Compare running an adapter with replaying its output from the adapter output cache.
+
+Tiles the GENCODE sample --repeat times, then times the exon node adapter run directly, run
+while recording its output into an AdapterOutputCache, and replayed from the cache, and
+checks that the replay yields the same nodes.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_output_cache.py --repeat 200
+"""
+
+import argparse
+import gzip
+import tempfile
+import time
+from pathlib import Path
+
+from biocypher_metta.adapters.gencode_exon_adapter import GencodeExonAdapter
+from biocypher_metta.adapters.output_cache import AdapterOutputCache
+
+SAMPLE = 'samples/hsa/gencode_sample.gtf.gz'
+ADAPTER = {'module': 'biocypher_metta.adapters.gencode_exon_adapter', 'cls': 'GencodeExonAdapter'}
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28} {elapsed:8.3f}s  {len(result) / elapsed:12,.0f} nodes/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=100, help='Times the sample records are repeated')
+    args = parser.parse_args()
+
+    with gzip.open(SAMPLE, 'rt') as f:
+        sample = [line for line in f if not line.startswith('#')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = str(Path(tmp) / 'gencode.v49.annotation.gtf.gz')
+        with gzip.open(filepath, 'wt') as f:
+            for _ in range(args.repeat):
+                f.writelines(sample)
+        adapter_args = {'write_properties': True, 'add_provenance': True, 'target_type': 'exon',
+                        'taxon_id': 9606, 'label': 'exon', 'filepath': filepath}
+        adapter = GencodeExonAdapter(**adapter_args)
+        cache = AdapterOutputCache(str(Path(tmp) / 'cache'))
+        key = cache.key(ADAPTER, adapter_args)
+
+        nodes = timed("run adapter", lambda: list(adapter.get_nodes()))
+        timed("run adapter, recording", lambda: list(cache.record('exon', key, 'nodes', adapter.get_nodes())))
+        cache.save_metadata('exon', key, adapter)
+        _, replays = cache.load('exon', key, ['nodes'])
+        replayed = timed("replay from the cache", lambda: list(replays['nodes']))
+        assert replayed == nodes
+
+
+if __name__ == '__main__':
+    main()
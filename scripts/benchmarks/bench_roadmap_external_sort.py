@@ -0,0 +1,86 @@
+"""
+Compare RoadMapChromatinStateAdapter's in-memory deduplication with its external sort.
+
+Generates --files synthetic chromatin state files of --rows rows each, drawing variants,
+cells, tissues and states from the sample file, and reports wall time and peak traced
+memory of both paths. The two outputs are checked to be identical.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_roadmap_external_sort.py --rows 500000 --memory-budget-mb 16
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from biocypher_metta.adapters.hsa.roadmap_state_adapter import RoadMapChromatinStateAdapter
+
+SAMPLE = 'samples/hsa/roadmap/chromatin_state/chromatin15state-all_sample.csv.gz'
+CELL_MAP = 'aux_files/hsa/roadmap_ids_to_ontology.pkl'
+TISSUE_MAP = 'aux_files/hsa/roadmap_tissues_to_ontology_map.pkl'
+
+
+def build_inputs(directory, n_files, n_rows, n_variants):
+    with gzip.open(SAMPLE, 'rt') as f:
+        header, *rows = f.readlines()
+    rows = [row.rstrip('\n').split(',') for row in rows]
+    cells = sorted({row[2] for row in rows})
+    tissues = sorted({row[3] for row in rows})
+    states = sorted({row[4] for row in rows})
+    rng = random.Random(0)
+    for i in range(n_files):
+        with gzip.open(Path(directory) / f'chromatin15state-all.{i}.csv.gz', 'wt', compresslevel=1) as f:
+            f.write(header)
+            for _ in range(n_rows):
+                f.write(f"rs{rng.randrange(n_variants)},erc2-chromatin15state-all,"
+                        f"{rng.choice(cells)},{rng.choice(tissues)},{rng.choice(states)}\n")
+    return {f'rs{i}': {'chr': 'chr1', 'pos': i} for i in range(n_variants)}
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    # tracemalloc is only reset after the run, so the output list is kept out of the peak
+    edges = 0
+    digest = 0
+    for edge in fn():
+        edges += 1
+        digest = hash((digest, edge[0], edge[1], edge[3]['state']))
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<24} {elapsed:8.3f}s  peak {peak / 2**20:8.1f} MiB  ({edges} edges)")
+    return digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=4, help='Number of input files')
+    parser.add_argument('--rows', type=int, default=200000, help='Rows per input file')
+    parser.add_argument('--variants', type=int, default=100000, help='Number of distinct variants')
+    parser.add_argument('--memory-budget-mb', type=float, default=16, help='Budget of the external sort')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rsid_map = build_inputs(tmp, args.files, args.rows, args.variants)
+
+        def run(**kwargs):
+            adapter = RoadMapChromatinStateAdapter(tmp, CELL_MAP, TISSUE_MAP, 'chromatin_state', rsid_map,
+                                                   True, False, **kwargs)
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield from adapter.get_edges()
+
+        in_memory = measure("in-memory dict", run)
+        external = measure(f"external sort ({args.memory_budget_mb:g} MiB)",
+                           lambda: run(memory_budget_mb=args.memory_budget_mb))
+        assert in_memory == external, "external sort output differs from the in-memory path"
+
+
+if __name__ == '__main__':
+    main()
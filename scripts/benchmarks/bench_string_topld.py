@@ -0,0 +1,109 @@
+"""
+Rows per second of the STRING and TopLD adapters on tiled sample files.
+
+Repeats the data rows of the STRING and TopLD samples --repeat times and times the former
+row-by-row loops against the chunked, columnar get_edges() of StringPPIAdapter and
+TopLDAdapter. Both produce the same edges, which is checked.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_string_topld.py --repeat 20000
+"""
+
+import argparse
+import csv
+import gzip
+import tempfile
+import time
+from pathlib import Path
+
+from biocypher_metta.adapters.helpers import check_genomic_location, to_float
+from biocypher_metta.adapters.hsa.topld_adapter import TopLDAdapter
+from biocypher_metta.adapters.string_ppi_adapter import StringPPIAdapter
+from biocypher_metta.processors import EnsemblUniProtProcessor
+
+STRING_SAMPLE = 'samples/hsa/string_human_ppi_v12.0.txt.gz'
+TOPLD_SAMPLE = 'samples/hsa/topld/EUR/topld_eur_chr16_sample.csv.gz'
+
+
+def tile(src, dst, repeat):
+    with gzip.open(src, 'rt') as f:
+        header, *rows = f.readlines()
+    with gzip.open(dst, 'wt', compresslevel=1) as f:
+        f.write(header)
+        for _ in range(repeat):
+            f.writelines(rows)
+    return len(rows) * repeat
+
+
+def legacy_string_edges(path, ensembl2uniprot):
+    # the former StringPPIAdapter.get_edges() loop
+    with gzip.open(path, "rt") as fp:
+        table = csv.reader(fp, delimiter=" ", quotechar='"')
+        next(table)
+        for row in table:
+            protein1 = row[0].split(".")[1]
+            protein2 = row[1].split(".")[1]
+            if protein1 in ensembl2uniprot and protein2 in ensembl2uniprot:
+                yield ensembl2uniprot[protein1], ensembl2uniprot[protein2], 'interacts_with', {
+                    "score": to_float(row[2]) / 1000, 'taxon_id': '9606'}
+
+
+def legacy_topld_edges(path, dbsnp_pos_map, chr, cutoff=0.5):
+    # the former TopLDAdapter.get_edges() loop
+    with gzip.open(path, 'rt') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            var1_pos, var2_pos = int(row[0]), int(row[1])
+            if not check_genomic_location(chr, None, None, chr, var1_pos, var1_pos) or \
+                    not check_genomic_location(chr, None, None, chr, var2_pos, var2_pos):
+                continue
+            rsid_1 = dbsnp_pos_map.get(f"{chr}_{var1_pos}", None)
+            rsid_2 = dbsnp_pos_map.get(f"{chr}_{var2_pos}", None)
+            if rsid_1 is None or rsid_2 is None:
+                continue
+            r2_score = to_float(f"{row[6]}{row[4]}")
+            if abs(r2_score) < cutoff:
+                continue
+            yield rsid_1, rsid_2, 'in_linkage_disequilibrium_with', {
+                'r2': to_float(r2_score), 'd_prime': to_float(row[5]), 'ancestry': 'EUR'}
+
+
+def timed(label, rows, edges):
+    t0 = time.perf_counter()
+    edges = list(edges)
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<22} {elapsed:8.3f}s  {rows / elapsed:12,.0f} rows/s  ({len(edges)} edges)")
+    return edges
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20000, help='Times the sample rows are repeated')
+    args = parser.parse_args()
+
+    processor = EnsemblUniProtProcessor()
+    processor.load_or_update()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        string_path = str(Path(tmp) / 'string.txt.gz')
+        rows = tile(STRING_SAMPLE, string_path, args.repeat)
+        legacy = timed("STRING row by row", rows, legacy_string_edges(string_path, processor.mapping))
+        adapter = StringPPIAdapter(string_path, write_properties=True, add_provenance=False,
+                                   ensembl_uniprot_processor=processor)
+        assert timed("STRING columnar", rows, adapter.get_edges()) == legacy
+
+        topld_path = str(Path(tmp) / 'topld.csv.gz')
+        rows = tile(TOPLD_SAMPLE, topld_path, args.repeat)
+        with gzip.open(TOPLD_SAMPLE, 'rt') as f:
+            positions = {p for line in list(f)[1:] for p in line.split(',')[:2]}
+        # about two thirds of the positions have an rsid
+        dbsnp_pos_map = {f'chr16_{p}': f'rs{p}' for p in sorted(positions)[::3] + sorted(positions)[1::3]}
+        legacy = timed("TopLD row by row", rows, legacy_topld_edges(topld_path, dbsnp_pos_map, 'chr16'))
+        adapter = TopLDAdapter(topld_path, dbsnp_pos_map, 'chr16', 'EUR', 'in_linkage_disequilibrium_with',
+                               True, False)
+        assert timed("TopLD columnar", rows, adapter.get_edges()) == legacy
+
+
+if __name__ == '__main__':
+    main()
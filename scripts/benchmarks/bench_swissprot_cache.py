@@ -0,0 +1,71 @@
+"""
+Compare parsing SwissProt once per UniProt adapter with reading the columnar cache.
+
+Tiles the sample SwissProt file --repeat times, then times a Bio.SwissProt parse of the
+whole file (what every UniProt adapter did), building the cache, and reading back the
+columns of the protein node and dbxref edge adapters. A build runs --adapters UniProt
+adapters over the same file; the totals compare them parsing it every time with one cache
+build followed by cache reads.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/bench_swissprot_cache.py --repeat 50
+"""
+
+import argparse
+import gzip
+import tempfile
+import time
+from pathlib import Path
+
+from Bio import SwissProt
+
+from biocypher_metta.adapters.swissprot_cache import SwissProtCache, build_swissprot_cache, swissprot_cache_path
+
+SAMPLE = 'samples/hsa/uniprot_sprot_human_sample.dat.gz'
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<36} {elapsed:8.3f}s")
+    return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='Times the sample records are repeated')
+    parser.add_argument('--adapters', type=int, default=13, help='UniProt adapters run over the file in a build')
+    args = parser.parse_args()
+
+    with gzip.open(SAMPLE, 'rt') as f:
+        sample = f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = str(Path(tmp) / 'uniprot_sprot_human.dat.gz')
+        with gzip.open(filepath, 'wt') as f:
+            for _ in range(args.repeat):
+                f.write(sample)
+
+        def parse():
+            with gzip.open(filepath, 'rt') as f:
+                return sum(1 for _ in SwissProt.parse(f))
+
+        def read(columns):
+            with SwissProtCache(filepath, tmp) as swissprot:
+                return sum(1 for _ in swissprot.records(columns))
+
+        parse_time, records = timed("Bio.SwissProt parse", parse)
+        build_time, _ = timed("build cache", lambda: build_swissprot_cache(
+            filepath, swissprot_cache_path(filepath, tmp)))
+        node_time, _ = timed("read protein node columns", lambda: read(['entry_name', 'accessions', 'comments']))
+        edge_time, _ = timed("read dbxref edge columns", lambda: read(
+            ['entry_name', 'accessions', 'cross_references', 'comments', 'binding_sites']))
+
+        print(f"{records} records, {args.adapters} adapters: "
+              f"{parse_time * args.adapters:.1f}s parsing in every adapter, "
+              f"{build_time + edge_time * args.adapters:.1f}s with the cache")
+
+
+if __name__ == '__main__':
+    main()
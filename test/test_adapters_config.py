@@ -0,0 +1,34 @@
+"""
+Checks that every entry of the adapters configs has what process_adapters reads.
+"""
+
+from pathlib import Path
+
+import pytest
+import yaml
+
+from config.yaml_loader import IncludeLoader
+
+CONFIGS = sorted(Path(__file__).resolve().parent.parent.glob('config/*/*adapters_config*.yaml'))
+
+
+class UniqueKeyLoader(IncludeLoader):
+    """IncludeLoader rejecting duplicate keys, which PyYAML would silently let override each other."""
+
+    def construct_mapping(self, node, deep=False):
+        keys = [self.construct_object(key, deep=deep) for key, _ in node.value]
+        duplicates = {key for key in keys if keys.count(key) > 1}
+        if duplicates:
+            raise yaml.constructor.ConstructorError(None, None, f"duplicate keys {sorted(duplicates)}",
+                                                    node.start_mark)
+        return super().construct_mapping(node, deep=deep)
+
+
+@pytest.mark.parametrize('config_path', CONFIGS, ids=[path.name for path in CONFIGS])
+def test_adapter_entries_complete(config_path):
+    with config_path.open() as f:
+        adapters = yaml.load(f, UniqueKeyLoader)
+    for name, entry in adapters.items():
+        missing = [key for key in ('adapter', 'outdir', 'nodes', 'edges') if key not in entry]
+        assert not missing, f"{config_path.name}: {name} has no {', '.join(missing)}"
+        assert {'module', 'cls', 'args'} <= set(entry['adapter']), f"{config_path.name}: {name}"
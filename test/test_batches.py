@@ -0,0 +1,88 @@
+"""
+Tests for the columnar batch protocol of adapters and writers.
+"""
+
+import filecmp
+import gzip
+import os
+
+from biocypher_metta.adapters.batches import (edge_batch_records, node_batch_records, to_edge_batches,
+                                              to_node_batches)
+from biocypher_metta.adapters.hsa.dbsnp_adapter import DBSNPAdapter
+from biocypher_metta.adapters.hsa.gtex_eqtl_adapter import GTExEQTLAdapter
+from biocypher_metta.metta_writer import MeTTaWriter
+from create_knowledge_graph import delete_temp_schema, merge_schemas
+
+VCF = """##fileformat=VCFv4.0
+#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO
+1\t10177\trs367896724\tA\tAC\t.\t.\tRS=367896724;RSPOS=10177;VC=DIV;R5;CAF=0.5747,0.4253;COMMON=1
+1\t10352\trs555500075\tT\tTA\t.\t.\tRS=555500075;RSPOS=10352;VC=DIV;R5
+X\t10616\trs376342519\tCCGCCGTTGCAAAGGCGCGCCG\tC,G\t.\t.\tCAF=0.9;RS=376342519;NOCAF=1
+"""
+
+
+def gtex_adapter(write_properties=True, add_provenance=True):
+    return GTExEQTLAdapter('samples/hsa/gtex.forgedb.sample.csv.gz', 'aux_files/hsa/gtex_tissues_to_ontology_map.pkl',
+                           write_properties, add_provenance, 'gtex_variant_gene')
+
+
+def dbsnp_adapter(tmp_path, write_properties=True, add_provenance=True):
+    filepath = tmp_path / 'dbsnp.vcf.gz'
+    with gzip.open(filepath, 'wt') as f:
+        f.write(VCF)
+    return DBSNPAdapter(str(filepath), write_properties, add_provenance, 'snp')
+
+
+def test_batches_round_trip():
+    nodes = [('ENSEMBL:ENSG1', 'gene', {'chr': 'chr1', 'synonyms': ['a']}),
+             (('protein', 'P1'), 'protein', {}),
+             ('ENSEMBL:ENSG2', 'gene', {'start': 0, 'chr': 'chr2'})]
+    edges = [('DBSNP:rs1', 'ENSEMBL:ENSG1', 'eqtl', {'p_value': 0.1}),
+             ('DBSNP:rs2', 'ENSEMBL:ENSG2', 'eqtl', {})]
+
+    batches = list(to_node_batches(nodes, batch_size=2))
+    assert [len(batch['id']) for batch in batches] == [2, 1]
+    assert batches[0]['properties'] == {'chr': ['chr1', None], 'synonyms': [['a'], None]}
+    assert list(node_batch_records(batches)) == nodes
+    assert list(edge_batch_records(to_edge_batches(edges))) == edges
+
+
+def test_adapter_batches_match_records(tmp_path):
+    for write_properties, add_provenance in ((True, True), (True, False), (False, False)):
+        adapter = dbsnp_adapter(tmp_path, write_properties, add_provenance)
+        nodes = list(adapter.get_nodes())
+        assert len(nodes) == 3
+        assert list(node_batch_records(adapter.get_node_batches(batch_size=2))) == nodes
+
+        adapter = gtex_adapter(write_properties, add_provenance)
+        edges = list(adapter.get_edges())
+        assert edges
+        assert list(edge_batch_records(adapter.get_edge_batches(batch_size=7))) == edges
+
+    assert DBSNPAdapter.yields_batches() and GTExEQTLAdapter.yields_batches()
+
+
+def test_metta_batch_writes_match_record_writes(tmp_path):
+    schema = merge_schemas('config/primer_schema_config.yaml', 'config/hsa/hsa_schema_config.yaml')
+    try:
+        outputs = []
+        for mode in ('records', 'batches'):
+            writer = MeTTaWriter(schema_config=str(schema), biocypher_config='config/biocypher_config.yaml',
+                                 output_dir=str(tmp_path / mode))
+            nodes, edges = dbsnp_adapter(tmp_path), gtex_adapter()
+            if mode == 'records':
+                node_counts = writer.write_nodes(nodes.get_nodes(), path_prefix='out')
+                edge_counts = writer.write_edges(edges.get_edges(), path_prefix='out')
+            else:
+                node_counts = writer.write_node_batches(nodes.get_node_batches(batch_size=2), path_prefix='out')
+                edge_counts = writer.write_edge_batches(edges.get_edge_batches(batch_size=7), path_prefix='out')
+            outputs.append((str(tmp_path / mode / 'out'), node_counts, edge_counts))
+    finally:
+        delete_temp_schema(schema)
+
+    (records_dir, *record_counts), (batches_dir, *batch_counts) = outputs
+    assert batch_counts == record_counts
+    files = sorted(os.listdir(records_dir))
+    assert sorted(os.listdir(batches_dir)) == files
+    _, mismatch, errors = filecmp.cmpfiles(records_dir, batches_dir, files, shallow=False)
+    assert not mismatch and not errors
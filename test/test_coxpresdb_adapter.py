@@ -0,0 +1,57 @@
+"""
+Checks the partner selection of CoxpresdbAdapter.
+"""
+
+import numpy as np
+
+from biocypher_metta.adapters import coxpresdb_adapter
+from biocypher_metta.adapters.coxpresdb_adapter import CoxpresdbAdapter, select_partners
+
+
+def test_select_partners(tmp_path):
+    gene_file = tmp_path / '1'
+    gene_file.write_text('30\t2.5\n10\t9.0\n99\t8.0\n20\t4.0\n40\t1.0\n')
+    mapped_entrez_ids = np.array([10, 20, 30, 40])
+
+    partners, scores = select_partners(gene_file, mapped_entrez_ids)
+    assert mapped_entrez_ids[partners].tolist() == [30, 10, 20, 40]
+    assert scores.tolist() == [2.5, 9.0, 4.0, 1.0]
+
+    partners, scores = select_partners(gene_file, mapped_entrez_ids, top_k=2)
+    assert mapped_entrez_ids[partners].tolist() == [10, 20]
+
+    partners, scores = select_partners(gene_file, mapped_entrez_ids, top_k=2, min_score=5)
+    assert mapped_entrez_ids[partners].tolist() == [10]
+
+
+class Processor:
+    entrez_to_ensembl = {'1': 'ENSG1', '2': 'ENSG2', '10': 'ENSG10', '20': 'ENSG20'}
+
+
+def test_workers_keep_gene_order(tmp_path):
+    for gene_id in ('2', '10', '1', '3'):
+        (tmp_path / gene_id).write_text('20\t1.5\n1\t3.0\n10\t2.0\n')
+
+    def get_edges(workers):
+        adapter = CoxpresdbAdapter(str(tmp_path), write_properties=True, add_provenance=False,
+                                   entrez_ensembl_processor=Processor(), workers=workers)
+        return list(adapter.get_edges())
+
+    edges = get_edges(workers=1)
+    assert [edge[0] for edge in edges[::3]] == ['ENSEMBL:ENSG1', 'ENSEMBL:ENSG2', 'ENSEMBL:ENSG10']
+    assert edges[:3] == [('ENSEMBL:ENSG1', f'ENSEMBL:ENSG{i}', 'coexpressed_with', {'taxon_id': '9606', 'score': s})
+                         for i, s in ((20, 1.5), (1, 3.0), (10, 2.0))]
+    assert get_edges(workers=3) == edges
+
+
+def test_gene_files_read_in_process_by_default(tmp_path, monkeypatch):
+    (tmp_path / '1').write_text('20\t1.5\n')
+    (tmp_path / '2').write_text('10\t2.0\n')
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError('worker processes started')
+    monkeypatch.setattr(coxpresdb_adapter, 'ProcessPoolExecutor', no_pool)
+    adapter = CoxpresdbAdapter(str(tmp_path), write_properties=False, add_provenance=False,
+                               entrez_ensembl_processor=Processor())
+    assert [edge[:2] for edge in adapter.get_edges()] == [('ENSEMBL:ENSG1', 'ENSEMBL:ENSG20'),
+                                                         ('ENSEMBL:ENSG2', 'ENSEMBL:ENSG10')]
@@ -0,0 +1,78 @@
+"""
+Checks the expression-matrix path of ExpressionValueAdapter against its row path on the
+dmel sample files.
+"""
+
+import gzip
+
+from biocypher_metta.adapters.batches import edge_batch_records
+from biocypher_metta.adapters.dmel.expression_matrix import ExpressionMatrix
+from biocypher_metta.adapters.dmel.expression_value_adapter import ExpressionValueAdapter
+
+HIGH_THROUGHPUT = 'samples/dmel/flybase/high-throughput_gene_expression_fb_2024_02.tsv.gz'
+FBGN_TABLE = 'aux_files/dmel/fbgn_fbtr_fbpp_expanded_fb_2024_02.tsv.gz'
+
+
+def get_edges(**kwargs):
+    adapter = ExpressionValueAdapter(True, True, [HIGH_THROUGHPUT], [FBGN_TABLE], **kwargs)
+    return list(adapter.get_edges())
+
+
+def test_matrix_edges_match_row_edges():
+    assert get_edges(expression_matrix=True) == get_edges()
+
+
+def test_matrix_edge_batches():
+    adapter = ExpressionValueAdapter(True, True, [HIGH_THROUGHPUT], [FBGN_TABLE], expression_matrix=True,
+                                     batch_size=10)
+    batches = list(adapter.get_edge_batches())
+
+    assert len(batches) > 1 and all(len(batch['source']) <= 10 for batch in batches)
+    assert set(batches[0]['properties']) == {'value_and_description', 'taxon_id', 'source', 'source_url'}
+    assert list(edge_batch_records(batches)) == get_edges()
+
+
+def test_matrix_threshold():
+    edges = get_edges(expression_matrix=True, min_expression_value=10)
+
+    expected = [edge for edge in get_edges() if float(edge[3]['value_and_description'][0][0]) >= 10]
+    assert edges == expected
+    assert 0 < len(edges) < len(get_edges())
+
+
+MIXED_VALUES = ['5', '0.50', '1e-3', '', '12', '7.25']
+
+
+def test_matrix_keeps_values_as_written(tmp_path):
+    # integer, float and empty values in one table: edges carry them as the row path does
+    path = tmp_path / 'high-throughput_gene_expression_fb_2024_02.tsv.gz'
+    with gzip.open(path, 'wt') as f:
+        f.write('## FlyBase high-throughput gene expression\n')
+        f.write('#High_Throughput_Expression_Section\tDataset_ID\tDataset_Name\tSample_ID\tSample_Name\tGene_ID\t'
+                'Gene_Symbol\tExpression_Unit\tExpression_Value\n')
+        for i, value in enumerate(MIXED_VALUES):
+            f.write(f'RNA-Seq\tFBlc0000001\tdataset\tFBlc000000{i % 2 + 2}\tsample\tFBgn000000{i // 2}\tg\tFPKM\t{value}\n')
+
+    def get_edges(**kwargs):
+        adapter = ExpressionValueAdapter(True, False, [str(path)], [FBGN_TABLE], **kwargs)
+        return list(adapter.get_edges())
+
+    edges = get_edges(expression_matrix=True)
+    assert edges == get_edges()
+    assert [edge[3]['value_and_description'][0][0] for edge in edges] == MIXED_VALUES
+    assert [edge[3]['value_and_description'][0][0] for edge in get_edges(expression_matrix=True,
+                                                                          min_expression_value=1)] == ['5', '12', '7.25']
+
+
+def test_wide_matrix_keeps_values_as_written(tmp_path):
+    path = tmp_path / 'afca.tsv.gz'
+    with gzip.open(path, 'wt') as f:
+        f.write('#FB gene symbol\tcell_5\tcell_30\tcell_50\n')
+        f.write('geneA\t' + '\t'.join(MIXED_VALUES[:3]) + '\n')
+        f.write('geneB\t' + '\t'.join(MIXED_VALUES[3:]) + '\n')
+
+    matrix = ExpressionMatrix.from_wide_table(str(path), chunk_size=1)
+    assert matrix.genes == ['geneA', 'geneB'] and matrix.conditions == ['cell_5', 'cell_30', 'cell_50']
+    assert list(matrix.iter_batches(batch_size=3)) == [([0, 0, 0], [0, 1, 2], MIXED_VALUES[:3]),
+                                                       ([1, 1, 1], [0, 1, 2], MIXED_VALUES[3:])]
+    assert list(matrix.iter_batches(min_value=1)) == [([0, 1, 1], [0, 1, 2], ['5', '12', '7.25'])]
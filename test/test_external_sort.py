@@ -0,0 +1,83 @@
+"""
+Checks ExternalSorter and the adapters deduplicating edges with it.
+"""
+
+import gzip
+import random
+
+import pytest
+
+from biocypher_metta.adapters.bgee_adapter import BgeeAdapter
+from biocypher_metta.adapters.external_sort import ExternalSorter
+from biocypher_metta.adapters.hsa.roadmap_state_adapter import RoadMapChromatinStateAdapter
+
+ROADMAP_SAMPLE = 'samples/hsa/roadmap/chromatin_state/chromatin15state-all_sample.csv.gz'
+
+
+def test_external_sort_spills_and_keeps_first_per_key(tmp_path):
+    rng = random.Random(0)
+    records = [(rng.randrange(500), rng.random()) for _ in range(20000)]
+
+    sorter = ExternalSorter(memory_budget_mb=0.1, unique_key=lambda record: record[0], tmp_dir=tmp_path)
+    for record in records:
+        sorter.add(record)
+    assert len(sorter.runs) > 1
+
+    expected = {}
+    for key, value in sorted(records):
+        expected.setdefault(key, value)
+    assert list(sorter) == sorted(expected.items())
+    assert not list(tmp_path.iterdir())
+
+
+def test_roadmap_external_sort_matches_in_memory(tmp_path):
+    with gzip.open(ROADMAP_SAMPLE, 'rt') as f:
+        header, *rows = f.readlines()
+    # the same rows spread over several files, so duplicates span files
+    for i in range(3):
+        with gzip.open(tmp_path / f'part{i}.csv.gz', 'wt') as f:
+            f.write(header)
+            f.writelines(rows[i * len(rows) // 4:])
+    rsid_map = {row.split(',')[0]: {'chr': 'chr1', 'pos': i} for i, row in enumerate(rows)}
+
+    def get_edges(**kwargs):
+        adapter = RoadMapChromatinStateAdapter(str(tmp_path), 'aux_files/hsa/roadmap_ids_to_ontology.pkl',
+                                               'aux_files/hsa/roadmap_tissues_to_ontology_map.pkl',
+                                               'chromatin_state', rsid_map, True, True, **kwargs)
+        return list(adapter.get_edges())
+
+    edges = get_edges()
+    assert edges
+    assert get_edges(memory_budget_mb=0.001) == edges
+
+
+def test_bgee_sorted_max_score_matches_in_memory(tmp_path, monkeypatch):
+    rng = random.Random(0)
+    path = tmp_path / 'Homo_sapiens_expr_simple_all_conditions.tsv.gz'
+    with gzip.open(path, 'wt') as f:
+        f.write('Gene ID\tGene name\tAnatomical entity ID\tAnatomical entity name\tDevelopmental stage ID\t'
+                'Developmental stage name\tSex\tStrain\tExpression\tCall quality\tFDR\tExpression score\tExpression rank\n')
+        for _ in range(5000):
+            anatomical_entity = rng.choice(['CL:0000015', 'UBERON:0000473', 'CL:0000089 ∩ UBERON:0000473'])
+            score = rng.choice(['NaN', '50.00', f'{rng.uniform(0, 100):.2f}'])
+            f.write(f'ENSG{rng.randrange(300):011d}\t"G"\t{anatomical_entity}\t"entity"\tHsapDv:{rng.randrange(10):07d}\t'
+                    f'"stage"\tany\twild-type\tpresent\tgold quality\t{rng.random()}\t{score}\t1.0\n')
+
+    def get_edges(**kwargs):
+        return list(BgeeAdapter(str(path), True, True, 9606, 'expressed_in', **kwargs).get_edges())
+
+    edges = get_edges(external_sort=False)
+    sorted_edges = get_edges(external_sort=True, memory_budget_mb=0.05)
+    assert sorted(sorted_edges, key=repr) == sorted(edges, key=repr)
+    assert [edge[0] for edge in sorted_edges] == sorted(edge[0] for edge in edges)
+
+    # external_sort=None picks the sort from the size of the file once the edges are read
+    assert get_edges() == edges
+    monkeypatch.setattr(BgeeAdapter, 'EXTERNAL_SORT_MIN_FILE_SIZE', 0)
+    assert get_edges(memory_budget_mb=0.05) == sorted_edges
+
+
+def test_bgee_input_not_read_before_edges(tmp_path):
+    adapter = BgeeAdapter(str(tmp_path / 'missing.tsv.gz'), True, True, 9606, 'expressed_in')
+    with pytest.raises(OSError):
+        next(adapter.get_edges())
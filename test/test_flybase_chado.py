@@ -0,0 +1,107 @@
+"""
+Offline tests for the FlyBase chado access layer, run against a SQLite copy of the
+chado tables it queries.
+"""
+
+import pytest
+
+from biocypher_metta.adapters.dmel.flybase_chado import FlybaseChado, create_sqlite_chado
+from biocypher_metta.adapters.reactome_edges_adapter import ReactomeEdgesAdapter
+
+
+@pytest.fixture
+def chado():
+    conn = create_sqlite_chado()
+    conn.executemany('INSERT INTO feature (feature_id, uniquename, name, is_obsolete) VALUES (?, ?, ?, ?)', [
+        (1, 'FBgn0000001', 'abc', 1),
+        (2, 'FBgn0000002', 'abc', 0),
+        (3, 'FBgn0000003:1', 'def:1', 0),
+        (4, 'FBgn0000004', 'CG4', 0),
+    ])
+    conn.executemany('INSERT INTO synonym (synonym_id, name) VALUES (?, ?)', [(1, 'ghi')])
+    conn.executemany('INSERT INTO feature_synonym (feature_id, synonym_id) VALUES (?, ?)', [(4, 1)])
+    conn.executemany('INSERT INTO library (library_id, uniquename, name) VALUES (?, ?, ?)', [
+        (1, 'FBlc0000001', 'RNA-Seq_Profile_FlyAtlas2_Adult_Brain'),
+        (2, 'FBlc0000002', 'microRNA-Seq_TPM_FlyAtlas2_Adult_Male'),
+    ])
+    conn.executemany('INSERT INTO feature (feature_id, uniquename, is_obsolete, is_analysis) VALUES (?, ?, ?, ?)', [
+        (10, 'FBpp0070000', 0, 0),
+        (11, 'FBpp0070006', 1, 0),
+        (12, 'FBpp0070006', 0, 1),
+        (13, 'FBpp0070027', 0, 0),
+        (14, 'FBpp0070037', 0, 0),
+    ])
+    conn.executemany('INSERT INTO db (db_id, name) VALUES (?, ?)', [
+        (1, 'UniProt/Swiss-Prot'), (2, 'UniProt/TrEMBL'), (3, 'GenBank'),
+    ])
+    conn.executemany('INSERT INTO dbxref (dbxref_id, db_id, accession) VALUES (?, ?, ?)', [
+        (1, 2, 'Q9W5X1'), (2, 1, 'P12345'), (3, 1, 'P00006'), (4, 1, 'P00007'), (5, 3, 'AAF45000'), (6, 1, 'P00037'),
+    ])
+    conn.executemany('INSERT INTO feature_dbxref (feature_id, dbxref_id, is_current) VALUES (?, ?, ?)', [
+        (10, 1, 1), (10, 2, 1), (11, 3, 1), (12, 4, 1), (13, 5, 1), (14, 6, 0),
+    ])
+    yield conn
+    conn.close()
+
+
+def test_resolve_gene_symbols_in_batches(chado):
+    client = FlybaseChado(connection=chado, chunk_size=2)
+    resolved = client.resolve_gene_symbols(['abc', 'def', 'ghi', 'missing', 'abc'])
+
+    assert resolved == {'abc': 'FBgn0000002', 'def': 'FBgn0000003', 'ghi': 'FBgn0000004', 'missing': None}
+    # 2 chunks: [abc, def] needs the name and ':1' queries, [ghi, missing] all three
+    assert client.round_trips == 5
+
+
+def test_sqlite_chunks_stay_under_the_parameter_limit(chado):
+    client = FlybaseChado(connection=chado)
+    symbols = ['abc'] + [f'missing{i}' for i in range(1200)]
+    resolved = client.resolve_gene_symbols(symbols)
+    assert resolved['abc'] == 'FBgn0000002'
+    assert resolved['missing1199'] is None
+    # 3 chunks of at most 500 symbols, each looked up by name, as '<symbol>:1' and as a synonym
+    assert client.round_trips == 9
+    with pytest.raises(ValueError):
+        client._any(symbols)
+
+
+def test_lookups_are_cached_per_release(chado, tmp_path):
+    cache_path = str(tmp_path / 'chado_cache.sqlite')
+    first = FlybaseChado(release='2024_02', cache_path=cache_path, connection=chado)
+    first.resolve_gene_symbols(['abc', 'missing'])
+    assert first.get_libraries('RNA-Seq_Profile_FlyAtlas2_%') == [
+        ('FBlc0000001', 'RNA-Seq_Profile_FlyAtlas2_Adult_Brain')]
+    first.close()
+
+    second = FlybaseChado(release='2024_02', cache_path=cache_path, connection=create_sqlite_chado())
+    assert second.resolve_gene_symbols(['abc', 'missing']) == {'abc': 'FBgn0000002', 'missing': None}
+    assert second.get_libraries('RNA-Seq_Profile_FlyAtlas2_%') == [
+        ('FBlc0000001', 'RNA-Seq_Profile_FlyAtlas2_Adult_Brain')]
+    assert second.round_trips == 0
+
+    next_release = FlybaseChado(release='2024_03', cache_path=cache_path, connection=chado)
+    next_release.resolve_gene_symbols(['abc'])
+    assert next_release.round_trips == 1
+
+
+def test_resolve_polypeptide_uniprot_ids(chado, tmp_path):
+    cache_path = str(tmp_path / 'chado_cache.sqlite')
+    client = FlybaseChado(release='2025_03', cache_path=cache_path, connection=chado)
+    expected = {'FBpp0070000': 'P12345', 'FBpp0070006': None, 'FBpp0070027': None, 'FBpp0070037': None}
+    assert client.resolve_polypeptide_uniprot_ids(list(expected) * 2) == expected
+    assert client.round_trips == 1
+    client.close()
+
+    offline = FlybaseChado(release='2025_03', cache_path=cache_path, connection=create_sqlite_chado())
+    assert offline.resolve_polypeptide_uniprot_ids(list(expected)) == expected
+    assert offline.round_trips == 0
+
+
+def test_reactome_polypeptides_resolved_in_one_query(chado, tmp_path):
+    adapter = ReactomeEdgesAdapter('samples/reactome/Ensembl2Reactome_All_Levels_sample.txt', 'genes_pathways',
+                                   True, False, 7227, ensembl_uniprot_map_path=str(tmp_path / 'no_map.pkl'))
+    adapter.chado = FlybaseChado(connection=chado)
+    proteins = [source for source, _, _, _ in adapter.get_edges() if source[0] == 'protein']
+
+    assert proteins == [('protein', 'UniProtKB:P12345')] * 9
+    assert adapter.chado.round_trips == 1
@@ -0,0 +1,123 @@
+"""
+Tests for the streaming reader of FlyBase precomputed tables.
+"""
+
+import gzip
+
+import pytest
+
+from biocypher_metta.adapters.dmel.flybase_tsv_reader import FlybasePrecomputedTable, FlybaseTsvStream
+
+SAMPLES = ['samples/dmel/flybase/gene_rpkm_report_fb_2024_02.tsv.gz',
+           'samples/dmel/flybase/high-throughput_gene_expression_fb_2024_02.tsv.gz',
+           'samples/dmel/flybase/dmel_paralogs_fb_2024_02.tsv.gz',
+           'samples/dmel/flybase/best_gene_summary_fb_2024_02.tsv.gz',
+           'samples/dmel/afca/afca_afca_annotation_group_by_mean.tsv.gz']
+
+TABLE = """## FlyBase gene table
+## Generated: Sat Apr 06 21:08:23 2024
+##
+#Gene_ID\tGene_Symbol\tCount
+FBgn0000001\talpha\t12
+
+FBgn0000002\tbeta\t
+#Gene_ID\tGene_Symbol\tCount
+Gene_ID\tGene_Symbol\tCount
+FBgn0000003\tgamma\t7
+FBgn0000004\tdelta
+#-----------------------------
+## Finished gene table.
+"""
+
+
+def legacy_table(path):
+    # FlybasePrecomputedTable._proces_input_tsv() before it streamed the file
+    header, rows, previous = None, [], None
+    with gzip.open(path, 'rt') as f:
+        for row in f.readlines():
+            if not row or not row.strip():
+                continue
+            if not row.startswith("#"):
+                if header is None and previous is not None:
+                    header = [column_name.strip() for column_name in previous.lstrip("#\t ").split('\t')]
+                row_list = [value.strip() for value in row.split('\t')]
+                if row_list[0] != header[0]:
+                    rows.append(row_list)
+            if not row.startswith("#-----") and not row.startswith("## Finished "):
+                previous = row
+    return header, rows
+
+
+@pytest.fixture
+def table(tmp_path):
+    path = tmp_path / 'genes_fb_2024_02.tsv.gz'
+    with gzip.open(path, 'wt') as f:
+        f.write(TABLE)
+    return str(path)
+
+
+def test_header_detection(table):
+    stream = FlybaseTsvStream(table)
+    assert stream.get_header() == ['Gene_ID', 'Gene_Symbol', 'Count']
+    assert stream.get_columns() == stream.get_header()
+    # blank lines, the repeated header and the trailer are skipped
+    assert list(stream) == [['FBgn0000001', 'alpha', '12'], ['FBgn0000002', 'beta', ''],
+                            ['FBgn0000003', 'gamma', '7'], ['FBgn0000004', 'delta']]
+    assert stream.extract_date_string() == '2024_02'
+
+
+def test_projection(table):
+    stream = FlybaseTsvStream(table, columns=['Count', 'Gene_ID'])
+    assert stream.get_columns() == ['Count', 'Gene_ID']
+    # missing trailing values are read as empty
+    assert list(stream) == [['12', 'FBgn0000001'], ['', 'FBgn0000002'], ['7', 'FBgn0000003'], ['', 'FBgn0000004']]
+
+    with pytest.raises(ValueError, match="Column 'Gene_Name' not found"):
+        list(FlybaseTsvStream(table, columns=['Gene_ID', 'Gene_Name']))
+
+
+def test_projection_without_header(tmp_path):
+    path = tmp_path / 'no_header.tsv'
+    path.write_text('FBgn0000001\talpha\nFBgn0000002\tbeta\n')
+
+    # rows are not taken for a header, nor skipped as repeating it
+    stream = FlybaseTsvStream(str(path))
+    assert list(stream) == [['FBgn0000001', 'alpha'], ['FBgn0000002', 'beta']]
+    assert stream.get_header() == []
+    with pytest.raises(ValueError, match="Column 'Gene_ID' not found"):
+        list(FlybaseTsvStream(str(path), columns=['Gene_ID']))
+
+
+def test_converters(table):
+    rows = FlybaseTsvStream(table, columns=['Gene_Symbol', 'Count'], converters={'Count': int})
+    # empty values are not converted
+    assert list(rows) == [['alpha', 12], ['beta', ''], ['gamma', 7], ['delta', '']]
+
+    rows = FlybaseTsvStream(table, converters={'Count': int, 'Gene_Symbol': str.upper})
+    assert list(rows)[0] == ['FBgn0000001', 'ALPHA', 12]
+
+
+def test_iter_chunks(table, tmp_path):
+    stream = FlybaseTsvStream(table, columns=['Gene_ID'])
+    assert list(stream.iter_chunks(3)) == [[['FBgn0000001'], ['FBgn0000002'], ['FBgn0000003']], [['FBgn0000004']]]
+    assert list(stream.iter_chunks(4)) == [list(stream)]
+
+    empty = tmp_path / 'empty.tsv'
+    empty.write_text('#Gene_ID\n')
+    assert list(FlybaseTsvStream(str(empty)).iter_chunks(3)) == []
+
+
+@pytest.mark.parametrize('path', SAMPLES)
+def test_precomputed_table_matches_legacy_reader(path):
+    header, rows = legacy_table(path)
+    assert rows
+
+    table = FlybasePrecomputedTable(path)
+    assert table.get_header() == header
+    assert table.get_rows() == rows
+
+    columns = [header[-1], header[0]]
+    projected = FlybasePrecomputedTable(path, columns=columns)
+    assert projected.get_header() == columns
+    assert projected.get_rows() == [[row[header.index(column)] if header.index(column) < len(row) else ''
+                                     for column in columns] for row in rows]
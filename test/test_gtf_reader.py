@@ -0,0 +1,39 @@
+"""
+Tests for the columnar GTF reader of the GENCODE adapters.
+"""
+
+import gzip
+
+from biocypher_metta.adapters.gtf_reader import read_gtf
+
+GTF = """##description: evidence-based annotation of the human genome (GRCh38), version 43 (Ensembl 109)
+chr1\tHAVANA\tgene\t11869\t14409\t.\t+\t.\tgene_id "ENSG00000290825.1"; gene_type "lncRNA"; gene_name "DDX11L2"; level 2;
+chr1\tHAVANA\ttranscript\t11869\t14409\t.\t+\t.\tgene_id "ENSG00000290825.1"; transcript_id "ENST00000456328.2"; havana_gene_id "OTTHUMG1"; tag "basic"; tag "Ensembl_canonical";
+#!a comment in the middle
+chr1\tHAVANA\texon\t11869\t12227\t.\t+\t.\tgene_id "ENSG00000290825.1"; transcript_id "ENST00000456328.2"; exon_number 1; exon_id "ENSE00002234944.1";
+3R    FlyBase transcript  17750129    17758978    .   -   .   gene_id "FBgn0038542"; transcript_id "FBtr0344474"; transcript_biotype "protein_coding";\r
+"""
+
+
+def test_read_gtf(tmp_path):
+    filepath = tmp_path / 'sample.gtf.gz'
+    with gzip.open(filepath, 'wt') as f:
+        f.write(GTF)
+
+    chunks = list(read_gtf(str(filepath), ['transcript'], ['gene_id', 'transcript_id', 'transcript_biotype'], ['tag']))
+    assert chunks == [{
+        'chr': ['chr1', '3R'],
+        'type': ['transcript', 'transcript'],
+        'start': [11869, 17750129],
+        'end': [14409, 17758978],
+        'strand': ['+', '-'],
+        'gene_id': ['ENSG00000290825.1', 'FBgn0038542'],
+        'transcript_id': ['ENST00000456328.2', 'FBtr0344474'],
+        'transcript_biotype': [None, 'protein_coding'],
+        'tag': [['basic', 'Ensembl_canonical'], []],
+    }]
+
+    [chunk] = read_gtf(str(filepath), ['gene', 'exon'], ['gene_name', 'exon_number'])
+    assert chunk['type'] == ['gene', 'exon']
+    assert chunk['gene_name'] == ['DDX11L2', None]
+    assert chunk['exon_number'] == [None, '1']
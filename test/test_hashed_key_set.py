@@ -0,0 +1,52 @@
+"""
+Checks HashedKeySet against a Python set.
+"""
+
+import random
+
+import pytest
+
+from biocypher_metta.adapters.hashed_key_set import HashedKeySet
+
+
+@pytest.mark.parametrize('hash_bits', [64, 128])
+@pytest.mark.parametrize('exact', [False, True])
+def test_hashed_key_set_matches_set(hash_bits, exact):
+    rng = random.Random(hash_bits)
+    seen = HashedKeySet(hash_bits=hash_bits, capacity=16, exact=exact)
+    expected = set()
+    for _ in range(50000):
+        key = (('protein', f'UniProt:P{rng.randrange(20000)}'), ('biological_process', 'GO:0008150'), 'label')
+        assert seen.insert(key) == (key not in expected)
+        expected.add(key)
+
+    assert len(seen) == len(expected)
+    assert all(key in seen for key in expected)
+    assert ('protein', 'UniProt:Q') not in seen
+    assert seen.capacity > 16
+
+
+class FixedHash:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def __hash__(self):
+        return self.value
+
+    def __eq__(self, other):
+        return self.name == other.name
+
+
+def test_exact_mode_counts_collisions():
+    seen = HashedKeySet(exact=True)
+    assert seen.insert(FixedHash('a', 7))
+    assert seen.insert(FixedHash('b', 7))
+    assert not seen.insert(FixedHash('b', 7))
+    assert seen.collisions == 1
+    assert len(seen) == 2
+
+    # without verification a colliding key looks seen
+    seen = HashedKeySet()
+    assert seen.insert(FixedHash('a', 7))
+    assert not seen.insert(FixedHash('b', 7))
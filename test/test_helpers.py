@@ -0,0 +1,77 @@
+"""
+Checks the ID builders and interval joins of the adapter helpers.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from biocypher_metta.adapters.helpers import (build_regulatory_region_id, build_regulatory_region_ids,
+                                              build_variant_id, build_variant_ids, nearest_join, overlap_join,
+                                              window_join)
+
+
+def test_build_variant_ids_match_scalar():
+    chrs = ['chr1', 'X', None, 'CHR22']
+    positions = np.array([1, 2, 3, 400000000])
+    refs = pd.Series(['A', 'C', None, 'GG'])
+    alts = pa.array(['T', 'G', 'A', None])
+
+    ids = build_variant_ids(chrs, positions, refs, alts)
+    assert ids.to_pylist() == [build_variant_id(*args) for args in zip(chrs, positions.tolist(), refs, alts.to_pylist())]
+
+    ids = build_variant_ids(pa.chunked_array([chrs[:2], chrs[2:]]), positions, 'A', 'T')
+    assert ids.to_pylist() == [build_variant_id(chr, pos, 'A', 'T') for chr, pos in zip(chrs, positions.tolist())]
+
+
+def test_build_regulatory_region_ids_match_scalar():
+    starts = list(range(0, 3000, 1000))
+    ids = build_regulatory_region_ids('chr1', starts, np.array(starts) + 500)
+    assert ids.to_pylist() == [build_regulatory_region_id('chr1', start, start + 500) for start in starts]
+
+
+def test_batch_id_builders_validate_input():
+    with pytest.raises(ValueError):
+        build_regulatory_region_ids(['chr1'], [1], [2], assembly=['GRCh37'])
+    with pytest.raises(TypeError):
+        build_variant_ids(['chr1'], [1.0], ['A'], ['T'])
+
+
+def test_assembly_check():
+    assert build_variant_id('chr1', 1, 'A', 'T', 'GRCh38') == build_variant_id.trusted('chr1', 1, 'A', 'T')
+    assert build_variant_id('chr1', 1, 'A', 'T', assembly='GRCh38') == 'chr1_1_A_T_GRCh38'
+    with pytest.raises(ValueError):
+        build_variant_id('chr1', 1, 'A', 'T', 'hg19')
+    with pytest.raises(ValueError):
+        build_regulatory_region_id('chr1', 1, 2, assembly='hg19')
+    assert build_regulatory_region_id.trusted('chr1', 1, 2, 'hg19') == 'chr1_1_2_hg19'
+
+
+def test_interval_joins_match_nested_loops():
+    rng = np.random.default_rng(0)
+    query_chr = rng.choice(['chr1', 'chr2', 'chrX'], 300).tolist()
+    query_start = rng.integers(0, 10000, 300)
+    query_end = query_start + rng.integers(0, 300, 300)
+    ref_chr = rng.choice(['chr1', 'chr2', 'chrY'], 200).tolist()
+    ref_start = rng.integers(0, 10000, 200)
+    ref_end = ref_start + (10 ** rng.uniform(0, 4, 200)).astype(int)
+
+    def distance(i, j):
+        return max(ref_start[j] - query_end[i], query_start[i] - ref_end[j], 0)
+    pairs = [(i, j) for i in range(300) for j in range(200) if query_chr[i] == ref_chr[j]]
+
+    queries, refs = overlap_join(query_chr, query_start, query_end, ref_chr, ref_start, ref_end)
+    assert list(zip(queries.tolist(), refs.tolist())) == [(i, j) for i, j in pairs if distance(i, j) == 0]
+
+    queries, refs, distances = window_join(query_chr, query_start, query_end, ref_chr, ref_start, ref_end, 100)
+    assert list(zip(queries.tolist(), refs.tolist(), distances.tolist())) == [
+        (i, j, distance(i, j)) for i, j in pairs if distance(i, j) <= 100]
+
+    nearest = {}
+    for i, j in pairs:
+        nearest[i] = min(nearest.get(i, (distance(i, j), j)), (distance(i, j), j))
+    queries, refs, distances = nearest_join(query_chr, query_start, query_end, ref_chr, ref_start, ref_end)
+    assert list(zip(queries.tolist(), refs.tolist(), distances.tolist())) == [
+        (i, j, d) for i, (d, j) in sorted(nearest.items())]
+    assert 'chrX' not in {query_chr[i] for i in queries.tolist()}
@@ -0,0 +1,90 @@
+"""
+Checks HGVS validation against a SQLite stand-in for UTA.
+"""
+
+from biocypher_metta.adapters.hgvs_validation import HgvsValidator, SqliteSequenceProvider, create_sqlite_uta
+from biocypher_metta.adapters.row_errors import row_errors
+
+# Reference sequence of NC_000006.12 from 0-based position 49949300
+SEGMENT_START = 49949300
+SEGMENT = 'ACGT' * 25 + 'GACCAGAAAGAAAAATAAAAC' + 'TGCA' * 25
+
+
+def make_provider():
+    conn = create_sqlite_uta()
+    conn.execute('INSERT INTO seq_segment VALUES (?, ?, ?)', ('NC_000006.12', SEGMENT_START, SEGMENT))
+    return SqliteSequenceProvider(conn)
+
+
+def test_variant_ids(tmp_path):
+    provider = make_provider()
+    cache_path = str(tmp_path / 'hgvs_cache.sqlite')
+    validator = HgvsValidator(data_provider=provider, cache_path=cache_path)
+    expected = {
+        'NC_000006.12:g.49949407A>T': '6_49949407_A_T_GRCh38',
+        'NC_000006.12:g.49949413_49949414delinsCC': '6_49949413_AA_CC_GRCh38',
+        'NC_000006.12:g.49949415del': '6_49949410_GA_G_GRCh38',
+        'NC_000006.12:g.49949414_49949415insAA': '6_49949410_G_GAA_GRCh38',
+        'NC_000006.12:g.49949407=': None,
+        'not an hgvs id': None,
+    }
+    assert validator.variant_ids(list(expected) * 2) == expected
+    assert validator.variant_id('NC_000006.12:g.49949407A>T') == '6_49949407_A_T_GRCh38'
+
+    # answers come from the cache, in memory and on disk for a new validator
+    round_trips = provider.round_trips
+    validator.close()
+    validator = HgvsValidator(data_provider=provider, cache_path=cache_path, cache_size=2)
+    assert validator.variant_ids(expected) == expected
+    assert provider.round_trips == round_trips
+    assert len(validator._cache) == 2
+
+
+def test_missing_sequence_is_not_cached(tmp_path):
+    provider = make_provider()
+    validator = HgvsValidator(data_provider=provider)
+    assert validator.variant_id('NC_000007.14:g.1000A>T') is None
+    assert 'NC_000007.14:g.1000A>T' not in validator._cache
+
+
+def test_invalid_ids_are_counted():
+    row_errors.clear()
+    try:
+        validator = HgvsValidator(data_provider=make_provider())
+        validator.variant_ids(['not an hgvs id', 'NC_000006.12:g.49949407=', 'NC_000006.12:g.49949407A>T'])
+        report = row_errors.report('HgvsValidator')
+        assert sum(entry['count'] for entry in report) == 2
+        assert {entry['error'] for entry in report} >= {'ValueError'}
+    finally:
+        row_errors.clear()
+
+
+def test_helpers_keep_validated_ids_on_disk(tmp_path, monkeypatch):
+    import biocypher_metta.adapters.hgvs_validation as hgvs_validation
+    from biocypher_metta.adapters.helpers import build_variant_id_from_hgvs, build_variant_ids_from_hgvs
+
+    def no_uta():
+        raise AssertionError('validated ids should come from the cache')
+    monkeypatch.setattr(hgvs_validation, '_validators', {})
+    monkeypatch.setattr(hgvs_validation, 'get_data_provider', no_uta)
+    monkeypatch.setattr(hgvs_validation, 'DEFAULT_CACHE_PATH', str(tmp_path / 'hgvs_cache' / 'default.sqlite'))
+
+    provider = make_provider()
+    ids = ['NC_000006.12:g.49949407A>T', 'NC_000006.12:g.49949407=']
+    expected = {'NC_000006.12:g.49949407A>T': '6_49949407_A_T_GRCh38', 'NC_000006.12:g.49949407=': None}
+    validator = HgvsValidator(data_provider=provider, cache_path=hgvs_validation.DEFAULT_CACHE_PATH)
+    assert validator.variant_ids(ids) == expected
+    validator.close()
+
+    # a later run, through the helpers and the default cache, never reaches UTA
+    assert build_variant_ids_from_hgvs(ids) == expected
+    assert build_variant_id_from_hgvs(ids[0]) == expected[ids[0]]
+    assert list(hgvs_validation._validators) == [('GRCh38', hgvs_validation.DEFAULT_CACHE_PATH)]
+
+    cache_path = str(tmp_path / 'other.sqlite')
+    validator = HgvsValidator(data_provider=provider, cache_path=cache_path)
+    validator.variant_ids(ids)
+    validator.close()
+    round_trips = provider.round_trips
+    assert build_variant_ids_from_hgvs(ids, cache_path=cache_path) == expected
+    assert provider.round_trips == round_trips
@@ -0,0 +1,47 @@
+"""
+Keeps the startup of adapters and of the pipeline script within an import-time budget.
+
+Every import is measured in a fresh interpreter with `python -X importtime`.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import time, in seconds, of modules every adapter imports. biocypher_metta.adapters.helpers
+# imports in about 0.1 s (numpy); it took over 1 s when it pulled in biocypher and liftover.
+IMPORT_BUDGETS = {
+    'biocypher_metta.adapters': 0.1,
+    'biocypher_metta.adapters.helpers': 0.6,
+}
+# Imported on first use only
+HEAVY_MODULES = ['biocypher', 'pandas', 'pyarrow', 'networkx', 'liftover', 'hgvs', 'rdflib']
+WRITER_MODULES = ['biocypher_metta.metta_writer', 'biocypher_metta.prolog_writer', 'biocypher_metta.neo4j_csv_writer',
+                  'biocypher_metta.kgx_writer', 'biocypher_metta.parquet_writer', 'biocypher_metta.networkx_writer']
+
+
+def import_times(module):
+    """{imported module: cumulative import time in seconds} of importing `module`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_adapter_imports_within_budget():
+    for module, budget in IMPORT_BUDGETS.items():
+        times = import_times(module)
+        assert times[module] < budget, f'importing {module} took {times[module]:.2f} s (budget {budget} s)'
+        assert not [name for name in HEAVY_MODULES if name in times]
+
+
+def test_writers_imported_on_use():
+    times = import_times('create_knowledge_graph')
+    assert not [name for name in WRITER_MODULES if name in times]
@@ -0,0 +1,56 @@
+"""
+Checks the batch liftover against the liftover package on a synthetic chain file.
+"""
+
+import gzip
+
+import numpy as np
+from liftover import ChainFile
+
+from biocypher_metta.adapters import helpers
+from biocypher_metta.adapters.helpers import convert_genome_reference, convert_genome_references
+from biocypher_metta.adapters.liftover_chain import ChainIntervals
+
+
+def write_chain_file(path, seed=0):
+    """Random chains with gaps, overlapping chains, shared starts and reverse strand queries."""
+    rng = np.random.default_rng(seed)
+    lines = []
+    for chain_id in rng.permutation(60):
+        target = ['chr1', 'chr2', 'chrX', '7'][chain_id % 4]
+        start = int(rng.integers(0, 5)) * 1000
+        query_strand = '-' if rng.random() < 0.3 else '+'
+        query_start = int(rng.integers(0, 1000))
+        blocks = [(int(rng.integers(1, 300)), int(rng.integers(0, 200)), int(rng.integers(0, 200)))
+                  for _ in range(int(rng.integers(1, 6)))]
+        target_end = start + sum(size + dt for size, dt, _ in blocks[:-1]) + blocks[-1][0]
+        query_end = query_start + sum(size + dq for size, _, dq in blocks[:-1]) + blocks[-1][0]
+        lines.append(f'chain {int(rng.integers(1, 10**6))} {target} 100000 + {start} {target_end} '
+                     f'chr{chain_id % 3 + 1} 50000 {query_strand} {query_start} {query_end} {chain_id}')
+        lines.extend(f'{size}\t{dt}\t{dq}' for size, dt, dq in blocks[:-1])
+        lines.extend([str(blocks[-1][0]), ''])
+    with gzip.open(path, 'wt') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def test_lift_matches_liftover(tmp_path, monkeypatch):
+    path = str(tmp_path / 'hg19ToHg38.over.chain.gz')
+    write_chain_file(path)
+    monkeypatch.setitem(helpers._lifters, 'hg19_hg38', ChainFile(path))
+    monkeypatch.setitem(helpers._chain_intervals, 'hg19_hg38', ChainIntervals.from_file(path))
+
+    rng = np.random.default_rng(1)
+    chroms = rng.choice(['chr1', 'chr2', 'chrX', 'chr7', 'chrY', '1'], 20000).tolist()
+    positions = rng.integers(-10, 7000, 20000)
+    expected = [convert_genome_reference(chr, int(pos)) for chr, pos in zip(chroms, positions)]
+
+    lifted, failed = convert_genome_references(chroms, positions)
+    assert [None if fail else value for value, fail in zip(lifted.tolist(), failed.tolist())] == expected
+    assert 0 < failed.sum() < len(expected)
+
+    # the memo answers without the chain file
+    memo_path = str(tmp_path / 'liftover_memo.npz')
+    convert_genome_references(chroms, positions, memo_path=memo_path)
+    monkeypatch.setitem(helpers._chain_intervals, 'hg19_hg38', None)
+    memo_lifted, memo_failed = convert_genome_references(chroms, positions, memo_path=memo_path)
+    assert np.array_equal(memo_lifted, lifted) and np.array_equal(memo_failed, failed)
@@ -0,0 +1,248 @@
+"""
+Offline tests for OntologyAdapter internals, run against a tiny OWL fixture
+instead of the downloaded ontologies.
+"""
+
+import json
+
+import pytest
+
+from biocypher_metta.adapters.ontologies_adapter import OntologyAdapter
+from biocypher_metta.adapters.ontology_store import ontology_store
+from create_knowledge_graph import process_adapters
+
+
+MINI_OWL = """<?xml version="1.0"?>
+<rdf:RDF xmlns:owl="http://www.w3.org/2002/07/owl#"
+     xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+     xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+     xmlns:oboInOwl="http://www.geneontology.org/formats/oboInOwl#"
+     xmlns:obo="http://purl.obolibrary.org/obo/">
+    <owl:Ontology rdf:about="http://purl.obolibrary.org/obo/mini.owl"/>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/GO_0000001">
+        <rdfs:label>root</rdfs:label>
+        <oboInOwl:hasOBONamespace>biological_process</oboInOwl:hasOBONamespace>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/GO_0000002">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/GO_0000001"/>
+        <rdfs:label>child</rdfs:label>
+        <obo:IAO_0000115>a child term</obo:IAO_0000115>
+        <oboInOwl:hasExactSynonym>kid</oboInOwl:hasExactSynonym>
+        <oboInOwl:hasOBONamespace>biological_process</oboInOwl:hasOBONamespace>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/GO_0000003">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/GO_0000002"/>
+        <rdfs:label>grandchild</rdfs:label>
+        <oboInOwl:hasRelatedSynonym>grandkid</oboInOwl:hasRelatedSynonym>
+        <oboInOwl:hasOBONamespace>biological_process</oboInOwl:hasOBONamespace>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/GO_0000004">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/GO_0000001"/>
+        <rdfs:label>obsolete term</rdfs:label>
+        <owl:deprecated rdf:datatype="http://www.w3.org/2001/XMLSchema#boolean">true</owl:deprecated>
+    </owl:Class>
+</rdf:RDF>
+"""
+
+
+class MiniOntologyAdapter(OntologyAdapter):
+    ONTOLOGIES = {}
+
+    def get_ontology_source(self):
+        return 'Mini Ontology', 'http://purl.obolibrary.org/obo/mini.owl'
+
+    def get_uri_prefixes(self):
+        return {
+            'primary': 'http://purl.obolibrary.org/obo/GO_',
+        }
+
+
+@pytest.fixture
+def mini_owl(tmp_path, monkeypatch):
+    owl_path = tmp_path / 'mini.owl'
+    owl_path.write_text(MINI_OWL)
+    monkeypatch.setattr(MiniOntologyAdapter, 'ONTOLOGIES', {'mini': str(owl_path)})
+    ontology_store.clear()
+    ontology_store.reset_stats()
+    yield owl_path
+    ontology_store.clear()
+    ontology_store.reset_stats()
+
+
+def make_adapter(type, label, **kwargs):
+    return MiniOntologyAdapter(write_properties=True, add_provenance=False,
+                               ontology='mini', type=type, label=label, **kwargs)
+
+
+def test_ontology_parsed_once_across_adapters(mini_owl):
+    """Node and edge adapters for the same ontology share a single parse."""
+    nodes = list(make_adapter('node', 'term').get_nodes())
+    edges = list(make_adapter('edge', 'term_subclass_of').get_edges())
+
+    assert {node_id for node_id, _, _ in nodes} == {'GO:0000001', 'GO:0000002', 'GO:0000003'}
+    assert ('GO:0000002', 'GO:0000001') in {(s, t) for s, t, _, _ in edges}
+    assert ontology_store.parses == 1
+    assert ontology_store.parses_avoided == 1
+
+
+def test_bridge_graph_does_not_stand_for_the_ontology(mini_owl, monkeypatch):
+    """A graph parsed as a bridge is not taken by an adapter of that ontology, which records its version."""
+    def extract_version_info(adapter):
+        adapter.version = '2024-01-01'
+    monkeypatch.setattr(MiniOntologyAdapter, '_extract_version_info', extract_version_info)
+    bridge = make_adapter('node', 'term').get_shared_graph(str(mini_owl), str(mini_owl))
+    assert len(bridge) > 0
+
+    adapter = make_adapter('node', 'term')
+    adapter.update_graph()
+    assert adapter.version == '2024-01-01'
+    assert ontology_store.get(str(mini_owl)).version == '2024-01-01'
+    # and a later bridge reuses the adapter's graph
+    assert make_adapter('node', 'term').get_shared_graph(str(mini_owl)) is adapter.graph
+
+
+def test_store_evicts_least_recently_used(mini_owl):
+    store_capacity = ontology_store.max_entries
+    for i in range(store_capacity + 1):
+        ontology_store.put(f'http://example.org/onto_{i}.owl', graph=object())
+
+    assert 'http://example.org/onto_0.owl' not in ontology_store
+    assert ontology_store.evictions == 1
+
+
+MINI_OWL_CLASS = 'http://www.w3.org/2002/07/owl#Class'
+MINI_OWL_NODE_PROPERTIES = {
+    'GO:0000001': {'term_names': ['root'], 'namespaces': ['biological_process'], 'node_types': [MINI_OWL_CLASS]},
+    'GO:0000002': {'term_names': ['child'], 'namespaces': ['biological_process'], 'node_types': [MINI_OWL_CLASS],
+                   'descriptions': ['a child term'], 'exact_synonyms': ['kid']},
+    'GO:0000003': {'term_names': ['grandchild'], 'namespaces': ['biological_process'],
+                   'node_types': [MINI_OWL_CLASS], 'related_synonyms': ['grandkid']},
+    'GO:0000004': {'term_names': ['obsolete term'], 'node_types': [MINI_OWL_CLASS], 'deprecated': ['true']},
+}
+
+
+def cached_terms(adapter):
+    return {key: {collection: [str(value) for value in values] for collection, values in entry.items()}
+            for key, entry in adapter.cache.items() if key.startswith('GO:')}
+
+
+def test_node_property_cache(mini_owl):
+    """cache_node_properties() indexes the node properties of the fixture in a single pass over the graph."""
+    adapter = make_adapter('node', 'term')
+    adapter.update_graph()
+    adapter.cache_node_properties()
+
+    assert cached_terms(adapter) == MINI_OWL_NODE_PROPERTIES
+    assert set(adapter.iter_graph_nodes()) == set(adapter.graph.all_nodes())
+    synonyms = adapter.get_all_property_values_from_node(
+        'http://purl.obolibrary.org/obo/GO_0000002', 'exact_synonyms')
+    assert [str(synonym) for synonym in synonyms] == ['kid']
+
+    # caching a predicate again does not repeat its values
+    adapter.cache_predicate(OntologyAdapter.LABEL, 'term_names')
+    adapter.cache_predicates({OntologyAdapter.TYPE: 'node_types'}, collect_nodes=True)
+    assert cached_terms(adapter) == MINI_OWL_NODE_PROPERTIES
+
+    adapter.clear_cache()
+    adapter.cache_predicate(OntologyAdapter.EXACT_SYNONYM, 'exact_synonyms')
+    assert cached_terms(adapter) == {'GO:0000002': {'exact_synonyms': ['kid']}}
+    assert adapter.graph_nodes is None
+
+
+def test_transitive_closure_edges(mini_owl):
+    """Closure edges link each term to every non-deprecated ancestor with its shortest distance."""
+    adapter = make_adapter('edge', 'term_subclass_of_closure', transitive_closure=True)
+    edges = {(s, t): props['distance'] for s, t, _, props in adapter.get_edges()}
+
+    assert edges == {
+        ('GO:0000002', 'GO:0000001'): 1,
+        ('GO:0000003', 'GO:0000002'): 1,
+        ('GO:0000003', 'GO:0000001'): 2,
+    }
+
+    capped = make_adapter('edge', 'term_subclass_of_closure', transitive_closure=True,
+                          closure_max_ancestors=1)
+    assert {(s, t) for s, t, _, _ in capped.get_edges()} == {
+        ('GO:0000002', 'GO:0000001'),
+        ('GO:0000003', 'GO:0000002'),
+    }
+
+
+def emit_nodes(adapter):
+    # as process_adapters() reads the nodes of an adapter with emit_diff
+    return adapter.emit_changes(adapter.get_nodes())
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_emit_diff_between_releases(mini_owl, tmp_path):
+    """With emit_diff, the full release is still emitted and the changes are written apart."""
+    cache_dir = tmp_path / 'cache'
+    first = list(emit_nodes(make_adapter('node', 'term', emit_diff=True, cache_dir=str(cache_dir))))
+    assert len(first) == 3
+    assert not (cache_dir / 'deltas').exists()
+
+    mini_owl.write_text(MINI_OWL
+                        .replace('<rdfs:label>grandchild</rdfs:label>', '<rdfs:label>renamed</rdfs:label>')
+                        .replace('GO_0000002"', 'GO_0000005"'))
+    # Drop the cached download so the new release is read, keeping the snapshot
+    (cache_dir / 'mini.owl').unlink()
+    ontology_store.clear()
+    adapter = make_adapter('node', 'term', emit_diff=True, cache_dir=str(cache_dir))
+    nodes = {node_id: props for node_id, _, props in emit_nodes(adapter)}
+
+    assert set(nodes) == {'GO:0000001', 'GO:0000003', 'GO:0000005'}
+    [delta_dir] = (cache_dir / 'deltas').iterdir()
+    assert read_jsonl(delta_dir / 'added.jsonl') == [
+        {'id': 'GO:0000005', 'label': 'term', 'properties': json.loads(json.dumps(nodes['GO:0000005']))}]
+    [changed] = read_jsonl(delta_dir / 'changed.jsonl')
+    assert changed['id'] == 'GO:0000003' and changed['properties']['term_name'] == 'renamed'
+    assert read_jsonl(delta_dir / 'removed.jsonl') == [{'id': 'GO:0000002'}]
+    summary = json.loads((delta_dir / 'summary.json').read_text())
+    assert (summary['added'], summary['changed'], summary['removed']) == (1, 1, 1)
+
+
+class ListWriter:
+    def __init__(self):
+        self.nodes = []
+
+    def clear_counts(self):
+        pass
+
+    def write_nodes(self, nodes, path_prefix=None):
+        self.nodes.extend(nodes)
+        return {}, {}
+
+
+def test_process_adapters_emits_the_changes(mini_owl, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    adapters = {'mini_terms': {
+        'adapter': {'module': MiniOntologyAdapter.__module__, 'cls': 'MiniOntologyAdapter',
+                    'args': {'ontology': 'mini', 'type': 'node', 'label': 'term', 'emit_diff': True,
+                             'cache_dir': str(cache_dir)}},
+        'outdir': 'mini', 'nodes': True, 'edges': False}}
+    writer = ListWriter()
+    process_adapters(adapters, {}, {}, writer, True, False, {})
+
+    assert len(writer.nodes) == 3
+    assert (cache_dir / 'mini_term_node_snapshot.json').exists()
+
+
+def test_emit_diff_rerun_of_a_release(mini_owl, tmp_path, monkeypatch):
+    """Rerunning the release of the snapshot emits it in full and writes no delta."""
+    def extract_version_info(adapter):
+        adapter.version = '2024-01-01'
+    monkeypatch.setattr(MiniOntologyAdapter, '_extract_version_info', extract_version_info)
+    cache_dir = tmp_path / 'cache'
+    first = list(emit_nodes(make_adapter('node', 'term', emit_diff=True, cache_dir=str(cache_dir))))
+    snapshot = cache_dir / 'mini_term_node_snapshot.json'
+    assert json.loads(snapshot.read_text())['version'] == '2024-01-01'
+    snapshot_written = snapshot.stat().st_mtime_ns
+
+    ontology_store.clear()
+    again = list(emit_nodes(make_adapter('node', 'term', emit_diff=True, cache_dir=str(cache_dir))))
+    assert again == first
+    assert not (cache_dir / 'deltas').exists()
+    assert snapshot.stat().st_mtime_ns == snapshot_written
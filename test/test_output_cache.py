@@ -0,0 +1,132 @@
+"""
+Tests for the Arrow IPC cache of adapter outputs.
+"""
+
+import gzip
+import os
+from collections import Counter
+
+from biocypher_metta.adapters.hsa.gtex_eqtl_adapter import GTExEQTLAdapter
+from biocypher_metta.adapters import output_cache
+from biocypher_metta.adapters.output_cache import AdapterOutputCache
+from biocypher_metta.adapters.row_errors import row_errors
+from biocypher_metta.processors import EntrezEnsemblProcessor, HGNCProcessor
+from create_knowledge_graph import process_adapters
+
+
+class ListWriter:
+    """Writer keeping what it is given, in place of the MeTTa/Neo4j/... writers."""
+    def __init__(self):
+        self.nodes = []
+        self.edges = []
+
+    def clear_counts(self):
+        pass
+
+    def write_nodes(self, nodes, path_prefix=None):
+        self.nodes.extend(nodes)
+        return Counter(label for _, label, _ in self.nodes), {}
+
+    def write_edges(self, edges, path_prefix=None):
+        self.edges.extend(edges)
+        return Counter(label for _, _, label, _ in self.edges)
+
+
+def test_record_and_replay(tmp_path):
+    cache = AdapterOutputCache(str(tmp_path), batch_size=2)
+    nodes = [('ENSEMBL:ENSG1', 'gene', {'chr': 'chr1', 'start': 1, 'synonym': ['a', 'b']}),
+             (('protein', 'P1'), 'protein', {}),
+             ('ENSEMBL:ENSG2', 'gene', {'score': 0.5, 'context': None})]
+
+    assert list(cache.record('genes', 'k', 'nodes', iter(nodes))) == nodes
+    assert list(cache.replay(os.path.join(str(tmp_path), 'genes_k', 'nodes.arrow'))) == nodes
+
+    # a stream that is not read to the end is not cached
+    list(zip(range(1), cache.record('genes', 'partial', 'nodes', iter(nodes))))
+    assert not os.path.exists(os.path.join(str(tmp_path), 'genes_partial', 'nodes.arrow'))
+
+
+def test_key_follows_arguments_and_inputs(tmp_path):
+    filepath = tmp_path / 'input.csv'
+    filepath.write_text('a\n')
+    cache = AdapterOutputCache(str(tmp_path / 'cache'), shared_inputs={'dbsnp_rsid_map': None})
+    config = {'module': 'biocypher_metta.adapters.hsa.gtex_eqtl_adapter', 'cls': 'GTExEQTLAdapter'}
+    key = cache.key(config, {'filepath': str(filepath), 'label': 'x', 'dbsnp_rsid_map': {'rs1': 1}})
+
+    assert cache.key(config, {'filepath': str(filepath), 'label': 'x', 'dbsnp_rsid_map': {'rs2': 2}}) == key
+    assert cache.key(config, {'filepath': str(filepath), 'label': 'y', 'dbsnp_rsid_map': {}}) != key
+    filepath.write_text('ab\n')
+    assert cache.key(config, {'filepath': str(filepath), 'label': 'x', 'dbsnp_rsid_map': {}}) != key
+
+
+
+def test_key_follows_shared_sources(tmp_path, monkeypatch):
+    # helpers, readers and processors the adapter runs, besides its own module
+    shared = tmp_path / 'processors' / 'sub'
+    shared.mkdir(parents=True)
+    (shared / 'mapping.py').write_text('MAPPING = {}\n')
+    monkeypatch.setattr(output_cache, 'SHARED_SOURCES',
+                        output_cache.SHARED_SOURCES + [(str(tmp_path / 'processors'), True)])
+    config = {'module': 'biocypher_metta.adapters.hsa.gtex_eqtl_adapter', 'cls': 'GTExEQTLAdapter'}
+    key = AdapterOutputCache(str(tmp_path / 'cache')).key(config, {'label': 'x'})
+    assert AdapterOutputCache(str(tmp_path / 'cache')).key(config, {'label': 'x'}) == key
+
+    (shared / 'mapping.py').write_text('MAPPING = {1: 2}\n')
+    assert AdapterOutputCache(str(tmp_path / 'cache')).key(config, {'label': 'x'}) != key
+
+
+def test_key_resolves_implicit_inputs(tmp_path, monkeypatch):
+    # ontologies are downloaded by the adapter, it is never cached
+    ontology = {'module': 'biocypher_metta.adapters.uberon_adapter', 'cls': 'UberonAdapter'}
+    assert AdapterOutputCache(str(tmp_path)).key(ontology, {'ontology': 'uberon', 'type': 'node'}) is None
+    reactome = {'module': 'biocypher_metta.adapters.reactome_edges_adapter', 'cls': 'ReactomeEdgesAdapter'}
+    assert AdapterOutputCache(str(tmp_path)).key(reactome, {'taxon_id': 7227}) is None
+
+    # nor is an adapter whose ID mapping is due for an update
+    genes = {'module': 'biocypher_metta.adapters.gencode_gene_adapter', 'cls': 'GencodeGeneAdapter'}
+    monkeypatch.setattr(EntrezEnsemblProcessor, 'check_update_needed', lambda self: False)
+    monkeypatch.setattr(HGNCProcessor, 'check_update_needed', lambda self: True)
+    assert AdapterOutputCache(str(tmp_path)).key(genes, {'label': 'gene'}) is None
+    monkeypatch.setattr(HGNCProcessor, 'check_update_needed', lambda self: False)
+    key = AdapterOutputCache(str(tmp_path)).key(genes, {'label': 'gene'})
+    assert key is not None
+
+    # the key follows the version of the mappings
+    monkeypatch.setattr(output_cache, '_file_fingerprint', lambda path: [path, 0, 0])
+    assert AdapterOutputCache(str(tmp_path)).key(genes, {'label': 'gene'}) != key
+
+
+def test_process_adapters_replays_the_cache(tmp_path, monkeypatch):
+    # the sample with a row whose position is not a number
+    filepath = tmp_path / 'gtex.csv.gz'
+    with gzip.open('./samples/hsa/gtex.forgedb.sample.csv.gz', 'rt') as f:
+        lines = f.readlines()
+    fields = lines[1].split(',')
+    fields[19] = 'x'
+    with gzip.open(filepath, 'wt') as f:
+        f.writelines(lines + [','.join(fields)])
+    adapters = {'gtex_eqtl': {
+        'adapter': {'module': 'biocypher_metta.adapters.hsa.gtex_eqtl_adapter', 'cls': 'GTExEQTLAdapter',
+                    'args': {'filepath': str(filepath),
+                             'gtex_tissue_ontology_map': './aux_files/hsa/gtex_tissues_to_ontology_map.pkl',
+                             'label': 'gtex_variant_gene'}},
+        'outdir': 'gtex/eqtl', 'nodes': False, 'edges': True}}
+    cache = AdapterOutputCache(str(tmp_path / 'cache'))
+
+    first = ListWriter()
+    expected = process_adapters(adapters, {}, {}, first, True, True, {}, output_cache=cache)
+    assert cache.misses == 1 and first.edges
+    report = row_errors.report()
+    assert [(entry['adapter'], entry['error'], entry['count']) for entry in report] == [('gtex_eqtl', 'ValueError', 1)]
+
+    # the adapter is not constructed again
+    def not_constructed(*args, **kwargs):
+        raise AssertionError('adapter constructed')
+    monkeypatch.setattr(GTExEQTLAdapter, '__init__', not_constructed)
+    replayed = ListWriter()
+    assert process_adapters(adapters, {}, {}, replayed, True, True, {}, output_cache=cache) == expected
+    assert cache.hits == 1
+    assert replayed.edges == first.edges
+    # with the rows the adapter skipped
+    assert row_errors.report() == report
+    row_errors.clear()
@@ -0,0 +1,67 @@
+"""
+Checks the accounting of the rows adapters skip.
+"""
+
+import logging
+
+from biocypher_metta.adapters import Adapter
+from biocypher_metta.adapters.row_errors import RowErrors, row_errors
+
+
+class DirtyAdapter(Adapter):
+    def __init__(self, rows):
+        self.rows = rows
+        super().__init__(True, False)
+
+    def get_nodes(self):
+        for row in self.rows:
+            try:
+                yield row[0], 'gene', {'score': float(row[1])}
+            except Exception as e:
+                self.row_error(e, row)
+
+
+def test_first_errors_logged_and_the_rest_counted(caplog):
+    errors = RowErrors(examples=2, log_interval=3600)
+    with caplog.at_level(logging.WARNING, logger='biocypher'):
+        for i in range(1000):
+            errors.record(ValueError(f'bad value {i}'), ['ENSG1', 'x' * 500], adapter='gtex')
+        errors.record(KeyError('tissue'), adapter='gtex')
+
+    assert errors.counts == {('gtex', 'ValueError'): 1000, ('gtex', 'KeyError'): 1}
+    assert len(caplog.records) == 3
+    assert caplog.records[0].getMessage().startswith("gtex: skipping row, ValueError: bad value 0 in ['ENSG1', 'xxx")
+    assert caplog.records[0].getMessage().endswith("...")
+    assert 'one is logged every 3600 s' in caplog.records[1].getMessage()
+
+    [value_errors, key_errors] = errors.report()
+    assert value_errors['adapter'] == 'gtex' and value_errors['count'] == 1000
+    assert len(value_errors['examples']) == 2
+    assert key_errors == {'adapter': 'gtex', 'error': 'KeyError', 'count': 1,
+                          'examples': ["gtex: skipping row, KeyError: 'tissue'"]}
+    assert errors.summary().splitlines() == ['Row errors: 1001 rows skipped', 'gtex: 1000 rows skipped on ValueError',
+                                             'gtex: 1 rows skipped on KeyError']
+
+
+def test_errors_sampled_after_the_first(caplog):
+    errors = RowErrors(examples=1, log_interval=0)
+    with caplog.at_level(logging.WARNING, logger='biocypher'):
+        for _ in range(3):
+            errors.record(ValueError('bad value'), adapter='gwas')
+    assert [record.getMessage() for record in caplog.records][1:] == [
+        'gwas: skipping row, ValueError: bad value (2 ValueError errors so far)',
+        'gwas: skipping row, ValueError: bad value (3 ValueError errors so far)']
+    assert len(errors.report()[0]['examples']) == 1
+
+
+def test_adapters_count_skipped_rows():
+    row_errors.clear()
+    nodes = list(DirtyAdapter([('ENSG1', '0.5'), ('ENSG2', 'n/a'), ('ENSG3',)]).get_nodes())
+    assert nodes == [('ENSG1', 'gene', {'score': 0.5})]
+    assert row_errors.counts == {('DirtyAdapter', 'ValueError'): 1, ('DirtyAdapter', 'IndexError'): 1}
+
+    # in a build, errors are counted against the adapter being run
+    row_errors.adapter = 'dirty_genes'
+    list(DirtyAdapter([('ENSG2', 'n/a')]).get_nodes())
+    assert row_errors.counts[('dirty_genes', 'ValueError')] == 1
+    row_errors.clear()
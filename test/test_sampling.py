@@ -0,0 +1,130 @@
+"""
+Tests for the deterministic record sampling of sampled builds.
+"""
+
+import os
+from collections import Counter
+
+import pytest
+
+from biocypher_metta.adapters.gencode_exon_adapter import GencodeExonAdapter
+from biocypher_metta.adapters.hsa.gtex_eqtl_adapter import GTExEQTLAdapter
+from biocypher_metta.adapters.sampling import RecordSampler, SampleFilter, SAMPLED_NODE_TYPES, sample_key
+from config.yaml_loader import load_yaml_with_includes
+from create_knowledge_graph import merge_schemas, preprocess_schema, process_adapters
+
+# Sample entries of GENCODE nodes and of edges to them from other adapters
+BUILD = ['gencode_gene', 'gencode_transcripts', 'gencode_exon', 'transcribes_to', 'exon_part_of_transcript',
+         'exon_part_of_gene', 'genes_pathways', 'coexpression', 'tflink', 'gtex_eqtl']
+
+
+class ListWriter:
+    """Writer keeping what it is given, in place of the MeTTa/Neo4j/... writers."""
+    def __init__(self):
+        self.nodes = []
+        self.edges = []
+
+    def clear_counts(self):
+        pass
+
+    def write_nodes(self, nodes, path_prefix=None):
+        self.nodes.extend(nodes)
+        return Counter(label for _, label, _ in self.nodes), {}
+
+    def write_edges(self, edges, path_prefix=None):
+        self.edges.extend(edges)
+        return Counter(label for _, _, label, _ in self.edges)
+
+
+def test_sampler_is_deterministic():
+    ids = [f'ENSG{i:011d}' for i in range(20000)]
+    sampler = RecordSampler(0.1, seed=1)
+    kept = [i for i in ids if sampler.keep(i)]
+
+    assert kept == [i for i in ids if RecordSampler(0.1, seed=1).keep(i)]
+    assert abs(len(kept) / len(ids) - 0.1) < 0.01
+    assert kept != [i for i in ids if RecordSampler(0.1, seed=2).keep(i)]
+    # a smaller rate keeps a subset of the entities
+    assert set(i for i in ids if RecordSampler(0.05, seed=1).keep(i)) <= set(kept)
+    # the CURIE prefix and case do not matter
+    assert all(sampler.keep(f'ENSEMBL:{i}') and sampler.keep(i.lower()) for i in kept)
+    assert RecordSampler(1).keep(*ids)
+
+    with pytest.raises(ValueError):
+        RecordSampler(0)
+
+
+def test_exons_are_sampled_by_their_id():
+    sampler = RecordSampler(0.3, seed=0)
+    nodes = GencodeExonAdapter(True, False, 'exon', 9606, 'exon', filepath='samples/hsa/gencode_sample.gtf.gz')
+    edges = GencodeExonAdapter(True, False, 'gene', 9606, 'part_of_gene', filepath='samples/hsa/gencode_sample.gtf.gz')
+    all_exons = [exon_id for exon_id, _, _ in nodes.get_nodes()]
+    nodes.sampler = edges.sampler = sampler
+
+    node_exons = [exon_id for exon_id, _, _ in nodes.get_nodes()]
+    assert node_exons == [exon_id for exon_id in all_exons if sampler.keep(exon_id)]
+    assert 0 < len(node_exons) < len(all_exons)
+    assert all(sampler.keep(exon_id, gene_id) for exon_id, gene_id, _, _ in edges.get_edges())
+
+
+def test_edges_are_kept_when_both_ends_are_sampled():
+    adapter = GTExEQTLAdapter('samples/hsa/gtex.forgedb.sample.csv.gz',
+                              'aux_files/hsa/gtex_tissues_to_ontology_map.pkl', True, False, 'gtex_variant_gene')
+    edges = list(adapter.get_edges())
+    adapter.sampler = sampler = RecordSampler(0.5, seed=3)
+
+    assert list(adapter.get_edges()) == [edge for edge in edges if sampler.keep(edge[0], edge[1])]
+
+
+def test_sample_filter_batches():
+    schema = {'transcribed_to': {'source': 'gene', 'target': 'transcript'},
+              'genes_pathways': {'source': ['gene', 'protein'], 'target': 'pathway'}}
+    sample_filter = SampleFilter(RecordSampler(0.5, seed=1), schema)
+    genes = [f'ENSG{i:011d}' for i in range(100)]
+    kept = [gene for gene in genes if sample_filter.sampler.keeps(gene)]
+    batch = {'source': genes + [('protein', 'P1')], 'target': ['R-HSA-1'] * 101,
+             'label': ['genes_pathways'] * 101, 'properties': {'rank': list(range(101))}}
+
+    filtered, = sample_filter.edge_batches([batch])
+    assert filtered['source'] == kept + [('protein', 'P1')]
+    assert filtered['properties']['rank'] == [genes.index(gene) for gene in kept] + [100]
+    assert sample_filter.dropped['edges'] == 100 - len(kept)
+
+    nodes = {'id': genes[:2] + ['GO:0008150'], 'label': ['gene', 'gene', 'biological_process'],
+             'properties': {}}
+    filtered, = sample_filter.node_batches([nodes])
+    assert filtered['id'] == [gene for gene in genes[:2] if gene in kept] + ['GO:0008150']
+
+
+def test_sampled_build_has_no_dangling_edges():
+    schema_path = merge_schemas('config/primer_schema_config.yaml', 'config/hsa/hsa_schema_config.yaml')
+    try:
+        schema = preprocess_schema(schema_path)
+    finally:
+        os.remove(schema_path)
+    with open('config/hsa/hsa_adapters_config_sample.yaml') as f:
+        adapters = load_yaml_with_includes(f)
+    adapters = {name: adapters[name] for name in BUILD}
+    sampler = RecordSampler(0.3, seed=0)
+
+    def dangling_ends(writer):
+        node_ids = {sample_key(node_id) for node_id, label, _ in writer.nodes if label in SAMPLED_NODE_TYPES}
+        ends = set()
+        for source, target, label, _ in writer.edges:
+            for end, types in ((source, schema[label.lower()]['source']), (target, schema[label.lower()]['target'])):
+                if isinstance(end, tuple):
+                    types, end = end
+                types = types if isinstance(types, list) else [types]
+                if SAMPLED_NODE_TYPES.intersection(types) and sample_key(end) not in node_ids:
+                    ends.add(sample_key(end))
+        return ends
+
+    full, sampled = ListWriter(), ListWriter()
+    process_adapters(adapters, {}, {}, full, True, False, schema)
+    process_adapters(adapters, {}, {}, sampled, True, False, schema, sampler=sampler)
+
+    assert {node[0] for node in sampled.nodes} == {node[0] for node in full.nodes
+                                                   if node[1] not in SAMPLED_NODE_TYPES or sampler.keeps(node[0])}
+    assert 0 < len(sampled.edges) < len(full.edges)
+    # the only ends without a node are those of entities the samples/ files lack, which are in the sample
+    assert dangling_ends(sampled) <= {end for end in dangling_ends(full) if sampler.keeps(end)}
@@ -0,0 +1,175 @@
+"""
+Checks the chunked STRING and TopLD adapters against their former row-by-row loops on the
+samples, with score thresholds, region filters, unmapped and malformed rows.
+"""
+
+import csv
+import gzip
+from types import SimpleNamespace
+
+import pytest
+
+from biocypher_metta.adapters.helpers import check_genomic_location, to_float
+from biocypher_metta.adapters.hsa.topld_adapter import TopLDAdapter
+from biocypher_metta.adapters.row_errors import row_errors
+from biocypher_metta.adapters.string_ppi_adapter import StringPPIAdapter
+
+STRING_SAMPLE = 'samples/hsa/string_human_ppi_v12.0.txt.gz'
+TOPLD_SAMPLE = 'samples/hsa/topld/EUR/topld_eur_chr16_sample.csv.gz'
+LABEL = 'in_linkage_disequilibrium_with'
+
+MALFORMED_TOPLD_ROWS = [
+    'x10038,308433,10038:C:T,308433:C:T,0.9,1.0,+',      # position that is not an int
+    '10038,308433,10038:C:T,308433:C:T,high,1.0,+',      # R2 that is not a float
+    '10038,308433,10038:C:T,308433:C:T,-0.9,1.0,+',      # R2 with its own sign: '+-0.9'
+    '10038,308433,10038:C:T,308433:C:T,0.9,1.0,?',       # unknown sign
+    '10038,308433,10038:C:T,308433:C:T,inf,1.0,-',       # to_float() clamps infinities
+    '10038,308433,10038:C:T,308433:C:T,0.9,1e400,+',
+    '10038,308433,10038:C:T,308433:C:T,0.9,nan,+',
+    '10038,308433,10038:C:T,308433:C:T,0.9',             # short row
+    '10038,308433,10038:C:T,308433:C:T,0.75,0.5,-',      # a valid row after them
+]
+
+
+def string_rows(path, ensembl2uniprot, write_properties, add_provenance, taxon_id=9606):
+    # StringPPIAdapter.get_edges() before it read the file in chunks
+    with gzip.open(path, "rt") as fp:
+        table = csv.reader(fp, delimiter=" ", quotechar='"')
+        next(table)
+        for row in table:
+            protein1 = row[0].split(".")[1]
+            protein2 = row[1].split(".")[1]
+            if protein1 in ensembl2uniprot and protein2 in ensembl2uniprot:
+                props = {}
+                if write_properties:
+                    props = {"score": to_float(row[2]) / 1000, 'taxon_id': f'{taxon_id}'}
+                    if add_provenance:
+                        props["source"] = "STRING"
+                        props["source_url"] = "https://string-db.org/"
+                yield ensembl2uniprot[protein1], ensembl2uniprot[protein2], 'interacts_with', props
+
+
+def topld_rows(path, dbsnp_pos_map, chr, start=None, end=None, cutoff=0.5, add_provenance=False):
+    # TopLDAdapter.get_edges() before it read the file in chunks
+    with gzip.open(path, 'rt') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            try:
+                var1_pos, var2_pos = int(row[0]), int(row[1])
+                if not check_genomic_location(chr, start, end, chr, var1_pos, var1_pos) or \
+                        not check_genomic_location(chr, start, end, chr, var2_pos, var2_pos):
+                    continue
+                rsid_1 = dbsnp_pos_map.get(f"{chr}_{var1_pos}", None)
+                rsid_2 = dbsnp_pos_map.get(f"{chr}_{var2_pos}", None)
+                if rsid_1 is None or rsid_2 is None:
+                    continue
+                r2_score = to_float(f"{row[6]}{row[4]}")
+                if abs(r2_score) < cutoff:
+                    continue
+                props = {'r2': to_float(r2_score), 'd_prime': to_float(row[5]), 'ancestry': 'EUR'}
+                if add_provenance:
+                    props['source'] = "TopLD"
+                    props['source_url'] = "http://topld.genetics.unc.edu/"
+                yield rsid_1, rsid_2, LABEL, props
+            except Exception:
+                continue
+
+
+def write_gzip(path, lines):
+    with gzip.open(path, 'wt') as f:
+        f.writelines(line + '\n' for line in lines)
+    return str(path)
+
+
+def sample_lines(path):
+    with gzip.open(path, 'rt') as f:
+        return f.read().splitlines()
+
+
+@pytest.fixture
+def string_mapping():
+    # about two thirds of the sample's proteins are mapped
+    proteins = sorted({protein.split('.')[1] for line in sample_lines(STRING_SAMPLE)[1:]
+                       for protein in line.split()[:2]})
+    return {protein: f'P{i:05d}' for i, protein in enumerate(proteins) if i % 3 != 1}
+
+
+@pytest.mark.parametrize('write_properties, add_provenance', [(True, True), (True, False), (False, False)])
+def test_string_matches_rows(tmp_path, string_mapping, write_properties, add_provenance):
+    path = write_gzip(tmp_path / 'string.txt.gz', sample_lines(STRING_SAMPLE) * 1 +
+                      sample_lines(STRING_SAMPLE)[1:])
+    expected = list(string_rows(path, string_mapping, write_properties, add_provenance))
+    assert 0 < len(expected) < 2 * 49
+
+    adapter = StringPPIAdapter(path, write_properties=write_properties, add_provenance=add_provenance,
+                               ensembl_uniprot_processor=SimpleNamespace(mapping=string_mapping), chunk_size=7)
+    assert list(adapter.get_edges()) == expected
+
+
+def test_string_min_score(tmp_path, string_mapping):
+    expected = [edge for edge in string_rows(STRING_SAMPLE, string_mapping, True, False)
+                if edge[3]['score'] >= 0.2]
+    assert 0 < len(expected) < len(list(string_rows(STRING_SAMPLE, string_mapping, True, False)))
+
+    adapter = StringPPIAdapter(STRING_SAMPLE, write_properties=True, add_provenance=False, min_score=0.2,
+                               ensembl_uniprot_processor=SimpleNamespace(mapping=string_mapping), chunk_size=10)
+    assert list(adapter.get_edges()) == expected
+
+
+@pytest.fixture
+def dbsnp_pos_map():
+    positions = sorted({p for line in sample_lines(TOPLD_SAMPLE)[1:] for p in line.split(',')[:2]})
+    # about two thirds of the positions have an rsid
+    return {f'chr16_{p}': f'rs{p}' for p in positions[::3] + positions[1::3] + ['10038', '308433']}
+
+
+@pytest.mark.parametrize('start, end, cutoff', [(None, None, 0.5), (None, None, 0.0), (10038, 90000, 0.3)])
+def test_topld_matches_rows(tmp_path, dbsnp_pos_map, start, end, cutoff):
+    lines = sample_lines(TOPLD_SAMPLE)
+    path = write_gzip(tmp_path / 'topld.csv.gz', lines[:20] + MALFORMED_TOPLD_ROWS + lines[20:])
+    expected = list(topld_rows(path, dbsnp_pos_map, 'chr16', start, end, cutoff, add_provenance=True))
+    assert expected
+
+    adapter = TopLDAdapter(path, dbsnp_pos_map, 'chr16', 'EUR', LABEL, True, True,
+                           start=start, end=end, cutoff=cutoff, chunk_size=8)
+    assert list(adapter.get_edges()) == expected
+
+
+def test_topld_counts_malformed_rows(tmp_path, dbsnp_pos_map):
+    path = write_gzip(tmp_path / 'topld.csv.gz', ['SNP1,SNP2,Uniq_ID_1,Uniq_ID_2,R2,Dprime,+/-corr'] +
+                      MALFORMED_TOPLD_ROWS)
+    adapter = TopLDAdapter(path, dbsnp_pos_map, 'chr16', 'EUR', LABEL, True, False, cutoff=0.0)
+    row_errors.clear()
+    edges = list(adapter.get_edges())
+    assert edges == list(topld_rows(path, dbsnp_pos_map, 'chr16', cutoff=0.0))
+    # pandas pads the short row with empty fields, so it fails on them rather than on a missing column
+    assert row_errors.counts == {('TopLDAdapter', 'ValueError'): 6}
+    row_errors.clear()
+
+
+@pytest.mark.parametrize('chunk_size', [4, 7])
+def test_ragged_rows_are_counted(tmp_path, string_mapping, dbsnp_pos_map, chunk_size):
+    # rows with extra fields are skipped and counted instead of failing the whole file, also
+    # when they start a chunk (the fifth row, with chunks of 4)
+    lines = sample_lines(STRING_SAMPLE)
+    path = write_gzip(tmp_path / 'string.txt.gz', lines[:5] + [lines[5] + ' 999 1'] + lines[6:])
+    expected = list(string_rows(write_gzip(tmp_path / 'expected.txt.gz', lines[:5] + lines[6:]), string_mapping,
+                                True, False))
+    adapter = StringPPIAdapter(path, write_properties=True, add_provenance=False,
+                               ensembl_uniprot_processor=SimpleNamespace(mapping=string_mapping),
+                               chunk_size=chunk_size)
+    row_errors.clear()
+    assert list(adapter.get_edges()) == expected
+    assert row_errors.counts == {('StringPPIAdapter', 'ValueError'): 1}
+
+    lines = sample_lines(TOPLD_SAMPLE)
+    path = write_gzip(tmp_path / 'topld.csv.gz', lines[:5] + [lines[5] + ',extra,more'] + lines[6:])
+    adapter = TopLDAdapter(path, dbsnp_pos_map, 'chr16', 'EUR', LABEL, True, False, cutoff=0.0,
+                           chunk_size=chunk_size)
+    expected = list(topld_rows(write_gzip(tmp_path / 'expected.csv.gz', lines[:5] + lines[6:]), dbsnp_pos_map,
+                               'chr16', cutoff=0.0))
+    row_errors.clear()
+    assert list(adapter.get_edges()) == expected
+    assert row_errors.counts == {('TopLDAdapter', 'ValueError'): 1}
+    row_errors.clear()
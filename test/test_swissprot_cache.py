@@ -0,0 +1,57 @@
+"""
+Checks that the SwissProt cache returns the records Bio.SwissProt parses.
+"""
+
+import gzip
+import os
+import shutil
+
+from Bio import SwissProt
+
+from biocypher_metta.adapters import swissprot_cache
+from biocypher_metta.adapters.swissprot_cache import SwissProtCache
+
+SAMPLE = 'samples/hsa/uniprot_sprot_human_sample.dat.gz'
+
+
+def test_records_match_parser(tmp_path):
+    with gzip.open(SAMPLE, 'rt') as f:
+        parsed = list(SwissProt.parse(f))
+
+    with SwissProtCache(SAMPLE, str(tmp_path)) as swissprot:
+        records = list(swissprot.records(['entry_name', 'accessions', 'sequence_length', 'cross_references',
+                                          'comments', 'binding_sites'], batch_size=7))
+    assert len(records) == len(parsed)
+    for record, expected in zip(records, parsed):
+        assert record.entry_name == expected.entry_name
+        assert record.accessions == expected.accessions
+        assert record.sequence_length == expected.sequence_length
+        assert [tuple(xref) for xref in record.cross_references] == expected.cross_references
+        assert record.comments == expected.comments
+        assert [site['ligand_id'] for site in record.binding_sites] == \
+            [feature.qualifiers.get('ligand_id') for feature in expected.features if feature.type == 'BINDING']
+
+    # a second reader uses the cache built by the first
+    cache_files = list(tmp_path.iterdir())
+    with SwissProtCache(SAMPLE, str(tmp_path)) as swissprot:
+        assert next(swissprot.records(['entry_name'])).entry_name == parsed[0].entry_name
+    assert list(tmp_path.iterdir()) == cache_files
+
+
+def test_digest_computed_once(tmp_path, monkeypatch):
+    sample = tmp_path / 'uniprot_sprot_human_sample.dat.gz'
+    shutil.copy(SAMPLE, sample)
+    hashed = []
+    file_digest = swissprot_cache.file_digest
+    monkeypatch.setattr(swissprot_cache, 'file_digest', lambda path: hashed.append(path) or file_digest(path))
+    cache_dir = str(tmp_path / 'cache')
+
+    path = swissprot_cache.swissprot_cache_path(str(sample), cache_dir)
+    assert swissprot_cache.swissprot_cache_path(str(sample), cache_dir) == path
+    assert len(hashed) == 1
+
+    # a file rewritten in place is hashed again
+    stat = sample.stat()
+    os.utime(sample, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert swissprot_cache.swissprot_cache_path(str(sample), cache_dir) == path
+    assert len(hashed) == 2